@@ -87,7 +87,10 @@ async function install(components) {
   const log = message => { const line = `[${new Date().toLocaleTimeString('zh-CN',{hour12:false})}] ${message}`; fs.appendFileSync(logPath, `${line}\n`, 'utf8'); send({type:'log',message:line}); };
   fs.writeFileSync(logPath, '', 'utf8');
   fs.mkdirSync(modelRoot, {recursive:true});
-  if (app.isPackaged) fs.copyFileSync(bundledBatchScript, batchScript);
+  if (app.isPackaged) {
+    fs.copyFileSync(bundledBatchScript, batchScript);
+    fs.copyFileSync(path.join(process.resourcesPath, 'full-hub', 'download_engine.py'), path.join(modelRoot, 'download_engine.py'));
+  }
   log(`安装根目录: ${installDir}`);
   log(`模型保存目录: ${modelRoot}`);
 
@@ -12,6 +12,13 @@ from urllib3.util.retry import Retry
 import platform
 import subprocess
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+try:
+    from download_engine import DownloadError, download, extract_zip_streaming, release_manifest
+except ImportError:
+    # 旧版安装器只复制了本文件，没有引擎时退回单连接下载
+    download = None
+
 system = platform.system()
 
 version_tag = "v6.6.2"
@@ -81,6 +88,18 @@ def extract_zip(zip_file, target_folder):
     print(f"正在解压 {zip_file} 到 {target_folder}...")
     if not os.path.exists(target_folder):
         os.makedirs(target_folder)
+    if download is not None:
+        try:
+            extract_zip_streaming(zip_file, target_folder, progress=lambda done, total: display_progress_bar(
+                int(done * 100 / total), "解压进度", current=done, total=total))
+            print("\n解压完成!")
+            return True
+        except zipfile.BadZipFile as e:
+            print(f"错误: 下载的文件不是有效的ZIP格式 ({e})")
+            return False
+        except Exception as e:
+            print(f"解压过程中出错: {e}")
+            return False
     try:
         with zipfile.ZipFile(zip_file, 'r') as zip_ref:
             file_list = zip_ref.namelist()
@@ -220,6 +239,34 @@ def _live2d_installed_version(target_folder):
         return None
 
 
+def _release_asset(asset_name):
+    """从 GitHub Release 读取资产的 SHA-256 和大小；取不到（限流/无网）时返回 None，只是不做校验"""
+    api_url = f'https://api.github.com/repos/morettt/my-neuro/releases/tags/{version_tag}'
+    try:
+        return release_manifest(api_url).get(asset_name)
+    except Exception as e:
+        print(f"获取校验信息失败，跳过 SHA-256 校验: {e}")
+        return None
+
+
+def _download_segmented(download_sources, file_path, asset_name):
+    """多源分段并行下载，中断后重新运行会从断点继续；失败返回 None"""
+    asset = _release_asset(asset_name) or {}
+    print(f"正在下载: {asset_name}...")
+    try:
+        download(
+            download_sources, file_path, sha256=asset.get('sha256'), size=asset.get('size'), segments=8,
+            progress=lambda done, total: display_progress_bar(
+                int(done * 100 / total) if total else 0, "下载进度",
+                mb_downloaded=done / (1024 * 1024), mb_total=total / (1024 * 1024))
+        )
+        print("\n下载完成!")
+        return file_path
+    except (DownloadError, OSError) as e:
+        print(f"\n[FAIL] 下载失败: {e}")
+        return None
+
+
 def download_live2d(force=False):
     print("\n========== 下载Live 2D模型 ==========")
     repo_root = os.path.dirname(current_dir)
@@ -236,7 +283,9 @@ def download_live2d(force=False):
     ]
     zip_path = os.path.join(repo_root, 'live-2d.zip')
     downloaded_file = None
-    for source_name, url in download_sources:
+    if download is not None:
+        downloaded_file = _download_segmented(download_sources, zip_path, 'live-2d.zip')
+    for source_name, url in ([] if download is not None else download_sources):
         try:
             print(f"尝试使用 {source_name} 下载...")
             downloaded_file = download_file(url, zip_path)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
 from funasr import AutoModel
 import torch
@@ -7,7 +7,14 @@ import numpy as np
 import os
 import sys
 import re
+import time
+import struct
+import asyncio
 
+from concurrent.futures import ThreadPoolExecutor
+
+from collections import deque
+from typing import List
 from datetime import datetime
 from queue import Queue
 from modelscope.hub.snapshot_download import snapshot_download
@@ -76,11 +83,31 @@ SAMPLE_RATE = 16000
 WINDOW_SIZE = 512
 VAD_THRESHOLD = 0.7
 
+# 流式识别参数
+STREAM_CHUNK_SIZE = [0, 10, 5]           # paraformer-zh-streaming: 600ms 一块，300ms 前瞻
+STREAM_CHUNK_SAMPLES = STREAM_CHUNK_SIZE[1] * 960
+STREAM_ENCODER_LOOK_BACK = 4
+STREAM_DECODER_LOOK_BACK = 1
+STREAM_PRE_ROLL_FRAMES = 10              # 语音开始前保留约 320ms
+STREAM_END_SILENCE_FRAMES = 20           # 连续约 640ms 静音判定说话结束
+STREAM_PARTIAL_INTERVAL = 0.6            # 无流式模型时，分块重解码的间隔（秒）
+STREAM_MAX_UTTERANCE_SECONDS = 30        # 单句最长时长，超过强制结束
+
+# 识别队列参数
+ASR_WORKERS = 1                          # 推理线程数（单 GPU 建议 1）
+ASR_MAX_BATCH = 8                        # 单次 generate 合并的最大句数
+ASR_BATCH_WINDOW = 0.02                  # 收集并发请求的等待时间（秒）
+
+# VAD 批处理参数
+VAD_BATCH_WINDOW = 0.002                 # 每个 tick 收集其他连接帧的等待时间（秒）
+VAD_MAX_BATCH = 64
+
 # VAD状态
 vad_state = {
     "is_running": False,
     "active_websockets": set(),
     "model": None,
+    "engine": None,
     "result_queue": Queue()
 }
 
@@ -92,9 +119,22 @@ torch.set_default_dtype(torch.float32)
 model_state = {
     "vad_model": None,
     "asr_model": None,
+    "asr_streaming_model": None,
     "punc_model": None
 }
 
+# 识别队列
+transcription_state = {
+    "queue": None
+}
+
+# 流式识别延迟统计（最近 200 句）
+stream_metrics = {
+    "first_partial_ms": deque(maxlen=200),
+    "final_ms": deque(maxlen=200),
+    "utterances": 0
+}
+
 # 热词配置
 HOTWORD_FILE = os.path.join(os.path.dirname(__file__), "hotwords.txt")
 hotword_state = {
@@ -194,6 +234,19 @@ async def startup_event():
     )
     print("ASR模型加载完成")
 
+    # 加载流式ASR模型（可选，失败时流式接口退回分块重解码）
+    print("正在加载流式ASR模型（paraformer-zh-streaming）...")
+    try:
+        model_state["asr_streaming_model"] = AutoModel(
+            model="paraformer-zh-streaming",
+            device=device,
+            dtype="float32"
+        )
+        print("流式ASR模型加载完成")
+    except Exception as e:
+        model_state["asr_streaming_model"] = None
+        print(f"流式ASR模型加载失败，流式接口将使用分块重解码: {str(e)}")
+
     # 加载标点符号模型
     print("正在加载标点符号模型...")
     model_state["punc_model"] = AutoModel(
@@ -217,27 +270,202 @@ async def startup_event():
     print("标点符号模型加载完成")
 
     vad_state["model"] = model_state["vad_model"]
+    vad_state["engine"] = VADEngine(model_state["vad_model"])
+    print(f"VAD引擎: {'跨连接批处理' if vad_state['engine'].batched else '逐帧推理'}")
+
+    transcription_state["queue"] = TranscriptionQueue(
+        workers=ASR_WORKERS,
+        max_batch=ASR_MAX_BATCH,
+        batch_window=ASR_BATCH_WINDOW
+    )
+    transcription_state["queue"].start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if vad_state["engine"] is not None:
+        await vad_state["engine"].close()
+    if transcription_state["queue"] is not None:
+        await transcription_state["queue"].close()
+
+
+class VADStream:
+    """单个连接的 silero VAD 状态（RNN state 与上一帧尾部上下文）"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.reset()
+
+    def reset(self):
+        self.state = {name: np.zeros(shape, dtype=np.float32) for name, shape in self.engine.state_shapes.items()}
+        self.context = np.zeros(self.engine.context_size, dtype=np.float32)
+
+    async def __call__(self, frame):
+        """提交一帧 512 样本，返回语音概率"""
+        return await self.engine.submit(self, frame)
+
+
+class VADEngine:
+    """
+    跨连接批处理的 VAD 推理引擎
+
+    每个连接持有自己的 VADStream 状态，推理放到独立线程执行；
+    同一 tick 内所有连接提交的帧拼成一个 batch 调用一次 ONNX session。
+    模型不是 ONNX 时退回逐帧调用原模型（状态在连接间共享，与旧行为一致）。
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.session = getattr(model, "session", None)
+        self.queue = None
+        self.task = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vad")
+        self.batches = 0
+        self.frames = 0
+
+        input_names = {i.name for i in self.session.get_inputs()} if self.session else set()
+        if "state" in input_names:
+            # silero-vad v5：state [2, B, 128]，输入需拼接前一帧末尾 64 个样本
+            self.state_shapes = {"state": (2, 128)}
+            self.context_size = 64
+        elif {"h", "c"} <= input_names:
+            # silero-vad v4：h/c 各 [2, B, 64]
+            self.state_shapes = {"h": (2, 64), "c": (2, 64)}
+            self.context_size = 0
+        else:
+            self.session = None
+            self.state_shapes = {}
+            self.context_size = 0
+        self.batched = self.session is not None
+
+    def open_stream(self):
+        return VADStream(self)
+
+    async def submit(self, stream, frame):
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((stream, frame, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            if VAD_BATCH_WINDOW > 0:
+                await asyncio.sleep(VAD_BATCH_WINDOW)
+            while not self.queue.empty() and len(items) < VAD_MAX_BATCH:
+                items.append(self.queue.get_nowait())
+
+            # 同一连接的帧必须按顺序推理，每个 batch 中每个连接只取一帧
+            batch, deferred, seen = [], [], set()
+            for item in items:
+                if id(item[0]) in seen:
+                    deferred.append(item)
+                else:
+                    seen.add(id(item[0]))
+                    batch.append(item)
+            for item in deferred:
+                self.queue.put_nowait(item)
+
+            try:
+                probs = await loop.run_in_executor(self.executor, self._infer, batch)
+                for (_, _, future), prob in zip(batch, probs):
+                    if not future.done():
+                        future.set_result(prob)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self.batches += 1
+            self.frames += len(batch)
+
+    def _infer(self, batch):
+        if not self.batched:
+            return [
+                self.model(torch.from_numpy(np.ascontiguousarray(frame, dtype=np.float32)), SAMPLE_RATE).item()
+                for _, frame, _ in batch
+            ]
+
+        size = len(batch)
+        inputs = np.empty((size, self.context_size + WINDOW_SIZE), dtype=np.float32)
+        for i, (stream, frame, _) in enumerate(batch):
+            inputs[i, :self.context_size] = stream.context
+            inputs[i, self.context_size:] = frame
+
+        ort_inputs = {"input": inputs, "sr": np.array(SAMPLE_RATE, dtype=np.int64)}
+        for name in self.state_shapes:
+            ort_inputs[name] = np.stack([stream.state[name] for stream, _, _ in batch], axis=1)
+
+        outputs = self.session.run(None, ort_inputs)
+        probs = outputs[0].reshape(size, -1)[:, 0]
+        for i, (stream, _, _) in enumerate(batch):
+            for j, name in enumerate(self.state_shapes, start=1):
+                stream.state[name] = outputs[j][:, i].copy()
+            if self.context_size:
+                stream.context = inputs[i, -self.context_size:].copy()
+        return [float(p) for p in probs]
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.executor.shutdown(wait=False)
+
+
+def _frames(audio):
+    """把 PCM 缓冲按 512 样本切帧（零拷贝视图）"""
+    usable = len(audio) - len(audio) % WINDOW_SIZE
+    return [audio[start:start + WINDOW_SIZE] for start in range(0, usable, WINDOW_SIZE)]
 
 
 @app.websocket("/v1/ws/vad")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, mode: str = "json", coalesce: int = 1):
+    """
+    逐帧 VAD。
+
+    mode=json（默认）：每帧返回 {"is_speech", "probability"}；
+        coalesce=N 时每 N 帧合并为一条 {"results": [...]}。
+    mode=binary：返回 little-endian float32 概率数组，每 N 帧一条消息。
+    """
     await websocket.accept()
     vad_state["active_websockets"].add(websocket)
+    stream = vad_state["engine"].open_stream()
+    coalesce = max(1, min(int(coalesce), 256))
+    pending = []
     try:
         print("新的WebSocket连接")
         while True:
             try:
                 data = await websocket.receive_bytes()
-                audio = np.frombuffer(data, dtype=np.float32).copy()
-
-                if len(audio) == WINDOW_SIZE:
-                    audio_tensor = torch.FloatTensor(audio)
-                    speech_prob = vad_state["model"](audio_tensor, SAMPLE_RATE).item()
-                    result = {
-                        "is_speech": speech_prob > VAD_THRESHOLD,
-                        "probability": float(speech_prob)
-                    }
-                    await websocket.send_text(json.dumps(result))
+                audio = np.frombuffer(data, dtype=np.float32)
+
+                for frame in _frames(audio):
+                    pending.append(await stream(frame))
+                    if len(pending) < coalesce:
+                        continue
+
+                    if mode == "binary":
+                        await websocket.send_bytes(struct.pack(f"<{len(pending)}f", *pending))
+                    elif coalesce == 1:
+                        result = {
+                            "is_speech": pending[0] > VAD_THRESHOLD,
+                            "probability": float(pending[0])
+                        }
+                        await websocket.send_text(json.dumps(result))
+                    else:
+                        await websocket.send_text(json.dumps({
+                            "results": [
+                                {"is_speech": p > VAD_THRESHOLD, "probability": float(p)}
+                                for p in pending
+                            ]
+                        }))
+                    pending = []
             except WebSocketDisconnect:
                 print("客户端断开连接")
                 break
@@ -256,64 +484,384 @@ async def websocket_endpoint(websocket: WebSocket):
             pass
 
 
-@app.post("/v1/upload_audio")
-async def upload_audio(file: UploadFile = File(...)):
+def _punctuate(text):
+    """只在整句结束时加标点"""
+    if not text:
+        return text
+    result = model_state["punc_model"].generate(input=text, dtype="float32")
+    return result[0]["text"] if result else text
+
+
+def _decode_offline(audio):
+    """用离线 paraformer 解码整段音频，返回不带标点的文本"""
+    generate_kwargs = {
+        "input": audio,
+        "dtype": "float32"
+    }
+    if hotword_state["hotwords"]:
+        generate_kwargs["hotword"] = hotword_state["hotwords"]
+    with torch.no_grad():
+        result = model_state["asr_model"].generate(**generate_kwargs)
+    return result[0]["text"] if result else ""
+
+
+def _decode_streaming_chunk(chunk, cache, is_final):
+    """把一块音频送入流式 paraformer，返回这一块新增的文本"""
+    with torch.no_grad():
+        result = model_state["asr_streaming_model"].generate(
+            input=chunk,
+            cache=cache,
+            is_final=is_final,
+            chunk_size=STREAM_CHUNK_SIZE,
+            encoder_chunk_look_back=STREAM_ENCODER_LOOK_BACK,
+            decoder_chunk_look_back=STREAM_DECODER_LOOK_BACK
+        )
+    return result[0]["text"] if result else ""
+
+
+class StreamingUtterance:
+    """流式接口中一句话的识别状态"""
+
+    def __init__(self, pre_roll):
+        self.started_at = time.perf_counter()
+        self.audio = list(pre_roll)          # 已收到的整句音频（512 样本一帧）
+        self.pending = list(pre_roll)        # 尚未送入流式模型的音频
+        self.cache = {}
+        self.text = ""
+        self.first_partial_at = None
+        self.last_speech_at = self.started_at
+        self.last_partial_decode_at = self.started_at
+        self.silence_frames = 0
+
+    def samples(self, frames):
+        return np.concatenate(frames) if frames else np.zeros(0, dtype=np.float32)
+
+    def duration(self):
+        return sum(len(f) for f in self.audio) / SAMPLE_RATE
+
+
+async def _emit_partial(websocket, utterance, text):
+    if not text or (text == utterance.text and utterance.first_partial_at is not None):
+        return
+    utterance.text = text
+    if utterance.first_partial_at is None:
+        utterance.first_partial_at = time.perf_counter()
+    await websocket.send_text(json.dumps({
+        "type": "partial",
+        "text": text
+    }, ensure_ascii=False))
+
+
+async def _stream_partial(websocket, utterance):
+    """说话过程中推进识别并下发中间结果"""
+    if model_state["asr_streaming_model"] is not None:
+        pending_samples = sum(len(f) for f in utterance.pending)
+        if pending_samples < STREAM_CHUNK_SAMPLES:
+            return
+        chunk = utterance.samples(utterance.pending)
+        utterance.pending = []
+        delta = await transcription_state["queue"].run(_decode_streaming_chunk, chunk, utterance.cache, False)
+        await _emit_partial(websocket, utterance, utterance.text + delta)
+    else:
+        now = time.perf_counter()
+        if now - utterance.last_partial_decode_at < STREAM_PARTIAL_INTERVAL:
+            return
+        utterance.last_partial_decode_at = now
+        text = await transcription_state["queue"].run(_decode_offline, utterance.samples(utterance.audio))
+        await _emit_partial(websocket, utterance, text)
+
+
+async def _stream_final(websocket, utterance, reason):
+    """整句结束：冲刷剩余音频、加标点并下发最终结果和延迟"""
+    if model_state["asr_streaming_model"] is not None:
+        chunk = utterance.samples(utterance.pending)
+        utterance.pending = []
+        delta = await transcription_state["queue"].run(_decode_streaming_chunk, chunk, utterance.cache, True)
+        raw_text = utterance.text + delta
+        text = await transcription_state["queue"].run(_punctuate, raw_text) if raw_text else ""
+    else:
+        # 无流式模型时整句进入识别队列，与上传请求合并批处理
+        text, raw_text = await transcription_state["queue"].transcribe(utterance.samples(utterance.audio))
+    finished_at = time.perf_counter()
+
+    first_partial_ms = None
+    if utterance.first_partial_at is not None:
+        first_partial_ms = round((utterance.first_partial_at - utterance.started_at) * 1000, 1)
+        stream_metrics["first_partial_ms"].append(first_partial_ms)
+    final_ms = round((finished_at - utterance.last_speech_at) * 1000, 1)
+    stream_metrics["final_ms"].append(final_ms)
+    stream_metrics["utterances"] += 1
+
+    await websocket.send_text(json.dumps({
+        "type": "final",
+        "text": text,
+        "raw_text": raw_text,
+        "reason": reason,
+        "audio_seconds": round(utterance.duration(), 2),
+        "latency": {
+            "time_to_first_partial_ms": first_partial_ms,
+            "end_of_speech_to_final_ms": final_ms
+        }
+    }, ensure_ascii=False))
+    print(f"流式识别: {text} (首个中间结果 {first_partial_ms}ms, 说话结束到最终结果 {final_ms}ms)")
+
+
+@app.websocket("/v1/ws/asr_stream")
+async def asr_stream_endpoint(websocket: WebSocket):
+    """
+    流式识别：客户端持续发送 16kHz float32 PCM，服务端做 VAD 断句，
+    说话过程中下发 partial，说话结束后下发带标点的 final。
+
+    文本消息 {"type": "flush"} 可强制结束当前句子。
+    """
+    await websocket.accept()
+    vad_state["active_websockets"].add(websocket)
+    vad_stream = vad_state["engine"].open_stream()
+    pre_roll = deque(maxlen=STREAM_PRE_ROLL_FRAMES)
+    remainder = np.zeros(0, dtype=np.float32)
+    utterance = None
     try:
-        # 直接读取音频数据到内存
-        audio_bytes = await file.read()
+        print("新的流式识别连接")
+        while True:
+            message = await websocket.receive()
+            if message.get("type") == "websocket.disconnect":
+                break
 
-        # 使用 soundfile 或 librosa 直接从内存中解析音频
-        import io
+            if message.get("text") is not None:
+                try:
+                    command = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if command.get("type") == "flush" and utterance is not None:
+                    await _stream_final(websocket, utterance, "flush")
+                    utterance = None
+                continue
+
+            data = message.get("bytes")
+            if not data:
+                continue
+            audio = np.frombuffer(data, dtype=np.float32)
+            if len(remainder):
+                audio = np.concatenate([remainder, audio])
+
+            frames = _frames(audio)
+            remainder = audio[len(frames) * WINDOW_SIZE:].copy()
+            for frame in frames:
+                is_speech = await vad_stream(frame) > VAD_THRESHOLD
+
+                if utterance is None:
+                    pre_roll.append(frame)
+                    if is_speech:
+                        utterance = StreamingUtterance(pre_roll)
+                        pre_roll.clear()
+                        await websocket.send_text(json.dumps({"type": "speech_start"}))
+                    continue
+
+                utterance.audio.append(frame)
+                utterance.pending.append(frame)
+                if is_speech:
+                    utterance.silence_frames = 0
+                    utterance.last_speech_at = time.perf_counter()
+                else:
+                    utterance.silence_frames += 1
+
+                if utterance.silence_frames >= STREAM_END_SILENCE_FRAMES:
+                    await _stream_final(websocket, utterance, "silence")
+                    utterance = None
+                elif utterance.duration() >= STREAM_MAX_UTTERANCE_SECONDS:
+                    await _stream_final(websocket, utterance, "max_length")
+                    utterance = None
+
+            if utterance is not None:
+                await _stream_partial(websocket, utterance)
+    except WebSocketDisconnect:
+        print("流式识别客户端断开连接")
+    except Exception as e:
+        print(f"流式识别出错: {str(e)}")
+    finally:
+        vad_state["active_websockets"].discard(websocket)
+        print("流式识别连接关闭")
         try:
-            import soundfile as sf
-            # 直接从内存中读取音频数据
-            audio_data, sample_rate = sf.read(io.BytesIO(audio_bytes))
-            audio_data = audio_data.astype(np.float32)  # sf.read 默认返回 float64，强制转 float32 防止 DoubleTensor 错误
-            print(f"音频数据形状: {audio_data.shape}, 采样率: {sample_rate}")
-        except ImportError:
-            print("soundfile 不可用，尝试使用 librosa")
+            await websocket.close()
+        except:
+            pass
+
+
+@app.get("/v1/asr_stream/stats")
+def get_stream_stats():
+    """流式识别延迟统计（毫秒，p50/p90）"""
+    def summary(values):
+        if not values:
+            return None
+        arr = np.asarray(values, dtype=np.float64)
+        return {
+            "p50": round(float(np.percentile(arr, 50)), 1),
+            "p90": round(float(np.percentile(arr, 90)), 1),
+            "count": len(arr)
+        }
+
+    return {
+        "streaming_model": model_state["asr_streaming_model"] is not None,
+        "utterances": stream_metrics["utterances"],
+        "time_to_first_partial_ms": summary(stream_metrics["first_partial_ms"]),
+        "end_of_speech_to_final_ms": summary(stream_metrics["final_ms"])
+    }
+
+
+def _to_mono(audio):
+    """多声道下混为单声道"""
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    return audio
+
+
+def _resample(audio, sample_rate):
+    """统一重采样到 16kHz float32（多相滤波，所有输入走同一条路径）"""
+    audio = np.asarray(audio, dtype=np.float32)
+    if sample_rate == SAMPLE_RATE or len(audio) == 0:
+        return audio
+    try:
+        from math import gcd
+        from scipy.signal import resample_poly
+        g = gcd(int(sample_rate), SAMPLE_RATE)
+        return resample_poly(audio, SAMPLE_RATE // g, int(sample_rate) // g).astype(np.float32, copy=False)
+    except ImportError:
+        duration = len(audio) / sample_rate
+        target = np.linspace(0, duration, int(round(duration * SAMPLE_RATE)), endpoint=False)
+        source = np.arange(len(audio)) / sample_rate
+        return np.interp(target, source, audio).astype(np.float32)
+
+
+def _decode_container(fileobj):
+    """从上传文件对象直接解码（不先整体读入 bytes），返回 16kHz 单声道 float32"""
+    try:
+        import soundfile as sf
+        audio, sample_rate = sf.read(fileobj, dtype="float32", always_2d=False)
+    except ImportError:
+        print("soundfile 不可用，尝试使用 librosa")
+        import librosa
+        audio, sample_rate = librosa.load(fileobj, sr=None, mono=False)
+        audio = audio.T if audio.ndim > 1 else audio
+    return _resample(_to_mono(audio), sample_rate)
+
+
+def _decode_pcm(data, sample_rate, dtype, channels):
+    """解析裸 PCM（float32 或 int16），跳过容器解码"""
+    if dtype == "int16":
+        audio = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    else:
+        audio = np.frombuffer(data, dtype="<f4")
+    if channels > 1:
+        audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels)
+    return _resample(_to_mono(audio), sample_rate)
+
+
+class TranscriptionQueue:
+    """
+    识别请求队列
+
+    上传接口只负责解码，把 16kHz 音频放进队列后等待结果；
+    后台 worker 把同一时间窗口内的多段音频合并为一次 generate 调用，
+    推理在线程池中执行，不阻塞事件循环（VAD 连接等）。
+    """
+
+    def __init__(self, workers=1, max_batch=8, batch_window=0.02):
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.queue = None
+        self.tasks = []
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr")
+        self.batches = 0
+        self.utterances = 0
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def run(self, fn, *args):
+        """在推理线程池里执行其他用到模型的调用（流式解码、标点），与批处理共用线程，
+        funasr 模型不是线程安全的，不能另开线程调用"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def transcribe(self, audio):
+        """提交一段 16kHz 音频，返回 (带标点文本, 原始文本)"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((audio, future))
+        return await future
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            if self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+            while not self.queue.empty() and len(jobs) < self.max_batch:
+                jobs.append(self.queue.get_nowait())
+
             try:
-                import librosa
-                audio_data, sample_rate = librosa.load(io.BytesIO(audio_bytes), sr=16000)
-                audio_data = audio_data.astype(np.float32)  # 确保类型一致
-                print(f"音频数据形状: {audio_data.shape}, 采样率: {sample_rate}")
-            except ImportError:
-                return {
-                    "status": "error",
-                    "message": "需要安装 soundfile 或 librosa 库来处理音频"
-                }
-
-        # 进行ASR处理 - 直接传入音频数组
+                results = await loop.run_in_executor(self.executor, self._run_batch, [a for a, _ in jobs])
+                for (_, future), result in zip(jobs, results):
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                for _, future in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+            self.batches += 1
+            self.utterances += len(jobs)
+
+    def _run_batch(self, audios):
+        generate_kwargs = {
+            "input": audios if len(audios) > 1 else audios[0],
+            "batch_size": len(audios),
+            "dtype": "float32"
+        }
+        if hotword_state["hotwords"]:
+            generate_kwargs["hotword"] = hotword_state["hotwords"]
+
         with torch.no_grad():
-            generate_kwargs = {
-                "input": audio_data,
-                "dtype": "float32"
-            }
-            if hotword_state["hotwords"]:
-                generate_kwargs["hotword"] = hotword_state["hotwords"]
-
-            asr_result = model_state["asr_model"].generate(**generate_kwargs)
-
-            # 添加标点符号
-            if asr_result and len(asr_result) > 0:
-                text_input = asr_result[0]["text"]
-                final_result = model_state["punc_model"].generate(
-                    input=text_input,
-                    dtype="float32"
-                )
-
-                return {
-                    "status": "success",
-                    "filename": file.filename or "uploaded_audio",
-                    "text": final_result[0]["text"] if final_result else text_input
-                }
-            else:
-                return {
-                    "status": "error",
-                    "filename": file.filename or "uploaded_audio",
-                    "message": "语音识别失败"
-                }
+            asr_results = model_state["asr_model"].generate(**generate_kwargs) or []
+
+        texts = [r.get("text", "") for r in asr_results]
+        texts += [""] * (len(audios) - len(texts))
+        return [(_punctuate(text) if text else "", text) for text in texts]
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.executor.shutdown(wait=False)
+
+
+async def _transcribe_result(audio, filename):
+    if len(audio) == 0:
+        return {
+            "status": "error",
+            "filename": filename,
+            "message": "音频为空"
+        }
+    text, raw_text = await transcription_state["queue"].transcribe(audio)
+    if not raw_text:
+        return {
+            "status": "error",
+            "filename": filename,
+            "message": "语音识别失败"
+        }
+    return {
+        "status": "success",
+        "filename": filename,
+        "text": text
+    }
 
+
+@app.post("/v1/upload_audio")
+async def upload_audio(file: UploadFile = File(...)):
+    try:
+        audio_data = await asyncio.to_thread(_decode_container, file.file)
+        print(f"音频数据形状: {audio_data.shape}, 采样率: {SAMPLE_RATE}")
+        return await _transcribe_result(audio_data, file.filename or "uploaded_audio")
     except Exception as e:
         print(f"处理音频时出错: {str(e)}")
         return {
@@ -322,6 +870,60 @@ async def upload_audio(file: UploadFile = File(...)):
         }
 
 
+@app.post("/v1/upload_pcm")
+async def upload_pcm(
+    request: Request,
+    sample_rate: int = SAMPLE_RATE,
+    dtype: str = "float32",
+    channels: int = 1
+):
+    """请求体为裸 PCM（float32 或 int16，小端），跳过容器解码"""
+    try:
+        data = await request.body()
+        audio_data = _decode_pcm(data, sample_rate, dtype, max(1, channels))
+        return await _transcribe_result(audio_data, "pcm")
+    except Exception as e:
+        print(f"处理PCM时出错: {str(e)}")
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+
+
+@app.post("/v1/transcribe/batch")
+async def transcribe_batch(files: List[UploadFile] = File(...)):
+    """离线批量识别：多个文件同时入队，由队列合并成批推理"""
+    async def run(upload):
+        filename = upload.filename or "uploaded_audio"
+        try:
+            audio_data = await asyncio.to_thread(_decode_container, upload.file)
+            return await _transcribe_result(audio_data, filename)
+        except Exception as e:
+            return {
+                "status": "error",
+                "filename": filename,
+                "message": str(e)
+            }
+
+    results = await asyncio.gather(*(run(f) for f in files))
+    return {
+        "status": "success",
+        "count": len(results),
+        "results": results
+    }
+
+
+@app.get("/v1/transcribe/stats")
+def get_transcribe_stats():
+    q = transcription_state["queue"]
+    return {
+        "workers": q.workers if q else 0,
+        "pending": q.queue.qsize() if q and q.queue else 0,
+        "batches": q.batches if q else 0,
+        "avg_batch_size": round(q.utterances / q.batches, 2) if q and q.batches else 0
+    }
+
+
 @app.get("/hotwords")
 def get_hotwords():
     """查看当前热词"""
@@ -354,9 +956,12 @@ def get_status():
     for ws in closed_websockets:
         vad_state["active_websockets"].remove(ws)
 
+    engine = vad_state["engine"]
     return {
         "is_running": bool(vad_state["active_websockets"]),
-        "active_connections": len(vad_state["active_websockets"])
+        "active_connections": len(vad_state["active_websockets"]),
+        "batched": bool(engine and engine.batched),
+        "avg_batch_size": round(engine.frames / engine.batches, 2) if engine and engine.batches else 0
     }
 
 
@@ -0,0 +1,78 @@
+"""嵌入后端一致性检查与吞吐基准
+
+以 torch 后端为基准，检查 onnx / onnx-int8 输出的余弦一致性，
+并测量各后端的吞吐（句/秒）。首次运行会在模型目录下导出 ONNX 缓存。
+
+用法：
+    python benchmark_embedding_backend.py
+    python benchmark_embedding_backend.py --model ./rag-hub --device cpu --min-cosine 0.98
+退出码非 0 表示一致性检查未通过。
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from embedding_backend import BACKENDS, load_embedding_backend, _normalize
+
+SAMPLE_TEXTS = [
+    "今天天气不错，适合出去散步。",
+    "肥牛喜欢吃火锅，尤其是麻辣锅底。",
+    "The quick brown fox jumps over the lazy dog.",
+    "记得明天早上九点提醒我开会。",
+    "我最近在玩一款开放世界的冒险游戏，地图特别大。",
+    "用户说他养了一只橘猫，名字叫小橙子。",
+    "Python 的 asyncio 适合处理大量并发的网络请求。",
+    "周末打算去图书馆借几本科幻小说。",
+]
+
+
+def throughput(model, texts, batch_size, repeat):
+    model.encode(texts[:batch_size], batch_size=batch_size)  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.encode(texts, batch_size=batch_size)
+    return len(texts) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入后端一致性与吞吐")
+    parser.add_argument("--model", default="./rag-hub")
+    parser.add_argument("--device", default="auto")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--texts", type=int, default=256, help="吞吐测试的句子数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="一致性检查的最低余弦")
+    args = parser.parse_args()
+
+    texts = (SAMPLE_TEXTS * (args.texts // len(SAMPLE_TEXTS) + 1))[:args.texts]
+
+    reference = None
+    passed = True
+    for backend in args.backends:
+        model = load_embedding_backend(args.model, backend=backend, device=args.device)
+        if model.name != backend:
+            print(f"{backend}: 加载失败（已回退到 {model.name}），跳过")
+            continue
+
+        vectors = _normalize(model.encode(SAMPLE_TEXTS))
+        line = f"{backend:<10} device={model.device:<5} dim={vectors.shape[1]}"
+        if backend == "torch":
+            reference = vectors
+        elif reference is not None:
+            cosines = np.sum(vectors * reference, axis=1)
+            ok = bool(cosines.min() >= args.min_cosine)
+            passed = passed and ok
+            line += f"  cosine(min/mean)={cosines.min():.4f}/{cosines.mean():.4f} {'OK' if ok else 'FAIL'}"
+
+        line += f"  throughput={throughput(model, texts, args.batch_size, args.repeat):.1f} 句/秒"
+        print(line)
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""RAG /ask 检索方式的微基准（不加载模型，使用随机向量）
+
+对比三种检索：
+    sklearn    旧实现：cosine_similarity（每次重新归一化整个矩阵）+ 全量 argsort
+    gemv       预归一化矩阵 + 矩阵向量乘 + argpartition（run_rag.py 当前精确检索）
+    gemm       /ask/batch：多个问题一次矩阵乘
+    hnsw       hnswlib 近似检索（已安装时）
+
+用法：
+    python benchmark_rag_search.py
+    python benchmark_rag_search.py --sizes 1000 10000 100000 1000000 --dim 1024 --dtype float16
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores, k):
+    k = min(k, scores.shape[-1])
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def timed(fn, repeat):
+    fn()  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(size, dim, dtype, top_k, batch, repeat):
+    rng = np.random.default_rng(0)
+    raw = rng.standard_normal((size, dim), dtype=np.float32)
+    matrix = np.ascontiguousarray(normalize_rows(raw).astype(dtype))
+    query = rng.standard_normal((1, dim), dtype=np.float32)
+    queries = rng.standard_normal((batch, dim), dtype=np.float32)
+
+    row = {"size": size}
+
+    if size <= 100000:
+        try:
+            from sklearn.metrics.pairwise import cosine_similarity
+
+            def sklearn_search():
+                sims = cosine_similarity(query, raw)[0]
+                return np.argsort(sims)[::-1][:top_k]
+
+            row["sklearn"] = timed(sklearn_search, repeat)
+        except ImportError:
+            pass
+
+    def gemv_search():
+        scores = normalize_rows(query).astype(dtype) @ matrix.T
+        return top_k_indices(scores, top_k)
+
+    def gemm_search():
+        scores = normalize_rows(queries).astype(dtype) @ matrix.T
+        return top_k_indices(scores, top_k)
+
+    row["gemv"] = timed(gemv_search, repeat)
+    row[f"gemm/{batch}"] = timed(gemm_search, repeat) / batch
+
+    try:
+        import hnswlib
+        index = hnswlib.Index(space="ip", dim=dim)
+        index.init_index(max_elements=size, ef_construction=200, M=16)
+        index.add_items(matrix.astype(np.float32, copy=False), np.arange(size))
+        index.set_ef(128)
+        row["hnsw"] = timed(lambda: index.knn_query(normalize_rows(query), k=top_k), repeat)
+
+        exact = top_k_indices(normalize_rows(queries) @ matrix.astype(np.float32).T, top_k)
+        approx, _ = index.knn_query(normalize_rows(queries), k=top_k)
+        row["hnsw_recall"] = float(np.mean([
+            len(set(a) & set(e)) / top_k for a, e in zip(approx, exact)
+        ]))
+    except ImportError:
+        pass
+
+    row["matrix_mb"] = matrix.nbytes / 1024 / 1024
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG 检索微基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    dtype = np.float16 if args.dtype == "float16" else np.float32
+    print(f"dim={args.dim} dtype={args.dtype} top_k={args.top_k}（单位：毫秒/问题）")
+    for size in args.sizes:
+        row = run(size, args.dim, dtype, args.top_k, args.batch, args.repeat)
+        print("  ".join(
+            f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in row.items()
+        ))
+
+
+if __name__ == "__main__":
+    main()
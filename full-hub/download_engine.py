@@ -0,0 +1,482 @@
+"""大文件下载引擎（Batch_Download.py 与 update.py 共用）
+
+- 服务器支持 Range 时把文件切成 N 段并行下载，写入预分配的 <目标>.part；
+  每段进度记在 <目标>.part.json，中断后再次运行从各段断点继续
+- 多个镜像源：某个源连续失败后，所有分段切到下一个源继续下载（已下载部分保留）
+- 下载完成后按清单校验 SHA-256，不一致则删除重下
+- ZIP 解压按块流式写盘，不把整个成员读进内存
+
+用法：
+    from download_engine import download, extract_zip_streaming
+    download([('镜像', url1), ('GitHub', url2)], 'live-2d.zip', sha256='...', segments=8)
+
+命令行（可对本地 HTTP 服务测试）：
+    python download_engine.py http://127.0.0.1:8000/a.zip -o a.zip --sha256 <hex> --segments 4
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_SEGMENTS = 4
+# 小于该大小的分段不再切分
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+# 单个源连续失败多少次后切换到下一个源
+SOURCE_MAX_FAILURES = 3
+# 进度日志写盘间隔（秒）
+JOURNAL_INTERVAL = 1.0
+
+PART_SUFFIX = '.part'
+JOURNAL_SUFFIX = '.part.json'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+class DownloadError(Exception):
+    pass
+
+
+class _RangeNotSupported(Exception):
+    pass
+
+
+def _normalize_sources(sources):
+    result = []
+    for source in ([sources] if isinstance(sources, str) else sources):
+        if isinstance(source, str):
+            result.append((source, source))
+        else:
+            result.append((source[0], source[1]))
+    return result
+
+
+def _session(session=None):
+    if session is not None:
+        return session
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_manifest(text):
+    """解析校验清单：JSON {文件名: sha256 或 {"sha256", "size"}}，或 sha256sum 格式每行 "<hex>  <文件名>" """
+    manifest = {}
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        for name, entry in data.items():
+            entry = entry if isinstance(entry, dict) else {'sha256': entry}
+            manifest[name] = {'sha256': (entry.get('sha256') or '').lower() or None, 'size': entry.get('size')}
+        return manifest
+    for line in text.splitlines():
+        parts = line.strip().split(None, 1)
+        if len(parts) == 2 and len(parts[0]) == 64:
+            manifest[parts[1].lstrip('*').strip()] = {'sha256': parts[0].lower(), 'size': None}
+    return manifest
+
+
+def release_manifest(api_url, session=None, timeout=15):
+    """GitHub Release API 的资产清单：{文件名: {"sha256", "size", "url"}}（digest 字段缺失时 sha256 为 None）"""
+    response = _session(session).get(api_url, headers={'Accept': 'application/vnd.github+json'}, timeout=timeout)
+    response.raise_for_status()
+    manifest = {}
+    for asset in response.json().get('assets', []):
+        digest = asset.get('digest') or ''
+        manifest[asset['name']] = {
+            'sha256': digest.split(':', 1)[1].lower() if digest.startswith('sha256:') else None,
+            'size': asset.get('size'),
+            'url': asset.get('browser_download_url'),
+        }
+    return manifest
+
+
+# ---------- 探测 ----------
+
+def _probe(session, url, timeout, verify):
+    """返回 (文件大小或 None, 是否支持 Range)"""
+    response = session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=timeout, verify=verify)
+    try:
+        response.raise_for_status()
+        if response.status_code == 206:
+            content_range = response.headers.get('Content-Range', '')
+            total = content_range.rsplit('/', 1)[-1]
+            return (int(total) if total.isdigit() else None), True
+        length = response.headers.get('Content-Length')
+        return (int(length) if length and length.isdigit() else None), False
+    finally:
+        response.close()
+
+
+# ---------- 进度日志 ----------
+
+class _Journal:
+    """<目标>.part.json：文件大小、期望哈希和各段 [起点, 终点(含), 已下载字节]"""
+
+    def __init__(self, path, size, sha256, segments):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.segments = segments
+        self.lock = threading.Lock()
+        self._saved_at = 0.0
+
+    @classmethod
+    def plan(cls, path, size, sha256, segments):
+        count = max(1, min(segments, size // MIN_SEGMENT_SIZE or 1))
+        step = -(-size // count)
+        ranges = [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+        return cls(path, size, sha256, ranges)
+
+    @classmethod
+    def load(cls, path, size, sha256):
+        """读取已有日志；大小或期望哈希不一致（文件已更新）时返回 None"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('size') != size or (sha256 and data.get('sha256') not in (None, sha256)):
+            return None
+        return cls(path, size, sha256 or data.get('sha256'), data.get('segments') or [])
+
+    @property
+    def downloaded(self):
+        return sum(done for _, _, done in self.segments)
+
+    def advance(self, index, nbytes):
+        """记录已落盘的字节（调用方先 flush + fsync，断电后日志不会多记）"""
+        with self.lock:
+            self.segments[index][2] += nbytes
+        self.save()
+
+    def save(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._saved_at < JOURNAL_INTERVAL:
+            return
+        with self.lock:
+            self._saved_at = now
+            data = {'size': self.size, 'sha256': self.sha256, 'segments': [list(s) for s in self.segments]}
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+
+# ---------- 镜像源 ----------
+
+class _SourcePool:
+    """当前使用的下载源；连续失败超过阈值时所有分段一起切到下一个源"""
+
+    def __init__(self, sources, log):
+        self.sources = sources
+        self.index = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+        self.log = log
+
+    def current(self):
+        with self.lock:
+            if self.index >= len(self.sources):
+                raise DownloadError('所有下载源均失败')
+            return self.index, self.sources[self.index]
+
+    def succeeded(self, index):
+        with self.lock:
+            if index == self.index:
+                self.failures = 0
+
+    def failed(self, index, error):
+        with self.lock:
+            if index != self.index:
+                return  # 其他分段已经切换过了
+            self.failures += 1
+            if self.failures >= SOURCE_MAX_FAILURES:
+                self.log(f"[FAIL] {self.sources[index][0]} 连续失败: {error}")
+                self.index += 1
+                self.failures = 0
+                if self.index < len(self.sources):
+                    self.log(f"切换到 {self.sources[self.index][0]} 继续下载...")
+
+
+# ---------- 下载 ----------
+
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+
+def _check_content_range(header, start, end, total):
+    """Content-Range 必须与请求的范围和文件大小完全一致"""
+    match = _CONTENT_RANGE.match(header or '')
+    if not match:
+        return False
+    got_start, got_end, got_total = match.groups()
+    return (int(got_start), int(got_end)) == (start, end) and got_total in ('*', str(total))
+
+
+def _fetch_segment(session, pool, journal, index, part_path, timeout, verify, stop, progress):
+    while not stop.is_set():
+        start, end, done = journal.segments[index]
+        position = start + done
+        if position > end:
+            return
+        source_index, (name, url) = pool.current()
+        try:
+            response = session.get(
+                url, headers={'Range': f'bytes={position}-{end}'},
+                stream=True, timeout=timeout, verify=verify
+            )
+            try:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise _RangeNotSupported(f'{name} 不支持分段下载')
+                content_range = response.headers.get('Content-Range')
+                if not _check_content_range(content_range, position, end, journal.size):
+                    raise DownloadError(f"{name} 返回的范围不对: {content_range}")
+                with open(part_path, 'r+b') as f:
+                    f.seek(position)
+                    unsynced = 0
+                    synced_at = time.monotonic()
+                    try:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if stop.is_set():
+                                return
+                            if not chunk:
+                                continue
+                            chunk = chunk[:end + 1 - position]
+                            f.write(chunk)
+                            position += len(chunk)
+                            unsynced += len(chunk)
+                            progress(len(chunk))
+                            if position > end:
+                                break
+                            if time.monotonic() - synced_at >= JOURNAL_INTERVAL:
+                                # 先落盘再记日志，强制结束后续传不会留下全零的空洞
+                                f.flush()
+                                os.fsync(f.fileno())
+                                journal.advance(index, unsynced)
+                                unsynced = 0
+                                synced_at = time.monotonic()
+                    finally:
+                        if unsynced:
+                            f.flush()
+                            os.fsync(f.fileno())
+                            journal.advance(index, unsynced)
+            finally:
+                response.close()
+            if position <= end:
+                raise DownloadError(f'{name} 连接提前结束')
+            pool.succeeded(source_index)
+            return
+        except (DownloadError, _RangeNotSupported, requests.RequestException, OSError) as e:
+            pool.failed(source_index, e)
+            time.sleep(0.5)
+
+
+def _download_single(session, sources, dest, timeout, verify, log, progress):
+    """不支持 Range 的源：单连接整体下载，失败换下一个源"""
+    part_path = dest + PART_SUFFIX
+    for name, url in sources:
+        try:
+            response = session.get(url, stream=True, timeout=timeout, verify=verify)
+            response.raise_for_status()
+            total = int(response.headers.get('Content-Length') or 0)
+            downloaded = 0
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        progress(len(chunk), total)
+            if total and downloaded != total:
+                raise DownloadError(f'{name} 连接提前结束 ({downloaded}/{total})')
+            return part_path
+        except (requests.RequestException, OSError, DownloadError) as e:
+            log(f"[FAIL] {name} 下载失败: {e}")
+    raise DownloadError('所有下载源均失败')
+
+
+def download(sources, dest, sha256=None, size=None, segments=DEFAULT_SEGMENTS,
+             progress=None, log=print, session=None, timeout=30, verify=True):
+    """
+    下载文件到 dest（先写 dest.part，校验通过后改名）
+
+    Args:
+        sources: URL 或 [(源名称, URL), ...]，按优先级排列
+        sha256: 期望的 SHA-256（十六进制），为空时不校验
+        size: 期望的文件大小（清单里有时传入，用于排除返回错误页的镜像）
+        segments: 并行分段数
+        progress: progress(已下载字节, 总字节) 回调
+        log: 日志函数
+
+    Returns:
+        dest
+
+    Raises:
+        DownloadError: 所有源都失败或校验不通过（已下载的分段保留，下次续传）
+    """
+    dest = os.fspath(dest)
+    sources = _normalize_sources(sources)
+    sha256 = sha256.lower() if sha256 else None
+    session = _session(session)
+    part_path = dest + PART_SUFFIX
+    journal_path = dest + JOURNAL_SUFFIX
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+
+    # 找到第一个可用的源，确定大小和是否支持分段
+    total, ranged = None, False
+    for position, (name, url) in enumerate(sources):
+        try:
+            total, ranged = _probe(session, url, timeout, verify)
+        except requests.exceptions.SSLError:
+            log(f"{name} SSL验证失败，使用不安全模式重新尝试...")
+            verify = False
+            try:
+                total, ranged = _probe(session, url, timeout, verify)
+            except requests.RequestException as e:
+                log(f"[FAIL] {name} 无法连接: {e}")
+                continue
+        except requests.RequestException as e:
+            log(f"[FAIL] {name} 无法连接: {e}")
+            continue
+        if size and total and total != size:
+            log(f"[FAIL] {name} 文件大小不符 ({total} != {size})")
+            continue
+        sources = sources[position:]
+        break
+    else:
+        raise DownloadError('所有下载源均失败')
+
+    lock = threading.Lock()
+    state = {'done': 0, 'total': total or 0, 'reported': 0.0}
+
+    def _progress(nbytes, total_override=None):
+        with lock:
+            state['done'] += nbytes
+            if total_override:
+                state['total'] = total_override
+            now = time.monotonic()
+            if progress and (now - state['reported'] >= 0.2 or state['done'] >= state['total']):
+                state['reported'] = now
+                progress(state['done'], state['total'])
+
+    if not ranged or not total:
+        log("服务器不支持分段下载，使用单连接下载")
+        _download_single(session, sources, dest, timeout, verify, log, _progress)
+    else:
+        journal = _Journal.load(journal_path, total, sha256) if os.path.exists(part_path) else None
+        if journal is None:
+            journal = _Journal.plan(journal_path, total, sha256, segments)
+            with open(part_path, 'wb') as f:
+                f.truncate(total)  # 预分配
+            journal.save(force=True)
+        else:
+            log(f"检测到未完成的下载，已下载: {journal.downloaded / (1024 * 1024):.2f}MB，继续下载...")
+        state['done'] = journal.downloaded
+
+        pool = _SourcePool(sources, log)
+        stop = threading.Event()
+        with ThreadPoolExecutor(max_workers=len(journal.segments)) as executor:
+            futures = [
+                executor.submit(_fetch_segment, session, pool, journal, index, part_path,
+                                timeout, verify, stop, _progress)
+                for index in range(len(journal.segments))
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                stop.set()
+                raise
+            finally:
+                journal.save(force=True)
+
+    if sha256:
+        log("正在校验文件完整性...")
+        actual = file_sha256(part_path)
+        if actual != sha256:
+            for path in (part_path, journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise DownloadError(f'SHA-256 校验失败: {actual} != {sha256}')
+        log("[OK] SHA-256 校验通过")
+
+    os.replace(part_path, dest)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    return dest
+
+
+# ---------- 解压 ----------
+
+def _member_name(info):
+    """ZIP 未标记 UTF-8 的文件名按 cp437 存储，中文压缩包多为 GBK"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('gbk')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def extract_zip_streaming(zip_file, target_folder, progress=None, chunk_size=CHUNK_SIZE):
+    """逐个成员按块写盘解压；progress(已完成数, 总数)。返回解压的文件数"""
+    os.makedirs(target_folder, exist_ok=True)
+    root = os.path.realpath(target_folder)
+    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+        members = zip_ref.infolist()
+        for index, info in enumerate(members):
+            name = _member_name(info)
+            target_path = os.path.realpath(os.path.join(root, name))
+            if target_path != root and not target_path.startswith(root + os.sep):
+                raise zipfile.BadZipFile(f'压缩包包含非法路径: {name}')
+            if info.is_dir() or name.endswith('/'):
+                os.makedirs(target_path, exist_ok=True)
+            else:
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                with zip_ref.open(info) as src, open(target_path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, chunk_size)
+            if progress:
+                progress(index + 1, len(members))
+        return len(members)
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='多段并行下载（可续传、多源切换、SHA-256 校验）')
+    parser.add_argument('urls', nargs='+', help='下载地址，按优先级排列')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--sha256', default=None)
+    parser.add_argument('--segments', type=int, default=DEFAULT_SEGMENTS)
+    args = parser.parse_args()
+
+    def _show(done, total):
+        percent = int(done * 100 / total) if total else 0
+        sys.stdout.write(f"\r{done / 1048576:.2f}MB/{total / 1048576:.2f}MB {percent}%")
+        sys.stdout.flush()
+
+    started = time.perf_counter()
+    download([(f'源{i + 1}', url) for i, url in enumerate(args.urls)], args.output,
+             sha256=args.sha256, segments=args.segments, progress=_show)
+    print(f"\n完成: {args.output} ({time.perf_counter() - started:.1f}s)")
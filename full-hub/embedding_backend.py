@@ -0,0 +1,262 @@
+"""文本嵌入后端（RAG 服务与 MemOS 共用）
+
+三种实现，接口与 SentenceTransformer.encode() 兼容：
+    torch       SentenceTransformer（原实现），有 GPU 用 GPU，否则 CPU
+    onnx        ONNX Runtime fp32
+    onnx-int8   ONNX Runtime + 动态 int8 量化（纯 CPU 主机推荐）
+
+ONNX 图在第一次使用时从模型目录导出，缓存在 <模型目录>/onnx/ 下，之后直接加载。
+任何一步失败（缺少 onnxruntime、导出失败、CUDA 不可用等）都会自动回退到可用的实现。
+
+用法：
+    from embedding_backend import load_embedding_backend
+    model = load_embedding_backend("./rag-hub", backend="onnx-int8", device="auto")
+    vectors = model.encode(["你好"])
+"""
+
+import os
+import json
+import time
+
+import numpy as np
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+ONNX_DIR = "onnx"
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+
+
+def _cuda_available():
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def _resolve_device(device):
+    if device in (None, "", "auto"):
+        return "cuda" if _cuda_available() else "cpu"
+    if device.startswith("cuda") and not _cuda_available():
+        print(f"[嵌入] 请求的设备 {device} 不可用，改用 CPU")
+        return "cpu"
+    return device
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class TorchEmbeddingBackend:
+    """SentenceTransformer 后端"""
+
+    name = "torch"
+
+    def __init__(self, model_path, device="auto"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_path = model_path
+        self.device = _resolve_device(device)
+        self.model = SentenceTransformer(model_path, device=self.device)
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=normalize_embeddings,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def to(self, device):
+        """兼容旧代码的 .to('cuda') 调用"""
+        self.device = _resolve_device(device)
+        self.model = self.model.to(self.device)
+        return self
+
+
+class OnnxEmbeddingBackend:
+    """ONNX Runtime 后端（fp32 或动态 int8 量化）"""
+
+    def __init__(self, model_path, quantized=False, device="auto", max_length=512):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_path = model_path
+        self.quantized = quantized
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.pooling, self.normalize_output = _read_pooling_config(model_path)
+
+        onnx_path = ensure_onnx_model(model_path, quantized=quantized)
+
+        providers = ["CPUExecutionProvider"]
+        # int8 动态量化算子只在 CPU 上有收益
+        if not quantized and _resolve_device(device).startswith("cuda") \
+                and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=providers)
+        self.device = "cuda" if self.session.get_providers()[0] == "CUDAExecutionProvider" else "cpu"
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dimension = None
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+
+        # 按长度排序后分批，减少 padding
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        outputs = [None] * len(texts)
+        for start in range(0, len(texts), batch_size):
+            batch_idx = order[start:start + batch_size]
+            batch = [texts[i] for i in batch_idx]
+            vectors = self._encode_batch(batch)
+            for i, vector in zip(batch_idx, vectors):
+                outputs[i] = vector
+
+        result = np.stack(outputs).astype(np.float32, copy=False)
+        self.dimension = result.shape[1]
+        if self.normalize_output or normalize_embeddings:
+            result = _normalize(result)
+        return result
+
+    def _encode_batch(self, texts):
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+
+        if self.pooling == "mean":
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return hidden[:, 0]
+
+    def get_sentence_embedding_dimension(self):
+        if self.dimension is None:
+            self.encode(["dimension probe"])
+        return self.dimension
+
+    def to(self, device):
+        """ONNX 会话在创建时已选定设备，这里仅保持接口兼容"""
+        return self
+
+
+def _read_pooling_config(model_path):
+    """读取 SentenceTransformer 的池化方式和是否归一化（BGE 为 CLS + Normalize）"""
+    pooling = "cls"
+    normalize = False
+    try:
+        with open(os.path.join(model_path, "modules.json"), "r", encoding="utf-8") as f:
+            modules = json.load(f)
+        for module in modules:
+            module_type = module.get("type", "")
+            if module_type.endswith("Normalize"):
+                normalize = True
+            elif module_type.endswith("Pooling"):
+                pooling_path = os.path.join(model_path, module.get("path", ""), "config.json")
+                with open(pooling_path, "r", encoding="utf-8") as f:
+                    pooling_config = json.load(f)
+                if pooling_config.get("pooling_mode_mean_tokens"):
+                    pooling = "mean"
+    except (OSError, ValueError):
+        pass
+    return pooling, normalize
+
+
+def ensure_onnx_model(model_path, quantized=False):
+    """返回 ONNX 文件路径；不存在时导出（以及量化）一次并缓存到模型目录"""
+    onnx_dir = os.path.join(model_path, ONNX_DIR)
+    fp32_path = os.path.join(onnx_dir, ONNX_FP32_FILE)
+    int8_path = os.path.join(onnx_dir, ONNX_INT8_FILE)
+
+    if not os.path.exists(fp32_path):
+        os.makedirs(onnx_dir, exist_ok=True)
+        print(f"[嵌入] 首次使用，导出 ONNX 模型到 {fp32_path} ...")
+        start = time.time()
+        _export_onnx(model_path, fp32_path)
+        print(f"[嵌入] ONNX 导出完成，耗时 {time.time() - start:.1f}s")
+
+    if not quantized:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        print(f"[嵌入] 生成 int8 动态量化模型 {int8_path} ...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+def _export_onnx(model_path, output_path):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModel.from_pretrained(model_path)
+    model.eval()
+
+    sample = tokenizer(["onnx export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    tmp_path = output_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            tmp_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            do_constant_folding=True
+        )
+    os.replace(tmp_path, output_path)
+
+
+def load_embedding_backend(model_path, backend="torch", device="auto"):
+    """
+    按配置加载嵌入后端，失败时依次回退：onnx-int8/onnx -> torch
+
+    Args:
+        model_path: SentenceTransformer 模型目录
+        backend: torch / onnx / onnx-int8 / auto（GPU 用 torch，纯 CPU 用 onnx-int8）
+        device: auto / cpu / cuda
+    """
+    backend = (backend or "torch").lower()
+    if backend == "auto":
+        backend = "torch" if _resolve_device(device).startswith("cuda") else "onnx-int8"
+    if backend not in BACKENDS:
+        print(f"[嵌入] 未知后端 {backend}，使用 torch")
+        backend = "torch"
+
+    if backend in ("onnx", "onnx-int8"):
+        try:
+            model = OnnxEmbeddingBackend(model_path, quantized=backend == "onnx-int8", device=device)
+            print(f"[嵌入] 使用 {model.name} 后端 ({model.device})")
+            return model
+        except Exception as e:
+            print(f"[嵌入] {backend} 后端加载失败，回退 torch: {e}")
+
+    model = TorchEmbeddingBackend(model_path, device=device)
+    print(f"[嵌入] 使用 torch 后端 ({model.device})")
+    return model
@@ -2,6 +2,12 @@ from fastapi import FastAPI
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 from pydantic import BaseModel
+from typing import List, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import asyncio
+import time
 import os
 import sys
 import re
@@ -47,6 +53,12 @@ app = FastAPI()
 
 class TextInput(BaseModel):
     text: str
+    threshold: Optional[float] = None
+
+
+class BatchTextInput(BaseModel):
+    texts: List[str]
+    threshold: Optional[float] = None
 
 # 检测是否有可用的GPU
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -55,6 +67,16 @@ print(f"Using device: {device}")
 # 标签映射
 label_mapping = {"0": "否", "1": "是"}
 
+# 判定阈值（请求中可单独指定 threshold 覆盖）
+DEFAULT_THRESHOLD = float(os.environ.get("BERT_THRESHOLD", "0.5"))
+
+# 动态批处理参数
+MAX_LENGTH = 512
+MAX_BATCH = 32
+BATCH_WINDOW = 0.005                       # 收集并发请求的等待时间（秒）
+LENGTH_BUCKETS = [16, 32, 64, 128, 256, MAX_LENGTH]
+CACHE_SIZE = 4096
+
 # 固定的模型路径
 model_path = "bert-hub"
 tokenizer = AutoTokenizer.from_pretrained(model_path)
@@ -64,28 +86,182 @@ model = AutoModelForSequenceClassification.from_pretrained(model_path)
 model = model.to(device)
 model.eval()
 
-@app.post("/classify")
-async def classify_emotion(input_data: TextInput):
-    text = input_data.text
-    # 预测
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-    inputs = {k: v.to(device) for k, v in inputs.items()}
 
-    with torch.no_grad():
-        outputs = model(**inputs)
-        probabilities = torch.sigmoid(outputs.logits).cpu().numpy()[0]
-        predictions = (probabilities > 0.5).astype(int)
+class ClassifyBatcher:
+    """
+    动态微批处理
+
+    并发到达的单条请求在 BATCH_WINDOW 内合并，按 token 长度分桶后
+    每桶只补齐到桶内最长长度，在单独线程中以 inference_mode 推理。
+    重复文本直接命中 LRU 缓存（缓存概率，阈值在返回时再应用）。
+    """
+
+    def __init__(self):
+        self.queue = None
+        self.task = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bert")
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self.batched_texts = 0
+
+    async def predict(self, texts):
+        """返回每条文本各标签的概率列表"""
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._run())
+
+        results = [None] * len(texts)
+        futures = []
+        for i, text in enumerate(texts):
+            cached = self._cache_get(text)
+            if cached is not None:
+                results[i] = cached
+                continue
+            future = asyncio.get_running_loop().create_future()
+            await self.queue.put((text, future))
+            futures.append((i, future))
+
+        for i, future in futures:
+            results[i] = await future
+        return results
+
+    def _cache_get(self, text):
+        probs = self.cache.get(text)
+        if probs is None:
+            self.cache_misses += 1
+            return None
+        self.cache.move_to_end(text)
+        self.cache_hits += 1
+        return probs
+
+    def _cache_put(self, text, probs):
+        self.cache[text] = probs
+        self.cache.move_to_end(text)
+        while len(self.cache) > CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            if BATCH_WINDOW > 0:
+                await asyncio.sleep(BATCH_WINDOW)
+            while not self.queue.empty() and len(jobs) < MAX_BATCH:
+                jobs.append(self.queue.get_nowait())
+
+            # 同一批内重复文本只推理一次
+            unique_texts = list(dict.fromkeys(text for text, _ in jobs))
+            try:
+                probs = await loop.run_in_executor(self.executor, self._infer, unique_texts)
+                by_text = dict(zip(unique_texts, probs))
+                for text, p in by_text.items():
+                    self._cache_put(text, p)
+                for text, future in jobs:
+                    if not future.done():
+                        future.set_result(by_text[text])
+            except Exception as e:
+                for _, future in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+            self.batches += 1
+            self.batched_texts += len(unique_texts)
+
+    def _infer(self, texts):
+        encoded = tokenizer(texts, truncation=True, max_length=MAX_LENGTH)
+        buckets = {}
+        for i, ids in enumerate(encoded["input_ids"]):
+            bucket = next(b for b in LENGTH_BUCKETS if len(ids) <= b)
+            buckets.setdefault(bucket, []).append(i)
+
+        results = [None] * len(texts)
+        with torch.inference_mode():
+            for indices in buckets.values():
+                features = [{k: encoded[k][i] for k in encoded.keys()} for i in indices]
+                inputs = tokenizer.pad(features, padding="longest", return_tensors="pt")
+                inputs = {k: v.to(device) for k, v in inputs.items()}
+                outputs = model(**inputs)
+                probabilities = torch.sigmoid(outputs.logits).cpu().numpy()
+                for row, i in enumerate(indices):
+                    results[i] = [float(p) for p in probabilities[row]]
+        return results
+
+
+batcher = ClassifyBatcher()
+
+# 请求延迟（毫秒），保留最近 1000 条
+latency_ms = {
+    "classify": deque(maxlen=1000),
+    "classify_batch": deque(maxlen=1000)
+}
+
+
+def format_result(text, probabilities, threshold):
+    predictions = [int(p > threshold) for p in probabilities]
 
     # 转换为文本标签并分开返回
     result_labels = [label_mapping[str(pred)] for pred in predictions]
 
-    # 返回分开的标签结果
     return {
         "text": text,
         "Vision": result_labels[0],  # 第一个标签
         "core memory": result_labels[1]  # 第二个标签
     }
 
+
+@app.post("/classify")
+async def classify_emotion(input_data: TextInput):
+    start = time.perf_counter()
+    text = input_data.text
+    threshold = DEFAULT_THRESHOLD if input_data.threshold is None else input_data.threshold
+
+    probabilities = (await batcher.predict([text]))[0]
+    result = format_result(text, probabilities, threshold)
+
+    latency_ms["classify"].append((time.perf_counter() - start) * 1000)
+    return result
+
+
+@app.post("/classify/batch")
+async def classify_batch(input_data: BatchTextInput):
+    start = time.perf_counter()
+    threshold = DEFAULT_THRESHOLD if input_data.threshold is None else input_data.threshold
+
+    all_probabilities = await batcher.predict(input_data.texts)
+    results = [
+        format_result(text, probabilities, threshold)
+        for text, probabilities in zip(input_data.texts, all_probabilities)
+    ]
+
+    latency_ms["classify_batch"].append((time.perf_counter() - start) * 1000)
+    return {"results": results, "count": len(results)}
+
+
+@app.get("/stats")
+def get_stats():
+    def summary(values):
+        if not values:
+            return None
+        arr = np.asarray(values, dtype=np.float64)
+        return {
+            "p50": round(float(np.percentile(arr, 50)), 2),
+            "p99": round(float(np.percentile(arr, 99)), 2),
+            "count": len(arr)
+        }
+
+    lookups = batcher.cache_hits + batcher.cache_misses
+    return {
+        "threshold": DEFAULT_THRESHOLD,
+        "latency_ms": {name: summary(values) for name, values in latency_ms.items()},
+        "cache": {
+            "size": len(batcher.cache),
+            "hits": batcher.cache_hits,
+            "hit_rate": round(batcher.cache_hits / lookups, 4) if lookups else 0
+        },
+        "avg_batch_size": round(batcher.batched_texts / batcher.batches, 2) if batcher.batches else 0
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=6007)
\ No newline at end of file
@@ -1,6 +1,16 @@
 import os
+import re
 import json
 import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+# 每个 motion 文件的处理记录：路径 -> size / mtime / 内容哈希 / 是否已处理
+MANIFEST_FILE = 'live2d_manifest.json'
+MANIFEST_VERSION = 1
+
+# 待处理文件少于这个数时不启动进程池（Windows 上进程池启动本身要一两秒）
+POOL_MIN_FILES = 8
 
 
 def get_motions_from_folder(character_path):
@@ -55,11 +65,13 @@ def get_expressions_from_folder(character_path):
 
 
 
-def process_model_file(model_file_path, character_path):
-    """处理单个model3.json文件，重构Motions结构并添加Expressions"""
+def process_model_file(model_file_path, character_path, motion_files_list=None):
+    """处理单个model3.json文件，重构Motions结构并添加Expressions；内容无变化时不重写文件"""
     try:
         with open(model_file_path, 'r', encoding='utf-8') as f:
-            model_data = json.load(f)
+            original_text = f.read()
+        model_data = json.loads(original_text)
+        original_data = json.loads(original_text)
 
         has_motions = False
         has_expressions = False
@@ -82,7 +94,8 @@ def process_model_file(model_file_path, character_path):
 
         # 处理动作文件
         if has_motions:
-            motion_files_list = get_motions_from_folder(character_path)
+            if motion_files_list is None:
+                motion_files_list = get_motions_from_folder(character_path)
             original_motions = motions_location["Motions"]
             new_motions = {}
 
@@ -109,6 +122,10 @@ def process_model_file(model_file_path, character_path):
 
         
 
+            if model_data == original_data:
+                print(f"      └─ 内容无变化，跳过写入: {os.path.basename(model_file_path)}")
+                return False
+
         # 直接覆盖原文件
             with open(model_file_path, 'w', encoding='utf-8') as f:
                 json.dump(model_data, f, ensure_ascii=False, indent=2)
@@ -162,129 +179,257 @@ def process_model_file(model_file_path, character_path):
         return False
 
 
-def process_single_motion_file(motion_file_path):
-    """处理单个motion文件，删除包含mouth关键词的Curves条目并更新CurveCount"""
-    try:
-        with open(motion_file_path, 'r', encoding='utf-8') as f:
-            motion_data = json.load(f)
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+_CURVE_COUNT = re.compile(r'("CurveCount"\s*:\s*)-?\d+')
+
+
+def _skip_ws(text, pos):
+    return _WHITESPACE.match(text, pos).end()
+
+
+def _scan_motion_text(text):
+    """
+    逐个解码顶层字段，不整体 json.loads：
+    返回 (Meta 的 (起, 止, 值) 或 None, Curves 数组 '[' 与 ']' 的位置, [(起, 止, 曲线)])。
+    """
+    pos = _skip_ws(text, 0)
+    if text[pos] != '{':
+        raise ValueError('顶层不是对象')
+    pos += 1
+    meta, array, curves = None, None, []
+    while True:
+        pos = _skip_ws(text, pos)
+        if text[pos] == '}':
+            break
+        key, pos = _DECODER.raw_decode(text, pos)
+        pos = _skip_ws(text, pos)
+        if text[pos] != ':':
+            raise ValueError(f'位置 {pos} 缺少冒号')
+        pos = _skip_ws(text, pos + 1)
+        if key == 'Curves' and text[pos] == '[':
+            open_pos = pos
+            pos += 1
+            while True:
+                pos = _skip_ws(text, pos)
+                if text[pos] == ']':
+                    break
+                curve, end = _DECODER.raw_decode(text, pos)
+                curves.append((pos, end, curve))
+                pos = _skip_ws(text, end)
+                if text[pos] == ',':
+                    pos += 1
+            array = (open_pos, pos)
+            pos += 1
+        else:
+            value, end = _DECODER.raw_decode(text, pos)
+            if key == 'Meta':
+                meta = (pos, end, value)
+            pos = end
+        pos = _skip_ws(text, pos)
+        if text[pos] == ',':
+            pos += 1
+    return meta, array, curves
+
+
+def strip_mouth_curves(text):
+    """
+    删除 Id 含 mouth 的 Curves 条目并更新 Meta.CurveCount。
+    只拼接被保留曲线的原始文本，其余内容原样保留，不重新缩进整个文件。
+    返回 (新文本, 原曲线数, 删除数)；无需修改时新文本为 None。
+    """
+    if 'mouth' not in text.lower():
+        return None, None, 0
+    meta, array, curves = _scan_motion_text(text)
+    if array is None:
+        return None, None, 0
+
+    kept = [c for c in curves if not ('Id' in c[2] and 'mouth' in str(c[2]['Id']).lower())]
+    removed = len(curves) - len(kept)
+    if removed == 0:
+        return None, len(curves), 0
+
+    open_pos, close_pos = array
+    if kept:
+        separator = text[curves[0][1]:curves[1][0]] if len(curves) > 1 else ', '
+        body = (text[open_pos + 1:curves[0][0]]
+                + separator.join(text[start:end] for start, end, _ in kept)
+                + text[curves[-1][1]:close_pos])
+    else:
+        body = ''
+    pieces = [(open_pos + 1, close_pos, body)]
 
-        if "Curves" not in motion_data:
-            return False
+    if meta and isinstance(meta[2], dict) and 'CurveCount' in meta[2]:
+        meta_text = _CURVE_COUNT.sub(lambda m: f'{m.group(1)}{len(kept)}', text[meta[0]:meta[1]], count=1)
+        pieces.append((meta[0], meta[1], meta_text))
 
-        original_count = len(motion_data["Curves"])
-        filtered_curves = []
-        removed_count = 0
-
-        # 过滤掉包含"mouth"关键词的Curves
-        for curve in motion_data["Curves"]:
-            if "Id" in curve and "mouth" in curve["Id"].lower():
-                removed_count += 1
-                continue
-            filtered_curves.append(curve)
-
-        if removed_count > 0:
-            # 更新Curves数组
-            motion_data["Curves"] = filtered_curves
-
-            # 更新Meta中的CurveCount - 这里是关键！
-            if "Meta" in motion_data and "CurveCount" in motion_data["Meta"]:
-                motion_data["Meta"]["CurveCount"] = len(filtered_curves)
-                print(f"      ├─ 更新CurveCount: {original_count} -> {len(filtered_curves)}")
-
-            # 保存文件
-            with open(motion_file_path, 'w', encoding='utf-8') as f:
-                json.dump(motion_data, f, ensure_ascii=False, indent=2)
-
-            filename = os.path.basename(motion_file_path)
-            print(
-                f"      ├─ {filename}: 删除了 {removed_count} 个mouth相关的Curves ({original_count} -> {len(filtered_curves)})")
-            return True
-        else:
-            return False
+    # 从后往前替换，前面的位置不受影响
+    for start, end, replacement in sorted(pieces, reverse=True):
+        text = text[:start] + replacement + text[end:]
+    return text, len(curves), removed
 
-    except Exception as e:
-        print(f"      └─ 处理motion文件失败 {motion_file_path}: {e}")
-        return False
 
+def _file_hash(data):
+    return hashlib.sha1(data).hexdigest()
 
-def process_motion_files_in_folder(character_path):
-    """处理角色文件夹下motions文件夹中的所有motion文件"""
-    processed_motion_count = 0
 
+def process_single_motion_file(motion_file_path, known_hash=None):
+    """
+    处理单个motion文件，删除包含mouth关键词的Curves条目并更新CurveCount。
+    known_hash 与当前内容一致时视为已处理过，直接跳过。
+    返回结果字典（供进程池回传），含最新的 size / mtime / hash。
+    """
+    result = {'path': motion_file_path, 'removed': 0, 'skipped': False, 'error': None}
     try:
-        items = os.listdir(character_path)
-        for item in items:
-            item_path = os.path.join(character_path, item)
-            if os.path.isdir(item_path) and "motions" in item.lower():
-                print(f"   └─ 处理motions文件夹: {item}")
-                try:
-                    motion_items = os.listdir(item_path)
-                    for motion_item in motion_items:
-                        if motion_item.endswith('.motion3.json'):
-                            motion_file_path = os.path.join(item_path, motion_item)
-                            if process_single_motion_file(motion_file_path):
-                                processed_motion_count += 1
-                except PermissionError:
-                    print(f"      警告：无法访问 {item_path}")
-    except PermissionError:
-        print(f"   警告：无法访问 {character_path}")
+        with open(motion_file_path, 'rb') as f:
+            data = f.read()
+        digest = _file_hash(data)
+        if known_hash and digest == known_hash:
+            result['skipped'] = True
+        else:
+            # newline='' 语义：按原样保留换行符
+            new_text, original_count, removed = strip_mouth_curves(data.decode('utf-8'))
+            if new_text is not None:
+                new_data = new_text.encode('utf-8')
+                with open(motion_file_path, 'wb') as f:
+                    f.write(new_data)
+                digest = _file_hash(new_data)
+                result.update(removed=removed, original_count=original_count,
+                              new_count=original_count - removed)
+        st = os.stat(motion_file_path)
+        result.update(size=st.st_size, mtime_ns=st.st_mtime_ns, hash=digest)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == MANIFEST_VERSION and isinstance(data.get('files'), dict):
+            return data
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {'version': MANIFEST_VERSION, 'files': {}}
 
-    return processed_motion_count
 
+def save_manifest(manifest):
+    tmp_path = MANIFEST_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+
+def _manifest_key(path):
+    return path.replace('\\', '/')
+
+
+def process_motion_files(motion_paths, manifest, workers=None):
+    """
+    按清单增量处理 motion 文件：size 和 mtime 都没变的直接跳过；
+    变了的交给进程池（内容哈希未变的只刷新清单）。返回统计信息。
+    """
+    stats = {'total': len(motion_paths), 'unchanged': 0, 'checked': 0,
+             'processed': 0, 'curves_removed': 0, 'errors': 0, 'workers': 1}
+    files = manifest['files']
+    pending = []
+    for path in motion_paths:
+        key = _manifest_key(path)
+        entry = files.get(key)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if entry and entry.get('processed') and entry.get('size') == st.st_size \
+                and entry.get('mtime_ns') == st.st_mtime_ns:
+            stats['unchanged'] += 1
+            continue
+        pending.append((path, entry.get('hash') if entry and entry.get('processed') else None))
+
+    if len(pending) >= POOL_MIN_FILES:
+        stats['workers'] = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=stats['workers']) as pool:
+            results = list(pool.map(process_single_motion_file,
+                                    [p for p, _ in pending], [h for _, h in pending],
+                                    chunksize=4))
+    else:
+        results = [process_single_motion_file(p, h) for p, h in pending]
+
+    for result in results:
+        stats['checked'] += 1
+        if result['error']:
+            stats['errors'] += 1
+            print(f"      └─ 处理motion文件失败 {result['path']}: {result['error']}")
+            continue
+        if result['removed']:
+            stats['processed'] += 1
+            stats['curves_removed'] += result['removed']
+            print(f"      ├─ {os.path.basename(result['path'])}: 删除了 {result['removed']} 个mouth相关的Curves "
+                  f"({result['original_count']} -> {result['new_count']})")
+        files[_manifest_key(result['path'])] = {
+            'size': result['size'],
+            'mtime_ns': result['mtime_ns'],
+            'hash': result['hash'],
+            'processed': True,
+        }
+
+    # 清掉已删除文件的记录
+    current = {_manifest_key(p) for p in motion_paths}
+    for key in [k for k in files if k not in current]:
+        del files[key]
+    return stats
 
 
 # 修改 scan_character_folder 函数
 def scan_character_folder(folder_path):
-    """扫描单个角色文件夹，返回动作文件列表和表情文件列表"""
+    """
+    扫描单个角色文件夹（每个子目录只列一次），更新model文件，
+    返回 (动作文件列表, 表情文件列表, 处理的model文件数, 待处理的motion文件路径)
+    """
     motion_files = []
-    expression_files = []  
+    expression_files = []
+    motion_paths = []
     processed_model_count = 0
 
     try:
         items = os.listdir(folder_path)
 
-        # 处理model文件
-        for item in items:
-            item_path = os.path.join(folder_path, item)
-            if os.path.isfile(item_path) and item.endswith('.model3.json'):
-                print(f"   ├─ 处理model文件: {item}")
-                if process_model_file(item_path, folder_path):
-                    processed_model_count += 1
-
-        # 处理motion文件
-        processed_motion_count = process_motion_files_in_folder(folder_path)
-
-        # 扫描获取配置文件列表
         for item in items:
             item_path = os.path.join(folder_path, item)
             if os.path.isdir(item_path) and "motions" in item.lower():
-                print(f"   └─ 扫描motions文件夹生成配置: {item}")
+                print(f"   └─ 扫描motions文件夹: {item}")
                 try:
-                    motion_items = os.listdir(item_path)
-                    for motion_item in motion_items:
+                    for motion_item in os.listdir(item_path):
                         if motion_item.endswith('.motion3.json'):
                             motion_files.append(f"motions/{motion_item}")
+                            motion_paths.append(os.path.join(item_path, motion_item))
                 except PermissionError:
                     print(f"      警告：无法访问 {item_path}")
-            
+
             # 扫描expressions文件夹
             if os.path.isdir(item_path) and "expressions" in item.lower():
-                print(f"   └─ 扫描expressions文件夹生成配置: {item}")
+                print(f"   └─ 扫描expressions文件夹: {item}")
                 try:
-                    expression_items = os.listdir(item_path)
-                    for expression_item in expression_items:
+                    for expression_item in os.listdir(item_path):
                         if expression_item.endswith('.exp3.json'):
                             expression_files.append(f"expressions/{expression_item}")
                 except PermissionError:
                     print(f"      警告：无法访问 {item_path}")
 
-        if processed_motion_count > 0:
-            print(f"   ├─ 成功处理 {processed_motion_count} 个motion文件（删除mouth相关Curves并更新CurveCount）")
+        # 处理model文件
+        motion_entries = [{"File": f} for f in motion_files]
+        for item in items:
+            item_path = os.path.join(folder_path, item)
+            if os.path.isfile(item_path) and item.endswith('.model3.json'):
+                print(f"   ├─ 处理model文件: {item}")
+                if process_model_file(item_path, folder_path, motion_entries):
+                    processed_model_count += 1
 
     except PermissionError:
         print(f"   警告：无法访问 {folder_path}")
 
-    return motion_files, expression_files, processed_model_count  # 修改返回值
+    return motion_files, expression_files, processed_model_count, motion_paths
 
 
 def get_latest_motions_time():
@@ -572,9 +717,11 @@ def create_character_backups1(all_expressions_data):  # 改为接收表情数据
 
 
 
-def main(force_update=False):
-    """主函数，支持强制更新参数"""
+def main(force_update=False, workers=None):
+    """主函数，支持强制更新参数；workers 为 motion 处理进程数（默认 CPU 核数）"""
     folder_2d = "2D"
+    timings = {}
+    start_time = time.perf_counter()
 
     if not os.path.exists(folder_2d):
         print("找不到2D文件夹！")
@@ -601,12 +748,34 @@ def main(force_update=False):
     all_expressions_data = {}  
     total_processed_files = 0
     default_emotions = ["开心", "生气", "难过", "惊讶", "害羞", "俏皮"]
+    scanned = {}
+    all_motion_paths = []
 
+    # 第一遍：列目录、更新model文件（每个角色目录只列一次）
+    phase_start = time.perf_counter()
     for character_name in character_folders:
         print(f"[文件夹] 正在扫描: {character_name}")
-
         character_path = os.path.join(folder_2d, character_name)
-        motion_files, expression_files, processed_model_count = scan_character_folder(character_path)  # 修改调用
+        motion_files, expression_files, processed_model_count, motion_paths = scan_character_folder(character_path)
+        scanned[character_name] = (motion_files, expression_files, processed_model_count)
+        all_motion_paths.extend(motion_paths)
+    timings['扫描与model文件'] = time.perf_counter() - phase_start
+
+    # 第二步：按清单增量处理motion文件（只处理新增或变化的文件，多进程并行）
+    phase_start = time.perf_counter()
+    manifest = load_manifest()
+    motion_stats = process_motion_files(all_motion_paths, manifest, workers=workers)
+    save_manifest(manifest)
+    timings['motion文件处理'] = time.perf_counter() - phase_start
+    if motion_stats['processed'] > 0:
+        print(f"   ├─ 成功处理 {motion_stats['processed']} 个motion文件（删除mouth相关Curves并更新CurveCount）")
+    print("-" * 40)
+
+    # 第三步：用第一遍的列表生成配置
+    phase_start = time.perf_counter()
+    for character_name in character_folders:
+        motion_files, expression_files, processed_model_count = scanned[character_name]
+        print(f"[配置] {character_name}")
 
         total_processed_files += processed_model_count
 
@@ -720,11 +889,28 @@ def main(force_update=False):
         print("  - 各角色的 .exp3.json 文件已直接更新")   
     elif not all_expressions_data:
         print("\n[错误] 没有找到任何包含表情文件的角色文件夹")    
+    timings['配置生成'] = time.perf_counter() - phase_start
+
+    print("=" * 60)
+    print("[汇总]")
+    print(f"   motion文件: 共 {motion_stats['total']} 个，清单命中跳过 {motion_stats['unchanged']} 个，"
+          f"检查 {motion_stats['checked']} 个，修改 {motion_stats['processed']} 个"
+          f"（删除 {motion_stats['curves_removed']} 条曲线，失败 {motion_stats['errors']} 个，"
+          f"{motion_stats['workers']} 进程）")
+    print(f"   model文件: 更新 {total_processed_files} 个")
+    for name, seconds in timings.items():
+        print(f"   {name}: {seconds:.2f}s")
+    print(f"   总耗时: {time.perf_counter() - start_time:.2f}s")
 
 
 if __name__ == '__main__':
     import sys
 
-    # 支持命令行参数强制更新
+    # 支持命令行参数强制更新；--workers N 指定motion处理进程数
     force = '--force' in sys.argv
-    main(force_update=force)
\ No newline at end of file
+    workers = None
+    if '--workers' in sys.argv:
+        index = sys.argv.index('--workers')
+        if index + 1 < len(sys.argv) and sys.argv[index + 1].isdigit():
+            workers = int(sys.argv[index + 1])
+    main(force_update=force, workers=workers)
\ No newline at end of file
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""Live2D / VRM 资源目录索引（WebUI 与 Qt 界面共用）
+
+一次扫描 2D/ 和 3D/，记下每个 Live2D 模型的 model3.json、动作、表情和全部文件，
+以及每个 .vrm 的版本（0.x / 1.0）。索引带上各目录的 mtime 和关键文件的 mtime/size，
+持久化到 .runtime/asset_catalog.json。
+
+访问时只 stat 记录过的目录：目录增删改名会改变其 mtime，对应模型才重新扫描；
+model3.json 原地修改按文件 mtime/size 判断。同一模型 1 秒内的重复访问直接用内存结果。
+VRM 只在文件 size/mtime 变化时重新读头部判断版本。
+
+用法：
+    from asset_catalog import get_catalog
+    catalog = get_catalog(live2d_root)
+    catalog.live2d_model('肥牛')['motions']
+"""
+
+import json
+import os
+import posixpath
+import struct
+import threading
+import time
+from pathlib import Path
+
+INDEX_VERSION = 1
+INDEX_FILE = os.path.join('.runtime', 'asset_catalog.json')
+
+# 同一对象两次校验的最小间隔（秒）
+REVALIDATE_INTERVAL_SEC = 1.0
+
+MODEL3_SUFFIX = '.model3.json'
+MOTION_SUFFIX = '.motion3.json'
+EXPRESSION_SUFFIX = '.exp3.json'
+
+
+def _norm_key(rel_path):
+    """文件查找键：统一分隔符、折叠 ./..，Windows 下不区分大小写"""
+    rel = posixpath.normpath(str(rel_path).replace('\\', '/'))
+    return os.path.normcase(rel)
+
+
+def _stat_sig(path):
+    try:
+        st = os.stat(path)
+        return [st.st_mtime_ns, st.st_size]
+    except OSError:
+        return None
+
+
+def _dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def sniff_vrm_version(path):
+    """读 glTF 头部的 JSON 块：含 VRMC_vrm 扩展为 '1.0'，否则 '0.x'；不是 glb 返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b'glTF':
+                return None
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_length, chunk_type = struct.unpack('<II', chunk_header)
+            if chunk_type != 0x4E4F534A:  # "JSON"
+                return None
+            return '1.0' if b'VRMC_vrm' in f.read(chunk_length) else '0.x'
+    except Exception:
+        return None
+
+
+class AssetCatalog:
+    """按目录 mtime 增量校验的资源索引"""
+
+    def __init__(self, root, index_path=None):
+        self.root = Path(root)
+        self.index_path = Path(index_path) if index_path else self.root / INDEX_FILE
+        self.lock = threading.RLock()
+        self.index = {'version': INDEX_VERSION, 'live2d': {}, 'vrm': None}
+        self._checked = {}  # 键 -> 上次校验时刻
+        self._lookup = {}   # 模型名 -> 规范化文件键集合
+        self.stats = {'rescans': 0, 'hits': 0}
+        self._dirty = False  # 索引有改动尚未写盘
+        self._load()
+
+    # ---------- 持久化 ----------
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get('version') == INDEX_VERSION:
+                self.index.update(data)
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+        self._dirty = False
+
+    def _save_if_dirty(self):
+        """一次查询里可能重扫多个模型，结束时只整体写一次"""
+        if self._dirty:
+            self._save()
+
+    def _due(self, key, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked.get(key, -REVALIDATE_INTERVAL_SEC) < REVALIDATE_INTERVAL_SEC:
+            return False
+        self._checked[key] = now
+        return True
+
+    # ---------- 扫描 ----------
+
+    def _walk(self, base, skip_top=()):
+        """遍历 base，返回 ({相对目录: mtime_ns}, [排好序的相对文件路径])"""
+        dirs = {}
+        files = []
+        for current, dirnames, filenames in os.walk(base):
+            rel_dir = os.path.relpath(current, base)
+            rel_dir = '' if rel_dir == '.' else rel_dir.replace('\\', '/')
+            if not rel_dir:
+                dirnames[:] = [d for d in dirnames if d not in skip_top]
+            dirs[rel_dir] = _dir_mtime(current)
+            for name in filenames:
+                files.append(Path(current) / name)
+        # 与 sorted(Path.rglob()) 的顺序保持一致
+        files = [p.relative_to(base).as_posix() for p in sorted(files)]
+        return dirs, files
+
+    def _dirs_unchanged(self, base, dirs):
+        for rel_dir, mtime in dirs.items():
+            if _dir_mtime(os.path.join(base, rel_dir) if rel_dir else base) != mtime:
+                return False
+        return True
+
+    def _scan_model(self, name):
+        model_dir = self.root / '2D' / name
+        dirs, files = self._walk(model_dir)
+        model3_files = [f for f in files if f.endswith(MODEL3_SUFFIX)]
+        model3 = model3_files[0] if model3_files else None
+        model3_json = {}
+        if model3:
+            try:
+                with open(model_dir / model3, 'r', encoding='utf-8') as f:
+                    model3_json = json.load(f)
+            except Exception:
+                model3_json = {}
+        self.stats['rescans'] += 1
+        return {
+            'dirs': dirs,
+            'files': files,
+            'model3': model3,
+            'model3_files': model3_files,
+            'model3_sig': _stat_sig(model_dir / model3) if model3 else None,
+            'model3_json': model3_json if isinstance(model3_json, dict) else {},
+            'motions': [f for f in files if f.endswith(MOTION_SUFFIX)],
+            'expressions': [f for f in files if f.endswith(EXPRESSION_SUFFIX)],
+        }
+
+    def _model_valid(self, name, entry):
+        model_dir = self.root / '2D' / name
+        if not self._dirs_unchanged(model_dir, entry.get('dirs') or {}):
+            return False
+        model3 = entry.get('model3')
+        return not model3 or _stat_sig(model_dir / model3) == entry.get('model3_sig')
+
+    def _scan_vrm(self, previous):
+        base = self.root / '3D'
+        if not base.is_dir():
+            return {'dirs': {}, 'files': {}}
+        dirs, files = self._walk(base, skip_top=('mmd',))
+        old_files = (previous or {}).get('files') or {}
+        result = {}
+        for rel in files:
+            if not rel.lower().endswith('.vrm'):
+                continue
+            sig = _stat_sig(base / rel)
+            old = old_files.get(rel)
+            if old and old.get('sig') == sig:
+                result[rel] = old
+            else:
+                result[rel] = {'sig': sig, 'version': sniff_vrm_version(base / rel)}
+        self.stats['rescans'] += 1
+        return {'dirs': dirs, 'files': result}
+
+    # ---------- 查询 ----------
+
+    def live2d_models(self, force=False):
+        """[{'name', 'model3', 'model3_files'}]：2D/ 下含 model3.json 的模型目录（按名称排序）"""
+        with self.lock:
+            base = self.root / '2D'
+            names = sorted(p.name for p in base.iterdir() if p.is_dir()) if base.is_dir() else []
+            for stale in set(self.index['live2d']) - set(names):
+                del self.index['live2d'][stale]
+                self._lookup.pop(stale, None)
+                self._dirty = True
+            result = []
+            for name in names:
+                entry = self._live2d_model(name, force)
+                if entry and entry['model3']:
+                    result.append({'name': name, 'model3': entry['model3'], 'model3_files': entry['model3_files']})
+            self._save_if_dirty()
+            return result
+
+    def live2d_model(self, name, force=False):
+        """单个模型的索引条目；目录不存在返回 None。条目内容为共享数据，调用方不要修改。"""
+        if not name:
+            return None
+        with self.lock:
+            entry = self._live2d_model(name, force)
+            self._save_if_dirty()
+            return entry
+
+    def _live2d_model(self, name, force):
+        """live2d_model 的实现，只标记改动不写盘（调用方持有锁）"""
+        entry = self.index['live2d'].get(name)
+        if entry is not None and not self._due(('live2d', name), force):
+            self.stats['hits'] += 1
+            return entry
+        if not (self.root / '2D' / name).is_dir():
+            if self.index['live2d'].pop(name, None) is not None:
+                self._dirty = True
+            self._lookup.pop(name, None)
+            return None
+        if entry is not None and self._model_valid(name, entry):
+            self.stats['hits'] += 1
+            return entry
+        entry = self._scan_model(name)
+        self.index['live2d'][name] = entry
+        self._lookup.pop(name, None)
+        self._checked[('live2d', name)] = time.monotonic()
+        self._dirty = True
+        return entry
+
+    def has_file(self, name, rel_path):
+        """模型目录下是否存在该相对路径的文件（不访问磁盘）"""
+        with self.lock:
+            entry = self.live2d_model(name)
+            if not entry:
+                return False
+            keys = self._lookup.get(name)
+            if keys is None:
+                keys = self._lookup[name] = {_norm_key(f) for f in entry['files']}
+            return _norm_key(rel_path) in keys
+
+    def vrm_models(self, force=False):
+        """[{'path': 相对 3D/ 的路径, 'version': '0.x' / '1.0' / None}]，不含 3D/mmd"""
+        with self.lock:
+            vrm = self.index.get('vrm')
+            base = self.root / '3D'
+            if vrm is not None and not self._due(('vrm',), force):
+                self.stats['hits'] += 1
+            elif vrm is None or not self._dirs_unchanged(base, vrm.get('dirs') or {}):
+                vrm = self.index['vrm'] = self._scan_vrm(vrm)
+                self._save()
+            else:
+                # 目录未变，但 .vrm 可能被原地覆盖：只比较文件签名
+                changed = False
+                for rel, info in vrm['files'].items():
+                    sig = _stat_sig(base / rel)
+                    if sig != info.get('sig'):
+                        vrm['files'][rel] = {'sig': sig, 'version': sniff_vrm_version(base / rel)}
+                        changed = True
+                if changed:
+                    self._save()
+            return [{'path': rel, 'version': info.get('version')} for rel, info in vrm['files'].items()]
+
+    def invalidate(self, name=None):
+        """写入资源后主动失效：name 为空时全部失效"""
+        with self.lock:
+            if name is None:
+                self._checked.clear()
+                self._lookup.clear()
+            else:
+                self._checked.pop(('live2d', name), None)
+                self._lookup.pop(name, None)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(root):
+    """按根目录复用同一个索引实例"""
+    key = os.path.normcase(os.path.abspath(str(root)))
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = AssetCatalog(root)
+        return catalog
@@ -13,6 +13,9 @@ const PYTHON_CMD = process.platform === 'win32' ? 'python' : 'python3';
 // plugin_sdk.py 所在目录（plugins/）
 const SDK_DIR = path.join(__dirname, '..', '..', 'plugins');
 
+// 单次处理超过该耗时（毫秒）的钩子打一条警告
+const SLOW_HOOK_MS = 500;
+
 class PythonPluginBridge extends Plugin {
     constructor(metadata, context, scriptPath) {
         super(metadata, context);
@@ -23,6 +26,14 @@ class PythonPluginBridge extends Plugin {
         this._buffer = '';
         this._tools = [];
         this._timeout = 10000;
+        // onInit 时 SDK 声明的能力；旧版 SDK 不声明，所有钩子照常转发
+        this._hooks = null;
+        this._features = new Set();
+        this._outbox = [];
+        this._flushScheduled = false;
+        this._sentHistory = null;   // { rev, serialized }：上次发给 Python 的消息历史
+        this._historyRev = 0;
+        this._hookStats = {};
     }
 
     // ===== 启动子进程 =====
@@ -109,30 +120,91 @@ class PythonPluginBridge extends Plugin {
                 this.context?.registerTool(msg.toolDef);
                 return;
             }
-            // JS→Python 钩子调用的响应
-            const pending = this._pending.get(msg.id);
-            if (pending) {
-                this._pending.delete(msg.id);
-                msg.error ? pending.reject(new Error(msg.error)) : pending.resolve(msg);
+            // 批量帧：逐个按钩子响应处理
+            if (msg.type === 'batch') {
+                for (const response of msg.responses || []) this._resolveCall(response);
+                return;
             }
+            // JS→Python 钩子调用的响应
+            this._resolveCall(msg);
         } catch (e) {
             logToTerminal('warn', `[Python:${this.metadata.name}] 无效响应: ${line}`);
         }
     }
 
+    _resolveCall(msg) {
+        const pending = this._pending.get(msg.id);
+        if (!pending) return;
+        this._pending.delete(msg.id);
+        this._recordLatency(pending.event, msg.ms, Date.now() - pending.sentAt);
+        msg.error ? pending.reject(new Error(msg.error)) : pending.resolve(msg);
+    }
+
+    _recordLatency(event, handlerMs, roundTripMs) {
+        const stats = this._hookStats[event] || (this._hookStats[event] = {
+            count: 0, totalMs: 0, maxMs: 0, totalRoundTripMs: 0
+        });
+        stats.count++;
+        stats.totalRoundTripMs += roundTripMs;
+        if (typeof handlerMs === 'number') {
+            stats.totalMs += handlerMs;
+            stats.maxMs = Math.max(stats.maxMs, handlerMs);
+            if (handlerMs > SLOW_HOOK_MS) {
+                logToTerminal('warn', `[Python:${this.metadata.name}] ${event} 处理耗时 ${handlerMs}ms`);
+            }
+        }
+    }
+
+    /** 各钩子的调用次数、Python 端平均/最大处理耗时和平均往返耗时（毫秒） */
+    getHookStats() {
+        const result = {};
+        for (const [event, s] of Object.entries(this._hookStats)) {
+            result[event] = {
+                count: s.count,
+                avgMs: s.count ? +(s.totalMs / s.count).toFixed(2) : 0,
+                maxMs: s.maxMs,
+                avgRoundTripMs: s.count ? +(s.totalRoundTripMs / s.count).toFixed(2) : 0
+            };
+        }
+        return result;
+    }
+
     _write(msg) {
         if (this._process?.stdin?.writable) {
             this._process.stdin.write(JSON.stringify(msg) + '\n');
         }
     }
 
+    /** 同一轮事件循环里发出的调用合并成一帧写入（SDK 支持批量时） */
+    _enqueue(frame) {
+        if (!this._features.has('batch')) {
+            this._write(frame);
+            return;
+        }
+        this._outbox.push(frame);
+        if (this._flushScheduled) return;
+        this._flushScheduled = true;
+        setImmediate(() => {
+            this._flushScheduled = false;
+            const frames = this._outbox;
+            this._outbox = [];
+            if (frames.length === 1) this._write(frames[0]);
+            else if (frames.length > 1) this._write({ type: 'batch', frames });
+        });
+    }
+
+    /** 插件没有覆盖的钩子不必跨进程调用 */
+    _handles(event) {
+        return !this._hooks || this._hooks.has(event);
+    }
+
     async _call(event, data) {
         if (!this._process || this._process.exitCode !== null) return null;
 
         return new Promise((resolve, reject) => {
             const id = ++this._reqId;
-            this._pending.set(id, { resolve, reject });
-            this._write({ id, event, data });
+            this._pending.set(id, { resolve, reject, event, sentAt: Date.now() });
+            this._enqueue({ id, event, data });
 
             setTimeout(() => {
                 if (this._pending.has(id)) {
@@ -143,6 +215,20 @@ class PythonPluginBridge extends Plugin {
         });
     }
 
+    /** 消息历史编码：SDK 支持时只发送与上次相比变化的部分 */
+    _encodeHistory(messages) {
+        const serialized = messages.map(m => JSON.stringify(m));
+        const previous = this._sentHistory;
+        const rev = ++this._historyRev;
+        this._sentHistory = { rev, serialized };
+        if (!previous) return { rev, messages };
+
+        let keep = 0;
+        const limit = Math.min(previous.serialized.length, serialized.length);
+        while (keep < limit && previous.serialized[keep] === serialized[keep]) keep++;
+        return { rev, messagesDelta: { baseRev: previous.rev, keep, append: messages.slice(keep) } };
+    }
+
     async _handlePythonRequest(msg) {
         const { reqId, method, data } = msg;
         try {
@@ -166,10 +252,12 @@ class PythonPluginBridge extends Plugin {
         await this._spawn();
         const config = this.context?.getConfig() || {};
         const pluginFileConfig = this.context?.getPluginFileConfig() || {};
-        await this._call('onInit', { config, pluginFileConfig });
+        const res = await this._call('onInit', { config, pluginFileConfig });
+        if (Array.isArray(res?.hooks)) this._hooks = new Set(res.hooks);
+        this._features = new Set(res?.features || []);
         // 预加载工具列表（同步接口，需要提前缓存）
-        const res = await this._call('getTools', {}).catch(() => null);
-        this._tools = res?.tools || [];
+        const toolsRes = await this._call('getTools', {}).catch(() => null);
+        this._tools = toolsRes?.tools || [];
     }
 
     async onStart() {
@@ -189,6 +277,7 @@ class PythonPluginBridge extends Plugin {
     // ===== 钩子 =====
 
     async onUserInput(event) {
+        if (!this._handles('onUserInput')) return;
         const res = await this._call('onUserInput', {
             text: event.text,
             source: event.source
@@ -203,17 +292,36 @@ class PythonPluginBridge extends Plugin {
     }
 
     async onLLMRequest(request) {
-        const res = await this._call('onLLMRequest', {
-            messages: request.messages
-        }).catch(() => null);
+        if (!this._handles('onLLMRequest')) return;
+        const sent = request.messages.slice();
+        let res;
+        if (this._features.has('messagesDelta')) {
+            res = await this._call('onLLMRequest', this._encodeHistory(sent)).catch((e) => {
+                // Python 端缓存对不上：重发完整历史
+                this._sentHistory = null;
+                return e.message === 'resync' ? undefined : null;
+            });
+            if (res === undefined) {
+                res = await this._call('onLLMRequest', this._encodeHistory(sent)).catch(() => null);
+            }
+        } else {
+            res = await this._call('onLLMRequest', { messages: sent }).catch(() => null);
+        }
 
-        if (res?.messages) {
+        let messages = null;
+        if (res?.messagesDelta) {
+            messages = sent.slice(0, res.messagesDelta.keep).concat(res.messagesDelta.append);
+        } else if (res?.messages) {
+            messages = res.messages;
+        }
+        if (messages) {
             request.messages.length = 0;
-            request.messages.push(...res.messages);
+            request.messages.push(...messages);
         }
     }
 
     async onLLMResponse(response) {
+        if (!this._handles('onLLMResponse')) return;
         const res = await this._call('onLLMResponse', {
             text: response.text
         }).catch(() => null);
@@ -222,15 +330,18 @@ class PythonPluginBridge extends Plugin {
     }
 
     async onTTSText(text) {
+        if (!this._handles('onTTSText')) return text;
         const res = await this._call('onTTSText', { text }).catch(() => null);
         return typeof res?.result === 'string' ? res.result : text;
     }
 
     async onTTSStart(text) {
+        if (!this._handles('onTTSStart')) return;
         await this._call('onTTSStart', { text }).catch(() => {});
     }
 
     async onTTSEnd() {
+        if (!this._handles('onTTSEnd')) return;
         await this._call('onTTSEnd', {}).catch(() => {});
     }
 
@@ -1,6 +1,7 @@
 """
 备忘录插件
-AI 可以用工具帮用户记录、查看、删除备忘，数据持久化到 JSON 文件。
+AI 可以用工具帮用户记录、查看、删除备忘。
+数据存在插件存储里（随时落盘），JSON 文件只在首次启动时导入、停止时导出一份方便查看。
 """
 
 import json
@@ -36,8 +37,11 @@ class NotesPlugin(Plugin):
     # ===== 生命周期 =====
 
     async def on_start(self):
-        notes = self._load()
-        self.context.storage.set('notes', notes)
+        notes = self.context.storage.get('notes')
+        if notes is None:
+            # 旧版本只存 JSON 文件：第一次启动时导入
+            notes = self._load()
+            self.context.storage.set('notes', notes)
         self.context.log('info', f'备忘录已加载，共 {len(notes)} 条')
 
     async def on_stop(self):
@@ -128,7 +132,6 @@ class NotesPlugin(Plugin):
             }
             notes.append(note)
             self.context.storage.set('notes', notes)
-            self._save(notes)
             return f'已保存备忘（第{len(notes)}条）：{content}'
 
         elif name == 'list_notes':
@@ -148,13 +151,11 @@ class NotesPlugin(Plugin):
                 return f'编号无效，当前共 {len(notes)} 条备忘。'
             removed = notes.pop(idx)
             self.context.storage.set('notes', notes)
-            self._save(notes)
             return f'已删除：{removed["content"]}'
 
         elif name == 'clear_notes':
             count = len(notes)
             self.context.storage.set('notes', [])
-            self._save([])
             return f'已清空全部 {count} 条备忘。'
 
         return '未知工具。'
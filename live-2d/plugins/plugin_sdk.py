@@ -10,29 +10,309 @@
 #   if __name__ == '__main__':
 #       run(MyPlugin)
 
+import os
 import sys
 import json
+import time
+import atexit
 import asyncio
-import concurrent.futures
+import sqlite3
+import threading
 import copy
+from collections import OrderedDict
+
+# 协议版本：2 起支持钩子声明、批量帧、消息历史增量和耗时上报
+PROTOCOL_VERSION = 2
+
+# 宿主事件 -> 插件方法；只有子类覆盖了的钩子，宿主才会发过来
+HOOK_METHODS = {
+    'onUserInput': 'on_user_input',
+    'onLLMRequest': 'on_llm_request',
+    'onLLMResponse': 'on_llm_response',
+    'onTTSText': 'on_tts_text',
+    'onTTSStart': 'on_tts_start',
+    'onTTSEnd': 'on_tts_end',
+}
+
+# 持久化存储：写入合并后延迟落盘的时间（秒）和内存缓存上限（字节）
+STORAGE_FLUSH_DELAY = 0.5
+STORAGE_CACHE_BYTES = 8 * 1024 * 1024
+
+_SCALARS = (str, int, float, bool, type(None))
+_UNDECODED = object()
+
+# ===== 存储的写时复制视图 =====
+
+def _cow(value):
+    """共享的解码结果 -> 写时复制视图；标量原样返回"""
+    if isinstance(value, dict) and not isinstance(value, _CowDict):
+        return _CowDict(value)
+    if isinstance(value, list) and not isinstance(value, _CowList):
+        return _CowList(value)
+    return value
+
+
+class _CowDict(dict):
+    """只浅拷贝本层；子容器在被取出时才换成自己的视图，共享的原对象始终不被修改
+
+    重写了 __iter__ / keys，dict(view)、{**view}、update、| 都会走逐键读取，先把子容器换成视图。
+    """
+
+    def _child(self, key):
+        value = dict.__getitem__(self, key)
+        wrapped = _cow(value)
+        if wrapped is not value:
+            dict.__setitem__(self, key, wrapped)
+        return wrapped
+
+    def _thaw(self):
+        for key in list(dict.keys(self)):
+            self._child(key)
+
+    def __getitem__(self, key):
+        return self._child(key)
+
+    def get(self, key, default=None):
+        return self._child(key) if key in self else default
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self._child(key)
+        dict.__setitem__(self, key, default)
+        return default
+
+    def pop(self, key, *default):
+        if key in self:
+            self._child(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self._thaw()
+        return dict.popitem(self)
+
+    def __iter__(self):
+        self._thaw()
+        return dict.__iter__(self)
+
+    def keys(self):
+        self._thaw()
+        return dict.keys(self)
+
+    def values(self):
+        self._thaw()
+        return dict.values(self)
+
+    def items(self):
+        self._thaw()
+        return dict.items(self)
+
+    def copy(self):
+        return _CowDict(self)
+
+
+class _CowList(list):
+    """_CowDict 的列表版本
+
+    plain + view、plain[i:j] = view 等会直接读取列表底层元素，无法拦截，
+    所以创建时就把本层的子容器都换成视图（子字典仍在取出时才复制下一层）。
+    """
+
+    def __init__(self, shared=()):
+        list.__init__(self, [_cow(value) for value in shared])
+
+    def copy(self):
+        return _CowList(self)
+
 
 # ===== 上下文对象 =====
 
+def _default_storage_path():
+    """.runtime/plugin_storage/<插件相对 plugins/ 的路径>.sqlite3；可用 PLUGIN_STORAGE_DIR 覆盖目录"""
+    sdk_dir = os.path.dirname(os.path.abspath(__file__))
+    plugin_dir = os.path.dirname(os.path.abspath(sys.argv[0] or '.'))
+    rel = os.path.relpath(plugin_dir, sdk_dir)
+    if rel.startswith('..'):
+        rel = os.path.basename(plugin_dir)
+    name = rel.replace('\\', '/').replace('/', '__') or 'plugin'
+    base = os.environ.get('PLUGIN_STORAGE_DIR') or os.path.join(sdk_dir, '..', '.runtime', 'plugin_storage')
+    return os.path.join(base, f'{name}.sqlite3')
+
+
 class _Storage:
-    def __init__(self):
-        self._data = {}
+    """每插件一个 SQLite 键值库，重启后数据仍在
+
+    set 时把值序列化成 JSON 文本作为快照，之后调用方再改原对象不影响存储；
+    快照只解码一次并缓存，get 返回写时复制的视图（_CowDict / _CowList），
+    只有被读到或修改的那一层才会复制，共享的解码结果不会被改动。
+    同一键的连续写入在内存里合并，由后台线程每 STORAGE_FLUSH_DELAY 秒批量落盘，
+    进程退出时再刷一次。读缓存按快照大小 LRU 淘汰，未落盘的写入不会被淘汰。
+    path 为 None 时只存内存。
+    """
+
+    def __init__(self, path=None, flush_delay=STORAGE_FLUSH_DELAY, cache_bytes=STORAGE_CACHE_BYTES):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.cache_bytes = cache_bytes
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()   # key -> [快照 JSON 文本或 None(标量), 解码结果或 _UNDECODED]
+        self._cache_size = 0
+        self._dirty = {}              # key -> 快照；None 表示删除
+        self._wake = threading.Event()
+        self._closed = False
+        self._conn = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+                self._conn.execute('CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+                self._conn.commit()
+            except sqlite3.Error as e:
+                sys.stderr.write(f'插件存储打开失败，改用内存存储: {e}\n')
+                sys.stderr.flush()
+                self._conn = None
+        if self._conn is not None:
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+            atexit.register(self.close)
+
+    # ---------- 快照 ----------
+
+    @staticmethod
+    def _decode(entry):
+        """快照只解码一次，结果缓存在条目里；返回写时复制视图"""
+        if entry[1] is _UNDECODED:
+            entry[1] = json.loads(entry[0])
+        return _cow(entry[1])
+
+    @staticmethod
+    def _snapshot(value):
+        if isinstance(value, _SCALARS):
+            return [None, value]
+        return [json.dumps(value, ensure_ascii=False), _UNDECODED]
+
+    def _cache_put(self, key, entry):
+        old = self._cache.pop(key, None)
+        if old is not None:
+            self._cache_size -= len(old[0] or '')
+        self._cache[key] = entry
+        self._cache_size += len(entry[0] or '')
+        self._evict(keep=key)
+
+    def _evict(self, keep=None):
+        """按 LRU 淘汰到 cache_bytes 以内；未落盘的条目不淘汰（内存模式没有磁盘，不淘汰）"""
+        if self._conn is None:
+            return
+        for stale in list(self._cache):
+            if self._cache_size <= self.cache_bytes:
+                break
+            if stale == keep or stale in self._dirty:
+                continue
+            self._cache_size -= len(self._cache.pop(stale)[0] or '')
+
+    def _load(self, key):
+        if self._conn is None:
+            return None
+        row = self._conn.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        return [None, value] if isinstance(value, _SCALARS) else [row[0], value]
+
+    # ---------- 读写 ----------
 
     def get(self, key, default=None):
-        return copy.deepcopy(self._data.get(key, default))
+        with self._lock:
+            if key in self._dirty and self._dirty[key] is None:
+                return default
+            entry = self._cache.get(key)
+            if entry is None:
+                entry = self._load(key)
+                if entry is None:
+                    return default
+                self._cache_put(key, entry)
+            else:
+                self._cache.move_to_end(key)
+            return self._decode(entry)
 
     def set(self, key, value):
-        self._data[key] = value
+        entry = self._snapshot(value)
+        with self._lock:
+            self._dirty[key] = entry
+            self._cache_put(key, entry)
+        self._wake.set()
 
     def delete(self, key):
-        self._data.pop(key, None)
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._cache_size -= len(old[0] or '')
+            self._dirty[key] = None
+        self._wake.set()
 
     def get_all(self):
-        return copy.deepcopy(self._data)
+        with self._lock:
+            entries = {}
+            if self._conn is not None:
+                for key, text in self._conn.execute('SELECT key, value FROM kv'):
+                    entries[key] = self._cache.get(key) or [text, _UNDECODED]
+            else:
+                entries.update(self._cache)
+            for key, entry in self._dirty.items():
+                if entry is None:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = entry
+            return {key: self._decode(entry) for key, entry in entries.items()}
+
+    # ---------- 落盘 ----------
+
+    def flush(self):
+        """把合并后的写入一次性写进 SQLite"""
+        if self._conn is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            pending, self._dirty = self._dirty, {}
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        'INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)',
+                        [(k, e[0] if e[0] is not None else json.dumps(e[1], ensure_ascii=False))
+                         for k, e in pending.items() if e is not None]
+                    )
+                    self._conn.executemany(
+                        'DELETE FROM kv WHERE key = ?',
+                        [(k,) for k, e in pending.items() if e is None]
+                    )
+            except sqlite3.Error as e:
+                # 写失败：放回待写队列，下次再试（期间更新的值优先）
+                for k, entry in pending.items():
+                    self._dirty.setdefault(k, entry)
+                sys.stderr.write(f'插件存储写入失败: {e}\n')
+                sys.stderr.flush()
+            # 刚落盘的条目现在可以淘汰了
+            self._evict()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait()
+            if self._closed:
+                break
+            time.sleep(self.flush_delay)  # 等一小会，把这段时间的写入合并成一次事务
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._wake.set()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
 
 
 class PluginContext:
@@ -40,7 +320,7 @@ class PluginContext:
         self._send = send_fn
         self._config = config or {}
         self._plugin_file_config = {}
-        self.storage = _Storage()
+        self.storage = _Storage(_default_storage_path())
         self._req_id = 0
         self._pending_requests = {}  # reqId -> asyncio.Future
 
@@ -182,9 +462,68 @@ class Plugin:
 
 
 
+def overridden_hooks(plugin):
+    """子类实际覆盖了的钩子（宿主事件名）"""
+    return [event for event, name in HOOK_METHODS.items()
+            if getattr(type(plugin), name, None) is not getattr(Plugin, name)]
+
+
+# ===== 消息历史增量 =====
+
+class _HistoryResync(Exception):
+    pass
+
+
+class _MessageHistory:
+    """onLLMRequest 的消息历史缓存
+
+    宿主只发送与上一次相比变化的部分：保留前 keep 条，再追加 append。
+    rev 对不上（例如插件进程重启过）时返回 resync，宿主改发完整历史。
+    同一批里的多个请求并发处理，所以回复按各自收到的历史（decode 返回的 base）编码。
+    """
+
+    def __init__(self):
+        self.rev = None
+        self.messages = []
+
+    def decode(self, data):
+        """返回 (交给插件的消息, 本次历史的原样副本)"""
+        if 'messagesDelta' in data:
+            delta = data['messagesDelta']
+            if self.rev is None or delta.get('baseRev') != self.rev:
+                raise _HistoryResync()
+            messages = self.messages[:delta['keep']] + delta['append']
+        else:
+            messages = data['messages']
+        self.rev = data.get('rev')
+        # 插件可能原地修改消息，缓存保留一份宿主原样的历史
+        base = copy.deepcopy(messages)
+        self.messages = base
+        return messages, base
+
+    @staticmethod
+    def encode(base, messages):
+        """插件返回的消息相对本次收到的历史（base）编码成增量"""
+        keep = 0
+        limit = min(len(base), len(messages))
+        while keep < limit and base[keep] == messages[keep]:
+            keep += 1
+        if keep == len(base) == len(messages):
+            return {'messagesUnchanged': True}
+        return {'messagesDelta': {'keep': keep, 'append': messages[keep:]}}
+
+
 # ===== 事件分发 =====
 
-async def _dispatch(plugin, msg):
+async def _dispatch(plugin, msg, history=None):
+    started = time.perf_counter()
+    response = await _dispatch_event(plugin, msg, history)
+    # 处理耗时回报给宿主，用于统计各钩子的延迟
+    response['ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return response
+
+
+async def _dispatch_event(plugin, msg, history):
     event = msg['event']
     data = msg.get('data', {})
     id_ = msg['id']
@@ -196,7 +535,13 @@ async def _dispatch(plugin, msg):
             if 'pluginFileConfig' in data:
                 plugin.context._plugin_file_config = data['pluginFileConfig']
             await plugin.on_init()
-            return {'id': id_, 'status': 'ok'}
+            return {
+                'id': id_,
+                'status': 'ok',
+                'protocol': PROTOCOL_VERSION,
+                'hooks': overridden_hooks(plugin),
+                'features': ['batch', 'messagesDelta', 'latency'],
+            }
 
         elif event == 'onStart':
             await plugin.on_start()
@@ -204,6 +549,8 @@ async def _dispatch(plugin, msg):
 
         elif event == 'onStop':
             await plugin.on_stop()
+            # 宿主随后可能直接结束进程，先把存储写盘
+            plugin.context.storage.flush()
             return {'id': id_, 'status': 'ok'}
 
         elif event == 'onDestroy':
@@ -216,9 +563,17 @@ async def _dispatch(plugin, msg):
             return {'id': id_, 'status': 'ok', 'actions': ev._actions}
 
         elif event == 'onLLMRequest':
-            req = LLMRequestEvent(data['messages'])
+            if history is None or 'rev' not in data:
+                req = LLMRequestEvent(data['messages'])
+                await plugin.on_llm_request(req)
+                return {'id': id_, 'status': 'ok', 'messages': req.messages}
+            try:
+                messages, base = history.decode(data)
+            except _HistoryResync:
+                return {'id': id_, 'error': 'resync'}
+            req = LLMRequestEvent(messages)
             await plugin.on_llm_request(req)
-            return {'id': id_, 'status': 'ok', 'messages': req.messages}
+            return {'id': id_, 'status': 'ok', **history.encode(base, req.messages)}
 
         elif event == 'onLLMResponse':
             resp = LLMResponseEvent(data['text'])
@@ -260,24 +615,41 @@ def run(plugin_class):
 
     plugin = plugin_class()
     plugin.context = PluginContext(_send)
+    history = _MessageHistory()
 
     async def _handle_message(msg):
         try:
-            response = await _dispatch(plugin, msg)
+            response = await _dispatch(plugin, msg, history)
             if response:
                 _send(response)
         except Exception as e:
             sys.stderr.write(f'Dispatch error: {e}\n')
             sys.stderr.flush()
 
+    async def _handle_batch(frames):
+        """一帧里的多个事件并发处理，响应合并成一帧返回"""
+        try:
+            responses = await asyncio.gather(*(_dispatch(plugin, frame, history) for frame in frames))
+            _send({'type': 'batch', 'responses': responses})
+        except Exception as e:
+            sys.stderr.write(f'Dispatch error: {e}\n')
+            sys.stderr.flush()
+
+    def _read_stdin(loop, queue):
+        # 常驻读线程逐行交给事件循环，不必每行都提交一次线程池任务
+        for line in sys.stdin:
+            loop.call_soon_threadsafe(queue.put_nowait, line)
+        loop.call_soon_threadsafe(queue.put_nowait, None)
+
     async def main():
         loop = asyncio.get_running_loop()
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        queue = asyncio.Queue()
+        threading.Thread(target=_read_stdin, args=(loop, queue), daemon=True).start()
 
         while True:
             try:
-                line = await loop.run_in_executor(executor, sys.stdin.readline)
-                if not line:
+                line = await queue.get()
+                if line is None:
                     break
                 line = line.strip()
                 if not line:
@@ -291,7 +663,10 @@ def run(plugin_class):
 
                 # 钩子调用作为独立 Task，主循环继续读 stdin
                 # 这样 get_messages/call_llm 向 JS 请求时不会死锁
-                asyncio.create_task(_handle_message(msg))
+                if msg.get('type') == 'batch':
+                    asyncio.create_task(_handle_batch(msg.get('frames', [])))
+                else:
+                    asyncio.create_task(_handle_message(msg))
 
             except Exception as e:
                 sys.stderr.write(f'SDK Error: {e}\n')
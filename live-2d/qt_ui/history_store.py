@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""对话历史索引：按字节偏移跟读 对话历史.jsonl，增量写入 SQLite（FTS5 全文检索）。
+
+索引只存每条消息的文本、角色、工具调用摘要以及在 JSONL 中的偏移/长度；
+图片不进库，显示时按偏移回读原行，解码后缩略图写入磁盘缓存。
+JSONL 被截断或替换（文件标识变化/变短/已读位置之前的内容变化）时自动重建索引。
+"""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+# 每次跟读最多处理的字节数，超出部分下次再读
+SYNC_CHUNK_BYTES = 8 * 1024 * 1024
+THUMBNAIL_MAX_WIDTH = 800
+# 已读位置之前参与校验的字节数
+TAIL_CHECK_BYTES = 256
+
+
+def _file_cursor(st):
+    return f'{st.st_dev}:{st.st_ino}'
+
+
+def _tail_digest(f, offset):
+    """offset 之前最多 TAIL_CHECK_BYTES 字节的短哈希。
+    WebUI 清空历史是原地截断（inode 不变），新内容写过旧偏移后只能靠它发现"""
+    start = max(offset - TAIL_CHECK_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()[:16]
+
+
+def extract_text(content):
+    """content 为字符串或 OpenAI 多段格式，返回 (纯文本, 图片数)"""
+    if isinstance(content, str):
+        return content, 0
+    if not isinstance(content, list):
+        return str(content or ''), 0
+    texts = []
+    images = 0
+    for item in content:
+        if not isinstance(item, dict):
+            continue
+        if item.get('type') == 'text':
+            texts.append(item.get('text', ''))
+        elif item.get('type') == 'image_url':
+            images += 1
+    return ''.join(texts), images
+
+
+def summarize_tool_call(tool_calls):
+    """第一个工具调用 -> (函数名, 参数文本)；没有则 (None, None)"""
+    if not tool_calls:
+        return None, None
+    function = (tool_calls[0] or {}).get('function', {}) or {}
+    arguments = function.get('arguments', '')
+    try:
+        args_text = ', '.join(str(v) for v in json.loads(arguments).values())
+    except Exception:
+        args_text = arguments
+    return function.get('name', 'unknown'), args_text
+
+
+class ChatHistoryStore:
+    """对话历史的 SQLite 侧索引"""
+
+    def __init__(self, history_file, index_dir):
+        self.history_file = history_file
+        self.index_dir = index_dir
+        self.image_dir = os.path.join(index_dir, 'images')
+        os.makedirs(self.image_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(index_dir, 'history.sqlite3'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.fts = None
+        self._init_schema()
+
+    # ---------- 建表 ----------
+
+    def _init_schema(self):
+        c = self.conn
+        c.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                role TEXT,
+                text TEXT,
+                images INTEGER DEFAULT 0,
+                tool_name TEXT,
+                tool_args TEXT
+            )
+        ''')
+        # trigram 分词支持中文子串检索（SQLite 3.34+）；不支持时退回默认分词，再不行只用 LIKE
+        for fts, tokenize in (('trigram', "tokenize='trigram'"), ('unicode61', '')):
+            try:
+                options = f", {tokenize}" if tokenize else ''
+                c.execute(f'''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts_{fts}
+                    USING fts5(text, content='messages', content_rowid='id'{options})
+                ''')
+                self.fts = f'messages_fts_{fts}'
+                break
+            except sqlite3.OperationalError:
+                continue
+        # 全文表与上次不同（如 SQLite 升级后改用 trigram）时从 messages 重建
+        if self.fts and self._meta('fts') != self.fts:
+            c.execute(f"INSERT INTO {self.fts}({self.fts}) VALUES ('rebuild')")
+            self._set_meta('fts', self.fts)
+        c.commit()
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+
+    def _clear(self):
+        self.conn.execute('DELETE FROM messages')
+        if self.fts:
+            self.conn.execute(f"INSERT INTO {self.fts}({self.fts}) VALUES ('delete-all')")
+        self._set_meta('offset', 0)
+
+    # ---------- 跟读 ----------
+
+    def sync(self):
+        """把 JSONL 新增的整行写入索引，返回新增条数"""
+        with self.lock:
+            try:
+                st = os.stat(self.history_file)
+            except OSError:
+                if self._meta('cursor'):
+                    self._clear()
+                    self._set_meta('cursor', '')
+                    self.conn.commit()
+                return 0
+
+            cursor = _file_cursor(st)
+            offset = int(self._meta('offset', 0) or 0)
+            rebuild = cursor != self._meta('cursor') or st.st_size < offset
+            if not rebuild and offset:
+                with open(self.history_file, 'rb') as f:
+                    rebuild = _tail_digest(f, offset) != self._meta('tail')
+            if rebuild:
+                self._clear()
+                self._set_meta('cursor', cursor)
+                offset = 0
+
+            added = 0
+            while offset < st.st_size:
+                with open(self.history_file, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read(SYNC_CHUNK_BYTES)
+                end = data.rfind(b'\n') + 1
+                if end == 0:
+                    if len(data) < SYNC_CHUNK_BYTES:
+                        break  # 最后一行还没写完
+                    # 单行超过一个块（大图），读到行尾为止
+                    with open(self.history_file, 'rb') as f:
+                        f.seek(offset)
+                        line = f.readline()
+                    if not line.endswith(b'\n'):
+                        break
+                    data, end = line, len(line)
+                added += self._ingest(data[:end], offset)
+                offset += end
+                with open(self.history_file, 'rb') as f:
+                    self._set_meta('tail', _tail_digest(f, offset))
+                self._set_meta('offset', offset)
+                self.conn.commit()
+            return added
+
+    def _ingest(self, data, base_offset):
+        rows = []
+        position = 0
+        for raw in data.split(b'\n')[:-1]:
+            line_offset = base_offset + position
+            position += len(raw) + 1
+            stripped = raw.strip()
+            if not stripped:
+                continue
+            try:
+                msg = json.loads(stripped.decode('utf-8'))
+            except (ValueError, UnicodeDecodeError):
+                continue
+            if not isinstance(msg, dict):
+                continue
+            text, images = extract_text(msg.get('content', ''))
+            tool_name, tool_args = summarize_tool_call(msg.get('tool_calls'))
+            rows.append((line_offset, len(raw), msg.get('role', 'unknown'), text, images, tool_name, tool_args))
+        if not rows:
+            return 0
+        c = self.conn
+        for row in rows:
+            rowid = c.execute(
+                'INSERT INTO messages (offset, length, role, text, images, tool_name, tool_args) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', row
+            ).lastrowid
+            if self.fts:
+                c.execute(f'INSERT INTO {self.fts} (rowid, text) VALUES (?, ?)', (rowid, row[3]))
+        return len(rows)
+
+    # ---------- 查询 ----------
+
+    def _rows(self, sql, params):
+        cur = self.conn.execute(sql, params)
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, r)) for r in cur.fetchall()]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+    def page(self, before_id=None, limit=30):
+        """before_id 之前（更早）的 limit 条，按时间正序返回；before_id 为空取最新一页"""
+        with self.lock:
+            if before_id is None:
+                rows = self._rows('SELECT * FROM messages ORDER BY id DESC LIMIT ?', (limit,))
+            else:
+                rows = self._rows('SELECT * FROM messages WHERE id < ? ORDER BY id DESC LIMIT ?',
+                                  (before_id, limit))
+        return rows[::-1]
+
+    def search(self, query, limit=200):
+        """全文检索全部历史，按时间倒序返回（最新在前）"""
+        query = (query or '').strip()
+        if not query:
+            return []
+        with self.lock:
+            # trigram 只能匹配 3 个字符以上的片段，更短的关键字走 LIKE
+            if self.fts and (self.fts != 'messages_fts_trigram' or len(query) >= 3):
+                phrase = '"' + query.replace('"', '""') + '"'
+                try:
+                    return self._rows(
+                        f'SELECT m.* FROM {self.fts} f JOIN messages m ON m.id = f.rowid '
+                        f'WHERE {self.fts} MATCH ? ORDER BY m.id DESC LIMIT ?', (phrase, limit))
+                except sqlite3.OperationalError:
+                    pass
+            escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            return self._rows(
+                "SELECT * FROM messages WHERE text LIKE ? ESCAPE '\\' ORDER BY id DESC LIMIT ?",
+                (f'%{escaped}%', limit))
+
+    # ---------- 图片 ----------
+
+    def load_message(self, row):
+        """按偏移回读原始消息（含图片）"""
+        with open(self.history_file, 'rb') as f:
+            f.seek(row['offset'])
+            return json.loads(f.read(row['length']).decode('utf-8'))
+
+    def image_files(self, row, max_width=THUMBNAIL_MAX_WIDTH):
+        """消息中各图片的缩略图路径（磁盘缓存，按图片内容哈希命名）；失败的图片为 None"""
+        if not row.get('images'):
+            return []
+        try:
+            content = self.load_message(row).get('content')
+        except Exception:
+            return []
+        paths = []
+        for item in content if isinstance(content, list) else []:
+            if isinstance(item, dict) and item.get('type') == 'image_url':
+                paths.append(self._thumbnail(item.get('image_url', {}).get('url', ''), max_width))
+        return paths
+
+    def _thumbnail(self, image_url, max_width):
+        if not image_url.startswith('data:image'):
+            return None
+        try:
+            header, base64_data = image_url.split(',', 1)
+            image_format = header.split(';')[0].split('/')[1].lower()
+            if image_format == 'jpg':
+                image_format = 'jpeg'
+            digest = hashlib.sha1(base64_data.encode('ascii')).hexdigest()
+            path = os.path.join(self.image_dir, f'{digest}_{max_width}.{image_format}')
+            if os.path.exists(path):
+                return path
+
+            image_bytes = base64.b64decode(base64_data)
+            try:
+                from io import BytesIO
+                from PIL import Image
+                img = Image.open(BytesIO(image_bytes))
+                if img.width > max_width:
+                    img = img.resize((max_width, int(img.height * max_width / img.width)),
+                                     Image.Resampling.LANCZOS)
+                buffered = BytesIO()
+                img.save(buffered, format=image_format.upper())
+                image_bytes = buffered.getvalue()
+            except Exception:
+                pass  # 没有 PIL 或缩放失败：缓存原图
+
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, path)
+            return path
+        except Exception as e:
+            print(f"处理图片时出错: {e}")
+            return None
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -23,6 +23,7 @@ import glob
 import webbrowser
 import requests
 from pathlib import Path
+from html import escape as html_escape
 
 from ..paths import get_base_path, get_app_path, IS_CLOUD_VERSION, TEST_PY_DIR  # noqa: F401
 from ..tool_descriptions import load_tool_descriptions  # noqa: F401
@@ -32,6 +33,167 @@ from ..workers import (  # noqa: F401
 from ..widgets.toast import ToastNotification  # noqa: F401
 from ..widgets.title_bar import CustomTitleBar  # noqa: F401
 
+# 每页显示的对话条数
+CHAT_HISTORY_PAGE_SIZE = 30
+# 搜索最多显示的条数
+CHAT_HISTORY_SEARCH_LIMIT = 200
+
+CHAT_HISTORY_STYLE = """
+<style>
+    body {
+        margin: 0;
+        padding: 0;
+    }
+    .dialogue-entry {
+        margin-bottom: 25px;
+        padding-left: 10px;
+    }
+    .character-name {
+        font-weight: bold;
+        margin-bottom: 8px;
+        letter-spacing: 1px;
+    }
+    .character-name.user {
+        color: #4a90d9;
+    }
+    .character-name.assistant {
+        color: #d4850d;
+    }
+    .dialogue-text {
+        line-height: 1.8;
+        color: #333;
+        padding-left: 15px;
+        border-left: 2px solid rgba(0, 0, 0, 0.15);
+    }
+    .dialogue-text img {
+        display: block;
+        max-width: 100%;
+        height: auto;
+        border-radius: 8px;
+        margin: 15px 0;
+        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
+        cursor: pointer;
+        transition: transform 0.2s;
+    }
+    .dialogue-text img:hover {
+        transform: scale(1.02);
+        box-shadow: 0 6px 16px rgba(0, 0, 0, 0.2);
+    }
+    .emotion-tag {
+        color: #e91e63;
+    }
+    .tool-call-box {
+        margin-top: 10px;
+        padding: 12px 15px;
+        background: rgba(100, 150, 200, 0.08);
+        border-left: 3px solid #6496c8;
+        border-radius: 4px;
+        color: #555;
+    }
+    .history-hint {
+        text-align: center;
+        color: #999;
+        padding: 10px 0;
+    }
+    .divider {
+        height: 1px;
+        background: linear-gradient(to right, transparent, rgba(0, 0, 0, 0.1), transparent);
+        margin: 20px 0;
+    }
+    /* 全屏图片预览遮罩层 */
+    #image-preview-fullscreen {
+        display: none;
+        position: fixed;
+        top: 0;
+        left: 0;
+        width: 100%;
+        height: 100%;
+        background: rgba(0, 0, 0, 0.98);
+        z-index: 999999;
+        cursor: pointer;
+        justify-content: center;
+        align-items: center;
+    }
+    #image-preview-fullscreen.active {
+        display: flex !important;
+    }
+    #image-preview-fullscreen img {
+        max-width: 98%;
+        max-height: 98%;
+        object-fit: contain;
+        box-shadow: 0 0 50px rgba(255, 255, 255, 0.3);
+    }
+</style>
+
+<script>
+    var overlay = null;
+    var overlayImg = null;
+    var loadingMore = false;
+
+    // 图片点击放大功能
+    function setupImagePreview() {
+        if (!overlay) {
+            // 创建全屏遮罩层
+            overlay = document.createElement('div');
+            overlay.id = 'image-preview-fullscreen';
+            overlayImg = document.createElement('img');
+            overlay.appendChild(overlayImg);
+            document.body.appendChild(overlay);
+            // 点击遮罩关闭
+            overlay.onclick = function() {
+                this.classList.remove('active');
+            };
+        }
+        // 为所有图片添加点击事件（翻页插入的新图片也要绑定）
+        document.querySelectorAll('.dialogue-text img').forEach(function(img) {
+            img.onclick = function(e) {
+                e.stopPropagation();
+                overlayImg.src = this.src;
+                overlay.classList.add('active');
+            };
+        });
+    }
+
+    // 向上翻页：在顶部插入更早的记录，保持当前可视位置不动
+    function prependEntries(html, hasMore) {
+        var container = document.getElementById('history-entries');
+        var oldHeight = document.body.scrollHeight;
+        container.insertAdjacentHTML('afterbegin', html);
+        window.scrollBy(0, document.body.scrollHeight - oldHeight);
+        document.getElementById('history-top-hint').style.display = hasMore ? 'block' : 'none';
+        setupImagePreview();
+        loadingMore = false;
+        onHistoryScroll();
+    }
+
+    function onHistoryScroll() {
+        var hint = document.getElementById('history-top-hint');
+        if (!loadingMore && hint && hint.style.display !== 'none' && window.scrollY < 50) {
+            loadingMore = true;
+            // 通过标题变化通知 Qt 加载更早的一页
+            document.title = 'load-more:' + Date.now();
+        }
+    }
+
+    function initHistoryView() {
+        setupImagePreview();
+        if (document.body.dataset.scrollBottom === '1') {
+            window.scrollTo(0, document.body.scrollHeight);
+        }
+        window.addEventListener('scroll', onHistoryScroll);
+        // 内容不足一屏时直接继续加载
+        onHistoryScroll();
+    }
+
+    // 页面加载完成后初始化
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', initHistoryView);
+    } else {
+        initHistoryView();
+    }
+</script>
+"""
+
 
 class ChatHistoryMixin:
     """聊天记录查看。"""
@@ -91,6 +253,10 @@ class ChatHistoryMixin:
                     print("打包模式：禁用WebEngineView，使用QTextEdit")
                     self.chat_history_webview = None
 
+            # 搜索框只创建一次
+            if not hasattr(self, 'chat_history_search'):
+                self._setup_chat_history_search()
+
             # 然后加载对话记录
             self.load_chat_history()
         except Exception as e:
@@ -105,330 +271,210 @@ class ChatHistoryMixin:
             except:
                 pass
 
+    def _setup_chat_history_search(self):
+        """在记录视图上方插入搜索框，回车检索全部历史，清空后恢复分页浏览"""
+        self.chat_history_search = QLineEdit()
+        self.chat_history_search.setPlaceholderText("搜索对话记录（回车搜索，清空返回）")
+        self.chat_history_search.setClearButtonEnabled(True)
+        self.chat_history_search.returnPressed.connect(self.search_chat_history)
+        self.chat_history_search.textChanged.connect(
+            lambda text: self.load_chat_history() if not text.strip() else None)
+
+        view = self._chat_history_view()
+        layout = self.ui.textEdit_chat_history.parent().layout()
+        for i in range(layout.count()):
+            if layout.itemAt(i).widget() == view:
+                layout.insertWidget(i, self.chat_history_search)
+                break
+
+        # 滚动到顶部时加载更早的一页
+        if view is self.ui.textEdit_chat_history:
+            view.verticalScrollBar().valueChanged.connect(
+                lambda value: self.load_older_chat_history() if value == 0 else None)
+        else:
+            view.titleChanged.connect(
+                lambda title: self.load_older_chat_history() if title.startswith('load-more:') else None)
+
+    def _chat_history_view(self):
+        if getattr(self, 'chat_history_webview', None):
+            return self.chat_history_webview
+        return self.ui.textEdit_chat_history
+
+    def _set_chat_history_html(self, html):
+        self._chat_history_view().setHtml(html)
+
+    def _get_chat_history_store(self):
+        """对话历史的 SQLite 索引，首次使用时创建"""
+        store = getattr(self, 'chat_history_store', None)
+        if store is None:
+            from ..history_store import ChatHistoryStore
+            history_file = os.path.join("..", "AI记录室", "对话历史.jsonl")
+            index_dir = os.path.join(get_app_path(), '.runtime', 'chat_history')
+            store = self.chat_history_store = ChatHistoryStore(history_file, index_dir)
+        return store
+
+    def _chat_entry_html(self, store, row):
+        """单条记录的 HTML；图片使用磁盘缓存的缩略图"""
+        role = row.get('role') or 'unknown'
+
+        # 角色显示
+        if role == 'user':
+            role_display = "用户"
+            role_class = "user"
+        elif role == 'assistant':
+            role_display = "AI"
+            role_class = "assistant"
+        else:
+            role_display = role
+            role_class = "unknown"
+
+        content_html = row.get('text') or ''
+        for path in store.image_files(row):
+            if path:
+                file_url = QUrl.fromLocalFile(os.path.abspath(path)).toString()
+                content_html += f'<br/><img src="{file_url}" style="display:block; margin:10px 0;" /><br/>'
+            else:
+                content_html += '<br/>[图片加载失败]<br/>'
+
+        # 将 <情绪> 标签转换为带样式的HTML（只匹配中文标签，排除HTML标签）
+        processed_content = re.sub(r'<([\u4e00-\u9fa5]+)>', r'<span class="emotion-tag">&lt;\1&gt;</span>', content_html)
+
+        # 处理工具调用（放在对话文本内部）
+        tool_html = ""
+        if row.get('tool_name'):
+            tool_html = f'<div class="tool-call-box">AI使用工具：{row["tool_name"]} 输入了参数：{row.get("tool_args") or ""}</div>'
+
+        return (
+            '<div class="dialogue-entry">'
+            f'<div class="character-name {role_class}">{role_display}</div>'
+            f'<div class="dialogue-text">{processed_content}{tool_html}</div>'
+            '</div>'
+        )
+
+    def _chat_entries_html(self, store, rows):
+        return '<div class="divider"></div>'.join(self._chat_entry_html(store, row) for row in rows)
+
+    def _chat_history_page_html(self, entries_html, has_more, scroll_bottom, header=''):
+        hint_display = 'block' if has_more else 'none'
+        return (
+            CHAT_HISTORY_STYLE
+            + f'<body data-scroll-bottom="{1 if scroll_bottom else 0}">'
+            + header
+            + f'<div id="history-top-hint" class="history-hint" style="display:{hint_display}">向上滚动加载更早的记录</div>'
+            + f'<div id="history-entries">{entries_html}</div>'
+            + '</body>'
+        )
+
+    def _render_chat_history_text(self, scroll_to):
+        """QTextEdit 没有脚本，翻页时整体重设 HTML 并恢复滚动位置"""
+        text_edit = self.ui.textEdit_chat_history
+        bar = text_edit.verticalScrollBar()
+        self._chat_history_rendering = True
+        try:
+            old_max = bar.maximum()
+            old_value = bar.value()
+            text_edit.setHtml(self._chat_history_page_html(
+                self._chat_entries_html(self._get_chat_history_store(), self._chat_history_rows),
+                self._chat_history_has_more, False))
+            if scroll_to == 'bottom':
+                bar.setValue(bar.maximum())
+            else:
+                # 保持原来看到的内容不动
+                bar.setValue(bar.maximum() - old_max + old_value)
+        finally:
+            self._chat_history_rendering = False
 
     def load_chat_history(self):
-        """加载对话记录"""
+        """加载对话记录：同步索引后显示最新一页，向上滚动再加载更早的"""
         print("开始加载对话记录...")
+        self._chat_history_rows = []
+        self._chat_history_has_more = False
+        self._chat_history_searching = False
         try:
             # 对话历史文件路径
             history_file = os.path.join("..", "AI记录室", "对话历史.jsonl")
 
             if not os.path.exists(history_file):
                 empty_html = "<p style='text-align:center; color:#666; padding:50px;'>对话历史文件不存在</p>"
-                if hasattr(self, 'chat_history_webview') and self.chat_history_webview:
-                    self.chat_history_webview.setHtml(empty_html)
-                else:
-                    self.ui.textEdit_chat_history.setHtml(empty_html)
+                self._set_chat_history_html(empty_html)
                 print(f"对话历史文件不存在: {history_file}")
                 return
 
-            # 读取对话历史
-            chat_history = []
-            with open(history_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        try:
-                            chat_history.append(json.loads(line))
-                        except json.JSONDecodeError as e:
-                            print(f"解析JSON失败: {e}")
-                            continue
-
-            # 打包模式下，限制加载最近的50条对话，避免内存溢出
-            is_frozen = getattr(sys, 'frozen', False)
-            if is_frozen and len(chat_history) > 50:
-                print(f"打包模式：限制只显示最近50条对话（共{len(chat_history)}条）")
-                chat_history = chat_history[-50:]
-
-            # 格式化显示
-            if not chat_history:
+            store = self._get_chat_history_store()
+            added = store.sync()
+            if added:
+                print(f"对话历史索引新增 {added} 条")
+
+            rows = store.page(limit=CHAT_HISTORY_PAGE_SIZE)
+            if not rows:
                 empty_html = "<p style='text-align:center; color:#666; padding:50px;'>暂无对话记录</p>"
-                if hasattr(self, 'chat_history_webview') and self.chat_history_webview:
-                    self.chat_history_webview.setHtml(empty_html)
-                else:
-                    self.ui.textEdit_chat_history.setHtml(empty_html)
+                self._set_chat_history_html(empty_html)
                 return
 
-            # 构建HTML - 完全按照HTML查看器的样式
-            html_parts = []
-            html_parts.append("""
-            <style>
-                body {
-                    margin: 0;
-                    padding: 0;
-                }
-                .dialogue-entry {
-                    margin-bottom: 25px;
-                    padding-left: 10px;
-                }
-                .character-name {
-                    font-weight: bold;
-                    margin-bottom: 8px;
-                    letter-spacing: 1px;
-                }
-                .character-name.user {
-                    color: #4a90d9;
-                }
-                .character-name.assistant {
-                    color: #d4850d;
-                }
-                .dialogue-text {
-                    line-height: 1.8;
-                    color: #333;
-                    padding-left: 15px;
-                    border-left: 2px solid rgba(0, 0, 0, 0.15);
-                }
-                .dialogue-text img {
-                    display: block;
-                    max-width: 100%;
-                    height: auto;
-                    border-radius: 8px;
-                    margin: 15px 0;
-                    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
-                    cursor: pointer;
-                    transition: transform 0.2s;
-                }
-                .dialogue-text img:hover {
-                    transform: scale(1.02);
-                    box-shadow: 0 6px 16px rgba(0, 0, 0, 0.2);
-                }
-                .emotion-tag {
-                    color: #e91e63;
-                }
-                .tool-call-box {
-                    margin-top: 10px;
-                    padding: 12px 15px;
-                    background: rgba(100, 150, 200, 0.08);
-                    border-left: 3px solid #6496c8;
-                    border-radius: 4px;
-                    color: #555;
-                }
-                .divider {
-                    height: 1px;
-                    background: linear-gradient(to right, transparent, rgba(0, 0, 0, 0.1), transparent);
-                    margin: 20px 0;
-                }
-                /* 全屏图片预览遮罩层 */
-                #image-preview-fullscreen {
-                    display: none;
-                    position: fixed;
-                    top: 0;
-                    left: 0;
-                    width: 100%;
-                    height: 100%;
-                    background: rgba(0, 0, 0, 0.98);
-                    z-index: 999999;
-                    cursor: pointer;
-                    justify-content: center;
-                    align-items: center;
-                }
-                #image-preview-fullscreen.active {
-                    display: flex !important;
-                }
-                #image-preview-fullscreen img {
-                    max-width: 98%;
-                    max-height: 98%;
-                    object-fit: contain;
-                    box-shadow: 0 0 50px rgba(255, 255, 255, 0.3);
-                }
-            </style>
-
-            <script>
-                // 图片点击放大功能
-                function setupImagePreview() {
-                    console.log('开始设置图片预览功能');
-
-                    // 创建全屏遮罩层
-                    var overlay = document.createElement('div');
-                    overlay.id = 'image-preview-fullscreen';
-                    var overlayImg = document.createElement('img');
-                    overlay.appendChild(overlayImg);
-                    document.body.appendChild(overlay);
-
-                    console.log('遮罩层已创建');
-
-                    // 点击遮罩关闭
-                    overlay.onclick = function() {
-                        console.log('关闭预览');
-                        this.classList.remove('active');
-                    };
-
-                    // 为所有图片添加点击事件
-                    var images = document.querySelectorAll('.dialogue-text img');
-                    console.log('找到图片数量:', images.length);
-
-                    images.forEach(function(img) {
-                        img.onclick = function(e) {
-                            console.log('图片被点击');
-                            e.stopPropagation();
-                            overlayImg.src = this.src;
-                            overlay.classList.add('active');
-                        };
-                    });
-                }
-
-                // 页面加载完成后初始化
-                if (document.readyState === 'loading') {
-                    document.addEventListener('DOMContentLoaded', setupImagePreview);
-                } else {
-                    setupImagePreview();
-                }
-            </script>
-            """)
-
-            # 处理情绪标签的函数（Python版本）
-            def process_emotion_tags(content):
-                """将 <情绪> 标签转换为带样式的HTML"""
-                import re
-                # 只匹配包含中文字符的标签，排除HTML标签
-                return re.sub(r'<([\u4e00-\u9fa5]+)>', r'<span class="emotion-tag">&lt;\1&gt;</span>', content)
-
-            # 提取内容并生成HTML的函数
-            def extract_content_html(content):
-                """从content中提取内容并生成HTML，处理字符串或列表格式"""
-                if isinstance(content, str):
-                    # 如果是字符串，直接返回
-                    return content
-                elif isinstance(content, list):
-                    # 如果是列表，提取所有文本和图片信息
-                    html_parts = []
-                    for item in content:
-                        if isinstance(item, dict):
-                            if item.get('type') == 'text':
-                                html_parts.append(item.get('text', ''))
-                            elif item.get('type') == 'image_url':
-                                # 提取图片数据
-                                image_url = item.get('image_url', {}).get('url', '')
-                                if image_url and image_url.startswith('data:image'):
-                                    # 检测是否是打包后的程序
-                                    is_frozen = getattr(sys, 'frozen', False)
-
-                                    if not is_frozen and hasattr(self, 'chat_history_webview') and self.chat_history_webview:
-                                        # 开发环境 + WebEngineView: 使用临时文件（更快）
-                                        try:
-                                            import base64
-                                            import tempfile
-                                            import uuid
-
-                                            header, base64_data = image_url.split(',', 1)
-                                            image_format = header.split(';')[0].split('/')[1]
-                                            image_bytes = base64.b64decode(base64_data)
-
-                                            temp_dir = tempfile.gettempdir()
-                                            temp_filename = f"chat_image_{uuid.uuid4().hex}.{image_format}"
-                                            temp_path = os.path.join(temp_dir, temp_filename)
-
-                                            with open(temp_path, 'wb') as f:
-                                                f.write(image_bytes)
-
-                                            file_url = f"file:///{temp_path.replace(chr(92), '/')}"
-                                            html_parts.append(f'<br/><img src="{file_url}" style="max-width:100%; height:auto; display:block; margin:10px 0;" /><br/>')
-                                        except Exception as e:
-                                            print(f"处理图片时出错: {e}")
-                                            html_parts.append(f'<br/>[图片加载失败]<br/>')
-                                    else:
-                                        # 打包模式 或 QTextEdit: 直接使用 base64
-                                        # QTextEdit 不支持百分比宽度，需要缩小图片
-                                        try:
-                                            import base64
-                                            from io import BytesIO
-                                            from PIL import Image
-
-                                            # 解码 base64
-                                            header, base64_data = image_url.split(',', 1)
-                                            image_bytes = base64.b64decode(base64_data)
-
-                                            # 使用 PIL 缩小图片
-                                            img = Image.open(BytesIO(image_bytes))
-
-                                            # 缩放到最大宽度 800px
-                                            max_width = 800
-                                            if img.width > max_width:
-                                                ratio = max_width / img.width
-                                                new_height = int(img.height * ratio)
-                                                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-
-                                            # 转回 base64
-                                            buffered = BytesIO()
-                                            img_format = header.split(';')[0].split('/')[1].upper()
-                                            if img_format == 'JPG':
-                                                img_format = 'JPEG'
-                                            img.save(buffered, format=img_format)
-                                            img_str = base64.b64encode(buffered.getvalue()).decode()
-                                            resized_url = f"data:image/{img_format.lower()};base64,{img_str}"
-
-                                            html_parts.append(f'<br/><img src="{resized_url}" style="display:block; margin:10px 0;" /><br/>')
-                                        except Exception as e:
-                                            print(f"缩放图片失败: {e}")
-                                            # 如果缩放失败，直接显示原图但限制宽度
-                                            html_parts.append(f'<br/><img src="{image_url}" width="800" style="display:block; margin:10px 0;" /><br/>')
-                    return ''.join(html_parts)
-                else:
-                    return str(content)
-
-            # 构建对话内容
-            for i, msg in enumerate(chat_history):
-                role = msg.get('role', 'unknown')
-                content = msg.get('content', '')
-                tool_calls = msg.get('tool_calls', [])
-
-                # 角色显示
-                if role == 'user':
-                    role_display = "用户"
-                    role_class = "user"
-                elif role == 'assistant':
-                    role_display = "AI"
-                    role_class = "assistant"
-                else:
-                    role_display = role
-                    role_class = "unknown"
-
-                # 提取内容（包括文本和图片）
-                content_html = extract_content_html(content)
-
-                # 处理内容：先处理情绪标签
-                processed_content = process_emotion_tags(content_html)
-
-                # 处理工具调用（放在对话文本内部）
-                tool_html = ""
-                if tool_calls:
-                    tool_call = tool_calls[0]  # 只取第一个工具调用
-                    function_name = tool_call.get('function', {}).get('name', 'unknown')
-                    arguments = tool_call.get('function', {}).get('arguments', '')
+            self._chat_history_rows = rows
+            self._chat_history_has_more = bool(store.page(before_id=rows[0]['id'], limit=1))
 
-                    # 尝试解析参数
-                    try:
-                        arg_obj = json.loads(arguments)
-                        args_text = ', '.join(str(v) for v in arg_obj.values())
-                    except:
-                        args_text = arguments
-
-                    tool_html = f'<div class="tool-call-box">AI使用工具：{function_name} 输入了参数：{args_text}</div>'
-
-                # 开始对话条目
-                html_parts.append('<div class="dialogue-entry">')
-                html_parts.append(f'<div class="character-name {role_class}">{role_display}</div>')
-                html_parts.append(f'<div class="dialogue-text">{processed_content}{tool_html}</div>')
-                html_parts.append('</div>')
-
-                # 添加分隔线（最后一条除外）
-                if i < len(chat_history) - 1:
-                    html_parts.append('<div class="divider"></div>')
-
-            # 设置HTML到文本框或WebView
-            final_html = "".join(html_parts)
-            if hasattr(self, 'chat_history_webview') and self.chat_history_webview:
-                self.chat_history_webview.setHtml(final_html)
+            if getattr(self, 'chat_history_webview', None):
+                self.chat_history_webview.setHtml(self._chat_history_page_html(
+                    self._chat_entries_html(store, rows), self._chat_history_has_more, True))
             else:
-                self.ui.textEdit_chat_history.setHtml(final_html)
-            print(f"成功加载 {len(chat_history)} 条对话记录")
+                self._render_chat_history_text('bottom')
+            print(f"成功加载 {len(rows)} 条对话记录（共{store.count()}条）")
 
         except Exception as e:
             error_html = f"<p style='color:red;'>加载对话记录失败: {str(e)}</p>"
-            if hasattr(self, 'chat_history_webview') and self.chat_history_webview:
-                self.chat_history_webview.setHtml(error_html)
-            else:
-                self.ui.textEdit_chat_history.setHtml(error_html)
+            self._set_chat_history_html(error_html)
             print(f"加载对话记录失败: {e}")
             import traceback
             traceback.print_exc()
+
+    def load_older_chat_history(self):
+        """加载当前最早一条之前的一页"""
+        if (getattr(self, '_chat_history_searching', False) or getattr(self, '_chat_history_rendering', False)
+                or not getattr(self, '_chat_history_has_more', False) or not self._chat_history_rows):
+            return
+        try:
+            store = self._get_chat_history_store()
+            rows = store.page(before_id=self._chat_history_rows[0]['id'], limit=CHAT_HISTORY_PAGE_SIZE)
+            if not rows:
+                self._chat_history_has_more = False
+                return
+            self._chat_history_rows = rows + self._chat_history_rows
+            self._chat_history_has_more = bool(store.page(before_id=rows[0]['id'], limit=1))
+
+            if getattr(self, 'chat_history_webview', None):
+                html = self._chat_entries_html(store, rows) + '<div class="divider"></div>'
+                self.chat_history_webview.page().runJavaScript(
+                    f"prependEntries({json.dumps(html)}, {json.dumps(self._chat_history_has_more)})")
+            else:
+                self._render_chat_history_text('keep')
+        except Exception as e:
+            print(f"加载更早的对话记录失败: {e}")
+
+    def search_chat_history(self):
+        """全文检索全部对话记录，结果按时间顺序显示"""
+        query = self.chat_history_search.text().strip()
+        if not query:
+            self.load_chat_history()
+            return
+        try:
+            store = self._get_chat_history_store()
+            store.sync()
+            rows = store.search(query, limit=CHAT_HISTORY_SEARCH_LIMIT)[::-1]
+            self._chat_history_searching = True
+            self._chat_history_rows = rows
+            self._chat_history_has_more = False
+
+            if len(rows) >= CHAT_HISTORY_SEARCH_LIMIT:
+                summary = f"找到超过 {CHAT_HISTORY_SEARCH_LIMIT} 条匹配「{html_escape(query)}」的记录，仅显示最近的 {CHAT_HISTORY_SEARCH_LIMIT} 条"
+            else:
+                summary = f"找到 {len(rows)} 条匹配「{html_escape(query)}」的记录"
+            header = f'<div class="history-hint">{summary}</div>'
+            self._set_chat_history_html(self._chat_history_page_html(
+                self._chat_entries_html(store, rows), False, True, header))
+            if not getattr(self, 'chat_history_webview', None):
+                bar = self.ui.textEdit_chat_history.verticalScrollBar()
+                bar.setValue(bar.maximum())
+        except Exception as e:
+            self._set_chat_history_html(f"<p style='color:red;'>搜索对话记录失败: {str(e)}</p>")
+            print(f"搜索对话记录失败: {e}")
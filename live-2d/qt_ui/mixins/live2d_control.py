@@ -424,62 +424,28 @@ class Live2DControlMixin:
 
 
     def scan_live2d_models(self):
-        """扫描2D文件夹下的Live2D模型"""
-        models = []
-        app_path = get_app_path()
-        models_dir = os.path.join(app_path, "2D")
-
-        if os.path.exists(models_dir):
-            for folder in os.listdir(models_dir):
-                folder_path = os.path.join(models_dir, folder)
-                if os.path.isdir(folder_path):
-                    # 检查文件夹里有没有.model3.json文件
-                    for file in os.listdir(folder_path):
-                        if file.endswith('.model3.json'):
-                            models.append(folder)
-                            break
-        return models
+        """扫描2D文件夹下的Live2D模型（模型目录下直接含.model3.json）"""
+        from asset_catalog import get_catalog
+        return [
+            m['name'] for m in get_catalog(get_app_path()).live2d_models()
+            if any('/' not in f for f in m['model3_files'])
+        ]
 
 
     def scan_vrm_models(self):
-        """扫描3D文件夹下的VRM 0.x模型（过滤掉VRM 1.0）"""
+        """扫描3D文件夹下的VRM 0.x模型（过滤掉VRM 1.0，版本由资源索引缓存）"""
+        from asset_catalog import get_catalog
         vrm_models = []
-        app_path = get_app_path()
-        models_dir = os.path.join(app_path, "3D")
-
-        if os.path.exists(models_dir):
-            for file in os.listdir(models_dir):
-                if file.lower().endswith('.vrm'):
-                    filepath = os.path.join(models_dir, file)
-                    if not self._is_vrm_1_0(filepath):
-                        vrm_models.append(file)
-                    else:
-                        print(f"跳过VRM 1.0模型: {file}")
+        for vrm in get_catalog(get_app_path()).vrm_models():
+            if '/' in vrm['path']:
+                continue  # 只列 3D 根目录下的模型
+            if vrm['version'] != '1.0':
+                vrm_models.append(vrm['path'])
+            else:
+                print(f"跳过VRM 1.0模型: {vrm['path']}")
         return vrm_models
 
 
-    @staticmethod
-    def _is_vrm_1_0(filepath):
-        """检测VRM文件是否为VRM 1.0格式（通过检查glTF JSON中的VRMC_vrm扩展）"""
-        try:
-            import struct
-            with open(filepath, 'rb') as f:
-                header = f.read(12)
-                if len(header) < 12 or header[:4] != b'glTF':
-                    return False
-                chunk_header = f.read(8)
-                if len(chunk_header) < 8:
-                    return False
-                chunk_length = struct.unpack('<I', chunk_header[:4])[0]
-                chunk_type = struct.unpack('<I', chunk_header[4:8])[0]
-                if chunk_type != 0x4E4F534A:  # "JSON"
-                    return False
-                json_bytes = f.read(chunk_length)
-                return b'VRMC_vrm' in json_bytes
-        except Exception:
-            return False
-
-
     def refresh_model_list(self):
         """刷新模型列表（包含Live2D和VRM模型）"""
         self.is_loading_model_list = True  # 开始加载，忽略选择改变事件
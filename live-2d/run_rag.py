@@ -4,12 +4,12 @@ from typing import List, Dict, Any
 import torch
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import uvicorn
 import time
 import os
 import sys
 import re
+import hashlib
 import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
@@ -53,18 +53,38 @@ sys.stderr = TeeOutput(original_stderr, log_file)
 
 # 全局变量
 model = None
-knowledge_base = []
-knowledge_embeddings = None
-reload_lock = threading.Lock()
+# 知识库快照 (段落列表, 归一化嵌入矩阵, 近似索引或 None)：只整体替换、从不原地修改，
+# 查询时先取局部引用，重新加载期间不需要加锁
+knowledge = ([], None, None)
+# 段落哈希 -> 嵌入，重新加载时只编码新增或修改的段落
+embedding_cache = {}
+reload_lock = threading.Lock()  # 只用于串行化重新加载，查询不获取
+
+RELOAD_DEBOUNCE_SECONDS = 0.5
+
+# 检索矩阵精度：float32（默认）或 float16（内存减半，适合超大知识库）
+MATRIX_DTYPE = np.float16 if os.environ.get("RAG_MATRIX_DTYPE") == "float16" else np.float32
+# 段落数超过该值且安装了 hnswlib 时，改用 HNSW 近似检索
+ANN_THRESHOLD = int(os.environ.get("RAG_ANN_THRESHOLD", "200000"))
 
 
 class KnowledgeBaseHandler(FileSystemEventHandler):
-    """监控记忆库文件变化"""
+    """监控记忆库文件变化（连续事件合并为一次重新加载）"""
+
+    def __init__(self):
+        super().__init__()
+        self._timer = None
+        self._timer_lock = threading.Lock()
 
     def on_modified(self, event):
         if not event.is_directory and event.src_path.endswith("记忆库.txt"):
-            time.sleep(0.5)  # 等待文件写入完成
-            reload_knowledge_base()
+            # 等待文件写入完成；期间的新事件会重新计时
+            with self._timer_lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = threading.Timer(RELOAD_DEBOUNCE_SECONDS, reload_knowledge_base)
+                self._timer.daemon = True
+                self._timer.start()
 
 
 def load_knowledge_base(file_path="./AI记录室/记忆库.txt"):
@@ -96,18 +116,114 @@ def load_knowledge_base(file_path="./AI记录室/记忆库.txt"):
         return []
 
 
+def paragraph_hash(paragraph):
+    return hashlib.sha1(paragraph.encode('utf-8')).hexdigest()
+
+
+def build_knowledge(paragraphs):
+    """
+    生成知识库快照：命中缓存的段落直接复用嵌入，只编码新增或修改的段落
+    """
+    hashes = [paragraph_hash(p) for p in paragraphs]
+    missing = list(dict.fromkeys(h for h in hashes if h not in embedding_cache))
+    if missing:
+        by_hash = dict(zip(hashes, paragraphs))
+        new_embeddings = model.encode([by_hash[h] for h in missing])
+        for h, embedding in zip(missing, new_embeddings):
+            embedding_cache[h] = embedding
+
+    # 清理已不存在的段落
+    current = set(hashes)
+    for h in [h for h in embedding_cache if h not in current]:
+        del embedding_cache[h]
+
+    if not hashes:
+        return (list(paragraphs), None, None), len(missing)
+    matrix = normalize_rows(np.stack([embedding_cache[h] for h in hashes])).astype(MATRIX_DTYPE)
+    return (list(paragraphs), np.ascontiguousarray(matrix), build_ann_index(matrix)), len(missing)
+
+
+def normalize_rows(vectors):
+    """按行 L2 归一化为 float32，之后内积即余弦相似度"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def build_ann_index(matrix):
+    """段落数超过阈值时构建 HNSW 索引；未安装 hnswlib 则保持精确检索"""
+    if len(matrix) < ANN_THRESHOLD:
+        return None
+    try:
+        import hnswlib
+    except ImportError:
+        print(f"段落数 {len(matrix)} 超过 {ANN_THRESHOLD}，但未安装 hnswlib，继续使用精确检索")
+        return None
+    index = hnswlib.Index(space='ip', dim=matrix.shape[1])
+    index.init_index(max_elements=len(matrix), ef_construction=200, M=16)
+    index.add_items(matrix.astype(np.float32, copy=False), np.arange(len(matrix)))
+    index.set_ef(128)
+    print(f"已构建 HNSW 索引: {len(matrix)} 个段落")
+    return index
+
+
+def top_k_indices(scores, k):
+    """argpartition 取前 k 个，再只对这 k 个排序"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    if k < scores.shape[-1]:
+        part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        part = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape[:-1] + (k,))
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+def search_knowledge(snapshot, question_embeddings, top_k):
+    """
+    对一批问题检索：精确模式一次矩阵乘（单问题即 GEMV），
+    近似模式走 HNSW。返回每个问题的 [(段落下标, 相似度)]
+    """
+    _, matrix, ann_index = snapshot
+    queries = normalize_rows(question_embeddings)
+    k = min(top_k, len(matrix)) if matrix is not None else 0
+    if k <= 0:
+        return [[] for _ in range(len(queries))]
+
+    if ann_index is not None:
+        labels, distances = ann_index.knn_query(queries, k=k)
+        return [
+            [(int(idx), float(1.0 - dist)) for idx, dist in zip(row_labels, row_distances)]
+            for row_labels, row_distances in zip(labels, distances)
+        ]
+
+    scores = queries.astype(matrix.dtype, copy=False) @ matrix.T
+    indices = top_k_indices(scores, top_k)
+    return [
+        [(int(idx), float(row_scores[idx])) for idx in row_indices]
+        for row_scores, row_indices in zip(scores, indices)
+    ]
+
+
 def reload_knowledge_base():
-    """重新加载知识库"""
-    global knowledge_base, knowledge_embeddings
+    """重新加载知识库（reload_lock 只串行化重载；查询继续读旧快照，新快照构建完成后整体替换）"""
+    global knowledge
 
     with reload_lock:
         print("检测到文件变化，重新加载知识库...")
         new_knowledge_base = load_knowledge_base()
+        if model is None:
+            return
 
-        if new_knowledge_base and model is not None:
-            knowledge_base = new_knowledge_base
-            knowledge_embeddings = model.encode(knowledge_base)
-            print("知识库更新完成！")
+        start_time = time.time()
+        # 知识库被清空时也要替换成空快照，否则会继续返回已删除的段落
+        new_knowledge, encoded = build_knowledge(new_knowledge_base)
+        knowledge = new_knowledge
+        if new_knowledge_base:
+            print(f"知识库更新完成！新编码 {encoded} 个段落，耗时 {time.time() - start_time:.2f}s")
+        else:
+            print("知识库已清空")
 
 
 # 创建FastAPI应用
@@ -116,21 +232,21 @@ app = FastAPI(title="BGE API", version="1.0.0")
 
 @app.on_event("startup")
 async def startup_event():
-    global model, knowledge_base, knowledge_embeddings
+    global model, knowledge
 
     print("启动BGE API服务...")
     print("加载模型...")
 
     # 加载模型
-    model = SentenceTransformer("./RAG-model")
-    model = model.to('cuda')
-    print("模型加载完成，使用GPU")
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    model = SentenceTransformer("./RAG-model", device=device)
+    print(f"模型加载完成，使用{'GPU' if device == 'cuda' else 'CPU'}")
 
     # 加载知识库
     knowledge_base = load_knowledge_base()
     if knowledge_base:
         print("生成知识库嵌入...")
-        knowledge_embeddings = model.encode(knowledge_base)
+        knowledge, _ = build_knowledge(knowledge_base)
         print("知识库嵌入完成")
 
     # 启动文件监控
@@ -153,6 +269,11 @@ class QuestionRequest(BaseModel):
     top_k: int = 3
 
 
+class BatchQuestionRequest(BaseModel):
+    questions: List[str]
+    top_k: int = 3
+
+
 class SimilarityRequest(BaseModel):
     text1: str
     text2: str
@@ -171,6 +292,11 @@ class AnswerResponse(BaseModel):
     processing_time: float
 
 
+class BatchAnswerResponse(BaseModel):
+    results: List[AnswerResponse]
+    processing_time: float
+
+
 class SimilarityResponse(BaseModel):
     similarity: float
     processing_time: float
@@ -181,7 +307,7 @@ async def root():
     return {
         "message": "BGE API服务运行中",
         "model_loaded": model is not None,
-        "knowledge_base_size": len(knowledge_base)
+        "knowledge_base_size": len(knowledge[0])
     }
 
 
@@ -208,7 +334,8 @@ async def calculate_similarity(request: SimilarityRequest):
 
     start_time = time.time()
     embeddings = model.encode([request.text1, request.text2])
-    similarity = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
+    normalized = normalize_rows(embeddings)
+    similarity = normalized[0] @ normalized[1]
     processing_time = time.time() - start_time
 
     return SimilarityResponse(
@@ -222,31 +349,64 @@ async def ask_question(request: QuestionRequest):
     if model is None:
         raise HTTPException(status_code=500, detail="模型未加载")
 
+    snapshot = knowledge  # 取当前快照，重新加载不会阻塞查询
+    knowledge_base = snapshot[0]
     if not knowledge_base:
         raise HTTPException(status_code=404, detail="知识库未加载")
 
-    with reload_lock:  # 确保查询时数据不会被更新
-        start_time = time.time()
+    start_time = time.time()
+
+    question_embedding = model.encode([request.question])
+    hits = search_knowledge(snapshot, question_embedding, request.top_k)[0]
+    relevant_passages = format_passages(knowledge_base, hits)
+
+    processing_time = time.time() - start_time
+
+    return AnswerResponse(
+        question=request.question,
+        relevant_passages=relevant_passages,
+        processing_time=processing_time
+    )
 
-        question_embedding = model.encode([request.question])
-        similarities = cosine_similarity(question_embedding, knowledge_embeddings)[0]
-        top_indices = np.argsort(similarities)[::-1][:request.top_k]
 
-        relevant_passages = []
-        for i, idx in enumerate(top_indices):
-            relevant_passages.append({
-                "rank": i + 1,
-                "similarity": float(similarities[idx]),
-                "content": knowledge_base[idx]
-            })
+@app.post("/ask/batch", response_model=BatchAnswerResponse)
+async def ask_questions(request: BatchQuestionRequest):
+    if model is None:
+        raise HTTPException(status_code=500, detail="模型未加载")
+
+    snapshot = knowledge
+    knowledge_base = snapshot[0]
+    if not knowledge_base:
+        raise HTTPException(status_code=404, detail="知识库未加载")
 
-        processing_time = time.time() - start_time
+    start_time = time.time()
+
+    results = []
+    if request.questions:
+        question_embeddings = model.encode(request.questions)
+        all_hits = search_knowledge(snapshot, question_embeddings, request.top_k)
+        for question, hits in zip(request.questions, all_hits):
+            results.append(AnswerResponse(
+                question=question,
+                relevant_passages=format_passages(knowledge_base, hits),
+                processing_time=0.0
+            ))
+
+    return BatchAnswerResponse(
+        results=results,
+        processing_time=time.time() - start_time
+    )
 
-        return AnswerResponse(
-            question=request.question,
-            relevant_passages=relevant_passages,
-            processing_time=processing_time
-        )
+
+def format_passages(knowledge_base, hits):
+    return [
+        {
+            "rank": i + 1,
+            "similarity": similarity,
+            "content": knowledge_base[idx]
+        }
+        for i, (idx, similarity) in enumerate(hits)
+    ]
 
 
 @app.post("/v1/embeddings")
@@ -292,7 +452,7 @@ async def health_check():
     return {
         "status": "healthy",
         "model_loaded": model is not None,
-        "knowledge_base_loaded": len(knowledge_base) > 0
+        "knowledge_base_loaded": len(knowledge[0]) > 0
     }
 
 
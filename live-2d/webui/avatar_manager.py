@@ -6,7 +6,7 @@
 
 设计：桌宠运行中优先走 HTTP 3002 热接口（即时生效）；
 桌宠未运行时直接写 config.json（下次启动生效）。
-模型列表由本模块直接扫描文件系统（与 js/avatar/model-registry.js 同一目录约定），
+模型列表来自共享资源索引 asset_catalog（与 js/avatar/model-registry.js 同一目录约定），
 不依赖桌宠在线。
 
 注意：当前线上运行时仅接入 Live2D 与 VRM 两种形态
@@ -19,6 +19,7 @@ import urllib.request
 from flask import Blueprint, request, jsonify
 
 from .utils import PROJECT_ROOT, logger
+from asset_catalog import get_catalog
 
 avatar_bp = Blueprint('avatar', __name__)
 
@@ -56,34 +57,16 @@ def _pet_running():
 # ============ 模型扫描（与 js/avatar/model-registry.js 目录约定一致） ============
 
 def _scan_live2d():
-    """2D/<模型名>/**/*.model3.json -> 按目录名去重"""
-    root = PROJECT_ROOT / '2D'
-    results = []
-    if not root.exists():
-        return results
-    for model_dir in sorted(root.iterdir()):
-        if not model_dir.is_dir():
-            continue
-        if any(model_dir.rglob('*.model3.json')):
-            results.append({'name': model_dir.name, 'value': model_dir.name})
-    return results
+    """2D/<模型名>/**/*.model3.json -> 按目录名去重（走资源索引，目录未变时不遍历）"""
+    return [{'name': m['name'], 'value': m['name']} for m in get_catalog(PROJECT_ROOT).live2d_models()]
 
 
 def _scan_vrm():
     """3D/**/*.vrm（排除 3D/mmd）-> value 为相对路径"""
-    root = PROJECT_ROOT / '3D'
     results = []
-    if not root.exists():
-        return results
-    mmd_root = root / 'mmd'
-    for vrm in sorted(root.rglob('*.vrm')):
-        try:
-            vrm.relative_to(mmd_root)
-            continue  # 位于 3D/mmd 下，跳过
-        except ValueError:
-            pass
-        rel = vrm.relative_to(PROJECT_ROOT).as_posix()
-        results.append({'name': vrm.stem, 'value': rel})
+    for vrm in get_catalog(PROJECT_ROOT).vrm_models():
+        rel = f"3D/{vrm['path']}"
+        results.append({'name': rel.rsplit('/', 1)[-1][:-len('.vrm')], 'value': rel})
     return results
 
 
@@ -15,6 +15,7 @@ import re
 from flask import Blueprint, request, jsonify
 
 from .utils import PROJECT_ROOT, logger
+from asset_catalog import get_catalog
 
 # 创建 Live2D 管理蓝图
 live2d_bp = Blueprint('live2d', __name__)
@@ -90,12 +91,16 @@ def _model_dir(model_name=None):
     return PROJECT_ROOT / '2D' / (model_name or get_current_model())
 
 
+def _catalog_entry(model_name=None):
+    """资源索引中的模型条目（内存命中，目录变化时自动重扫）"""
+    return get_catalog(PROJECT_ROOT).live2d_model(model_name or get_current_model())
+
+
 def _find_model_json(model_name=None):
-    root = _model_dir(model_name)
-    if not root.exists():
+    entry = _catalog_entry(model_name)
+    if not entry or not entry['model3']:
         return None
-    matches = sorted(root.rglob('*.model3.json'))
-    return matches[0] if matches else None
+    return _model_dir(model_name) / entry['model3']
 
 
 def _project_rel(path):
@@ -113,7 +118,7 @@ def _read_model3(model_name=None):
     model_path = _find_model_json(model_name)
     if not model_path:
         return None, {}
-    return model_path, _read_json(model_path, {})
+    return model_path, _catalog_entry(model_name)['model3_json']
 
 
 def _model_rel(model_name, path, base=None):
@@ -156,8 +161,9 @@ def _model_motion_groups(model_name=None):
                     'file': item.get('File'),
                     'source': 'model3'
                 })
-    for motion_path in sorted(_model_dir(model_name).rglob('*.motion3.json')):
-        rel = _model_rel(model_name, motion_path, asset_base)
+    model_dir = _model_dir(model_name)
+    for motion_file in (_catalog_entry(model_name) or {}).get('motions', []):
+        rel = _model_rel(model_name, model_dir / motion_file, asset_base)
         if rel in seen:
             continue
         group = 'Idle' if _looks_like_idle_motion(rel) else 'TapBody'
@@ -188,8 +194,9 @@ def _model_expression_files(model_name=None):
                 'file': item.get('File'),
                 'source': 'model3'
             })
-    for expr_path in sorted(_model_dir(model_name).rglob('*.exp3.json')):
-        rel = _model_rel(model_name, expr_path, asset_base)
+    model_dir = _model_dir(model_name)
+    for expr_file in (_catalog_entry(model_name) or {}).get('expressions', []):
+        rel = _model_rel(model_name, model_dir / expr_file, asset_base)
         if rel in seen:
             continue
         result.append({
@@ -205,16 +212,16 @@ def _model_expression_files(model_name=None):
 def _asset_file_exists(model_name, rel_path):
     if not rel_path:
         return False
-    rel = str(rel_path).replace('/', '\\')
-    model_path = _find_model_json(model_name)
-    candidates = []
-    if model_path:
-        candidates.append(model_path.parent / rel)
-    candidates.append(_model_dir(model_name) / rel)
-    try:
-        return any(candidate.is_file() for candidate in candidates)
-    except Exception:
+    catalog = get_catalog(PROJECT_ROOT)
+    entry = catalog.live2d_model(model_name)
+    if not entry:
         return False
+    rel = str(rel_path).replace('\\', '/')
+    # 相对 model3.json 所在目录，或相对模型根目录
+    if entry['model3'] and '/' in entry['model3']:
+        if catalog.has_file(model_name, entry['model3'].rsplit('/', 1)[0] + '/' + rel):
+            return True
+    return catalog.has_file(model_name, rel)
 
 
 def _filter_existing_files(config, model_name):
@@ -45,7 +45,8 @@ def _read_last_lines(path, max_lines, max_bytes=TAIL_READ_LIMIT_BYTES):
     return data.decode('utf-8', errors='ignore').splitlines()[-max_lines:]
 
 
-def _read_lines_from_offset(path, offset, max_bytes=INCREMENTAL_READ_LIMIT_BYTES):
+def _read_lines_from_offset(path, offset, max_bytes=INCREMENTAL_READ_LIMIT_BYTES, complete_only=False):
+    """从 offset 读新增内容；complete_only 时末尾未写完的半行留到下次再读。"""
     with open(path, 'rb') as stream:
         stream.seek(offset)
         data = stream.read(max_bytes + 1)
@@ -55,6 +56,9 @@ def _read_lines_from_offset(path, offset, max_bytes=INCREMENTAL_READ_LIMIT_BYTES
         last_newline = bounded.rfind(b'\n')
         consumed = last_newline + 1 if last_newline >= 0 else max_bytes
         data = bounded[:consumed]
+    elif complete_only and data and not data.endswith(b'\n'):
+        consumed = data.rfind(b'\n') + 1
+        data = data[:consumed]
     else:
         consumed = len(data)
 
@@ -33,7 +33,7 @@ def create_app():
     from .live2d_manager import live2d_bp
     from .avatar_manager import avatar_bp
     from .updater import updater_bp
-    from .telemetry import telemetry_bp
+    from .telemetry import telemetry_bp, start_tailer
     from . import process_metrics
 
     app.register_blueprint(service_bp)
@@ -53,6 +53,12 @@ def create_app():
     except Exception as e:
         logger.warning(f'process_metrics 采样启动失败: {e}')
 
+    # 遥测文件后台跟读（总览增量推送数据源）；失败时各接口首次请求会再尝试
+    try:
+        start_tailer()
+    except Exception as e:
+        logger.warning(f'遥测跟读启动失败: {e}')
+
     # 注册首页路由（必须在蓝图之后，确保根路径被正确处理）
     @app.route('/')
     def dashboard():
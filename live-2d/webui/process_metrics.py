@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-进程 CPU/内存采样(Windows ctypes,无 psutil 依赖)。
-采样对象:WebUI 自身 + Live2D 桌宠进程(若在运行)。
-Flask 进程内保留约 30 分钟环形缓冲(每 3 秒一次)。
-采样失败不抛异常,仅标记 available=False,不影响服务启停。
+进程 CPU/内存/线程采样(无 psutil 依赖)。
+采样后端可插拔:Windows 走 ctypes(Toolhelp32 + GetProcessTimes),Linux 读 /proc;
+都不可用时不采样,get_latest 返回 available=False。
+采样对象:WebUI 自身 + 每个受管服务(live2d/asr/tts/bert/memos/rag)的进程树,
+服务根进程取 service_processes 中的子进程或跨 WebUI 共享的 owner pid,子进程一并计入。
+Flask 进程内保留约 30 分钟环形缓冲(每 3 秒一次),另按 1 分钟降采样保留 24 小时。
+采样失败不抛异常,不影响服务启停。
 """
 
 import ctypes
 import os
+import sys
 import threading
 import time
 from collections import deque
@@ -18,124 +22,353 @@ from ctypes import wintypes
 BUFFER_MAXLEN = 600
 SAMPLE_INTERVAL_SEC = 3.0
 
+# 长周期序列:1 分钟一桶,1440 桶 = 24 小时
+BUCKET_MS = 60 * 1000
+BUCKET_MAXLEN = 24 * 60
+
 _buffer = deque(maxlen=BUFFER_MAXLEN)
+_buckets = deque(maxlen=BUCKET_MAXLEN)
+_current_bucket = None
 _lock = threading.Lock()
 _started = False
+_backend = None
 
-# 上一次采样值(用于 CPU 差分):{pid: (kernel+user 100ns 计数, 采样时刻)}
+# 上一次采样值(用于 CPU 差分):{pid: (CPU 累计秒数, 采样时刻)}
 _last_cpu = {}
 
 
+# ============ Windows 后端 ============
+
 class _FILETIME(ctypes.Structure):
     _fields_ = [("dwLowDateTime", wintypes.DWORD),
                 ("dwHighDateTime", wintypes.DWORD)]
 
 
+class _PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+    _fields_ = [("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t)]
+
+
+class _PROCESSENTRY32W(ctypes.Structure):
+    _fields_ = [("dwSize", wintypes.DWORD),
+                ("cntUsage", wintypes.DWORD),
+                ("th32ProcessID", wintypes.DWORD),
+                ("th32DefaultHeapID", ctypes.c_size_t),
+                ("th32ModuleID", wintypes.DWORD),
+                ("cntThreads", wintypes.DWORD),
+                ("th32ParentProcessID", wintypes.DWORD),
+                ("pcPriClassBase", wintypes.LONG),
+                ("dwFlags", wintypes.DWORD),
+                ("szExeFile", wintypes.WCHAR * 260)]
+
+
 def _filetime_to_int(ft):
     return (ft.dwHighDateTime << 32) | ft.dwLowDateTime
 
 
-def _pid_alive(pid):
-    if not pid or pid <= 0:
-        return False
-    try:
-        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
-        if not handle:
-            return False
-        ctypes.windll.kernel32.CloseHandle(handle)
-        return True
-    except Exception:
-        return False
+class WindowsBackend:
+    """Toolhelp32 快照取父子关系与线程数,GetProcessTimes/GetProcessMemoryInfo 取 CPU 与内存。"""
 
+    name = 'windows'
 
-def _sample_pid(pid):
-    """返回 {'cpu_percent': float, 'rss_mb': float},失败返回 None。"""
-    if not _pid_alive(pid):
-        return None
-    try:
+    def __init__(self):
+        self.kernel32 = ctypes.windll.kernel32
+        self.psapi = ctypes.windll.psapi
+        self.kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+        self.kernel32.OpenProcess.restype = wintypes.HANDLE
+
+    def snapshot(self):
+        """{pid: {'ppid', 'threads'}};失败返回空字典。"""
+        TH32CS_SNAPPROCESS = 0x2
+        table = {}
+        handle = self.kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+        if not handle or handle == wintypes.HANDLE(-1).value:
+            return table
+        try:
+            entry = _PROCESSENTRY32W()
+            entry.dwSize = ctypes.sizeof(entry)
+            ok = self.kernel32.Process32FirstW(handle, ctypes.byref(entry))
+            while ok:
+                table[entry.th32ProcessID] = {
+                    'ppid': entry.th32ParentProcessID,
+                    'threads': entry.cntThreads,
+                }
+                ok = self.kernel32.Process32NextW(handle, ctypes.byref(entry))
+        finally:
+            self.kernel32.CloseHandle(handle)
+        return table
+
+    def sample(self, pid, entry):
+        """{'cpu_time': 秒, 'rss_bytes', 'threads'},失败返回 None。"""
         PROCESS_QUERY_INFORMATION = 0x0400
         PROCESS_VM_READ = 0x0010
-        handle = ctypes.windll.kernel32.OpenProcess(
-            PROCESS_QUERY_INFORMATION | PROCESS_VM_READ, False, pid)
+        handle = self.kernel32.OpenProcess(PROCESS_QUERY_INFORMATION | PROCESS_VM_READ, False, pid)
         if not handle:
             return None
         try:
-            # 内存(WorkingSet)
-            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
-                _fields_ = [("cb", wintypes.DWORD),
-                            ("PageFaultCount", wintypes.DWORD),
-                            ("PeakWorkingSetSize", ctypes.c_size_t),
-                            ("WorkingSetSize", ctypes.c_size_t),
-                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
-                            ("QuotaPagedPoolUsage", ctypes.c_size_t),
-                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
-                            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
-                            ("PagefileUsage", ctypes.c_size_t),
-                            ("PeakPagefileUsage", ctypes.c_size_t)]
-            pmc = PROCESS_MEMORY_COUNTERS()
+            pmc = _PROCESS_MEMORY_COUNTERS()
             pmc.cb = ctypes.sizeof(pmc)
-            rss_mb = None
-            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(pmc), pmc.cb):
-                rss_mb = round(pmc.WorkingSetSize / (1024 * 1024), 1)
+            rss_bytes = None
+            if self.psapi.GetProcessMemoryInfo(handle, ctypes.byref(pmc), pmc.cb):
+                rss_bytes = pmc.WorkingSetSize
 
-            # CPU:两次 GetProcessTimes 差分
             creation = _FILETIME(); exit_ = _FILETIME(); kernel = _FILETIME(); user = _FILETIME()
-            cpu_percent = None
-            if ctypes.windll.kernel32.GetProcessTimes(
+            cpu_time = None
+            if self.kernel32.GetProcessTimes(
                     handle, ctypes.byref(creation), ctypes.byref(exit_),
                     ctypes.byref(kernel), ctypes.byref(user)):
-                proc_time = _filetime_to_int(kernel) + _filetime_to_int(user)  # 100ns 单位
-                now = time.time()
-                last = _last_cpu.get(pid)
-                if last:
-                    dproc = (proc_time - last[0]) / 10_000_000.0  # 秒
-                    dt = now - last[1]
-                    if dt > 0:
-                        cores = os.cpu_count() or 1
-                        cpu_percent = round(min(100.0, max(0.0, (dproc / dt) / cores * 100)), 1)
-                _last_cpu[pid] = (proc_time, now)
-
-            return {'cpu_percent': cpu_percent, 'rss_mb': rss_mb}
+                cpu_time = (_filetime_to_int(kernel) + _filetime_to_int(user)) / 10_000_000.0  # 100ns -> 秒
+
+            return {'cpu_time': cpu_time, 'rss_bytes': rss_bytes, 'threads': entry.get('threads')}
         finally:
-            ctypes.windll.kernel32.CloseHandle(handle)
+            self.kernel32.CloseHandle(handle)
+
+
+# ============ Linux /proc 后端 ============
+
+class ProcfsBackend:
+    """一次遍历 /proc/<pid>/stat 拿到父子关系、CPU 时间、RSS 和线程数。"""
+
+    name = 'procfs'
+
+    def __init__(self, root='/proc'):
+        self.root = root
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+
+    def _read_stat(self, pid):
+        try:
+            with open(os.path.join(self.root, str(pid), 'stat'), 'rb') as f:
+                data = f.read().decode('utf-8', errors='ignore')
+        except OSError:
+            return None
+        # comm 字段可能含空格和括号,从最后一个 ')' 之后切分
+        fields = data[data.rfind(')') + 2:].split()
+        if len(fields) < 22:
+            return None
+        return {
+            'ppid': int(fields[1]),
+            'cpu_time': (int(fields[11]) + int(fields[12])) / self.clock_ticks,  # utime + stime
+            'threads': int(fields[17]),
+            'rss_bytes': int(fields[21]) * self.page_size,
+        }
+
+    def snapshot(self):
+        table = {}
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return table
+        for name in names:
+            if not name.isdigit():
+                continue
+            stat = self._read_stat(int(name))
+            if stat:
+                table[int(name)] = stat
+        return table
+
+    def sample(self, pid, entry):
+        # snapshot 时已经读全
+        return {'cpu_time': entry['cpu_time'], 'rss_bytes': entry['rss_bytes'], 'threads': entry['threads']}
+
+
+def _select_backend():
+    """按平台选择采样后端,不可用时返回 None。"""
+    try:
+        if sys.platform.startswith('win'):
+            return WindowsBackend()
+        if os.path.isdir('/proc/self'):
+            return ProcfsBackend()
+    except Exception:
+        pass
+    return None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = _select_backend()
+    return _backend
+
+
+# ============ 采样 ============
+
+def _service_root_pids():
+    """{服务名: 根进程 pid}:本 WebUI 启动的子进程优先,其次是共享 owner 记录里仍存活的 pid。"""
+    roots = {}
+    try:
+        from .utils import service_pids, service_processes
+        from .service_controller import MANAGED_SERVICES, _read_service_owner, _pid_is_running
     except Exception:
+        return roots
+    for service in set(MANAGED_SERVICES) | set(service_pids) | set(service_processes):
+        proc = service_processes.get(service)
+        if proc is not None and proc.poll() is None:
+            roots[service] = proc.pid
+            continue
+        try:
+            owner = _read_service_owner(service)
+        except Exception:
+            owner = None
+        owner_pid = owner.get('service_pid') if isinstance(owner, dict) else None
+        if isinstance(owner_pid, int) and not isinstance(owner_pid, bool) and _pid_is_running(owner_pid):
+            roots[service] = owner_pid
+    return roots
+
+
+def _descendants(root, children):
+    """root 及其全部子孙 pid。"""
+    seen = []
+    stack = [root]
+    while stack:
+        pid = stack.pop()
+        if pid in seen:
+            continue
+        seen.append(pid)
+        stack.extend(children.get(pid, ()))
+    return seen
+
+
+def _cpu_percent(pid, cpu_time, now):
+    """按两次累计 CPU 时间差分;首次采样返回 None。"""
+    if cpu_time is None:
+        return None
+    last = _last_cpu.get(pid)
+    _last_cpu[pid] = (cpu_time, now)
+    if not last:
+        return None
+    dt = now - last[1]
+    if dt <= 0:
+        return None
+    cores = os.cpu_count() or 1
+    return min(100.0, max(0.0, (cpu_time - last[0]) / dt / cores * 100))
+
+
+def _sample_group(backend, table, pids, now):
+    """汇总一组 pid 的 CPU/RSS/线程;全部采样失败返回 None。"""
+    cpu = None
+    rss = 0
+    threads = 0
+    sampled = 0
+    for pid in pids:
+        entry = table.get(pid)
+        if entry is None:
+            continue
+        try:
+            s = backend.sample(pid, entry)
+        except Exception:
+            s = None
+        if not s:
+            continue
+        sampled += 1
+        pct = _cpu_percent(pid, s['cpu_time'], now)
+        if pct is not None:
+            cpu = (cpu or 0.0) + pct
+        rss += s['rss_bytes'] or 0
+        threads += s['threads'] or 0
+    if not sampled:
         return None
+    return {
+        'cpu_percent': round(min(100.0, cpu), 1) if cpu is not None else None,
+        'rss_mb': round(rss / (1024 * 1024), 1),
+        'threads': threads,
+        'processes': sampled,
+    }
+
+
+def sample_once(backend=None):
+    """采一个点:{'ts', 'backend', 'webui', 'live2d', 'services': {服务: {...}}}。"""
+    backend = backend or get_backend()
+    now = time.time()
+    point = {'ts': int(now * 1000), 'backend': backend.name}
+    table = backend.snapshot()
+
+    children = {}
+    for pid, entry in table.items():
+        children.setdefault(entry['ppid'], []).append(pid)
+
+    # WebUI 自身只算本进程,它启动的服务单独计
+    webui_pid = os.getpid()
+    table.setdefault(webui_pid, {'ppid': 0, 'threads': None})
+    point['webui'] = _sample_group(backend, table, [webui_pid], now)
+
+    services = {}
+    for service, root in _service_root_pids().items():
+        services[service] = _sample_group(backend, table, _descendants(root, children), now)
+    point['services'] = services
+    point['live2d'] = services.get('live2d')  # None = 桌宠未启动或采样失败
+
+    # 已退出进程的差分记录清掉
+    for pid in [pid for pid in _last_cpu if pid not in table]:
+        del _last_cpu[pid]
+    return point
+
+
+def _bucket_add(point):
+    """把采样点并入当前 1 分钟桶,跨分钟时封桶。"""
+    global _current_bucket
+    bucket_ts = point['ts'] // BUCKET_MS * BUCKET_MS
+    if _current_bucket is None or _current_bucket['ts'] != bucket_ts:
+        if _current_bucket is not None:
+            _buckets.append(_finish_bucket(_current_bucket))
+        _current_bucket = {'ts': bucket_ts, 'groups': {}}
+
+    groups = dict(point.get('services') or {})
+    groups['webui'] = point.get('webui')
+    for name, s in groups.items():
+        if not s:
+            continue
+        acc = _current_bucket['groups'].setdefault(
+            name, {'n': 0, 'cpu_sum': 0.0, 'cpu_n': 0, 'cpu_max': 0.0, 'rss_max': 0.0, 'threads_max': 0})
+        acc['n'] += 1
+        if s.get('cpu_percent') is not None:
+            acc['cpu_sum'] += s['cpu_percent']
+            acc['cpu_n'] += 1
+            acc['cpu_max'] = max(acc['cpu_max'], s['cpu_percent'])
+        acc['rss_max'] = max(acc['rss_max'], s.get('rss_mb') or 0)
+        acc['threads_max'] = max(acc['threads_max'], s.get('threads') or 0)
+
+
+def _finish_bucket(bucket):
+    groups = {}
+    for name, acc in bucket['groups'].items():
+        groups[name] = {
+            'cpu_avg': round(acc['cpu_sum'] / acc['cpu_n'], 1) if acc['cpu_n'] else None,
+            'cpu_max': round(acc['cpu_max'], 1) if acc['cpu_n'] else None,
+            'rss_max_mb': round(acc['rss_max'], 1),
+            'threads_max': acc['threads_max'],
+            'samples': acc['n'],
+        }
+    return {'ts': bucket['ts'], 'services': groups}
 
 
 def _sample_loop():
-    global _started
     while True:
         try:
-            point = {'ts': int(time.time() * 1000)}
-
-            # WebUI 自身
-            webui = _sample_pid(os.getpid())
-            if webui:
-                point['webui'] = webui
-
-            # Live2D 桌宠
-            live2d = None
-            try:
-                from .utils import service_pids
-                pid = service_pids.get('live2d')
-                if isinstance(pid, int) and pid > 0:
-                    live2d = _sample_pid(pid)
-            except Exception:
-                live2d = None
-            point['live2d'] = live2d  # None = 桌宠未启动或采样失败
-
+            point = sample_once()
             with _lock:
                 _buffer.append(point)
+                _bucket_add(point)
         except Exception:
             pass
         time.sleep(SAMPLE_INTERVAL_SEC)
 
 
 def start_sampler():
-    """启动后台采样线程(幂等)。"""
+    """启动后台采样线程(幂等);没有可用后端时不启动。"""
     global _started
     if _started:
         return
+    if get_backend() is None:
+        return
     _started = True
     t = threading.Thread(target=_sample_loop, daemon=True, name='process-metrics-sampler')
     t.start()
@@ -155,3 +388,14 @@ def get_series(limit=200):
     """环形缓冲的时间序列(供 CPU/内存折线图)。"""
     with _lock:
         return list(_buffer)[-limit:]
+
+
+def get_long_series(service=None):
+    """1 分钟降采样的 24 小时序列(含当前未封口的桶);指定 service 时只返回该服务。"""
+    with _lock:
+        buckets = list(_buckets)
+        if _current_bucket is not None:
+            buckets.append(_finish_bucket(_current_bucket))
+    if service is None:
+        return buckets
+    return [{'ts': b['ts'], **(b['services'].get(service) or {})} for b in buckets]
@@ -1,7 +1,8 @@
 /* ============================================================
    My Neuro WebUI — 总览区与日志图表(overview.js)
-   独立模块:不依赖、不修改 app.js;轮询 /api/overview 与
-   /api/system/metrics,渲染总览横幅/管道/动态/插件与三块图表。
+   独立模块:不依赖、不修改 app.js;订阅 /api/telemetry/stream(SSE,
+   断开时退回轮询 /api/overview)并轮询 /api/system/metrics,
+   渲染总览横幅/管道/动态/插件与三块图表。
    只在服务控制页可见时轮询;颜色读 CSS 变量,随主题切换刷新。
    ============================================================ */
 (function () {
@@ -331,32 +332,87 @@
         chart.update('none');
     }
 
-    // ---------- 轮询 ----------
+    // ---------- 推送 / 轮询 ----------
 
     var lastData = null;
-    function tick() {
-        if (!isDashboardActive()) return;
+    var source = null;
+
+    function renderOverview(data) {
         var c = themeColors();
-        fetch('/api/overview').then(function (r) { return r.json(); }).then(function (data) {
-            if (!data || !data.ok) return;
-            lastData = data;
-            renderBanner(data);
-            renderStats(data);
-            renderPipeline(data.pipeline_stage);
-            renderEvents(data.recent_events);
-            renderPlugins(data.plugins);
-            renderLLMChart(data.llm_runs, c);
-            renderErrorsChart(data.error_series, c);
-        }).catch(function () { /* 网络错误静默,下轮再试 */ });
+        renderBanner(data);
+        renderStats(data);
+        renderPipeline(data.pipeline_stage);
+        renderEvents(data.recent_events);
+        renderPlugins(data.plugins);
+        renderLLMChart(data.llm_runs, c);
+        renderErrorsChart(data.error_series, c);
+    }
 
+    // 把 SSE 增量并进 lastData:动态取最新 12 条,LLM 序列保留 40 点,错误桶按 ts 覆盖
+    function mergeDelta(delta) {
+        var data = lastData;
+        data.recent_events = delta.events.slice().reverse().concat(data.recent_events || []).slice(0, 12);
+        data.llm_runs = (data.llm_runs || []).concat(delta.llm_runs).slice(-40);
+        var buckets = {};
+        (data.error_series || []).concat(delta.error_series).forEach(function (b) { buckets[b.ts] = b; });
+        data.error_series = Object.keys(buckets).sort(function (a, b) { return a - b; }).map(function (k) { return buckets[k]; });
+        data.pipeline_stage = delta.pipeline_stage;
+        data.event_count = delta.event_count;
+        data.seq = delta.seq;
+    }
+
+    function fetchMetrics() {
         fetch('/api/system/metrics').then(function (r) { return r.json(); }).then(function (data) {
             if (!data || !data.ok) return;
             renderResourcesChart(data.series, themeColors());
         }).catch(function () { /* 静默 */ });
     }
 
+    function tick() {
+        if (!isDashboardActive()) return;
+        if (source) {
+            // 推送已连上:只用缓存数据刷新"x 秒前"等相对时间
+            if (lastData) renderOverview(lastData);
+        } else {
+            fetch('/api/overview').then(function (r) { return r.json(); }).then(function (data) {
+                if (!data || !data.ok) return;
+                lastData = data;
+                renderOverview(data);
+            }).catch(function () { /* 网络错误静默,下轮再试 */ });
+        }
+        fetchMetrics();
+    }
+
+    // SSE:snapshot 整体替换,delta/status 增量合并;页面不可见时只更新数据不渲染
+    function connect() {
+        if (!window.EventSource || source) return;
+        source = new EventSource('/api/telemetry/stream');
+        source.addEventListener('snapshot', function (e) {
+            lastData = JSON.parse(e.data);
+            if (isDashboardActive()) renderOverview(lastData);
+        });
+        source.addEventListener('delta', function (e) {
+            if (!lastData) return;
+            mergeDelta(JSON.parse(e.data));
+            if (isDashboardActive()) renderOverview(lastData);
+        });
+        source.addEventListener('status', function (e) {
+            if (!lastData) return;
+            var status = JSON.parse(e.data);
+            Object.keys(status).forEach(function (k) { lastData[k] = status[k]; });
+            if (isDashboardActive()) renderOverview(lastData);
+        });
+        source.onerror = function () {
+            // 连接断开:退回轮询,稍后重连
+            source.close();
+            source = null;
+            setTimeout(connect, POLL_MS * 5);
+        };
+    }
+
     function start() {
         if (timer) return;
+        connect();
         tick();
         timer = setInterval(tick, POLL_MS);
     }
@@ -364,7 +420,9 @@
     // 主题切换后刷新图表配色
     function watchTheme() {
         new MutationObserver(function () {
-            if (charts.llm || charts.errors || charts.resources) tick();
+            if (!(charts.llm || charts.errors || charts.resources)) return;
+            if (lastData && isDashboardActive()) renderOverview(lastData);
+            tick();
         }).observe(document.documentElement, { attributes: true, attributeFilter: ['data-theme'] });
     }
 
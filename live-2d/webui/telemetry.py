@@ -4,101 +4,259 @@
 遥测聚合 API(蓝图)。
 读取 Electron 侧落盘的 .runtime/telemetry.jsonl,聚合出总览所需的
 运行状态、最近动态、LLM 耗时/token 序列、错误分桶,并合并进程采样。
-只读尾读,不整文件入内存;文件不存在时返回空聚合,不报错。
+后台线程按字节偏移跟读文件,只解析新增行,增量维护环形缓冲和滚动聚合;
+总览既可轮询 /api/overview,也可订阅 /api/telemetry/stream(SSE)接收增量。
+文件不存在时返回空聚合,不报错。
 """
 
 import json
 import os
 import time
 import datetime
-from flask import Blueprint, jsonify, request
+import threading
+from collections import deque
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 
 from .utils import PROJECT_ROOT, WEBUI_VERSION, logger
-from .log_monitor import _read_last_lines
+from .log_monitor import _read_last_lines, _read_lines_from_offset, _runtime_cursor
 from . import process_metrics
 
 telemetry_bp = Blueprint('telemetry', __name__)
 
 TELEMETRY_FILE = os.path.join(PROJECT_ROOT, '.runtime', 'telemetry.jsonl')
 
-# 聚合只读最近 1500 条或 24 小时,取更严
+# 聚合只保留最近 1500 条或 24 小时,取更严
 MAX_EVENTS = 1500
 MAX_AGE_MS = 24 * 3600 * 1000
 
 # 错误趋势分桶宽度(5 分钟)
 ERROR_BUCKET_MS = 5 * 60 * 1000
 
+# LLM 耗时序列长度、最近动态条数
+LLM_RUNS_MAXLEN = 40
+RECENT_EVENTS = 12
+
+# 跟读间隔;SSE 心跳与服务/插件/进程状态推送间隔
+TAIL_INTERVAL_SEC = 0.5
+STREAM_STATUS_SEC = 2.0
+STREAM_HEARTBEAT_SEC = 15.0
+
 _service_controller_imports_done = False
 
 
-def _read_events():
-    """尾读 JSONL,返回最近且未过期的事件列表(按时间升序)。文件缺失/坏行跳过。"""
-    if not os.path.exists(TELEMETRY_FILE):
-        return []
+def _parse_line(line):
+    """解析一行 JSONL,坏行/缺 ts 返回 None。"""
+    line = line.strip()
+    if not line:
+        return None
     try:
-        lines = _read_last_lines(TELEMETRY_FILE, MAX_EVENTS * 2)  # 多读一些,坏行过滤后够用
-    except Exception as e:
-        logger.warning(f'读取遥测文件失败: {e}')
-        return []
-
-    now_ms = int(time.time() * 1000)
-    events = []
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            ev = json.loads(line)
-        except Exception:
-            continue  # 坏行跳过
-        if not isinstance(ev, dict) or 'ts' not in ev:
-            continue
-        if now_ms - ev['ts'] > MAX_AGE_MS:
-            continue
-        events.append(ev)
-    return events[-MAX_EVENTS:]
+        ev = json.loads(line)
+    except Exception:
+        return None
+    if not isinstance(ev, dict) or 'ts' not in ev:
+        return None
+    return ev
+
 
+def _llm_run(ev):
+    """llm.complete 事件 -> 耗时/token 点;其他事件返回 None。"""
+    if ev.get('type') != 'llm.complete' or not isinstance(ev.get('metrics'), dict):
+        return None
+    m = ev['metrics']
+    run = {'ts': ev['ts'], 'duration_ms': m.get('duration_ms')}
+    if 'input_tokens' in m:
+        run['input_tokens'] = m['input_tokens']
+    if 'output_tokens' in m:
+        run['output_tokens'] = m['output_tokens']
+    return run
 
-def _aggregate(events):
-    """把事件聚合成总览结构。"""
-    recent = events[-12:][::-1]  # 最近 12 条,新的在前
 
-    # 当前管道阶段:最近一条带 pipeline_stage 的事件
-    pipeline_stage = 'idle'
-    for ev in reversed(events):
+class TelemetryTailer:
+    """
+    按字节偏移跟读 telemetry.jsonl。
+    文件被轮转/截断(cursor 变化或变短)时重新尾读一次;其余时候只读新增的整行。
+    每条事件分配递增 seq,SSE 连接据此取增量。
+    """
+
+    def __init__(self, path=TELEMETRY_FILE):
+        self.path = path
+        self.offset = 0
+        self.cursor = None
+        self.seq = 0
+        self.reset_seq = 0  # 最近一次重置时的 seq,早于它的增量不可续接
+        self.events = deque(maxlen=MAX_EVENTS)        # (seq, ev)
+        self.llm_runs = deque(maxlen=LLM_RUNS_MAXLEN)  # (seq, run)
+        self.error_buckets = {}                        # bucket_ts -> {'ts','warn','error','seq'}
+        self.pipeline_stage = 'idle'
+        self.parsed_lines = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self._thread = None
+
+    # ---------- 增量维护 ----------
+
+    def _reset(self):
+        self.events.clear()
+        self.llm_runs.clear()
+        self.error_buckets.clear()
+        self.pipeline_stage = 'idle'
+        self.seq += 1
+        self.reset_seq = self.seq
+
+    def _ingest(self, ev):
+        self.seq += 1
+        self.events.append((self.seq, ev))
         if ev.get('pipeline_stage'):
-            pipeline_stage = ev['pipeline_stage']
-            break
-
-    # LLM 最近 40 次完成:耗时 + token
-    llm_runs = []
-    for ev in events:
-        if ev.get('type') == 'llm.complete' and isinstance(ev.get('metrics'), dict):
-            m = ev['metrics']
-            run = {'ts': ev['ts'], 'duration_ms': m.get('duration_ms')}
-            if 'input_tokens' in m:
-                run['input_tokens'] = m['input_tokens']
-            if 'output_tokens' in m:
-                run['output_tokens'] = m['output_tokens']
-            llm_runs.append(run)
-    llm_runs = llm_runs[-40:]
-
-    # 错误/警告按 5 分钟分桶
-    error_buckets = {}
-    for ev in events:
-        if ev.get('level') in ('warn', 'error'):
+            self.pipeline_stage = ev['pipeline_stage']
+        run = _llm_run(ev)
+        if run:
+            self.llm_runs.append((self.seq, run))
+        level = ev.get('level')
+        if level in ('warn', 'error'):
             b = ev['ts'] // ERROR_BUCKET_MS * ERROR_BUCKET_MS
-            error_buckets.setdefault(b, {'ts': b, 'warn': 0, 'error': 0})
-            error_buckets[b][ev['level']] += 1
-    error_series = [error_buckets[k] for k in sorted(error_buckets)]
+            bucket = self.error_buckets.setdefault(b, {'ts': b, 'warn': 0, 'error': 0})
+            bucket[level] += 1
+            bucket['seq'] = self.seq
+
+    def _prune(self, now_ms):
+        """丢弃超过 24 小时的事件与错误桶。"""
+        while self.events and now_ms - self.events[0][1]['ts'] > MAX_AGE_MS:
+            self.events.popleft()
+        while self.llm_runs and now_ms - self.llm_runs[0][1]['ts'] > MAX_AGE_MS:
+            self.llm_runs.popleft()
+        for b in [b for b in self.error_buckets if now_ms - b > MAX_AGE_MS]:
+            del self.error_buckets[b]
+
+    def poll(self):
+        """检查文件变化并解析新增行,返回本次新增事件数。"""
+        try:
+            stat_result = os.stat(self.path)
+        except OSError:
+            if self.cursor is not None:
+                with self.lock:
+                    self.cursor, self.offset = None, 0
+                    self._reset()
+                    self.changed.notify_all()
+            return 0
+
+        cursor = _runtime_cursor(stat_result)
+        reset = cursor != self.cursor or stat_result.st_size < self.offset
+        if not reset and stat_result.st_size == self.offset:
+            return 0
+
+        try:
+            if reset:
+                lines = _read_last_lines(self.path, MAX_EVENTS * 2)  # 多读一些,坏行过滤后够用
+                next_offset = stat_result.st_size
+                # 尾读可能带上未写完的最后半行,交给下次增量读取
+                if lines and not self._ends_with_newline(stat_result.st_size):
+                    next_offset -= len(lines[-1].encode('utf-8'))
+                    lines = lines[:-1]
+            else:
+                lines, next_offset = _read_lines_from_offset(self.path, self.offset, complete_only=True)
+        except Exception as e:
+            logger.warning(f'读取遥测文件失败: {e}')
+            return 0
+
+        parsed = [ev for ev in map(_parse_line, lines) if ev is not None]
+        now_ms = int(time.time() * 1000)
+        with self.lock:
+            if reset:
+                self._reset()
+                self.cursor = cursor
+            self.offset = next_offset
+            for ev in parsed:
+                self._ingest(ev)
+            self.parsed_lines += len(lines)
+            self._prune(now_ms)
+            if parsed or reset:
+                self.changed.notify_all()
+        return len(parsed)
+
+    def _ends_with_newline(self, size):
+        if size <= 0:
+            return True
+        with open(self.path, 'rb') as stream:
+            stream.seek(size - 1)
+            return stream.read(1) == b'\n'
+
+    # ---------- 读取 ----------
+
+    def snapshot(self):
+        """当前完整聚合(与旧版 _aggregate 输出一致),附带 seq。"""
+        now_ms = int(time.time() * 1000)
+        with self.lock:
+            self._prune(now_ms)
+            events = [ev for _, ev in self.events]
+            return {
+                'recent_events': events[-RECENT_EVENTS:][::-1],  # 新的在前
+                'pipeline_stage': self.pipeline_stage,
+                'llm_runs': [run for _, run in self.llm_runs],
+                'error_series': self._error_series(),
+                'event_count': len(events),
+                'seq': self.seq
+            }
+
+    def delta(self, since_seq):
+        """since_seq 之后的增量;若期间发生过重置或增量已被挤出缓冲,返回 None 要求整体刷新。"""
+        with self.lock:
+            evicted = self.events and self.events[0][0] > since_seq + 1
+            if since_seq < self.reset_seq or since_seq > self.seq or evicted:
+                return None
+            return {
+                'events': [ev for s, ev in self.events if s > since_seq],
+                'llm_runs': [run for s, run in self.llm_runs if s > since_seq],
+                'error_series': self._error_series(since_seq),
+                'pipeline_stage': self.pipeline_stage,
+                'event_count': len(self.events),
+                'seq': self.seq
+            }
+
+    def events_since(self, since_ts):
+        with self.lock:
+            return [ev for _, ev in self.events if ev['ts'] > since_ts]
+
+    def wait(self, since_seq, timeout):
+        """阻塞到 seq 前进或超时,返回当前 seq。"""
+        with self.changed:
+            if self.seq == since_seq:
+                self.changed.wait(timeout)
+            return self.seq
+
+    def _error_series(self, since_seq=None):
+        buckets = self.error_buckets
+        return [
+            {'ts': b['ts'], 'warn': b['warn'], 'error': b['error']}
+            for k, b in sorted(buckets.items())
+            if since_seq is None or b['seq'] > since_seq
+        ]
+
+    # ---------- 后台线程 ----------
+
+    def _loop(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f'遥测跟读失败: {e}')
+            time.sleep(TAIL_INTERVAL_SEC)
+
+    def start(self):
+        """启动后台跟读线程(幂等);启动前先同步读一次,首个请求即有数据。"""
+        with self.lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, daemon=True, name='telemetry-tailer')
+        self.poll()
+        self._thread.start()
+
+
+_tailer = TelemetryTailer()
 
-    return {
-        'recent_events': recent,
-        'pipeline_stage': pipeline_stage,
-        'llm_runs': llm_runs,
-        'error_series': error_series,
-        'event_count': len(events)
-    }
+
+def start_tailer():
+    """启动遥测跟读线程(幂等)。"""
+    _tailer.start()
 
 
 def _get_services_status():
@@ -116,9 +274,36 @@ def _get_services_status():
         return {}
 
 
+# 插件摘要缓存:键为插件目录/各插件子目录/enabled_plugins.json 的 mtime 指纹
+_plugins_cache = {'key': None, 'summary': None}
+_plugins_cache_lock = threading.Lock()
+
+
+def _plugins_fingerprint():
+    plugins_base = PROJECT_ROOT / 'plugins'
+    parts = []
+    for path in [plugins_base / 'enabled_plugins.json'] + [plugins_base / c for c in ('built-in', 'community')]:
+        try:
+            parts.append((path.name, path.stat().st_mtime_ns))
+        except OSError:
+            parts.append((path.name, None))
+            continue
+        if path.is_dir():
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        parts.append((entry.name, entry.stat().st_mtime_ns))
+    return tuple(parts)
+
+
 def _scan_plugins_summary():
-    """复用 plugin_manager 的扫描与启用清单,返回全部插件(含启用状态)+ 统计。"""
+    """复用 plugin_manager 的扫描与启用清单,返回全部插件(含启用状态)+ 统计;目录未变时走缓存。"""
     try:
+        key = _plugins_fingerprint()
+        with _plugins_cache_lock:
+            if _plugins_cache['key'] == key:
+                return _plugins_cache['summary']
+
         from .plugin_manager import scan_plugins_directory, load_enabled_plugins
         enabled_paths = set(load_enabled_plugins())
         plugins = scan_plugins_directory()
@@ -133,18 +318,18 @@ def _scan_plugins_summary():
                 'name': p.get('display_name') or p.get('name') or path,
                 'enabled': enabled
             })
-        return {'all_plugins': all_plugins, 'total': len(all_plugins), 'enabled_count': enabled_count}
+        summary = {'all_plugins': all_plugins, 'total': len(all_plugins), 'enabled_count': enabled_count}
+        with _plugins_cache_lock:
+            _plugins_cache['key'] = key
+            _plugins_cache['summary'] = summary
+        return summary
     except Exception as e:
         logger.warning(f'获取插件摘要失败: {e}')
         return {'all_plugins': [], 'total': 0, 'enabled_count': 0}
 
 
-@telemetry_bp.route('/api/overview')
-def api_overview():
-    """一次请求给齐总览所需全部数据。"""
-    events = _read_events()
-    agg = _aggregate(events)
-    metrics = process_metrics.get_latest()
+def _status_payload():
+    """服务/插件/进程采样/运行时间,变化频率低于遥测事件,SSE 里单独推送。"""
     # 运行时间:main_app 模块级 START_TIME(延迟导入避免循环依赖)
     uptime_seconds = None
     try:
@@ -152,26 +337,92 @@ def api_overview():
         uptime_seconds = int((datetime.datetime.now() - main_app.START_TIME).total_seconds())
     except Exception:
         pass
-    return jsonify({
-        'ok': True,
-        'version': WEBUI_VERSION,
+    return {
         'uptime_seconds': uptime_seconds,
         'services': _get_services_status(),
         'plugins': _scan_plugins_summary(),
-        'metrics': metrics,
-        **agg
+        'metrics': process_metrics.get_latest()
+    }
+
+
+@telemetry_bp.route('/api/overview')
+def api_overview():
+    """一次请求给齐总览所需全部数据。"""
+    start_tailer()
+    return jsonify({
+        'ok': True,
+        'version': WEBUI_VERSION,
+        **_status_payload(),
+        **_tailer.snapshot()
     })
 
 
 @telemetry_bp.route('/api/telemetry')
 def api_telemetry():
     """增量动态:since_ts 之后的事件。"""
+    start_tailer()
     since = request.args.get('since_ts', type=int) or 0
-    events = [e for e in _read_events() if e['ts'] > since]
-    return jsonify({'ok': True, 'events': events, 'now': int(time.time() * 1000)})
+    return jsonify({'ok': True, 'events': _tailer.events_since(since), 'now': int(time.time() * 1000)})
+
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+@telemetry_bp.route('/api/telemetry/stream')
+def api_telemetry_stream():
+    """
+    SSE 推送:连接后先发 snapshot(同 /api/overview),之后
+    遥测有新事件发 delta,服务/插件/进程状态变化发 status,空闲时发心跳注释。
+    """
+    start_tailer()
+
+    def generate():
+        seq = _tailer.seq
+        yield _sse('snapshot', {'ok': True, 'version': WEBUI_VERSION, **_status_payload(), **_tailer.snapshot()})
+        last_status = None
+        last_status_at = 0.0
+        last_send_at = time.time()
+        while True:
+            current = _tailer.wait(seq, STREAM_STATUS_SEC)
+            if current != seq:
+                delta = _tailer.delta(seq)
+                if delta is None:
+                    snap = _tailer.snapshot()
+                    yield _sse('snapshot', {'ok': True, 'version': WEBUI_VERSION, **_status_payload(), **snap})
+                    seq = snap['seq']
+                else:
+                    yield _sse('delta', delta)
+                    seq = delta['seq']
+                last_send_at = time.time()
+
+            now = time.time()
+            if now - last_status_at >= STREAM_STATUS_SEC:
+                last_status_at = now
+                status = _status_payload()
+                # 运行时间每次都变,比较时排除
+                comparable = json.dumps({k: v for k, v in status.items() if k != 'uptime_seconds'},
+                                        sort_keys=True, default=str)
+                if comparable != last_status:
+                    last_status = comparable
+                    yield _sse('status', status)
+                    last_send_at = now
+
+            if now - last_send_at >= STREAM_HEARTBEAT_SEC:
+                yield ': ping\n\n'
+                last_send_at = now
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 
 @telemetry_bp.route('/api/system/metrics')
 def api_system_metrics():
-    """CPU/内存环形缓冲序列(供折线图)。"""
+    """CPU/内存环形缓冲序列(供折线图);range=24h 时返回 1 分钟降采样的长周期序列,可用 service 过滤。"""
+    if request.args.get('range') == '24h':
+        service = request.args.get('service') or None
+        return jsonify({'ok': True, 'series': process_metrics.get_long_series(service),
+                        'bucket_ms': process_metrics.BUCKET_MS})
     return jsonify({'ok': True, 'series': process_metrics.get_series()})
@@ -15,6 +15,10 @@ PROJECT_ROOT = Path(__file__).parent.parent.absolute()
 # 数据根目录（my-neuro-main/），AI记录室等持久化数据可放置于此
 DATA_ROOT = PROJECT_ROOT.parent
 
+# live-2d/ 下的共享模块（如 asset_catalog）需可直接导入，不依赖启动时的工作目录
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
 # WebUI 版本
 WEBUI_VERSION = 'v2.5'
 
@@ -9,8 +9,13 @@ import os
 import re
 import asyncio
 from datetime import datetime
+import sys
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+
+_MEMOS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _MEMOS_ROOT not in sys.path:
+    sys.path.insert(0, _MEMOS_ROOT)
+from storage.matrix_store import MatrixMemoryStore
 
 
 class EmbeddingModel:
@@ -67,7 +72,9 @@ app.add_middleware(
 
 # 全局变量
 embedding_model = None
-memory_store = []  # 简单的内存存储
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+# 归一化 float32 矩阵 + 追加日志（memory_store.json 为压实后的快照）
+memory_store = MatrixMemoryStore(os.path.join(DATA_DIR, "memory_store.json"))
 USER_ID = "feiniu_default"
 llm_config = None  # LLM 配置（用于记忆加工）
 full_config = None  # 完整配置（包含备用模型等）
@@ -105,7 +112,7 @@ class MigrateRequest(BaseModel):
 # 初始化
 @app.on_event("startup")
 async def startup_event():
-    global embedding_model, memory_store, llm_config, full_config
+    global embedding_model, llm_config, full_config
     
     print("🚀 启动 MemOS 服务（简化版）...")
     
@@ -134,10 +141,9 @@ async def startup_event():
             print("   记忆加工功能将不可用")
         
         # 加载 Embedding 模型
-        data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-        os.makedirs(data_dir, exist_ok=True)
-        memory_file = os.path.join(data_dir, "memory_store.json")
-        marker_file = os.path.join(data_dir, "embedding_marker.json")
+        os.makedirs(DATA_DIR, exist_ok=True)
+        memory_file = memory_store.snapshot_path
+        marker_file = os.path.join(DATA_DIR, "embedding_marker.json")
 
         emb_cfg = (full_config or {}).get('embedding', {})
         use_api = emb_cfg.get('use_api', False)
@@ -181,22 +187,23 @@ async def startup_event():
         if old_marker and old_marker != new_marker:
             print(f"⚠️ Embedding 模型已更换 ({old_marker} → {new_marker})")
             print("🗑️ 清空旧记忆（向量空间不兼容，将重新积累）...")
-            if os.path.exists(memory_file):
-                import shutil
-                backup = memory_file + f".model_change_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                shutil.copy(memory_file, backup)
-                print(f"📦 已备份旧记忆到: {backup}")
-                os.remove(memory_file)
+            import shutil
+            suffix = f".model_change_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            for path in memory_store.files():
+                if os.path.exists(path):
+                    shutil.copy(path, path + suffix)
+                    print(f"📦 已备份旧记忆到: {path + suffix}")
+                    os.remove(path)
         with open(marker_file, 'w', encoding='utf-8') as f:
             json.dump({'marker': new_marker, 'updated_at': datetime.now().isoformat()}, f)
 
-        # 加载已存在的记忆（如果有）
-        
+        # 加载已存在的记忆快照（如果有），再重放追加日志
+        snapshot = []
         if os.path.exists(memory_file):
             try:
                 with open(memory_file, 'r', encoding='utf-8') as f:
-                    memory_store = json.load(f)
-                print(f"✅ 加载了 {len(memory_store)} 条历史记忆")
+                    snapshot = json.load(f)
+                print(f"✅ 加载了 {len(snapshot)} 条历史记忆")
             except json.JSONDecodeError as e:
                 print(f"⚠️ 记忆文件损坏: {e}")
                 print("🔧 尝试修复...")
@@ -235,7 +242,7 @@ async def startup_event():
                     if last_valid > 0:
                         # 截断到最后一个有效位置并添加结尾
                         fixed_content = content[:last_valid] + "\n]"
-                        memory_store = json.loads(fixed_content)
+                        snapshot = json.loads(fixed_content)
                         
                         # 备份损坏文件
                         backup_file = memory_file + f".broken_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -245,9 +252,9 @@ async def startup_event():
                         
                         # 保存修复后的文件
                         with open(memory_file, 'w', encoding='utf-8') as f:
-                            json.dump(memory_store, f, ensure_ascii=False, indent=2)
+                            json.dump(snapshot, f, ensure_ascii=False, indent=2)
                         
-                        print(f"✅ 修复成功！恢复了 {len(memory_store)} 条记忆")
+                        print(f"✅ 修复成功！恢复了 {len(snapshot)} 条记忆")
                     else:
                         raise ValueError("无法找到有效的记忆数据")
                         
@@ -259,9 +266,14 @@ async def startup_event():
                     shutil.copy(memory_file, backup_file)
                     print(f"📦 已备份损坏文件到: {backup_file}")
                     print("ℹ️ 创建新的记忆存储")
-                    memory_store = []
+                    snapshot = []
         else:
             print("ℹ️ 创建新的记忆存储")
+
+        memory_store.load(snapshot)
+        if memory_store.log_ops:
+            print(f"✅ 重放了 {memory_store.log_ops} 条记忆日志，共 {len(memory_store)} 条记忆")
+            memory_store.compact()
         
         print("✅ MemOS 服务启动成功!")
         print(f"📍 向量存储路径: ./memos_system/data")
@@ -275,6 +287,13 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """退出前把追加日志压实进快照"""
+    if memory_store.log_ops:
+        memory_store.compact()
+
+
 async def process_memory_with_llm(content: str, role: str = "user") -> dict:
     """使用 LLM 加工记忆：提取关键信息并结构化，同时判断重要度
     
@@ -633,8 +652,6 @@ async def add_memory(request: AddMemoryRequest):
     2. 只调用一次 LLM 从中提取关键记忆
     3. 支持提取多条记忆（用分号分隔）
     """
-    global memory_store
-    
     if not embedding_model:
         raise HTTPException(status_code=500, detail="Embedding 模型未加载")
     
@@ -680,7 +697,7 @@ async def add_memory(request: AddMemoryRequest):
                 continue
             
             # 生成 embedding
-            embedding = embedding_model.encode([content])[0].tolist()
+            embedding = embedding_model.encode([content])[0]
             
             # 去重：检查是否有相似记忆
             similar = find_similar_memory(embedding, threshold=0.95)
@@ -698,12 +715,11 @@ async def add_memory(request: AddMemoryRequest):
                         "id": f"mem_{len(memory_store)}_{datetime.now().timestamp()}",
                         "content": content,
                         "timestamp": datetime.now().isoformat(),
-                        "embedding": embedding,
                         "importance": importance,
                         "processed": True,
                         "merge_count": 0
                     }
-                    memory_store.append(memory)
+                    memory_store.add(memory, embedding)
                     added_count += 1
             else:
                 # 没有相似记忆，添加新记忆
@@ -711,18 +727,14 @@ async def add_memory(request: AddMemoryRequest):
                     "id": f"mem_{len(memory_store)}_{datetime.now().timestamp()}",
                     "content": content,
                     "timestamp": datetime.now().isoformat(),
-                    "embedding": embedding,
                     "importance": importance,
                     "processed": True,
                     "merge_count": 0
                 }
-                memory_store.append(memory)
+                memory_store.add(memory, embedding)
                 added_count += 1
                 print(f"✅ 新增记忆: {content[:50]}... (重要度: {importance})")
         
-        # 保存到文件
-        save_memory_store()
-        
         # 构建返回消息
         result_parts = []
         if added_count > 0:
@@ -750,8 +762,6 @@ async def add_memory(request: AddMemoryRequest):
 @app.post("/add_raw")
 async def add_memory_raw(request: AddRawMemoryRequest):
     """直接添加记忆（不经过 LLM 加工）"""
-    global memory_store
-    
     if not embedding_model:
         raise HTTPException(status_code=500, detail="Embedding 模型未加载")
     
@@ -764,7 +774,7 @@ async def add_memory_raw(request: AddRawMemoryRequest):
             
             if content and len(content) > 5:
                 # 直接使用原内容，不加工
-                embedding = embedding_model.encode([content])[0].tolist()
+                embedding = embedding_model.encode([content])[0]
                 
                 # 检查去重
                 similar = find_similar_memory(embedding, threshold=0.95)
@@ -781,18 +791,15 @@ async def add_memory_raw(request: AddRawMemoryRequest):
                     "role": msg.role or 'user',
                     "timestamp": datetime.now().isoformat(),
                     "created_at": datetime.now().isoformat(),
-                    "embedding": embedding,
                     "importance": importance,
                     "processed": False,  # 标记未加工
                     "merge_count": 0
                 }
                 
-                memory_store.append(memory)
+                memory_store.add(memory, embedding)
                 added_count += 1
                 print(f"✅ 直接添加记忆: {content[:50]}...")
         
-        save_memory_store()
-        
         return {
             "status": "success",
             "message": f"直接添加 {added_count} 条记忆",
@@ -805,33 +812,27 @@ async def add_memory_raw(request: AddRawMemoryRequest):
 @app.put("/update/{memory_id}")
 async def update_memory(memory_id: str, content: str, importance: Optional[float] = None):
     """更新记忆内容"""
-    global memory_store
-    
     if not embedding_model:
         raise HTTPException(status_code=500, detail="Embedding 模型未加载")
     
     try:
         # 查找记忆
-        mem = next((m for m in memory_store if m['id'] == memory_id), None)
-        
-        if not mem:
+        if memory_id not in memory_store:
             raise HTTPException(status_code=404, detail=f"记忆 {memory_id} 不存在")
         
         # 更新内容
-        mem['content'] = content
-        mem['timestamp'] = datetime.now().isoformat()
-        
+        fields = {'content': content, 'timestamp': datetime.now().isoformat()}
         if importance is not None:
-            mem['importance'] = importance
+            fields['importance'] = importance
         
         # 重新生成 embedding
-        mem['embedding'] = embedding_model.encode([content])[0].tolist()
-        
-        save_memory_store()
+        memory_store.update(memory_id, fields, embedding_model.encode([content])[0])
         
         print(f"✅ 记忆已更新: {memory_id}")
         
         return {"status": "success", "message": "记忆已更新"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"更新失败: {str(e)}")
 
@@ -839,8 +840,6 @@ async def update_memory(memory_id: str, content: str, importance: Optional[float
 @app.post("/search")
 async def search_memory(request: SearchMemoryRequest):
     """搜索相关记忆（综合考虑相似度和重要度）"""
-    global memory_store
-    
     if not embedding_model:
         raise HTTPException(status_code=500, detail="Embedding 模型未加载")
     
@@ -857,32 +856,17 @@ async def search_memory(request: SearchMemoryRequest):
         # 0.5 = 重要度影响较大
         IMPORTANCE_WEIGHT = 0.3
         
-        # 计算相似度和综合得分
-        scored_memories = []
-        for mem in memory_store:
-            mem_embedding = np.array(mem['embedding'])
-            similarity = float(cosine_similarity([query_embedding], [mem_embedding])[0][0])
-            importance = mem.get('importance', 0.5)
-            
-            # 🔥 综合得分 = 相似度 * (1 + 重要度 * 加权因子)
-            # 例如：相似度0.8，重要度0.9 → 0.8 * (1 + 0.9 * 0.3) = 0.8 * 1.27 = 1.016
-            # 例如：相似度0.8，重要度0.3 → 0.8 * (1 + 0.3 * 0.3) = 0.8 * 1.09 = 0.872
-            final_score = similarity * (1 + importance * IMPORTANCE_WEIGHT)
-            
-            scored_memories.append((mem, similarity, final_score))
-        
-        # 🔥 按综合得分排序（不是纯相似度）
-        scored_memories.sort(key=lambda x: x[2], reverse=True)
-        
-        # 🔥 应用相似度阈值过滤
+        # 🔥 综合得分 = 相似度 * (1 + 重要度 * 加权因子)
+        # 例如：相似度0.8，重要度0.9 → 0.8 * (1 + 0.9 * 0.3) = 0.8 * 1.27 = 1.016
+        # 例如：相似度0.8，重要度0.3 → 0.8 * (1 + 0.3 * 0.3) = 0.8 * 1.09 = 0.872
+        # 一次矩阵-向量乘法算出全部相似度，按综合得分取 top_k（不是纯相似度），低于阈值的不返回
         threshold = request.similarity_threshold or 0.5
-        filtered_memories = [(mem, sim, score) for mem, sim, score in scored_memories if sim >= threshold]
-        
-        # 取 top_k
-        top_memories = filtered_memories[:request.top_k]
+        top_memories, above_count = memory_store.top_k(
+            query_embedding, request.top_k, threshold=threshold, importance_weight=IMPORTANCE_WEIGHT
+        )
         
         # 🔥 调试日志
-        print(f"🔍 搜索 '{request.query[:30]}...': 总共 {len(memory_store)} 条，高于阈值 {threshold} 的有 {len(filtered_memories)} 条，返回 {len(top_memories)} 条")
+        print(f"🔍 搜索 '{request.query[:30]}...': 总共 {len(memory_store)} 条，高于阈值 {threshold} 的有 {above_count} 条，返回 {len(top_memories)} 条")
         
         # 格式化返回
         results = [
@@ -911,11 +895,9 @@ async def search_memory(request: SearchMemoryRequest):
 @app.get("/list")
 async def list_memories(user_id: Optional[str] = USER_ID, limit: int = 100):
     """列出所有记忆"""
-    global memory_store
-    
     try:
-        # 返回最近的记忆
-        recent_memories = memory_store[-limit:] if len(memory_store) > limit else memory_store
+        # 返回最近的记忆（最新的在前）
+        recent_memories = memory_store.recent(limit)
         
         results = [
             {
@@ -928,7 +910,7 @@ async def list_memories(user_id: Optional[str] = USER_ID, limit: int = 100):
                 "importance": mem.get('importance', 0.5),
                 "merge_count": mem.get('merge_count', 0)  # 显示合并次数
             }
-            for mem in reversed(recent_memories)  # 最新的在前
+            for mem in recent_memories
         ]
         
         return {
@@ -943,21 +925,16 @@ async def list_memories(user_id: Optional[str] = USER_ID, limit: int = 100):
 @app.get("/check_similarity")
 async def check_similarity(id1: str, id2: str):
     """检查两条记忆的相似度"""
-    global memory_store
-    
     try:
-        mem1 = next((m for m in memory_store if m['id'] == id1), None)
-        mem2 = next((m for m in memory_store if m['id'] == id2), None)
+        mem1 = memory_store.get(id1)
+        mem2 = memory_store.get(id2)
         
         if not mem1:
             raise HTTPException(status_code=404, detail=f"记忆 {id1} 不存在")
         if not mem2:
             raise HTTPException(status_code=404, detail=f"记忆 {id2} 不存在")
         
-        emb1 = np.array(mem1['embedding'])
-        emb2 = np.array(mem2['embedding'])
-        
-        similarity = float(cosine_similarity([emb1], [emb2])[0][0])
+        similarity = memory_store.similarity(id1, id2)
         
         return {
             "memory_1": {"id": id1, "content": mem1['content'][:100]},
@@ -979,44 +956,23 @@ async def check_similarity(id1: str, id2: str):
 @app.delete("/delete/{memory_id}")
 async def delete_memory(memory_id: str, user_id: Optional[str] = USER_ID):
     """删除指定记忆"""
-    global memory_store
-    
     try:
-        # 查找并删除
-        original_length = len(memory_store)
-        memory_store = [mem for mem in memory_store if mem['id'] != memory_id]
-        
-        if len(memory_store) < original_length:
-            save_memory_store()
+        # 按 id 定位，末行换入被删位置
+        if memory_store.delete([memory_id]):
             return {"status": "success", "message": f"记忆 {memory_id} 已删除"}
         else:
             raise HTTPException(status_code=404, detail=f"记忆 {memory_id} 不存在")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"删除记忆失败: {str(e)}")
 
 
 def find_similar_memory(new_embedding, threshold=0.95):
     """查找相似的记忆（用于去重）"""
-    global memory_store
-    
-    if len(memory_store) == 0:
-        return None
-    
-    new_emb = np.array(new_embedding)
-    max_similarity = 0
-    most_similar_idx = -1
-    
-    for idx, mem in enumerate(memory_store):
-        mem_emb = np.array(mem['embedding'])
-        similarity = cosine_similarity([new_emb], [mem_emb])[0][0]
-        
-        if similarity > max_similarity:
-            max_similarity = similarity
-            most_similar_idx = idx
-    
-    if max_similarity >= threshold:
-        return most_similar_idx, memory_store[most_similar_idx], float(max_similarity)
-    
+    similar = memory_store.most_similar(new_embedding)
+    if similar and similar[2] >= threshold:
+        return similar
     return None
 
 
@@ -1079,21 +1035,22 @@ async def merge_memories(existing_mem, new_content, new_embedding):
                         result = await response.json()
                         merged = result['choices'][0]['message']['content'].strip()
                         
-                        # 🔥 保留最早的时间作为 created_at
-                        if 'created_at' not in existing_mem:
-                            existing_mem['created_at'] = existing_mem.get('timestamp', datetime.now().isoformat())
+                        # 等待 LLM 期间记忆可能已被删除
+                        current = memory_store.get(existing_mem['id'])
+                        if current is None:
+                            print("⚠️ 待合并的记忆已不存在")
+                            return False
                         
-                        # 更新记忆
-                        existing_mem['content'] = merged
-                        # 🔥 确保 embedding 是 list 类型（不是 numpy ndarray）
-                        if hasattr(new_embedding, 'tolist'):
-                            existing_mem['embedding'] = new_embedding.tolist()
-                        else:
-                            existing_mem['embedding'] = list(new_embedding) if new_embedding else []
-                        existing_mem['updated_at'] = datetime.now().isoformat()
-                        existing_mem['merge_count'] = existing_mem.get('merge_count', 0) + 1
+                        # 🔥 保留最早的时间作为 created_at
+                        fields = {
+                            'content': merged,
+                            'created_at': current.get('created_at') or current.get('timestamp', datetime.now().isoformat()),
+                            'updated_at': datetime.now().isoformat(),
+                            'merge_count': current.get('merge_count', 0) + 1
+                        }
+                        memory_store.update(existing_mem['id'], fields, new_embedding)
                         
-                        print(f"🔗 记忆已合并 (第 {existing_mem['merge_count']} 次): {merged[:50]}...")
+                        print(f"🔗 记忆已合并 (第 {fields['merge_count']} 次): {merged[:50]}...")
                         return True
                     else:
                         error_text = await response.text()
@@ -1116,52 +1073,9 @@ async def merge_memories(existing_mem, new_content, new_embedding):
     return False
 
 
-class NumpyEncoder(json.JSONEncoder):
-    """自定义 JSON 编码器，处理 numpy 类型"""
-    def default(self, obj):
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if isinstance(obj, (np.float32, np.float64)):
-            return float(obj)
-        if isinstance(obj, (np.int32, np.int64)):
-            return int(obj)
-        return super().default(obj)
-
-
-def save_memory_store():
-    """保存记忆到文件（原子写入，防止损坏）"""
-    try:
-        data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
-        os.makedirs(data_dir, exist_ok=True)
-        memory_file = os.path.join(data_dir, "memory_store.json")
-        temp_file = memory_file + ".tmp"
-        
-        # 🔥 先写入临时文件（使用自定义编码器处理 numpy 类型）
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(memory_store, f, ensure_ascii=False, indent=2, cls=NumpyEncoder)
-        
-        # 🔥 验证临时文件是否有效
-        with open(temp_file, 'r', encoding='utf-8') as f:
-            json.load(f)  # 尝试解析，确保 JSON 有效
-        
-        # 🔥 原子替换：删除旧文件，重命名临时文件
-        if os.path.exists(memory_file):
-            os.remove(memory_file)
-        os.rename(temp_file, memory_file)
-        
-    except Exception as e:
-        print(f"保存记忆失败: {e}")
-        # 清理临时文件
-        temp_file = os.path.join(os.path.dirname(__file__), "..", "data", "memory_store.json.tmp")
-        if os.path.exists(temp_file):
-            os.remove(temp_file)
-
-
 @app.post("/migrate")
 async def migrate_from_txt(request: MigrateRequest):
     """从旧记忆库.txt 文件导入记忆"""
-    global memory_store
-    
     if not embedding_model:
         raise HTTPException(status_code=500, detail="Embedding 模型未加载")
     
@@ -1195,7 +1109,7 @@ async def migrate_from_txt(request: MigrateRequest):
             section = section.strip()
             if section and len(section) > 10:
                 # 生成 embedding
-                embedding = embedding_model.encode([section])[0].tolist()
+                embedding = embedding_model.encode([section])[0]
                 
                 # 创建记忆对象
                 memory = {
@@ -1203,17 +1117,13 @@ async def migrate_from_txt(request: MigrateRequest):
                     "content": section,
                     "role": "user",
                     "timestamp": datetime.now().isoformat(),
-                    "embedding": embedding,
                     "importance": 0.7,
                     "source": "migrated"
                 }
                 
-                memory_store.append(memory)
+                memory_store.add(memory, embedding)
                 imported_count += 1
         
-        # 保存
-        save_memory_store()
-        
         print(f"✅ 成功导入 {imported_count} 条记忆")
         
         return {
@@ -1230,8 +1140,6 @@ async def migrate_from_txt(request: MigrateRequest):
 @app.post("/reprocess")
 async def reprocess_all_memories():
     """批量加工所有未处理的记忆"""
-    global memory_store
-    
     if not embedding_model or not llm_config:
         raise HTTPException(status_code=500, detail="模型未加载")
     
@@ -1241,7 +1149,8 @@ async def reprocess_all_memories():
         
         print("🔧 开始批量加工记忆...")
         
-        for i, mem in enumerate(memory_store):
+        pending = list(memory_store)
+        for i, mem in enumerate(pending):
             # 跳过已加工的记忆
             if mem.get('processed'):
                 continue
@@ -1252,7 +1161,7 @@ async def reprocess_all_memories():
             
             # 获取记忆的角色（默认为 user）
             mem_role = mem.get('role', 'user')
-            print(f"处理 {i+1}/{len(memory_store)} [{mem_role}]: {original_content[:50]}...")
+            print(f"处理 {i+1}/{len(pending)} [{mem_role}]: {original_content[:50]}...")
             
             try:
                 # 使用 LLM 加工（返回内容和重要度）
@@ -1260,31 +1169,26 @@ async def reprocess_all_memories():
                 processed_content = processed_result["content"]
                 importance = processed_result["importance"]
                 
-                # 更新记忆
-                mem['original_content'] = original_content
-                mem['content'] = processed_content
-                mem['importance'] = importance  # 更新重要度
-                mem['processed'] = True
-                
-                # 重新生成 embedding（使用加工后的内容）
-                new_embedding = embedding_model.encode([processed_content])[0].tolist()
-                mem['embedding'] = new_embedding
+                # 重新生成 embedding（使用加工后的内容），更新记忆和重要度
+                new_embedding = embedding_model.encode([processed_content])[0]
+                if not memory_store.update(mem['id'], {
+                    'original_content': original_content,
+                    'content': processed_content,
+                    'importance': importance,
+                    'processed': True
+                }, new_embedding):
+                    continue  # 加工期间已被删除
                 
                 processed_count += 1
                 print(f"  ✅ 重要度: {importance}")
                 
-                # 每处理 10 条保存一次
                 if processed_count % 10 == 0:
-                    save_memory_store()
                     print(f"  ✅ 已处理 {processed_count} 条")
                 
             except Exception as e:
                 print(f"  ❌ 处理失败: {e}")
                 failed_count += 1
         
-        # 最终保存
-        save_memory_store()
-        
         print(f"✅ 批量加工完成！成功: {processed_count}, 失败: {failed_count}")
         
         return {
@@ -1304,8 +1208,6 @@ async def deduplicate_all_memories(threshold: float = 0.90):
     参数:
         threshold: 相似度阈值，0.90 表示 90% 相似则合并
     """
-    global memory_store
-    
     if not embedding_model:
         raise HTTPException(status_code=500, detail="Embedding 模型未加载")
     
@@ -1324,24 +1226,27 @@ async def deduplicate_all_memories(threshold: float = 0.90):
         deleted_ids = set()
         merge_details = []  # 🔥 记录合并详情
         
-        # 双重循环检查所有记忆对
-        for i in range(len(memory_store)):
-            if memory_store[i]['id'] in deleted_ids:
+        # 按添加顺序取出 id 和向量快照：合并会改写矩阵，这里始终用去重开始时的向量比较
+        ids = [m['id'] for m in memory_store]
+        vectors = np.array([memory_store.vector(memory_id) for memory_id in ids], dtype=np.float32)
+        
+        # 每条记忆与其后所有记忆的相似度一次算出，只逐对处理超过阈值的
+        for i in range(len(ids)):
+            if ids[i] in deleted_ids:
                 continue
             
-            mem_i = memory_store[i]
-            emb_i = np.array(mem_i['embedding'])
-            original_content_i = mem_i['content']  # 保存原始内容
+            candidates = np.flatnonzero(vectors[i + 1:] @ vectors[i] >= threshold) + i + 1
             
-            for j in range(i + 1, len(memory_store)):
-                if memory_store[j]['id'] in deleted_ids:
+            for j in candidates:
+                if ids[j] in deleted_ids:
                     continue
                 
-                mem_j = memory_store[j]
-                emb_j = np.array(mem_j['embedding'])
-                
-                # 计算相似度
-                similarity = float(cosine_similarity([emb_i], [emb_j])[0][0])
+                mem_i = memory_store.get(ids[i])
+                mem_j = memory_store.get(ids[j])
+                if mem_i is None or mem_j is None:
+                    continue  # 合并期间被其他请求删除
+                emb_j = vectors[j]
+                similarity = float(vectors[i] @ vectors[j])
                 
                 if similarity >= threshold:
                     print(f"🔗 发现相似记忆 (相似度: {similarity:.2%})")
@@ -1361,6 +1266,7 @@ async def deduplicate_all_memories(threshold: float = 0.90):
                     print(f"   🤖 正在调用 LLM 合并...")
                     merge_success = await merge_memories(mem_i, mem_j['content'], emb_j)
                     print(f"   🤖 LLM 合并结果: {'成功' if merge_success else '失败'}")
+                    mem_i = memory_store.get(ids[i]) or mem_i
                     
                     # 🔥 记录合并详情
                     detail = {
@@ -1375,7 +1281,7 @@ async def deduplicate_all_memories(threshold: float = 0.90):
                     if merge_success:
                         # 保留更早的时间
                         if earlier_time:
-                            mem_i['created_at'] = earlier_time
+                            memory_store.update(ids[i], {'created_at': earlier_time})
                         # 标记 j 为删除
                         deleted_ids.add(mem_j['id'])
                         merged_count += 1
@@ -1387,8 +1293,7 @@ async def deduplicate_all_memories(threshold: float = 0.90):
         
         # 删除被标记的记忆
         if deleted_ids:
-            memory_store = [m for m in memory_store if m['id'] not in deleted_ids]
-            save_memory_store()
+            memory_store.delete(deleted_ids)
         
         print(f"✅ 去重完成！合并 {merged_count} 条记忆")
         
@@ -1408,8 +1313,6 @@ async def deduplicate_all_memories(threshold: float = 0.90):
 @app.get("/stats")
 async def get_statistics():
     """获取记忆统计信息"""
-    global memory_store
-    
     try:
         total_count = len(memory_store)
         
@@ -32,6 +32,7 @@ import uuid
 import logging
 import hashlib
 import math
+import time
 import shutil
 import subprocess
 from pathlib import Path
@@ -61,6 +62,8 @@ def _find_project_root() -> Path:
 
 PROJECT_ROOT = _find_project_root()
 MEMOS_SYSTEM_ROOT = Path(__file__).resolve().parents[1]
+# 各 Qdrant 集合由哪个 Embedding 模型写入，以及进行中的重嵌入迁移
+EMBEDDING_REGISTRY_PATH = MEMOS_SYSTEM_ROOT / 'data' / 'embedding_fingerprints.json'
 
 
 def _resolve_runtime_path(raw_path: str) -> str:
@@ -140,6 +143,30 @@ def _prepare_reranker_model(search_config: Dict[str, Any]) -> Optional[str]:
     return None
 
 
+def _load_embedding_model(model_path: str, backend: str = 'torch', device: str = 'auto'):
+    """通过 full-hub/embedding_backend.py 加载嵌入模型（torch / onnx / onnx-int8）。
+
+    找不到共享模块时（插件单独部署）退回直接使用 SentenceTransformer。
+    """
+    full_hub_dir = PROJECT_ROOT / 'full-hub'
+    if (full_hub_dir / 'embedding_backend.py').exists() and str(full_hub_dir) not in sys.path:
+        sys.path.insert(0, str(full_hub_dir))
+
+    try:
+        from embedding_backend import load_embedding_backend
+    except ImportError:
+        from sentence_transformers import SentenceTransformer
+        import torch
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        model = SentenceTransformer(model_path, device=device)
+        print(f"[OK] Embedding 模型已加载 ({'GPU' if device == 'cuda' else 'CPU'})")
+        return model
+
+    model = load_embedding_backend(model_path, backend=backend, device=device)
+    print(f"[OK] Embedding 模型已加载 ({model.name}, {model.device})")
+    return model
+
+
 def _apply_llm_env_overrides(loaded_config: Dict[str, Any]) -> Dict[str, Any]:
     """Load sensitive LLM settings from environment variables when present."""
     llm_cfg = loaded_config.get('llm', {}).get('config', {})
@@ -183,6 +210,12 @@ last_evolution_completed_at = None  # 最近一次演化成功完成时间
 evolution_schedule_anchor_at = None  # 当前进程内的演化计时起点
 evolution_inflight = False  # 当前是否有演化任务正在执行
 evolution_submission_pending = False  # 当前是否已有演化任务已提交未开始执行
+embedding_migration = None  # 更换 Embedding 模型后的后台重嵌入迁移
+
+# 启动状态：组件名 -> {'state': pending/loading/ready/failed/disabled, 'seconds', 'error'}
+component_status: Dict[str, Dict[str, Any]] = {}
+warmup_tasks: List[asyncio.Task] = []   # BM25 / 重排序器后台预热任务
+bm25_warmup_backlog: List[tuple] = []   # BM25 构建期间的增删，建好后补上
 
 # 记忆类型权重配置（搜索时加权）
 MEMORY_TYPE_WEIGHTS = {
@@ -338,7 +371,17 @@ async def update_memory_usage_async(memory_ids: List[str]):
     """异步回写命中使用信号，不阻塞检索热路径。"""
     if not qdrant_client or not qdrant_client.is_available():
         return
-    for memory_id in dict.fromkeys([mid for mid in memory_ids if mid]):
+    memory_ids = list(dict.fromkeys([mid for mid in memory_ids if mid]))
+    if not memory_ids:
+        return
+    if hasattr(qdrant_client, 'update_usage_batch'):
+        # 一次 retrieve + 一次批量写回
+        try:
+            await asyncio.to_thread(qdrant_client.update_usage_batch, memory_ids)
+        except Exception as e:
+            logger.debug(f"回写记忆使用计数失败 {memory_ids}: {e}")
+        return
+    for memory_id in memory_ids:
         try:
             await asyncio.to_thread(qdrant_client.update_usage, memory_id)
         except Exception as e:
@@ -460,6 +503,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 记忆增强对话 /chat/*，对话引擎在启动完成后注册
+from routes.chat_routes import router as chat_router, MemoryEnhancedChat, configure_chat
+app.include_router(chat_router)
+
 
 # ==================== 请求模型（兼容旧版） ====================
 
@@ -506,336 +553,566 @@ class MigrateRequest(BaseModel):
 
 # ==================== 初始化 ====================
 
+def _set_component_state(name: str, state: str, started: Optional[float] = None, error: Any = None):
+    """记录组件启动状态（pending/loading/ready/failed/disabled）和耗时"""
+    entry = component_status.setdefault(name, {'state': 'pending', 'seconds': None, 'error': None})
+    entry['state'] = state
+    if started is not None:
+        entry['seconds'] = round(time.perf_counter() - started, 3)
+    if error is not None:
+        entry['error'] = str(error)
+
+
+def _warming_components() -> List[str]:
+    return [name for name, entry in component_status.items() if entry['state'] in ('pending', 'loading')]
+
+
+async def _init_component(name: str, loader):
+    """
+    初始化单个组件并记录耗时
+
+    同步 loader 放到线程里执行，协程 loader 直接 await，
+    因此多个组件可以用 asyncio.gather 并行加载。返回 None 视为不可用。
+    """
+    _set_component_state(name, 'loading')
+    started = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(loader):
+            result = await loader()
+        else:
+            result = await asyncio.to_thread(loader)
+    except Exception as e:
+        _set_component_state(name, 'failed', started, e)
+        print(f"[警告] {name} 初始化失败 ({component_status[name]['seconds']:.2f}s): {e}")
+        return None
+
+    _set_component_state(name, 'ready' if result is not None else 'failed', started)
+    print(f"[计时] {name}: {component_status[name]['seconds']:.2f}s ({component_status[name]['state']})")
+    return result
+
+
+def _disable_component(name: str, message: str):
+    _set_component_state(name, 'disabled')
+    print(message)
+
+
+def _load_config_file() -> Dict[str, Any]:
+    config_path = os.path.join(os.path.dirname(__file__), "..", "config", "memos_config.json")
+    print(f"[配置] 配置文件: {config_path}")
+    if not os.path.exists(config_path):
+        print(f"[警告] 配置文件不存在，使用默认配置")
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        loaded = json.load(f)
+    _apply_llm_env_overrides(loaded)
+    return loaded
+
+
+def _open_embedding_model():
+    print("[加载] Embedding 模型...")
+    embedding_config = config.get('embedding', {})
+    model_path = _resolve_runtime_path(embedding_config.get('model_path', '../full-hub/rag-hub'))
+    return _load_embedding_model(
+        model_path,
+        backend=embedding_config.get('backend', 'torch'),
+        device=embedding_config.get('device', 'auto')
+    )
+
+
+def _open_qdrant():
+    print("[初始化] Qdrant 向量数据库...")
+    try:
+        from storage.qdrant_client import MemosQdrantClient, resolve_server
+    except ImportError as e:
+        print(f"[警告] Qdrant 模块导入失败: {e}")
+        print("   请运行: pip install qdrant-client")
+        return None
+
+    qdrant_path = config.get('storage', {}).get('vector', {}).get('path', './data/qdrant')
+    if not os.path.isabs(qdrant_path):
+        qdrant_path = os.path.join(os.path.dirname(__file__), "..", qdrant_path)
+    qdrant_path = os.path.normpath(qdrant_path)
+
+    vector_config = config.get('storage', {}).get('vector', {})
+    vector_size = config.get('embedding', {}).get('vector_size', 768)
+    collection_name = vector_config.get('collection_name', 'memories')
+    url, api_key = resolve_server(vector_config)
+
+    client = MemosQdrantClient(
+        path=qdrant_path,
+        collection_name=collection_name,
+        vector_size=vector_size,
+        url=url,
+        api_key=api_key,
+        options=vector_config.get('options')
+    )
+    if not client.is_available():
+        print("[警告] Qdrant 初始化失败，使用内存存储")
+        return None
+    info = client.get_collection_info()
+    print(f"[OK] Qdrant 已就绪: {info.get('points_count', 0)} 条记忆")
+    return client
+
+
+def _open_graph():
+    graph_config = config.get('storage', {}).get('graph', {})
+    graph_type = graph_config.get('type', 'networkx')
+    print(f"[初始化] 图数据库 ({graph_type})...")
+
+    if graph_type == 'networkx':
+        # 使用轻量级 NetworkX 图存储
+        from storage.networkx_graph import NetworkXGraphClient
+        graph_path = graph_config.get('path', './data/graph_store.json')
+        if not os.path.isabs(graph_path):
+            graph_path = os.path.join(os.path.dirname(__file__), "..", graph_path)
+        client = NetworkXGraphClient(data_path=graph_path)
+    else:
+        # 使用 Neo4j
+        from storage.neo4j_client import MemosNeo4jClient
+        client = MemosNeo4jClient(
+            uri=graph_config.get('uri', 'bolt://localhost:7687'),
+            user=graph_config.get('user', 'neo4j'),
+            password=graph_config.get('password', 'password')
+        )
+
+    if not client.is_available():
+        print("[警告] 图数据库初始化失败")
+        return None
+    stats = client.get_stats()
+    print(f"[OK] 图数据库已就绪: {stats.get('entity_count', 0)} 实体, {stats.get('relation_count', 0)} 关系")
+    return client
+
+
+def _read_legacy_json():
+    legacy_json = config.get('storage', {}).get('legacy_json', {})
+    json_path = legacy_json.get('path', './data/memory_store.json')
+    if not os.path.isabs(json_path):
+        json_path = os.path.join(os.path.dirname(__file__), "..", json_path)
+    if not os.path.exists(json_path):
+        return []
+    with open(json_path, 'r', encoding='utf-8') as f:
+        backup = json.load(f)
+    print(f"[OK] 加载 JSON 备份: {len(backup)} 条记忆")
+    return backup
+
+
+def _build_bm25_searcher():
+    from utils.search_utils import BM25Searcher
+    searcher = BM25Searcher()
+    if qdrant_client and qdrant_client.is_available():
+        searcher.build_index(qdrant_client.get_all_memories(limit=10000))
+    return searcher
+
+
+async def _warm_bm25():
+    """后台构建 BM25 索引；建好之前 /search 只走向量检索"""
+    global bm25_searcher
+    searcher = await _init_component('bm25', _build_bm25_searcher)
+    if searcher is None:
+        bm25_warmup_backlog.clear()
+        return
+    # 补上构建期间的增删（在事件循环里执行，与替换之间没有 await）
+    for op, memory_id, content in bm25_warmup_backlog:
+        try:
+            if op == 'add':
+                searcher.add_document(memory_id, content)
+            else:
+                searcher.remove_document(memory_id)
+        except Exception as e:
+            print(f"[警告] BM25 预热补写失败: {e}")
+    bm25_warmup_backlog.clear()
+    bm25_searcher = searcher
+    print("[OK] BM25 索引已就绪")
+
+
+def _open_reranker():
+    from utils.search_utils import Reranker
+    search_config = config.get('search', {})
+    reranker_path = _prepare_reranker_model(search_config)
+    if not reranker_path:
+        return None
+    model = Reranker(reranker_path, cache_size=search_config.get('rerank_cache_size', 4096))
+    if not model.is_available():
+        print("[警告] 重排序器不可用，检索将回退粗排")
+        return None
+    print(f"[OK] 重排序器已就绪: {reranker_path}")
+    return model
+
+
+async def _warm_reranker():
+    """后台下载/加载 CrossEncoder；就绪前 /search 使用粗排结果"""
+    global reranker
+    reranker = await _init_component('reranker', _open_reranker)
+
+
+def _current_embedding_fingerprint() -> Dict[str, Any]:
+    from storage.embedding_migration import embedding_fingerprint
+    embedding_config = config.get('embedding', {})
+    model_path = _resolve_runtime_path(embedding_config.get('model_path', '../full-hub/rag-hub'))
+    return embedding_fingerprint(embedding_config, model_path)
+
+
+def _load_recorded_embedding_model(record: Dict[str, Any]):
+    """按登记表里的记录重新加载旧模型；模型文件已被替换时失败"""
+    from storage.embedding_migration import embedding_fingerprint
+    model_path = _resolve_runtime_path(record['model_path'])
+    if embedding_fingerprint(record, model_path)['fingerprint'] != record.get('fingerprint'):
+        raise RuntimeError(f"旧模型文件已变更或不存在: {model_path}")
+    return _load_embedding_model(model_path, backend=record.get('backend', 'torch'), device=record.get('device', 'auto'))
+
+
+def _swap_embedding_model(model):
+    """切换全局 Embedding 模型，并同步到持有 embedder 的记忆管理器"""
+    global embedding_model
+    embedding_model = model
+    for manager in (preference_memory, image_memory):
+        if manager is not None and getattr(manager, 'embedder', None) is not None:
+            manager.embedder = model
+
+
+async def _check_embedding_fingerprint():
+    """
+    比对 live 集合的模型指纹与当前 Embedding 配置
+
+    不一致时在后台把记忆用新模型重新编码到影子集合：
+    旧模型还能加载时，迁移完成前检索/写入继续使用旧模型和旧集合，完成后原子切换别名；
+    旧模型已不可用时（旧向量无法再被查询），立即切到影子集合，边补数据边提供检索。
+    """
+    global embedding_migration
+    from storage.embedding_migration import FingerprintRegistry, ReembedMigration
+
+    registry = FingerprintRegistry(EMBEDDING_REGISTRY_PATH)
+    current = await asyncio.to_thread(_current_embedding_fingerprint)
+    active = qdrant_client.physical_collection()
+    record = registry.get(active)
+    pending = registry.migration
+
+    if record is None:
+        size = qdrant_client.collection_vector_size(active)
+        if size is None or size == current['vector_size']:
+            # 第一次登记：维度一致时视为由当前模型写入
+            registry.set(active, current)
+            _disable_component('embedding_migration', f"[信息] 已登记集合 {active} 的 Embedding 指纹: {current['fingerprint']}")
+            return
+        record = {'fingerprint': f'unknown-{size}', 'vector_size': size}
+
+    if record.get('fingerprint') == current['fingerprint']:
+        if pending and pending.get('switched') and pending.get('target') == active \
+                and pending.get('fingerprint') == current['fingerprint'] \
+                and qdrant_client.collection_exists(pending.get('source', '')):
+            source = pending['source']
+        else:
+            if pending:
+                registry.set_migration(None)
+                print("[迁移] Embedding 配置已与当前集合一致，放弃未完成的迁移")
+            _disable_component('embedding_migration', "[信息] Embedding 指纹一致，无需迁移")
+            return
+        # 上次已立即切换但数据还没补完：继续从旧集合补
+        migration = ReembedMigration(qdrant_client, registry, source, active, current, embedding_model.encode)
+        embedding_migration = migration
+        print(f"[迁移] 继续补全集合 {active}（来源 {source}）")
+        warmup_tasks.append(asyncio.create_task(_run_embedding_migration(embedding_model)))
+        return
+
+    target = registry.find_collection(current['fingerprint'], qdrant_client.collection_exists) \
+        or f"{qdrant_client.base_collection_name}__{current['fingerprint']}"
+    if pending and pending.get('target') not in (None, target) and not pending.get('switched'):
+        qdrant_client.delete_collection(pending['target'])
+    print(f"[迁移] Embedding 模型已变更: {record.get('fingerprint')} -> {current['fingerprint']}，"
+          f"后台重新编码 {active} -> {target}")
+
+    old_model = None
+    if record.get('model_path'):
+        try:
+            old_model = await asyncio.to_thread(_load_recorded_embedding_model, record)
+        except Exception as e:
+            print(f"[警告] 旧 Embedding 模型不可用: {e}")
+
+    new_model = embedding_model
+    migration = ReembedMigration(qdrant_client, registry, active, target, current, new_model.encode)
+    embedding_migration = migration
+    if old_model is not None:
+        _swap_embedding_model(old_model)
+        print("[迁移] 迁移完成前继续使用旧模型和旧集合提供检索")
+    else:
+        if not qdrant_client.create_collection(target, current['vector_size']) \
+                or not qdrant_client.switch_live_collection(target, current['vector_size']):
+            raise RuntimeError(f"无法切换到影子集合: {target}")
+        migration.mark_switched()
+        print(f"[迁移] 已切换到 {target}，旧记忆补全前检索结果不完整")
+    warmup_tasks.append(asyncio.create_task(_run_embedding_migration(new_model)))
+
+
+async def _run_embedding_migration(new_model):
+    """后台执行重嵌入迁移，完成后切换 live 别名和 Embedding 模型"""
+    migration = embedding_migration
+    _set_component_state('embedding_migration', 'loading')
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(migration.run)
+        if not migration.switched:
+            # 别名切换与模型替换在同一段同步代码里完成，中间不会插入其他请求
+            if not qdrant_client.switch_live_collection(migration.target, int(migration.fingerprint['vector_size'])):
+                raise RuntimeError(f"切换集合别名失败: {migration.target}")
+            _swap_embedding_model(new_model)
+            migration.mark_switched()
+            # run() 最后一轮是完整同步；这里补上它之后写入旧集合的新增、修改和删除
+            await asyncio.to_thread(migration.sync)
+        migration.finish()
+        _set_component_state('embedding_migration', 'ready', started)
+        print(f"[OK] Embedding 迁移完成: {migration.target}（旧集合 {migration.source} 保留，可手动删除）")
+    except asyncio.CancelledError:
+        migration.stop()
+        raise
+    except Exception as e:
+        migration.state['error'] = str(e)
+        _set_component_state('embedding_migration', 'failed', started, e)
+        print(f"[警告] Embedding 迁移失败（下次启动从断点继续）: {e}")
+
+
+def _open_evolution():
+    from core.evolution import MemoryEvolution
+    return MemoryEvolution(qdrant_client, config.get('evolution', {}))
+
+
+async def _open_preference_memory():
+    from memories.preference_memory import PreferenceMemory
+    manager = PreferenceMemory(
+        user_id=USER_ID,
+        vector_storage=qdrant_client,
+        graph_storage=neo4j_client,
+        embedder=embedding_model
+    )
+    await manager.load()
+    pref_summary = await manager.get_summary()
+    print(f"[OK] 偏好记忆已就绪: {pref_summary.get('total_count', 0)} 个偏好")
+    return manager
+
+
+async def _open_tool_memory():
+    from memories.tool_memory import ToolMemory
+    tool_store_path = config.get('tools', {}).get('store_path', './data/tool_usage.db')
+    if not os.path.isabs(tool_store_path):
+        tool_store_path = os.path.join(os.path.dirname(__file__), "..", tool_store_path)
+    tool_store_path = os.path.normpath(tool_store_path)
+    os.makedirs(os.path.dirname(tool_store_path), exist_ok=True)
+    manager = ToolMemory(
+        user_id=USER_ID,
+        vector_storage=qdrant_client,
+        store_path=tool_store_path
+    )
+    await manager.load()
+    tool_stats = await manager.get_stats()
+    print(f"[OK] 工具记忆已就绪: {tool_stats.get('total_usage', 0)} 条使用记录")
+    return manager
+
+
+def _open_document_loader():
+    from utils.document_loader import DocumentLoader
+    return DocumentLoader(
+        chunk_size=config.get('kb', {}).get('chunk_size', 500),
+        chunk_overlap=config.get('kb', {}).get('chunk_overlap', 50)
+    )
+
+
+async def _open_image_memory():
+    from memories.image_memory import ImageMemory
+    image_config = config.get('image', {})
+    image_storage_path = image_config.get('storage_path', './data/images')
+    if not os.path.isabs(image_storage_path):
+        image_storage_path = os.path.join(os.path.dirname(__file__), "..", image_storage_path)
+
+    manager = ImageMemory(
+        storage_path=image_storage_path,
+        vector_storage=qdrant_client,
+        embedder=embedding_model,
+        llm_config=llm_config,
+        use_clip=image_config.get('use_clip', False),
+        max_image_size=image_config.get('max_size_mb', 5) * 1024 * 1024
+    )
+    await manager.load_metadata()
+    img_stats = manager.get_stats()
+    print(f"[OK] 图像记忆已就绪: {img_stats.get('total_images', 0)} 张图像")
+    return manager
+
+
+def _open_entity_extractor():
+    from utils.entity_extractor import EntityExtractor
+    return EntityExtractor(
+        llm_config=llm_config,
+        fallback_config=full_config.get('llm_fallback', {}).get('config') if full_config else None
+    )
+
+
+async def _open_scheduler():
+    from core.scheduler import MemScheduler
+    scheduler_config = config.get('scheduler', {})
+    instance = MemScheduler(
+        use_redis=scheduler_config.get('use_redis', False),
+        redis_url=scheduler_config.get('redis_url', 'redis://localhost:6379'),
+        max_workers=scheduler_config.get('max_workers', 4),
+        quota_per_user=scheduler_config.get('quota_per_user', 100)
+    )
+    await instance.start()
+
+    # 注册任务处理器
+    instance.register_handler('add_memory', _handle_add_memory_task)
+    instance.register_handler('process_image', _handle_process_image_task)
+    instance.register_handler('extract_entities', _handle_extract_entities_task)
+    instance.register_handler('evolve_memory', _handle_evolve_memory_task)
+    print(f"[OK] 调度器已就绪: {scheduler_config.get('max_workers', 4)} 个工作协程")
+    return instance
+
+
 async def startup_event():
-    """启动时初始化所有组件"""
+    """
+    启动时初始化所有组件
+
+    分三步：
+    1. 互不依赖的 Embedding 模型 / Qdrant / 图数据库 / JSON 备份并行加载（线程）；
+    2. 依赖它们的记忆管理器等并行初始化；
+    3. BM25 索引和重排序器放到后台预热，不阻塞端口就绪，
+       期间 /search 只做向量检索，/health 的 components 字段可查看进度。
+    """
     global embedding_model, qdrant_client, neo4j_client, config
-    global llm_config, full_config, bm25_searcher, memory_store_backup
-    global reranker, memory_evolution, evolution_loop_task, last_evolution_completed_at
+    global llm_config, full_config, memory_store_backup
+    global memory_evolution, evolution_loop_task, last_evolution_completed_at
+    global preference_memory, tool_memory, document_loader, scheduler, image_memory, entity_extractor
 
     print("=" * 60)
     print("  [启动] MemOS 服务（完整集成版 v2.0）")
     print("=" * 60)
+    startup_started = time.perf_counter()
 
     try:
         # 1. 加载配置
-        config_path = os.path.join(os.path.dirname(__file__), "..", "config", "memos_config.json")
-        print(f"[配置] 配置文件: {config_path}")
-
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                _apply_llm_env_overrides(config)
-                full_config = config
-                llm_config = config.get('llm', {}).get('config', {})
-
-                if llm_config and all(llm_config.get(k) for k in ['model', 'api_key', 'base_url']):
-                    print(f"[OK] LLM 配置: {llm_config.get('model')}")
-                else:
-                    print("[警告] LLM 配置不完整")
+        config = _load_config_file()
+        full_config = config
+        llm_config = config.get('llm', {}).get('config', {})
+        if llm_config and all(llm_config.get(k) for k in ['model', 'api_key', 'base_url']):
+            print(f"[OK] LLM 配置: {llm_config.get('model')}")
         else:
-            print(f"[警告] 配置文件不存在，使用默认配置")
-            config = {}
+            print("[警告] LLM 配置不完整")
 
-        # 2. 加载 Embedding 模型
-        print("[加载] Embedding 模型...")
-        from sentence_transformers import SentenceTransformer
-        import torch
+        memos_root = os.path.dirname(os.path.dirname(__file__))
+        if memos_root not in sys.path:
+            sys.path.insert(0, memos_root)
 
-        model_path = config.get('embedding', {}).get('model_path', '../full-hub/rag-hub')
-        model_path = _resolve_runtime_path(model_path)
+        search_config = config.get('search', {})
+        graph_enabled = config.get('storage', {}).get('graph', {}).get('enabled', False)
+        legacy_enabled = config.get('storage', {}).get('legacy_json', {}).get('enabled', True)
+        for name in ('embedding', 'qdrant', 'graph', 'legacy_json', 'embedding_migration', 'bm25',
+                     'reranker', 'evolution', 'preference_memory', 'tool_memory', 'document_loader',
+                     'image_memory', 'entity_extractor', 'scheduler'):
+            _set_component_state(name, 'pending')
 
-        embedding_model = SentenceTransformer(model_path)
-        if torch.cuda.is_available():
-            embedding_model = embedding_model.to('cuda')
-            print("[OK] Embedding 模型已加载 (GPU)")
+        # 重排序器只依赖配置，最先放到后台（可能需要下载模型）
+        if search_config.get('enable_reranker', False):
+            print("[初始化] CrossEncoder 重排序器（后台）...")
+            warmup_tasks.append(asyncio.create_task(_warm_reranker()))
         else:
-            print("[OK] Embedding 模型已加载 (CPU)")
+            _disable_component('reranker', "[信息] 重排序器未启用")
 
-        # 3. 初始化 Qdrant
-        print("[初始化] Qdrant 向量数据库...")
-        try:
-            import sys
-            sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-            from storage.qdrant_client import MemosQdrantClient
-
-            qdrant_path = config.get('storage', {}).get('vector', {}).get('path', './data/qdrant')
-            if not os.path.isabs(qdrant_path):
-                qdrant_path = os.path.join(os.path.dirname(__file__), "..", qdrant_path)
-            qdrant_path = os.path.normpath(qdrant_path)
-
-            vector_size = config.get('embedding', {}).get('vector_size', 768)
-            collection_name = config.get('storage', {}).get('vector', {}).get('collection_name', 'memories')
-
-            qdrant_client = MemosQdrantClient(
-                path=qdrant_path,
-                collection_name=collection_name,
-                vector_size=vector_size
-            )
+        # 2. 并行加载 Embedding 模型、Qdrant、图数据库、JSON 备份
+        async def _skip():
+            return None
 
-            if qdrant_client.is_available():
-                info = qdrant_client.get_collection_info()
-                print(f"[OK] Qdrant 已就绪: {info.get('points_count', 0)} 条记忆")
-            else:
-                print("[警告] Qdrant 初始化失败，使用内存存储")
-                qdrant_client = None
-        except ImportError as e:
-            print(f"[警告] Qdrant 模块导入失败: {e}")
-            print("   请运行: pip install qdrant-client")
-            qdrant_client = None
-        except Exception as e:
-            print(f"[警告] Qdrant 初始化失败: {e}")
-            qdrant_client = None
+        if not graph_enabled:
+            _disable_component('graph', "[信息] 图数据库未启用")
+        if not legacy_enabled:
+            _disable_component('legacy_json', "[信息] JSON 备份未启用")
 
-        # 4. 初始化图数据库（如果启用）
-        graph_enabled = config.get('storage', {}).get('graph', {}).get('enabled', False)
-        if graph_enabled:
-            graph_type = config.get('storage', {}).get('graph', {}).get('type', 'networkx')
-            print(f"[初始化] 图数据库 ({graph_type})...")
-            try:
-                graph_config = config.get('storage', {}).get('graph', {})
-
-                if graph_type == 'networkx':
-                    # 使用轻量级 NetworkX 图存储
-                    from storage.networkx_graph import NetworkXGraphClient
-                    graph_path = graph_config.get('path', './data/graph_store.json')
-                    if not os.path.isabs(graph_path):
-                        graph_path = os.path.join(os.path.dirname(__file__), "..", graph_path)
-                    neo4j_client = NetworkXGraphClient(data_path=graph_path)
-                else:
-                    # 使用 Neo4j
-                    from storage.neo4j_client import MemosNeo4jClient
-                    neo4j_client = MemosNeo4jClient(
-                        uri=graph_config.get('uri', 'bolt://localhost:7687'),
-                        user=graph_config.get('user', 'neo4j'),
-                        password=graph_config.get('password', 'password')
-                    )
+        embedding_model, qdrant_client, neo4j_client, backup = await asyncio.gather(
+            _init_component('embedding', _open_embedding_model),
+            _init_component('qdrant', _open_qdrant),
+            _init_component('graph', _open_graph) if graph_enabled else _skip(),
+            _init_component('legacy_json', _read_legacy_json) if legacy_enabled else _skip(),
+        )
+        memory_store_backup = backup or []
 
-                if neo4j_client.is_available():
-                    stats = neo4j_client.get_stats()
-                    print(f"[OK] 图数据库已就绪: {stats.get('entity_count', 0)} 实体, {stats.get('relation_count', 0)} 关系")
-                else:
-                    print("[警告] 图数据库初始化失败")
-                    neo4j_client = None
+        # Embedding 模型变更检测（可能切回旧模型服务检索，须在各管理器初始化之前）
+        if embedding_model is not None and qdrant_client and qdrant_client.is_available():
+            try:
+                await _check_embedding_fingerprint()
             except Exception as e:
-                print(f"[警告] 图数据库初始化失败: {e}")
-                neo4j_client = None
+                _set_component_state('embedding_migration', 'failed', error=e)
+                print(f"[警告] Embedding 指纹检查失败: {e}")
         else:
-            print("[信息] 图数据库未启用")
-
-        # 5. 加载备份数据（兼容旧版）
-        legacy_json = config.get('storage', {}).get('legacy_json', {})
-        if legacy_json.get('enabled', True):
-            json_path = legacy_json.get('path', './data/memory_store.json')
-            if not os.path.isabs(json_path):
-                json_path = os.path.join(os.path.dirname(__file__), "..", json_path)
+            _set_component_state('embedding_migration', 'disabled')
 
-            if os.path.exists(json_path):
-                try:
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        memory_store_backup = json.load(f)
-                    print(f"[OK] 加载 JSON 备份: {len(memory_store_backup)} 条记忆")
-
-                    # 如果 Qdrant 为空，尝试迁移
-                    if qdrant_client and qdrant_client.is_available():
-                        qdrant_count = qdrant_client.count_memories()
-                        if qdrant_count == 0 and len(memory_store_backup) > 0:
-                            print("[迁移] 检测到需要迁移数据到 Qdrant...")
-                            await migrate_json_to_qdrant()
-                except Exception as e:
-                    print(f"[警告] 加载 JSON 备份失败: {e}")
-
-        # 6. 初始化 BM25 索引（如果启用）
-        if config.get('search', {}).get('enable_bm25', False):
-            print("[初始化] BM25 索引...")
+        # 如果 Qdrant 为空，尝试迁移（需要 Embedding 和 Qdrant 都已就绪）
+        if memory_store_backup and qdrant_client and qdrant_client.is_available():
             try:
-                from utils.search_utils import BM25Searcher
-                bm25_searcher = BM25Searcher()
-                await rebuild_bm25_index()
-                print("[OK] BM25 索引已就绪")
+                if qdrant_client.count_memories() == 0:
+                    print("[迁移] 检测到需要迁移数据到 Qdrant...")
+                    await migrate_json_to_qdrant()
             except Exception as e:
-                print(f"[警告] BM25 初始化失败: {e}")
+                print(f"[警告] 迁移 JSON 备份失败: {e}")
+
+        # 3. BM25 索引后台构建
+        if search_config.get('enable_bm25', False):
+            print("[初始化] BM25 索引（后台）...")
+            warmup_tasks.append(asyncio.create_task(_warm_bm25()))
+        else:
+            _disable_component('bm25', "[信息] BM25 未启用")
 
-        # 7. 初始化记忆自演化引擎
-        evolution_config = config.get('evolution', {}) if config else {}
+        # 4. 并行初始化依赖存储的各个管理器
         last_evolution_completed_at = get_last_evolution_completed_at()
         if last_evolution_completed_at:
             print(f"[信息] 上次记忆演化完成时间: {last_evolution_completed_at.isoformat()}")
         else:
             print("[信息] 尚无记忆演化历史，将在启动后尽快补跑首轮")
-        if qdrant_client and qdrant_client.is_available():
-            try:
-                from core.evolution import MemoryEvolution
-                memory_evolution = MemoryEvolution(qdrant_client, evolution_config)
-                print("[OK] 记忆自演化引擎已就绪")
-            except Exception as e:
-                print(f"[警告] 记忆自演化引擎初始化失败: {e}")
-                memory_evolution = None
-        else:
-            memory_evolution = None
-
-        # 8. 初始化重排序器（缺失模型时只降级，不阻塞服务）
-        search_config = config.get('search', {}) if config else {}
-        if search_config.get('enable_reranker', False):
-            print("[初始化] CrossEncoder 重排序器...")
-            try:
-                from utils.search_utils import Reranker
-                reranker_path = _prepare_reranker_model(search_config)
-                if reranker_path:
-                    reranker = Reranker(reranker_path)
-                    if reranker.is_available():
-                        print(f"[OK] 重排序器已就绪: {reranker_path}")
-                    else:
-                        print("[警告] 重排序器不可用，检索将回退粗排")
-                        reranker = None
-                else:
-                    reranker = None
-            except Exception as e:
-                print(f"[警告] 重排序器初始化失败，回退粗排: {e}")
-                reranker = None
-        else:
-            print("[信息] 重排序器未启用")
-
-        # 8. 初始化偏好记忆管理器
-        global preference_memory
-        print("[初始化] 偏好记忆管理器...")
-        try:
-            from memories.preference_memory import PreferenceMemory
-            preference_memory = PreferenceMemory(
-                user_id=USER_ID,
-                vector_storage=qdrant_client,
-                graph_storage=neo4j_client,
-                embedder=embedding_model
-            )
-            await preference_memory.load()
-            pref_summary = await preference_memory.get_summary()
-            print(f"[OK] 偏好记忆已就绪: {pref_summary.get('total_count', 0)} 个偏好")
-        except Exception as e:
-            print(f"[警告] 偏好记忆初始化失败: {e}")
-            import traceback
-            traceback.print_exc()
-            preference_memory = None
-
-        # 8. 初始化工具记忆管理器
-        global tool_memory
-        print("[初始化] 工具记忆管理器...")
-        try:
-            from memories.tool_memory import ToolMemory
-            tool_memory = ToolMemory(
-                user_id=USER_ID,
-                vector_storage=qdrant_client
-            )
-            await tool_memory.load()
-            tool_stats = await tool_memory.get_stats()
-            print(f"[OK] 工具记忆已就绪: {tool_stats.get('total_usage', 0)} 条使用记录")
-        except Exception as e:
-            print(f"[警告] 工具记忆初始化失败: {e}")
-            tool_memory = None
 
-        # 9. 初始化文档加载器
-        global document_loader
-        print("[初始化] 文档加载器...")
-        try:
-            from utils.document_loader import DocumentLoader
-            document_loader = DocumentLoader(
-                chunk_size=config.get('kb', {}).get('chunk_size', 500),
-                chunk_overlap=config.get('kb', {}).get('chunk_overlap', 50)
-            )
-            print("[OK] 文档加载器已就绪")
-        except Exception as e:
-            print(f"[警告] 文档加载器初始化失败: {e}")
-            document_loader = None
+        qdrant_ready = bool(qdrant_client and qdrant_client.is_available())
+        image_enabled = config.get('image', {}).get('enabled', True)
+        entity_enabled = bool(config.get('entity_extraction', {}).get('enabled', False) and llm_config)
+
+        if not qdrant_ready:
+            _set_component_state('evolution', 'disabled')
+        if not image_enabled:
+            _disable_component('image_memory', "[信息] 图像记忆未启用")
+        if not entity_enabled:
+            _disable_component('entity_extractor', "[信息] 实体提取器未启用（可在配置中启用）")
+
+        (memory_evolution, preference_memory, tool_memory,
+         document_loader, image_memory, entity_extractor) = await asyncio.gather(
+            _init_component('evolution', _open_evolution) if qdrant_ready else _skip(),
+            _init_component('preference_memory', _open_preference_memory),
+            _init_component('tool_memory', _open_tool_memory),
+            _init_component('document_loader', _open_document_loader),
+            _init_component('image_memory', _open_image_memory) if image_enabled else _skip(),
+            _init_component('entity_extractor', _open_entity_extractor) if entity_enabled else _skip(),
+        )
 
-        # 10. 初始化异步任务调度器
-        global scheduler
-        scheduler_config = config.get('scheduler', {}) if config else {}
+        # 5. 异步任务调度器（依赖演化引擎）
+        scheduler_config = config.get('scheduler', {})
         if scheduler_config.get('enabled', False):
             print("[初始化] 异步任务调度器...")
-            try:
-                from core.scheduler import MemScheduler
-                scheduler = MemScheduler(
-                    use_redis=scheduler_config.get('use_redis', False),
-                    redis_url=scheduler_config.get('redis_url', 'redis://localhost:6379'),
-                    max_workers=scheduler_config.get('max_workers', 4),
-                    quota_per_user=scheduler_config.get('quota_per_user', 100)
-                )
-                await scheduler.start()
-
-                # 注册任务处理器
-                scheduler.register_handler('add_memory', _handle_add_memory_task)
-                scheduler.register_handler('process_image', _handle_process_image_task)
-                scheduler.register_handler('extract_entities', _handle_extract_entities_task)
-                scheduler.register_handler('evolve_memory', _handle_evolve_memory_task)
-
-                evolution_config = config.get('evolution', {}) if config else {}
-                if evolution_config.get('enabled', True) and memory_evolution:
-                    interval = max(int(evolution_config.get('evolve_interval', 86400)), 60)
-                    wait_seconds = seconds_until_next_evolution(interval)
-                    if wait_seconds == 0:
-                        print("[信息] 记忆演化已到期，启动后将尽快补跑一轮")
-                    else:
-                        print(f"[信息] 距离下一轮记忆演化还有 {wait_seconds} 秒")
-                    evolution_loop_task = asyncio.create_task(_evolution_periodic_loop())
-                    print(f"[OK] 记忆演化后台循环已启动: {interval} 秒/轮")
-
-                print(f"[OK] 调度器已就绪: {scheduler_config.get('max_workers', 4)} 个工作协程")
-            except Exception as e:
-                print(f"[警告] 调度器初始化失败: {e}")
-                scheduler = None
+            scheduler = await _init_component('scheduler', _open_scheduler)
+
+            evolution_config = config.get('evolution', {})
+            if scheduler and evolution_config.get('enabled', True) and memory_evolution:
+                interval = max(int(evolution_config.get('evolve_interval', 86400)), 60)
+                wait_seconds = seconds_until_next_evolution(interval)
+                if wait_seconds == 0:
+                    print("[信息] 记忆演化已到期，启动后将尽快补跑一轮")
+                else:
+                    print(f"[信息] 距离下一轮记忆演化还有 {wait_seconds} 秒")
+                evolution_loop_task = asyncio.create_task(_evolution_periodic_loop())
+                print(f"[OK] 记忆演化后台循环已启动: {interval} 秒/轮")
         else:
-            print("[信息] 异步调度器未启用（可在配置中启用）")
+            _disable_component('scheduler', "[信息] 异步调度器未启用（可在配置中启用）")
 
-        # 11. 初始化图像记忆管理器
-        global image_memory
-        image_config = config.get('image', {}) if config else {}
-        if image_config.get('enabled', True):
-            print("[初始化] 图像记忆管理器...")
-            try:
-                from memories.image_memory import ImageMemory
-                image_storage_path = image_config.get('storage_path', './data/images')
-                if not os.path.isabs(image_storage_path):
-                    image_storage_path = os.path.join(os.path.dirname(__file__), "..", image_storage_path)
-
-                image_memory = ImageMemory(
-                    storage_path=image_storage_path,
-                    vector_storage=qdrant_client,
-                    embedder=embedding_model,
-                    llm_config=llm_config,
-                    use_clip=image_config.get('use_clip', False),
-                    max_image_size=image_config.get('max_size_mb', 5) * 1024 * 1024
-                )
-                await image_memory.load_metadata()
-                img_stats = image_memory.get_stats()
-                print(f"[OK] 图像记忆已就绪: {img_stats.get('total_images', 0)} 张图像")
-            except Exception as e:
-                print(f"[警告] 图像记忆初始化失败: {e}")
-                image_memory = None
-
-        # 12. 初始化实体提取器
-        global entity_extractor
-        entity_config = config.get('entity_extraction', {}) if config else {}
-        if entity_config.get('enabled', False) and llm_config:
-            print("[初始化] 实体提取器...")
-            try:
-                from utils.entity_extractor import EntityExtractor
-                entity_extractor = EntityExtractor(
-                    llm_config=llm_config,
-                    fallback_config=full_config.get('llm_fallback', {}).get('config') if full_config else None
-                )
-                print("[OK] 实体提取器已就绪")
-            except Exception as e:
-                print(f"[警告] 实体提取器初始化失败: {e}")
-                entity_extractor = None
-        else:
-            print("[信息] 实体提取器未启用（可在配置中启用）")
+        # 6. 记忆增强对话（/chat/completions），对话写回交给调度器
+        configure_chat(MemoryEnhancedChat(_ChatMemoryAdapter(), llm_config or {}, scheduler))
+        print("[OK] 记忆增强对话已注册: /chat/completions")
 
         print("=" * 60)
-        print("  [OK] MemOS 服务启动成功!")
+        print(f"  [OK] MemOS 服务启动成功! 耗时 {time.perf_counter() - startup_started:.2f}s")
         print("=" * 60)
-        print(f"  Qdrant: {'已启用' if qdrant_client else '未启用'}")
-        print(f"  Graph: {'已启用' if neo4j_client else '未启用'}")
-        print(f"  Scheduler: {'已启用' if scheduler else '未启用'}")
-        print(f"  Image: {'已启用' if image_memory else '未启用'}")
-        print(f"  Entity: {'已启用' if entity_extractor else '未启用'}")
+        for name, entry in component_status.items():
+            seconds = f"{entry['seconds']:.2f}s" if entry['seconds'] is not None else "-"
+            print(f"  {name:<18} {entry['state']:<9} {seconds}")
         print(f"  LLM: {llm_config.get('model', '未配置') if llm_config else '未配置'}")
         print("=" * 60)
 
@@ -845,6 +1122,22 @@ async def startup_event():
         traceback.print_exc()
 
 
+class _ChatMemoryAdapter:
+    """给 MemoryEnhancedChat 用的 mos 接口，检索和写入复用 /search、/add_raw 的实现"""
+
+    async def search(self, query: str, user_id: str, top_k: int = 5, use_graph: bool = False):
+        result = await search_memory(SearchMemoryRequest(
+            query=query, user_id=user_id, top_k=top_k, use_graph=use_graph
+        ))
+        return result.get('memories', [])
+
+    async def add(self, content: str, user_id: str, memory_type: str = 'general', importance: float = 0.5):
+        return await add_memory_raw(AddRawMemoryRequest(
+            messages=[RawMemoryMessage(content=content, memory_type=memory_type, importance=importance)],
+            user_id=user_id
+        ))
+
+
 # ==================== 调度器任务处理器 ====================
 
 async def _handle_add_memory_task(task):
@@ -987,6 +1280,13 @@ async def shutdown_event():
     global qdrant_client, neo4j_client, scheduler, evolution_loop_task
 
     print("[关闭] 正在关闭 MemOS 服务...")
+    configure_chat(None)
+
+    for task in warmup_tasks:
+        task.cancel()
+    if warmup_tasks:
+        await asyncio.gather(*warmup_tasks, return_exceptions=True)
+        warmup_tasks.clear()
 
     if evolution_loop_task:
         try:
@@ -1005,6 +1305,12 @@ async def shutdown_event():
         except:
             pass
 
+    if tool_memory:
+        try:
+            tool_memory.close()
+        except:
+            pass
+
     if qdrant_client:
         try:
             qdrant_client.close()
@@ -1099,6 +1405,10 @@ def update_bm25_index(memory_id: str, content: str):
     """增量更新 BM25 索引（添加单条记忆）"""
     global bm25_searcher
 
+    if bm25_searcher is None and component_status.get('bm25', {}).get('state') == 'loading':
+        bm25_warmup_backlog.append(('add', memory_id, content))
+        return
+
     if bm25_searcher and hasattr(bm25_searcher, 'add_document'):
         try:
             bm25_searcher.add_document(memory_id, content)
@@ -1110,6 +1420,10 @@ def remove_bm25_document(memory_id: str):
     """从 BM25 索引移除记忆。"""
     global bm25_searcher
 
+    if bm25_searcher is None and component_status.get('bm25', {}).get('state') == 'loading':
+        bm25_warmup_backlog.append(('remove', memory_id, None))
+        return
+
     if bm25_searcher and hasattr(bm25_searcher, 'remove_document'):
         try:
             bm25_searcher.remove_document(memory_id)
@@ -1142,56 +1456,66 @@ async def store_entities_for_memory(
         return {'entity_ids': [], 'entities': [], 'relations_created': 0}
 
     entities, relations = await entity_extractor.extract(text, context)
+
+    extracted = []
+    for entity in entities:
+        extracted.append((
+            entity.name if hasattr(entity, 'name') else str(entity),
+            entity.entity_type.value if hasattr(entity, 'entity_type') else 'unknown',
+            entity.description if hasattr(entity, 'description') else '',
+            entity.confidence if hasattr(entity, 'confidence') else 0.8
+        ))
+
+    # 名称解析、实体写入、记忆关联、关系写入各一次批量调用
+    existing = neo4j_client.resolve_entity_names(
+        [(name, entity_type) for name, entity_type, _, _ in extracted], user_id
+    )
     entity_ids = []
     stored_entities = []
     entity_name_to_id = {}
+    new_entities = []
+    resolved_ids = {key: found['id'] for key, found in existing.items()}
 
-    for entity in entities:
-        entity_name = entity.name if hasattr(entity, 'name') else str(entity)
-        entity_type = entity.entity_type.value if hasattr(entity, 'entity_type') else 'unknown'
-        description = entity.description if hasattr(entity, 'description') else ''
-        confidence = entity.confidence if hasattr(entity, 'confidence') else 0.8
-        existing = neo4j_client.find_entity_by_name(entity_name, user_id, entity_type=entity_type)
-
-        if existing:
-            ent_id = existing['id']
-            if hasattr(neo4j_client, 'link_entity_to_memory'):
-                neo4j_client.link_entity_to_memory(ent_id, memory_id)
-        else:
+    for entity_name, entity_type, description, confidence in extracted:
+        ent_id = resolved_ids.get((entity_name, entity_type))
+        if not ent_id:
             ent_id = f"ent_{uuid.uuid4().hex[:12]}"
-            neo4j_client.create_entity(
-                entity_id=ent_id,
-                name=entity_name,
-                entity_type=entity_type,
-                user_id=user_id,
-                properties={
+            resolved_ids[(entity_name, entity_type)] = ent_id
+            new_entities.append({
+                'id': ent_id,
+                'name': entity_name,
+                'type': entity_type,
+                'user_id': user_id,
+                'properties': {
                     'description': description,
                     'confidence': confidence,
                     'source_memory_ids': [memory_id]
                 }
-            )
+            })
 
         entity_name_to_id[entity_name] = ent_id
         entity_ids.append(ent_id)
         stored_entities.append({'id': ent_id, 'name': entity_name, 'entity_type': entity_type})
 
-    relations_created = 0
+    neo4j_client.upsert_entities(new_entities)
+    neo4j_client.link_memories([(memory_id, ent_id) for ent_id in dict.fromkeys(entity_ids)])
+
+    relation_rows = []
     for relation in relations or []:
         source_id = entity_name_to_id.get(getattr(relation, 'source_name', ''))
         target_id = entity_name_to_id.get(getattr(relation, 'target_name', ''))
         if source_id and target_id:
-            relation_type = relation.relation_type.value if hasattr(relation, 'relation_type') else 'related_to'
-            neo4j_client.create_relation(
-                source_id=source_id,
-                target_id=target_id,
-                relation_type=relation_type,
-                properties={
+            relation_rows.append({
+                'source_id': source_id,
+                'target_id': target_id,
+                'relation_type': relation.relation_type.value if hasattr(relation, 'relation_type') else 'related_to',
+                'properties': {
                     'description': getattr(relation, 'description', ''),
                     'confidence': getattr(relation, 'confidence', 0.8),
                     'source_memory_id': memory_id
                 }
-            )
-            relations_created += 1
+            })
+    relations_created = neo4j_client.upsert_relations(relation_rows)
 
     return {
         'entity_ids': list(dict.fromkeys(entity_ids)),
@@ -1644,17 +1968,24 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """健康检查"""
-    memory_count = 0
-    if qdrant_client and qdrant_client.is_available():
-        memory_count = qdrant_client.count_memories()
+    """健康检查
+
+    ready 表示核心检索（Embedding + Qdrant）可用；BM25 / 重排序器等次要组件
+    可能仍在后台预热，具体见 components 和 warming。
+    """
+    qdrant_available = qdrant_client is not None and qdrant_client.is_available()
+    memory_count = qdrant_client.count_memories() if qdrant_available else 0
 
     return {
         "status": "healthy",
+        "ready": embedding_model is not None and qdrant_available,
         "model_loaded": embedding_model is not None,
-        "qdrant_available": qdrant_client is not None and qdrant_client.is_available(),
+        "qdrant_available": qdrant_available,
         "neo4j_available": neo4j_client is not None and neo4j_client.is_available(),
-        "memory_count": memory_count
+        "memory_count": memory_count,
+        "warming": _warming_components(),
+        "components": component_status,
+        "reranker": reranker.get_stats() if reranker else None
     }
 
 
@@ -2377,16 +2708,29 @@ async def search_memory(request: SearchMemoryRequest):
             print(f"   🔻 阈值过滤: {before_filter} → {len(results)} 条 (阈值={threshold}, 基于相似度)")
 
         # CrossEncoder 精排：模型缺失/失败时保守回退粗排
+        # 粗排第 top_k / top_k+1 名分差足够大时跳过；模型推理放到线程里，避免阻塞事件循环
         rerank_top_n = search_config.get('rerank_top_n', 20)
+        rerank_info = None
         if search_config.get('enable_reranker', False) and reranker and reranker.is_available() and results:
             try:
                 candidates = results[:max(rerank_top_n, request.top_k)]
-                results = reranker.rerank(request.query, candidates, top_k=request.top_k)
-                for item in results:
+                for item in candidates:
                     item['coarse_score'] = item.get('coarse_score', item.get('final_score', 0))
-                    if item.get('rerank_score') is not None:
-                        item['final_score'] = item['rerank_score']
-                reranker_used = True
+                results, rerank_info = await asyncio.to_thread(
+                    reranker.rerank_with_info,
+                    request.query,
+                    candidates,
+                    top_k=request.top_k,
+                    skip_gap=search_config.get('rerank_skip_gap', 0.15)
+                )
+                if not rerank_info['skipped']:
+                    for item in results:
+                        if item.get('rerank_score') is not None:
+                            item['final_score'] = item['rerank_score']
+                    reranker_used = True
+                    print(f"   🎯 重排序: {rerank_info['pairs']} 对, 缓存命中 {rerank_info['cache_hits']}, {rerank_info['latency_ms']:.1f}ms")
+                else:
+                    print(f"   🎯 重排序跳过: 粗排第 {request.top_k}/{request.top_k + 1} 名分差已足够大")
             except Exception as e:
                 print(f"[警告] 重排序失败，回退粗排: {e}")
                 results = results[:request.top_k]
@@ -2475,7 +2819,9 @@ async def search_memory(request: SearchMemoryRequest):
             "memories": formatted_results,
             "count": len(formatted_results),
             "layers": requested_layers,
-            "reranker_used": reranker_used
+            "reranker_used": reranker_used,
+            "rerank": rerank_info,
+            "warming": _warming_components()
         }
 
     except Exception as e:
@@ -2486,35 +2832,60 @@ async def search_memory(request: SearchMemoryRequest):
 async def list_memories(
     user_id: Optional[str] = USER_ID,
     limit: int = Query(0, ge=0, description="返回数量，0 表示不限制"),
+    offset: int = Query(0, ge=0, description="分页偏移（按 sort 排序后）"),
     status: Optional[str] = Query(None, description="状态过滤: active/archived/deleted"),
     layer: Optional[str] = Query(None, description="生命周期层过滤: WorkingMemory/LongTermMemory/UserMemory"),
+    memory_type: Optional[str] = Query(None, description="记忆类型过滤"),
+    keyword: Optional[str] = Query(None, description="内容关键词（子串匹配，不区分大小写）"),
+    sort: Optional[str] = Query(None, description="排序: created_desc / updated_desc，不传保持存储顺序"),
     include_deleted: bool = Query(False, description="是否包含软删除记忆")
 ):
-    """列出记忆，默认只返回 active；传 status=archived 可查看归档。"""
+    """列出记忆，默认只返回 active；传 status=archived 可查看归档。
+
+    传 offset/keyword/sort 时在服务端过滤、排序并分页，只返回当前页，
+    total_count 为过滤后的总数（供 WebUI 分页，避免拉取全部记忆）。
+    """
     try:
         memories = []
         total_count = 0
         normalized_layer = normalize_layer(layer, default='LongTermMemory') if layer else None
         include_archived = status == 'archived'
         include_deleted_effective = include_deleted or status == 'deleted'
+        paged = bool(offset or keyword or sort)
 
         if qdrant_client and qdrant_client.is_available():
-            fetch_limit = None if limit == 0 else limit
-            memories = qdrant_client.get_all_memories(
-                user_id=user_id,
-                limit=fetch_limit,
-                include_deleted=include_deleted_effective,
-                include_archived=include_archived,
-                status=status,
-                layer=normalized_layer
-            )
-            total_count = qdrant_client.count_memories(
-                user_id=user_id,
-                include_deleted=include_deleted_effective,
-                include_archived=include_archived,
-                status=status,
-                layer=normalized_layer
-            )
+            if paged:
+                # 过滤、排序在 Qdrant 完成，只读取当前页
+                memories, total_count = qdrant_client.list_memories_page(
+                    user_id=user_id,
+                    offset=offset,
+                    limit=limit,
+                    include_deleted=include_deleted_effective,
+                    include_archived=include_archived,
+                    status=status,
+                    memory_type=memory_type,
+                    layer=normalized_layer,
+                    keyword=keyword,
+                    sort=sort
+                )
+            else:
+                memories = qdrant_client.get_all_memories(
+                    user_id=user_id,
+                    limit=limit or None,
+                    include_deleted=include_deleted_effective,
+                    include_archived=include_archived,
+                    status=status,
+                    memory_type=memory_type,
+                    layer=normalized_layer
+                )
+                total_count = qdrant_client.count_memories(
+                    user_id=user_id,
+                    include_deleted=include_deleted_effective,
+                    include_archived=include_archived,
+                    status=status,
+                    memory_type=memory_type,
+                    layer=normalized_layer
+                )
 
         results = [
             {
@@ -2539,6 +2910,7 @@ async def list_memories(
             "user_id": user_id,
             "count": len(results),
             "total_count": total_count,
+            "offset": offset,
             "status": status or 'active',
             "layer": normalized_layer,
             "memories": results
@@ -2778,13 +3150,22 @@ def dispose_merged_duplicate(
         'deduplicate_action': duplicate_action,
         'deduplicate_similarity': round(similarity, 4) if similarity is not None else None,
     }
-    if not qdrant_client.update_memory(duplicate_id, merge_metadata):
-        return False
-
-    if duplicate_action == "archive":
-        success = qdrant_client.archive_memory(duplicate_id, reason='deduplicate')
+    if hasattr(qdrant_client, 'archive_memories_batch'):
+        # 合并元数据与状态变更一次写入
+        if duplicate_action == "archive":
+            success = qdrant_client.archive_memories_batch(
+                [duplicate_id], reason='deduplicate', extra_payload=merge_metadata) == 1
+        else:
+            success = qdrant_client.soft_delete_memories_batch(
+                [duplicate_id], reason='deduplicate', extra_payload=merge_metadata) == 1
     else:
-        success = qdrant_client.soft_delete_memory(duplicate_id, reason='deduplicate')
+        if not qdrant_client.update_memory(duplicate_id, merge_metadata):
+            return False
+
+        if duplicate_action == "archive":
+            success = qdrant_client.archive_memory(duplicate_id, reason='deduplicate')
+        else:
+            success = qdrant_client.soft_delete_memory(duplicate_id, reason='deduplicate')
 
     if success:
         remove_bm25_document(duplicate_id)
@@ -3175,14 +3556,19 @@ async def reclassify_all_memories(
         # 归档原记忆：重新分类是自动整理流程，保留可恢复性，不走人工软删除语义
         if original_ids_to_delete:
             print(f"\n🗄️ 归档 {len(original_ids_to_delete)} 条原记忆...")
-            for memory_id in original_ids_to_delete:
-                if hasattr(qdrant_client, 'archive_memory'):
-                    qdrant_client.archive_memory(memory_id, reason='reclassified')
-                elif hasattr(qdrant_client, 'soft_delete_memory'):
-                    qdrant_client.soft_delete_memory(memory_id, reason='reclassified')
-                else:
-                    qdrant_client.delete_memory(memory_id)
-                remove_bm25_document(memory_id)
+            if hasattr(qdrant_client, 'archive_memories_batch'):
+                qdrant_client.archive_memories_batch(original_ids_to_delete, reason='reclassified')
+                for memory_id in original_ids_to_delete:
+                    remove_bm25_document(memory_id)
+            else:
+                for memory_id in original_ids_to_delete:
+                    if hasattr(qdrant_client, 'archive_memory'):
+                        qdrant_client.archive_memory(memory_id, reason='reclassified')
+                    elif hasattr(qdrant_client, 'soft_delete_memory'):
+                        qdrant_client.soft_delete_memory(memory_id, reason='reclassified')
+                    else:
+                        qdrant_client.delete_memory(memory_id)
+                    remove_bm25_document(memory_id)
 
         print(f"\n{'='*60}")
         print(f"✅ [完成] 重新分类完成！")
@@ -3991,6 +4377,16 @@ async def get_memory_evolution_status():
     return get_evolution_status_snapshot()
 
 
+@app.get("/embedding/migration")
+async def get_embedding_migration_status():
+    """更换 Embedding 模型后的后台重嵌入进度（吞吐量、预计剩余时间）。"""
+    return {
+        "collection": qdrant_client.physical_collection() if qdrant_client and qdrant_client.is_available() else None,
+        "state": component_status.get('embedding_migration', {}).get('state'),
+        "migration": embedding_migration.status() if embedding_migration else None,
+    }
+
+
 @app.post("/memory/evolve")
 async def trigger_memory_evolution(
     user_id: str = Query(default=USER_ID),
@@ -5,11 +5,14 @@
 """
 
 import json
+import time
+import asyncio
 import logging
+from collections import OrderedDict
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional, AsyncGenerator
+from typing import List, Dict, Any, Optional, AsyncGenerator, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,7 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     messages: List[ChatMessage] = Field(..., description="对话历史")
     user_id: str = Field(default="feiniu_default", description="用户 ID")
+    conversation_id: Optional[str] = Field(default=None, description="会话 ID（默认按用户）")
     
     # 记忆检索配置
     use_memory: bool = Field(default=True, description="是否使用记忆")
@@ -64,6 +68,23 @@ async def chat_completions(request: ChatRequest):
     4. 调用 LLM 生成回复
     5. 可选保存对话到记忆
     """
+    if _chat_engine is not None:
+        options = dict(
+            use_memory=request.use_memory,
+            memory_top_k=request.memory_top_k,
+            use_graph=request.use_graph,
+            save_to_memory=request.save_to_memory,
+            conversation_id=request.conversation_id,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens
+        )
+        if request.stream:
+            return StreamingResponse(
+                _chat_engine.stream_chat(request.messages, request.user_id, **options),
+                media_type="text/event-stream"
+            )
+        return await _chat_engine.chat(request.messages, request.user_id, **options)
+    
     if request.stream:
         return StreamingResponse(
             _stream_chat(request),
@@ -134,19 +155,54 @@ async def get_chat_history(
 
 # ==================== 记忆增强 Chat 实现 ====================
 
+DEFAULT_RETRIEVAL_BUDGET = 0.35   # 从请求到达起等待记忆检索的最长时间（秒）
+MAX_RETRIEVAL_WAIT = 3.0          # 没有上一轮记忆可用时，最多等待检索的时间（秒）
+MAX_CACHED_CONVERSATIONS = 256    # 缓存“上一轮记忆”的会话数上限
+MAX_HISTORY_CHARS = 8000          # 发给 LLM 的历史消息总字数上限
+
+_chat_engine: Optional["MemoryEnhancedChat"] = None
+
+
+def configure_chat(engine: Optional["MemoryEnhancedChat"]):
+    """主服务器创建 MemoryEnhancedChat 后注册到 /chat/completions；未注册时返回占位回复"""
+    global _chat_engine
+    _chat_engine = engine
+
+
 class MemoryEnhancedChat:
-    """记忆增强的对话类"""
+    """记忆增强的对话类
+
+    请求一到就启动记忆检索，与提示组装并行；检索超过延迟预算时，
+    直接使用该会话上一轮检索到的记忆（检索完成后再刷新缓存，供下一轮使用）；
+    会话第一轮没有上一轮记忆，则继续等待检索，最多 MAX_RETRIEVAL_WAIT 秒。
+    对话写回记忆交给调度器后台执行，不占用请求路径。
+    """
     
-    def __init__(self, mos, llm_config: Dict[str, Any]):
+    def __init__(
+        self,
+        mos,
+        llm_config: Dict[str, Any],
+        scheduler=None,
+        retrieval_budget: float = DEFAULT_RETRIEVAL_BUDGET,
+        prefetch: bool = True
+    ):
         """
         初始化
         
         Args:
             mos: MOS 实例
             llm_config: LLM 配置
+            scheduler: MemScheduler 实例（已注册 add_memory 处理器），为空时用后台协程保存
+            retrieval_budget: 检索延迟预算（秒）
+            prefetch: False 时退回“先检索、再组装”的串行流程（用于对比）
         """
         self.mos = mos
         self.llm_config = llm_config
+        self.scheduler = scheduler
+        self.retrieval_budget = retrieval_budget
+        self.prefetch = prefetch
+        self._last_memories: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._background: Set[asyncio.Task] = set()
     
     async def chat(
         self,
@@ -156,6 +212,7 @@ class MemoryEnhancedChat:
         memory_top_k: int = 5,
         use_graph: bool = False,
         save_to_memory: bool = True,
+        conversation_id: Optional[str] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -168,64 +225,213 @@ class MemoryEnhancedChat:
             memory_top_k: 检索数量
             use_graph: 使用图增强
             save_to_memory: 保存到记忆
+            conversation_id: 会话 ID（用于上一轮记忆缓存，默认按用户）
             **kwargs: LLM 参数
         
         Returns:
             对话结果
         """
-        # 1. 提取用户最新消息作为查询
-        query = ""
-        for msg in reversed(messages):
-            if msg.role == "user":
-                query = msg.content
-                break
-        
+        query = self._latest_query(messages)
         if not query:
             return {
                 "message": {"role": "assistant", "content": "请输入您的问题"},
                 "memory_context": []
             }
         
-        # 2. 检索相关记忆
-        memory_context = []
-        if use_memory and self.mos:
-            memories = await self.mos.search(
+        # 1. 检索与提示组装并行
+        memory_context, api_messages, timing = await self._prepare(
+            query, messages, user_id, conversation_id,
+            use_memory, memory_top_k, use_graph
+        )
+        
+        # 2. 调用 LLM
+        response_content = await self._call_llm(api_messages, **kwargs)
+        
+        # 3. 后台保存对话到记忆
+        if save_to_memory:
+            await self._schedule_save(query, response_content, user_id)
+        
+        return {
+            "message": {"role": "assistant", "content": response_content},
+            "memory_context": memory_context,
+            "timing": timing
+        }
+
+    @staticmethod
+    def _latest_query(messages: List[ChatMessage]) -> str:
+        """用户最新一条消息作为检索查询"""
+        for msg in reversed(messages):
+            if msg.role == "user":
+                return msg.content
+        return ""
+
+    async def _prepare(
+        self,
+        query: str,
+        messages: List[ChatMessage],
+        user_id: str,
+        conversation_id: Optional[str],
+        use_memory: bool,
+        memory_top_k: int,
+        use_graph: bool
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]], Dict[str, Any]]:
+        """启动检索 → 组装不依赖记忆的消息 → 在预算内取回记忆 → 生成最终消息"""
+        started = time.perf_counter()
+        key = conversation_id or user_id
+        
+        task = None
+        if use_memory and self.mos and query:
+            task = asyncio.create_task(self.mos.search(
                 query=query,
                 user_id=user_id,
                 top_k=memory_top_k,
                 use_graph=use_graph
-            )
-            memory_context = memories
+            ))
+            if not self.prefetch:
+                await asyncio.wait({task})
         
-        # 3. 构建增强提示
-        system_prompt = self._build_system_prompt(memory_context)
+        history = await self._assemble_history(messages)
+        assembled_at = time.perf_counter()
         
-        # 4. 调用 LLM
-        response_content = await self._call_llm(
-            messages, system_prompt, **kwargs
-        )
+        memory_context, fallback = await self._collect_memories(task, key, started)
+        ready_at = time.perf_counter()
         
-        # 5. 保存对话到记忆（可选）
-        if save_to_memory and self.mos:
-            # 保存用户消息
-            await self.mos.add(
-                content=f"用户说：{query}",
-                user_id=user_id,
-                memory_type="conversation",
-                importance=0.5
-            )
-            # 保存助手回复
-            await self.mos.add(
-                content=f"AI回复：{response_content[:200]}...",
-                user_id=user_id,
-                memory_type="conversation",
-                importance=0.3
-            )
+        system_prompt = self._build_system_prompt(memory_context)
+        if history and history[0]["role"] == "system":
+            system_prompt = f"{history[0]['content']}\n\n{system_prompt}"
+            history = history[1:]
+        api_messages = [{"role": "system", "content": system_prompt}] + history
         
-        return {
-            "message": {"role": "assistant", "content": response_content},
-            "memory_context": memory_context
+        timing = {
+            "assemble_ms": round((assembled_at - started) * 1000, 2),
+            "memory_wait_ms": round((ready_at - assembled_at) * 1000, 2),
+            "prepare_ms": round((time.perf_counter() - started) * 1000, 2),
+            "memory_fallback": fallback,
         }
+        return memory_context, api_messages, timing
+
+    async def _assemble_history(self, messages: List[ChatMessage]) -> List[Dict[str, str]]:
+        """组装不依赖记忆的对话消息（检索进行期间执行）
+
+        去掉空消息，客户端自带的 system 消息合并到最前面；其余消息从最新往前保留，
+        总字数不超过 MAX_HISTORY_CHARS（最新一条始终保留）。
+        """
+        system_parts = [m.content for m in messages if m.role == "system" and m.content.strip()]
+        dialog = [m for m in messages if m.role != "system" and m.content.strip()]
+        
+        kept = []
+        total = sum(len(part) for part in system_parts)
+        for msg in reversed(dialog):
+            if kept and total + len(msg.content) > MAX_HISTORY_CHARS:
+                break
+            kept.append({"role": msg.role, "content": msg.content})
+            total += len(msg.content)
+        kept.reverse()
+        
+        if system_parts:
+            kept.insert(0, {"role": "system", "content": "\n\n".join(system_parts)})
+        return kept
+
+    async def _collect_memories(
+        self,
+        task: Optional[asyncio.Task],
+        key: str,
+        started: float
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        取回检索结果
+
+        Returns:
+            (记忆列表, 是否使用了上一轮缓存)
+        """
+        if task is None:
+            return [], False
+        
+        remaining = max(self.retrieval_budget - (time.perf_counter() - started), 0)
+        done, _ = await asyncio.wait({task}, timeout=None if not self.prefetch else remaining)
+        
+        if task in done:
+            try:
+                memories = task.result() or []
+            except Exception as e:
+                logger.warning(f"记忆检索失败，使用上一轮记忆: {e}")
+                return list(self._last_memories.get(key, [])), True
+            self._remember(key, memories)
+            return memories, False
+        
+        if key not in self._last_memories:
+            # 会话第一轮没有可替代的记忆：继续等检索，直到硬上限
+            remaining = max(MAX_RETRIEVAL_WAIT - (time.perf_counter() - started), 0)
+            done, _ = await asyncio.wait({task}, timeout=remaining)
+            if task in done:
+                try:
+                    memories = task.result() or []
+                except Exception as e:
+                    logger.warning(f"记忆检索失败: {e}")
+                    return [], False
+                self._remember(key, memories)
+                return memories, False
+        
+        # 超出预算：先用上一轮的记忆，检索完成后刷新缓存
+        task.add_done_callback(lambda t: self._remember_task_result(key, t))
+        logger.info(f"记忆检索超过 {self.retrieval_budget * 1000:.0f}ms 预算，使用上一轮记忆")
+        return list(self._last_memories.get(key, [])), True
+
+    def _remember(self, key: str, memories: List[Dict[str, Any]]):
+        self._last_memories[key] = memories
+        self._last_memories.move_to_end(key)
+        while len(self._last_memories) > MAX_CACHED_CONVERSATIONS:
+            self._last_memories.popitem(last=False)
+
+    def _remember_task_result(self, key: str, task: asyncio.Task):
+        if task.cancelled() or task.exception() is not None:
+            return
+        self._remember(key, task.result() or [])
+
+    async def _schedule_save(self, query: str, response_content: str, user_id: str):
+        """把本轮对话交给调度器后台写入记忆"""
+        if not self.mos and not self.scheduler:
+            return
+        
+        entries = [
+            (f"用户说：{query}", 0.5),
+            (f"AI回复：{response_content[:200]}...", 0.3),
+        ]
+        if self.scheduler:
+            try:
+                from core.scheduler import TaskPriority
+                for content, importance in entries:
+                    await self.scheduler.submit(
+                        'add_memory',
+                        {
+                            'content': content,
+                            'user_id': user_id,
+                            'memory_type': 'conversation',
+                            'importance': importance
+                        },
+                        priority=TaskPriority.LOW,
+                        user_id=user_id
+                    )
+                return
+            except Exception as e:
+                logger.warning(f"提交保存任务失败，改用后台协程: {e}")
+        
+        if self.mos:
+            task = asyncio.create_task(self._save_exchange(entries, user_id))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def _save_exchange(self, entries: List[Tuple[str, float]], user_id: str):
+        for content, importance in entries:
+            try:
+                await self.mos.add(
+                    content=content,
+                    user_id=user_id,
+                    memory_type="conversation",
+                    importance=importance
+                )
+            except Exception as e:
+                logger.error(f"保存对话到记忆失败: {e}")
     
     def _build_system_prompt(
         self,
@@ -252,22 +458,13 @@ class MemoryEnhancedChat:
     
     async def _call_llm(
         self,
-        messages: List[ChatMessage],
-        system_prompt: str,
+        api_messages: List[Dict[str, str]],
         **kwargs
     ) -> str:
         """调用 LLM"""
         import aiohttp
         
         try:
-            # 构建消息
-            api_messages = [{"role": "system", "content": system_prompt}]
-            for msg in messages:
-                api_messages.append({
-                    "role": msg.role,
-                    "content": msg.content
-                })
-            
             async with aiohttp.ClientSession() as session:
                 headers = {
                     "Authorization": f"Bearer {self.llm_config.get('api_key', '')}",
@@ -305,70 +502,68 @@ class MemoryEnhancedChat:
         **kwargs
     ) -> AsyncGenerator[str, None]:
         """流式对话"""
-        import aiohttp
-        
-        # 检索记忆
-        query = ""
-        for msg in reversed(messages):
-            if msg.role == "user":
-                query = msg.content
-                break
-        
-        memory_context = []
-        if kwargs.get('use_memory', True) and self.mos:
-            memories = await self.mos.search(
-                query=query,
-                user_id=user_id,
-                top_k=kwargs.get('memory_top_k', 5)
-            )
-            memory_context = memories
+        query = self._latest_query(messages)
+        memory_context, api_messages, timing = await self._prepare(
+            query, messages, user_id, kwargs.get('conversation_id'),
+            kwargs.get('use_memory', True), kwargs.get('memory_top_k', 5),
+            kwargs.get('use_graph', False)
+        )
         
         # 发送记忆上下文
-        yield f"data: {json.dumps({'type': 'memory', 'data': memory_context})}\n\n"
-        
-        # 构建提示
-        system_prompt = self._build_system_prompt(memory_context)
-        api_messages = [{"role": "system", "content": system_prompt}]
-        for msg in messages:
-            api_messages.append({"role": msg.role, "content": msg.content})
+        yield f"data: {json.dumps({'type': 'memory', 'data': memory_context, 'timing': timing})}\n\n"
         
         # 流式调用 LLM
+        response_parts = []
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Bearer {self.llm_config.get('api_key', '')}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": self.llm_config.get('model', ''),
-                    "messages": api_messages,
-                    "temperature": kwargs.get('temperature', 0.7),
-                    "max_tokens": kwargs.get('max_tokens', 2000),
-                    "stream": True
-                }
-                
-                async with session.post(
-                    f"{self.llm_config.get('base_url', '')}/chat/completions",
-                    headers=headers,
-                    json=payload
-                ) as resp:
-                    async for line in resp.content:
-                        line = line.decode('utf-8').strip()
-                        if line.startswith('data: '):
-                            data = line[6:]
-                            if data == '[DONE]':
-                                break
-                            try:
-                                chunk = json.loads(data)
-                                content = chunk['choices'][0].get('delta', {}).get('content', '')
-                                if content:
-                                    yield f"data: {json.dumps({'type': 'content', 'data': content})}\n\n"
-                            except:
-                                pass
-                        
+            async for content in self._stream_llm(api_messages, **kwargs):
+                response_parts.append(content)
+                yield f"data: {json.dumps({'type': 'content', 'data': content})}\n\n"
         except Exception as e:
             logger.error(f"流式调用失败: {e}")
             yield f"data: {json.dumps({'type': 'error', 'data': str(e)})}\n\n"
         
         yield f"data: {json.dumps({'type': 'end'})}\n\n"
+        
+        if kwargs.get('save_to_memory', True) and query and response_parts:
+            await self._schedule_save(query, "".join(response_parts), user_id)
+
+    async def _stream_llm(
+        self,
+        api_messages: List[Dict[str, str]],
+        **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """流式调用 LLM，逐段产出文本"""
+        import aiohttp
+        
+        async with aiohttp.ClientSession() as session:
+            headers = {
+                "Authorization": f"Bearer {self.llm_config.get('api_key', '')}",
+                "Content-Type": "application/json"
+            }
+            
+            payload = {
+                "model": self.llm_config.get('model', ''),
+                "messages": api_messages,
+                "temperature": kwargs.get('temperature', 0.7),
+                "max_tokens": kwargs.get('max_tokens', 2000),
+                "stream": True
+            }
+            
+            async with session.post(
+                f"{self.llm_config.get('base_url', '')}/chat/completions",
+                headers=headers,
+                json=payload
+            ) as resp:
+                async for line in resp.content:
+                    line = line.decode('utf-8').strip()
+                    if line.startswith('data: '):
+                        data = line[6:]
+                        if data == '[DONE]':
+                            break
+                        try:
+                            chunk = json.loads(data)
+                            content = chunk['choices'][0].get('delta', {}).get('content', '')
+                            if content:
+                                yield content
+                        except:
+                            pass
@@ -8,7 +8,7 @@
 
 import logging
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -86,13 +86,23 @@ class MemoryEvolution:
             return stats
 
         archived_ids = set()
-        for mem in memories:
+        touched_ids = set()  # 本轮作为保留条目被改写过的，需要重新读取
+        prefetched: Dict[str, Dict[str, Any]] = {}
+        chunk_size = 256
+        for index, mem in enumerate(memories):
             mem_id = mem.get("id")
             if not mem_id or mem_id in archived_ids:
                 continue
 
             try:
-                full_mem = self.qdrant_client.get_memory(mem_id)
+                # 向量按块一次 retrieve，而不是每条记忆一次 get_memory
+                if index % chunk_size == 0 or str(mem_id) not in prefetched:
+                    chunk_ids = [m.get("id") for m in memories[index:index + chunk_size] if m.get("id")]
+                    prefetched = self.qdrant_client.get_memories(chunk_ids, with_vectors=True)
+                if mem_id in touched_ids:
+                    full_mem = self.qdrant_client.get_memory(mem_id)
+                else:
+                    full_mem = prefetched.get(str(mem_id))
                 vector = (full_mem or {}).get("vector")
                 if not vector:
                     continue
@@ -140,6 +150,7 @@ class MemoryEvolution:
                     reason=f"memory_evolution_merge:{keeper_id}",
                 ):
                     archived_ids.add(duplicate_id)
+                    touched_ids.add(keeper_id)
                     stats["merged"] += 1
                 else:
                     stats["failed"] += 1
@@ -181,6 +192,9 @@ class MemoryEvolution:
         stats["archived"] += merge_stats["merged"]
         stats["failed"] += merge_stats["failed"]
 
+        # 归档和字段更新先收集，最后各用一次批量请求写回
+        archive_ids: List[str] = []
+        pending_updates: List[Tuple[str, Dict[str, Any]]] = []
         for mem in memories:
             mem_id = mem.get("id")
             payload = mem.get("payload", {}) or {}
@@ -224,11 +238,7 @@ class MemoryEvolution:
                 and age_days >= settings["archive_days"]
                 and importance < settings["archive_importance"]
             ):
-                ok = self.qdrant_client.archive_memory(mem_id, reason="memory_evolution")
-                if ok:
-                    stats["archived"] += 1
-                    continue
-                stats["failed"] += 1
+                archive_ids.append(mem_id)
                 continue
 
             if layer != "UserMemory" and settings["decay_rate"] > 0 and importance > settings["decay_floor"]:
@@ -238,9 +248,14 @@ class MemoryEvolution:
                     stats["decayed"] += 1
 
             if updates:
-                ok = self.qdrant_client.update_memory(mem_id, updates)
-                if not ok:
-                    stats["failed"] += 1
+                pending_updates.append((mem_id, updates))
+
+        if archive_ids:
+            archived = self.qdrant_client.archive_memories_batch(archive_ids, reason="memory_evolution")
+            stats["archived"] += archived
+            stats["failed"] += len(archive_ids) - archived
+        if pending_updates:
+            stats["failed"] += len(pending_updates) - self.qdrant_client.update_memories_batch(pending_updates)
 
         logger.info("记忆演化完成: %s", stats)
         return stats
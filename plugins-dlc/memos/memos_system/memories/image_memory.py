@@ -237,15 +237,29 @@ class ImageMemory:
         if not self.vector_storage or not self.vector_storage.is_available():
             return 0
         
+        # 只查缺描述的图片，一次批量 retrieve
+        missing_ids = [
+            image_id for image_id, metadata in self.metadata_cache.items()
+            if not (metadata.description and metadata.description.strip())
+        ]
+        if not missing_ids:
+            return 0
+        records = None
+        if hasattr(self.vector_storage, 'get_memories'):
+            try:
+                records = self.vector_storage.get_memories(missing_ids)
+            except Exception as e:
+                logger.debug(f"批量读取图片记录失败: {e}")
+        
         recovered_count = 0
-        for image_id, metadata in self.metadata_cache.items():
-            # 如果已经有描述，跳过
-            if metadata.description and metadata.description.strip():
-                continue
-            
+        for image_id in missing_ids:
+            metadata = self.metadata_cache[image_id]
             try:
                 # 从 Qdrant 获取记录
-                record = self.vector_storage.get_memory(image_id)
+                if records is not None:
+                    record = records.get(str(image_id))
+                else:
+                    record = self.vector_storage.get_memory(image_id)
                 if record:
                     # get_memory 返回 {'id': ..., 'content': ..., 'payload': ...}
                     content = record.get('content', '')
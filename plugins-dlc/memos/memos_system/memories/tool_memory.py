@@ -12,6 +12,8 @@ from enum import Enum
 
 from pydantic import BaseModel, Field
 
+from .tool_usage_store import ToolUsageStore, event_from_qdrant_point, encode_param_value
+
 logger = logging.getLogger(__name__)
 
 
@@ -85,68 +87,125 @@ class ToolPreference(BaseModel):
 
 
 class ToolMemory:
-    """工具记忆管理器"""
+    """工具记忆管理器
+
+    使用记录写入独立的 SQLite 存储（见 tool_usage_store.py），
+    不再占用 memories 向量集合；偏好统计直接由预聚合表加载。
+    """
+    
+    # 每个参数保留的常用值数量
+    MAX_PARAM_VALUES = 10
     
     def __init__(
         self,
         user_id: str,
         vector_storage=None,
-        max_records: int = 1000
+        max_records: int = 1000,
+        store_path: Optional[str] = None
     ):
         """
         初始化工具记忆
         
         Args:
             user_id: 用户 ID
-            vector_storage: 向量存储
-            max_records: 最大记录数
+            vector_storage: 向量存储（仅用于迁移旧版写入的 tool_usage 点）
+            max_records: 单次查询返回的最大记录数
+            store_path: SQLite 文件路径，None 时使用内存库
         """
         self.user_id = user_id
         self.vector_storage = vector_storage
         self.max_records = max_records
+        self.store = ToolUsageStore(store_path or ":memory:")
         
-        # 使用记录
-        self.usage_records: List[ToolUsageRecord] = []
-        
-        # 工具偏好缓存
+        # 工具偏好缓存（由聚合表加载并增量维护）
         self.tool_preferences: Dict[str, ToolPreference] = {}
         
+        # 参数频次 {tool_name: {param_key: {value_json: [value, count, last_used_at]}}}
+        self._param_freq: Dict[str, Dict[str, Dict[str, list]]] = {}
+        
         self._loaded = False
     
     async def load(self):
-        """加载历史记录"""
+        """加载聚合统计（并迁移旧版写入向量库的记录）"""
         if self._loaded:
             return
         
-        if self.vector_storage and self.vector_storage.is_available():
-            results = self.vector_storage.get_all_memories(
-                user_id=self.user_id,
-                limit=self.max_records
+        self.migrate_from_vector_storage()
+        
+        for row in self.store.load_stats(self.user_id):
+            try:
+                category = ToolCategory(row.get('tool_category', 'other'))
+            except ValueError:
+                category = ToolCategory.OTHER
+            use_count = row.get('use_count', 0)
+            success_count = row.get('success_count', 0)
+            self.tool_preferences[row['tool_name']] = ToolPreference(
+                tool_name=row['tool_name'],
+                tool_category=category,
+                use_count=use_count,
+                success_count=success_count,
+                success_rate=success_count / use_count if use_count > 0 else 1.0,
+                first_used_at=datetime.fromisoformat(row['first_used_at']),
+                last_used_at=datetime.fromisoformat(row['last_used_at'])
             )
-            
-            for result in results:
-                payload = result.get('payload', {})
-                if payload.get('memory_type') == 'tool_usage':
-                    try:
-                        record = ToolUsageRecord(
-                            id=result['id'],
-                            tool_name=payload.get('tool_name', ''),
-                            tool_category=ToolCategory(payload.get('tool_category', 'other')),
-                            parameters=payload.get('parameters', {}),
-                            success=payload.get('success', True),
-                            result_summary=payload.get('result_summary'),
-                            context=payload.get('context'),
-                            user_intent=payload.get('user_intent')
-                        )
-                        self.usage_records.append(record)
-                        
-                        # 更新偏好
-                        self._update_preference_from_record(record)
-                    except Exception as e:
-                        logger.warning(f"加载工具记录失败: {e}")
+        
+        for tool_name, key, value, count, last_used_at in self.store.load_param_frequencies(self.user_id):
+            self._param_freq.setdefault(tool_name, {}).setdefault(key, {})[
+                encode_param_value(value)
+            ] = [value, count, last_used_at]
+        for tool_name in self._param_freq:
+            self._refresh_common_parameters(tool_name)
         
         self._loaded = True
-        logger.info(f"加载 {len(self.usage_records)} 条工具使用记录")
+        total = sum(p.use_count for p in self.tool_preferences.values())
+        logger.info(f"加载 {len(self.tool_preferences)} 个工具的统计，共 {total} 次使用")
+    
+    def migrate_from_vector_storage(self) -> int:
+        """把旧版以零向量写入 memories 集合的 tool_usage 点迁出
+        
+        先写入 SQLite（重复 id 会被忽略），再从向量库删除，可重复执行。
+        
+        Returns:
+            迁出的点数量
+        """
+        if not self.vector_storage or not self.vector_storage.is_available():
+            return 0
+        
+        try:
+            points = self.vector_storage.get_all_memories(
+                memory_type='tool_usage',
+                limit=0,
+                include_archived=True,
+                include_deleted=True
+            )
+        except Exception as e:
+            logger.warning(f"读取旧版工具记录失败: {e}")
+            return 0
+        
+        if not points:
+            return 0
+        
+        events = []
+        converted_ids = []
+        skipped_ids = []
+        for point in points:
+            event = event_from_qdrant_point(point, self.user_id)
+            if event:
+                events.append(event)
+                converted_ids.append(point['id'])
+            else:
+                skipped_ids.append(point['id'])
+        
+        if skipped_ids:
+            logger.warning(f"{len(skipped_ids)} 个旧版工具记录无法转换（缺少 tool_name 等字段），保留在向量库: {skipped_ids[:10]}")
+        if not events:
+            return 0
+        
+        inserted = self.store.append_many(events)
+        # 只删除已写入 SQLite 的点，无法转换的点原样保留
+        deleted = self.vector_storage.delete_memories_batch(converted_ids)
+        logger.info(f"迁移旧版工具记录: 写入 {inserted} 条，从向量库移除 {deleted} 个点")
+        return deleted
     
     def _update_preference_from_record(self, record: ToolUsageRecord):
         """根据记录更新偏好"""
@@ -166,14 +225,27 @@ class ToolMemory:
         pref.success_rate = pref.success_count / pref.use_count
         pref.last_used_at = record.used_at
         
-        # 记录常用参数
+        # 记录参数频次
+        used_at = record.used_at.isoformat()
+        tool_params = self._param_freq.setdefault(tool_name, {})
         for key, value in record.parameters.items():
-            if key not in pref.common_parameters:
-                pref.common_parameters[key] = []
-            if value not in pref.common_parameters[key]:
-                pref.common_parameters[key].append(value)
-                # 只保留最近 10 个值
-                pref.common_parameters[key] = pref.common_parameters[key][-10:]
+            entry = tool_params.setdefault(str(key), {}).setdefault(
+                encode_param_value(value), [value, 0, used_at]
+            )
+            entry[1] += 1
+            entry[2] = max(entry[2], used_at)
+        self._refresh_common_parameters(tool_name)
+    
+    def _refresh_common_parameters(self, tool_name: str):
+        """按出现次数（其次最近使用）取每个参数的常用值"""
+        pref = self.tool_preferences.get(tool_name)
+        if not pref:
+            return
+        common = {}
+        for key, values in self._param_freq.get(tool_name, {}).items():
+            ranked = sorted(values.values(), key=lambda v: (v[1], v[2]), reverse=True)
+            common[key] = [v[0] for v in ranked[:self.MAX_PARAM_VALUES]]
+        pref.common_parameters = common
     
     async def record_usage(
         self,
@@ -212,40 +284,17 @@ class ToolMemory:
             user_intent=user_intent
         )
         
-        self.usage_records.append(record)
-        self._update_preference_from_record(record)
-        
         # 存储
         await self._save_record(record)
-        
-        # 清理旧记录
-        if len(self.usage_records) > self.max_records:
-            self.usage_records = self.usage_records[-self.max_records:]
+        self._update_preference_from_record(record)
         
         return record
     
     async def _save_record(self, record: ToolUsageRecord):
-        """保存记录到存储"""
-        if not self.vector_storage or not self.vector_storage.is_available():
-            return
-        
-        # 构建内容
-        content = f"使用工具 {record.tool_name}"
-        if record.user_intent:
-            content += f"，意图：{record.user_intent}"
-        if record.result_summary:
-            content += f"，结果：{record.result_summary}"
-        
-        # 生成向量（使用占位向量，实际应由 embedder 生成）
-        # 工具记录主要用于统计，不依赖向量搜索
-        # 创建一个与配置维度匹配的零向量作为占位
-        vector_size = getattr(self.vector_storage, 'vector_size', 1024)
-        vector = [0.0] * vector_size
-        
-        payload = {
-            'content': content,
+        """追加记录到使用统计存储"""
+        self.store.append({
+            'id': record.id,
             'user_id': self.user_id,
-            'memory_type': 'tool_usage',
             'tool_name': record.tool_name,
             'tool_category': record.tool_category.value,
             'parameters': record.parameters,
@@ -253,10 +302,9 @@ class ToolMemory:
             'result_summary': record.result_summary,
             'context': record.context,
             'user_intent': record.user_intent,
-            'created_at': record.used_at.isoformat()
-        }
-        
-        self.vector_storage.add_memory(record.id, vector, payload)
+            'conversation_id': record.conversation_id,
+            'used_at': record.used_at.isoformat()
+        })
     
     async def get_tool_preference(
         self,
@@ -310,15 +358,34 @@ class ToolMemory:
         """
         await self.load()
         
-        records = self.usage_records
-        
-        if tool_name:
-            records = [r for r in records if r.tool_name == tool_name]
-        
-        # 按时间倒序
-        records = sorted(records, key=lambda x: x.used_at, reverse=True)
+        events = self.store.recent(
+            self.user_id,
+            tool_name=tool_name,
+            limit=min(limit, self.max_records)
+        )
         
-        return records[:limit]
+        records = []
+        for event in events:
+            try:
+                category = ToolCategory(event.get('tool_category', 'other'))
+            except ValueError:
+                category = ToolCategory.OTHER
+            try:
+                records.append(ToolUsageRecord(
+                    id=event['id'],
+                    tool_name=event['tool_name'],
+                    tool_category=category,
+                    parameters=event.get('parameters', {}),
+                    success=event.get('success', True),
+                    result_summary=event.get('result_summary'),
+                    context=event.get('context'),
+                    user_intent=event.get('user_intent'),
+                    used_at=datetime.fromisoformat(event['used_at']),
+                    conversation_id=event.get('conversation_id')
+                ))
+            except Exception as e:
+                logger.warning(f"解析工具记录失败: {e}")
+        return records
     
     async def suggest_parameters(
         self,
@@ -342,34 +409,51 @@ class ToolMemory:
         """删除工具使用记录"""
         await self.load()
         
-        # 查找并删除内存中的记录
-        original_count = len(self.usage_records)
-        self.usage_records = [r for r in self.usage_records if r.id != record_id]
+        event = self.store.delete(record_id)
+        if not event:
+            return False
         
-        if len(self.usage_records) < original_count:
-            # 从向量库删除
-            if self.vector_storage:
-                self.vector_storage.delete_memory(record_id)
-            return True
-        return False
+        tool_name = event['tool_name']
+        pref = self.tool_preferences.get(tool_name)
+        if pref:
+            pref.use_count -= 1
+            if event['success']:
+                pref.success_count -= 1
+            if pref.use_count <= 0:
+                del self.tool_preferences[tool_name]
+                self._param_freq.pop(tool_name, None)
+                return True
+            pref.success_rate = pref.success_count / pref.use_count
+        
+        tool_params = self._param_freq.get(tool_name, {})
+        for key, value in event['parameters'].items():
+            values = tool_params.get(str(key), {})
+            entry = values.get(encode_param_value(value))
+            if entry:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del values[encode_param_value(value)]
+        self._refresh_common_parameters(tool_name)
+        return True
 
     async def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
         await self.load()
         
-        total_usage = len(self.usage_records)
+        prefs = self.tool_preferences.values()
+        total_usage = sum(p.use_count for p in prefs)
         total_tools = len(self.tool_preferences)
         
         # 按类别统计
         by_category = {}
-        for pref in self.tool_preferences.values():
+        for pref in prefs:
             cat = pref.tool_category.value
             if cat not in by_category:
                 by_category[cat] = 0
             by_category[cat] += pref.use_count
         
         # 成功率
-        success_count = sum(1 for r in self.usage_records if r.success)
+        success_count = sum(p.success_count for p in prefs)
         overall_success_rate = success_count / total_usage if total_usage > 0 else 1.0
         
         return {
@@ -381,3 +465,7 @@ class ToolMemory:
                         sorted(self.tool_preferences.values(), 
                               key=lambda x: x.use_count, reverse=True)[:5]]
         }
+    
+    def close(self):
+        """关闭存储"""
+        self.store.close()
@@ -0,0 +1,323 @@
+# tool_usage_store.py - 工具使用统计存储
+"""
+工具使用记录的独立存储（SQLite）
+
+- tool_usage_events：只追加的事件表，按月份（YYYY-MM）分区，可整月清理
+- tool_stats：按工具预聚合的使用次数/成功次数/首末使用时间
+- tool_param_freq：按 (工具, 参数名, 参数值) 预聚合的出现次数
+
+事件写入与聚合更新在同一个事务里完成，统计类查询只读聚合表，
+不再需要扫描向量库或全部事件。
+"""
+
+import json
+import sqlite3
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_usage_events (
+    id TEXT PRIMARY KEY,
+    partition TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    tool_name TEXT NOT NULL,
+    tool_category TEXT NOT NULL,
+    parameters TEXT NOT NULL DEFAULT '{}',
+    success INTEGER NOT NULL DEFAULT 1,
+    result_summary TEXT,
+    context TEXT,
+    user_intent TEXT,
+    conversation_id TEXT,
+    used_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tool_usage_partition ON tool_usage_events(partition);
+CREATE INDEX IF NOT EXISTS idx_tool_usage_user_time ON tool_usage_events(user_id, used_at);
+CREATE INDEX IF NOT EXISTS idx_tool_usage_tool_time ON tool_usage_events(user_id, tool_name, used_at);
+
+CREATE TABLE IF NOT EXISTS tool_stats (
+    user_id TEXT NOT NULL,
+    tool_name TEXT NOT NULL,
+    tool_category TEXT NOT NULL,
+    use_count INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    first_used_at TEXT NOT NULL,
+    last_used_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, tool_name)
+);
+
+CREATE TABLE IF NOT EXISTS tool_param_freq (
+    user_id TEXT NOT NULL,
+    tool_name TEXT NOT NULL,
+    param_key TEXT NOT NULL,
+    param_value TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    last_used_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, tool_name, param_key, param_value)
+);
+"""
+
+
+def encode_param_value(value: Any) -> str:
+    """参数值统一编码为 JSON 文本，便于作为聚合键"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _decode_value(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except Exception:
+        return text
+
+
+class ToolUsageStore:
+    """工具使用记录的 SQLite 存储（事件 + 预聚合表）"""
+
+    def __init__(self, db_path: str):
+        """
+        初始化存储
+
+        Args:
+            db_path: SQLite 文件路径，传 ":memory:" 使用内存库
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # ==================== 写入 ====================
+
+    def append(self, event: Dict[str, Any]) -> bool:
+        """
+        追加一条使用事件并同步更新聚合表
+
+        Args:
+            event: 包含 id, user_id, tool_name, tool_category, parameters,
+                   success, result_summary, context, user_intent,
+                   conversation_id, used_at(ISO 字符串)
+
+        Returns:
+            是否新写入（重复 id 返回 False）
+        """
+        return self.append_many([event]) == 1
+
+    def append_many(self, events: List[Dict[str, Any]]) -> int:
+        """批量追加事件（单事务），返回新写入的数量"""
+        inserted = 0
+        with self._lock, self._conn:
+            for event in events:
+                if self._insert_event(event):
+                    inserted += 1
+        return inserted
+
+    def _insert_event(self, event: Dict[str, Any]) -> bool:
+        used_at = event['used_at']
+        parameters = event.get('parameters') or {}
+        success = 1 if event.get('success', True) else 0
+
+        cursor = self._conn.execute(
+            """
+            INSERT OR IGNORE INTO tool_usage_events (
+                id, partition, user_id, tool_name, tool_category, parameters,
+                success, result_summary, context, user_intent, conversation_id, used_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                event['id'], used_at[:7], event['user_id'], event['tool_name'],
+                event['tool_category'], json.dumps(parameters, ensure_ascii=False, default=str),
+                success, event.get('result_summary'), event.get('context'),
+                event.get('user_intent'), event.get('conversation_id'), used_at
+            )
+        )
+        if cursor.rowcount == 0:
+            return False
+
+        self._conn.execute(
+            """
+            INSERT INTO tool_stats (
+                user_id, tool_name, tool_category, use_count, success_count,
+                first_used_at, last_used_at
+            ) VALUES (?, ?, ?, 1, ?, ?, ?)
+            ON CONFLICT(user_id, tool_name) DO UPDATE SET
+                tool_category = excluded.tool_category,
+                use_count = use_count + 1,
+                success_count = success_count + excluded.success_count,
+                first_used_at = MIN(first_used_at, excluded.first_used_at),
+                last_used_at = MAX(last_used_at, excluded.last_used_at)
+            """,
+            (event['user_id'], event['tool_name'], event['tool_category'], success, used_at, used_at)
+        )
+
+        for key, value in parameters.items():
+            self._conn.execute(
+                """
+                INSERT INTO tool_param_freq (
+                    user_id, tool_name, param_key, param_value, count, last_used_at
+                ) VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT(user_id, tool_name, param_key, param_value) DO UPDATE SET
+                    count = count + 1,
+                    last_used_at = MAX(last_used_at, excluded.last_used_at)
+                """,
+                (event['user_id'], event['tool_name'], str(key), encode_param_value(value), used_at)
+            )
+        return True
+
+    def delete(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """
+        删除单条事件并回退聚合计数
+
+        Returns:
+            被删除的事件，不存在返回 None
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM tool_usage_events WHERE id = ?", (record_id,)
+            ).fetchone()
+            if not row:
+                return None
+            event = self._row_to_event(row)
+            self._conn.execute("DELETE FROM tool_usage_events WHERE id = ?", (record_id,))
+
+            self._conn.execute(
+                """
+                UPDATE tool_stats
+                SET use_count = use_count - 1, success_count = success_count - ?
+                WHERE user_id = ? AND tool_name = ?
+                """,
+                (1 if event['success'] else 0, event['user_id'], event['tool_name'])
+            )
+            self._conn.execute(
+                "DELETE FROM tool_stats WHERE user_id = ? AND tool_name = ? AND use_count <= 0",
+                (event['user_id'], event['tool_name'])
+            )
+            for key, value in event['parameters'].items():
+                params = (event['user_id'], event['tool_name'], str(key), encode_param_value(value))
+                self._conn.execute(
+                    """
+                    UPDATE tool_param_freq SET count = count - 1
+                    WHERE user_id = ? AND tool_name = ? AND param_key = ? AND param_value = ?
+                    """,
+                    params
+                )
+                self._conn.execute(
+                    """
+                    DELETE FROM tool_param_freq
+                    WHERE user_id = ? AND tool_name = ? AND param_key = ? AND param_value = ?
+                      AND count <= 0
+                    """,
+                    params
+                )
+            return event
+
+    def drop_partitions_before(self, partition: str) -> int:
+        """
+        清理早于指定月份（YYYY-MM）的事件分区
+
+        聚合表保留历史总量，只释放明细占用的空间。
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM tool_usage_events WHERE partition < ?", (partition,)
+            )
+            return cursor.rowcount
+
+    # ==================== 查询 ====================
+
+    def load_stats(self, user_id: str) -> List[Dict[str, Any]]:
+        """读取某用户所有工具的聚合统计"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM tool_stats WHERE user_id = ?", (user_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def load_param_frequencies(self, user_id: str) -> List[Tuple[str, str, Any, int, str]]:
+        """读取某用户的参数频次表：[(tool_name, key, value, count, last_used_at)]"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT tool_name, param_key, param_value, count, last_used_at
+                FROM tool_param_freq WHERE user_id = ?
+                """,
+                (user_id,)
+            ).fetchall()
+        return [
+            (row['tool_name'], row['param_key'], _decode_value(row['param_value']),
+             row['count'], row['last_used_at'])
+            for row in rows
+        ]
+
+    def recent(
+        self,
+        user_id: str,
+        tool_name: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """按时间倒序读取最近事件（走 user_id/tool_name + used_at 索引）"""
+        sql = "SELECT * FROM tool_usage_events WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        if tool_name:
+            sql += " AND tool_name = ?"
+            params.append(tool_name)
+        sql += " ORDER BY used_at DESC LIMIT ?"
+        params.append(max(int(limit), 0))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_event(row) for row in rows]
+
+    def count_events(self, user_id: Optional[str] = None) -> int:
+        with self._lock:
+            if user_id:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM tool_usage_events WHERE user_id = ?", (user_id,)
+                ).fetchone()
+            else:
+                row = self._conn.execute("SELECT COUNT(*) FROM tool_usage_events").fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _row_to_event(row: sqlite3.Row) -> Dict[str, Any]:
+        event = dict(row)
+        try:
+            event['parameters'] = json.loads(event.get('parameters') or '{}')
+        except Exception:
+            event['parameters'] = {}
+        event['success'] = bool(event.get('success', 1))
+        return event
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+
+
+def event_from_qdrant_point(point: Dict[str, Any], default_user_id: str) -> Optional[Dict[str, Any]]:
+    """把旧版写在 memories 集合里的 tool_usage 点转换为事件"""
+    payload = point.get('payload', {}) or {}
+    if payload.get('memory_type') != 'tool_usage' or not payload.get('tool_name'):
+        return None
+    used_at = payload.get('created_at') or datetime.now().isoformat()
+    return {
+        'id': str(point['id']),
+        'user_id': payload.get('user_id') or default_user_id,
+        'tool_name': payload.get('tool_name'),
+        'tool_category': payload.get('tool_category') or 'other',
+        'parameters': payload.get('parameters') or {},
+        'success': payload.get('success', True),
+        'result_summary': payload.get('result_summary'),
+        'context': payload.get('context'),
+        'user_intent': payload.get('user_intent'),
+        'conversation_id': payload.get('conversation_id'),
+        'used_at': str(used_at),
+    }
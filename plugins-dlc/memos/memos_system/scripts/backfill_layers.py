@@ -21,7 +21,7 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from storage.qdrant_client import MemosQdrantClient  # noqa: E402
+from storage.qdrant_client import MemosQdrantClient, resolve_server  # noqa: E402
 
 
 def load_config():
@@ -41,19 +41,22 @@ def main():
     config = load_config()
     vector_cfg = config.get("storage", {}).get("vector", {})
     embedding_cfg = config.get("embedding", {})
+    url, api_key = resolve_server(vector_cfg)
 
     client = MemosQdrantClient(
         path=resolve_path(vector_cfg.get("path", "./data/qdrant")),
         collection_name=vector_cfg.get("collection_name", "memories"),
         vector_size=embedding_cfg.get("vector_size", vector_cfg.get("vector_size", 768)),
+        url=url,
+        api_key=api_key,
+        options=vector_cfg.get("options"),
     )
     if not client.is_available():
         raise RuntimeError("Qdrant 不可用")
 
     memories = client.get_all_memories(include_archived=True, include_deleted=True, limit=0)
-    updated = 0
+    pending = []
     skipped = 0
-    failed = 0
 
     for mem in memories:
         payload = mem.get("payload", {}) or {}
@@ -73,10 +76,11 @@ def main():
             skipped += 1
             continue
 
-        if client.update_memory(mem["id"], updates):
-            updated += 1
-        else:
-            failed += 1
+        pending.append((mem["id"], updates))
+
+    # 一次性批量写回（内部按块走 batch_update_points）
+    updated = client.update_memories_batch(pending)
+    failed = len(pending) - updated
 
     print(json.dumps({
         "status": "success" if failed == 0 else "partial",
@@ -0,0 +1,119 @@
+# benchmark_qdrant_batch.py - 逐条与批量维护操作的耗时对比
+"""
+在一个临时 Qdrant 集合（默认内存模式）里写入 N 条随机向量记忆，然后对比：
+    per_item   逐条 get_memory / update_memory / archive_memory / update_usage（旧调用方式）
+    batched    get_memories / update_memories_batch / archive_memories_batch / update_usage_batch
+
+每项操作分别计时，输出 JSON。
+
+用法：
+    python scripts/benchmark_qdrant_batch.py
+    python scripts/benchmark_qdrant_batch.py --points 20000 --dim 384 --ops 2000
+    python scripts/benchmark_qdrant_batch.py --path ./data/qdrant_bench   # 本地持久化模式
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from storage.qdrant_client import MemosQdrantClient  # noqa: E402
+
+
+def build_client(args):
+    if args.path:
+        return MemosQdrantClient(path=args.path, collection_name="bench", vector_size=args.dim)
+    return MemosQdrantClient(collection_name="bench", vector_size=args.dim, use_memory=True)
+
+
+def populate(client, args):
+    rng = np.random.default_rng(args.seed)
+    ids = [str(uuid.uuid4()) for _ in range(args.points)]
+    for start in range(0, args.points, 1000):
+        chunk = ids[start:start + 1000]
+        vectors = rng.normal(size=(len(chunk), args.dim)).astype(np.float32)
+        client.add_memories_batch([
+            {"id": memory_id, "vector": vector.tolist(), "payload": {"content": f"记忆 {start + i}"}}
+            for i, (memory_id, vector) in enumerate(zip(chunk, vectors))
+        ])
+    return ids
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - start, 4)
+
+
+def run_per_item(client, ids):
+    return {
+        "retrieve": timed(lambda: [client.get_memory(i) for i in ids]),
+        "update_payload": timed(lambda: [client.update_memory(i, {"bench_flag": 1}) for i in ids]),
+        "update_usage": timed(lambda: [client.update_usage(i) for i in ids]),
+        "archive": timed(lambda: [client.archive_memory(i, reason="bench") for i in ids]),
+    }
+
+
+def run_batched(client, ids):
+    return {
+        "retrieve": timed(lambda: client.get_memories(ids, with_vectors=True)),
+        "update_payload": timed(lambda: client.update_memories_batch([(i, {"bench_flag": 2}) for i in ids])),
+        "update_usage": timed(lambda: client.update_usage_batch(ids)),
+        "archive": timed(lambda: client.archive_memories_batch(ids, reason="bench")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐条与批量 Qdrant 维护操作对比")
+    parser.add_argument("--points", type=int, default=20000, help="集合中的记忆数")
+    parser.add_argument("--dim", type=int, default=384, help="向量维度")
+    parser.add_argument("--ops", type=int, default=2000, help="每种操作涉及的记忆数")
+    parser.add_argument("--path", default=None, help="本地持久化目录（默认内存模式）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    temp_dir = None
+    if args.path:
+        temp_dir = tempfile.mkdtemp(dir=args.path) if Path(args.path).exists() else None
+        args.path = temp_dir or args.path
+
+    client = build_client(args)
+    try:
+        start = time.perf_counter()
+        ids = populate(client, args)
+        populate_sec = round(time.perf_counter() - start, 2)
+
+        ops = min(args.ops, len(ids) // 2)
+        per_item = run_per_item(client, ids[:ops])
+        batched = run_batched(client, ids[ops:2 * ops])
+        print(json.dumps({
+            "points": args.points,
+            "dim": args.dim,
+            "ops": ops,
+            "mode": "local" if args.path else "memory",
+            "populate_sec": populate_sec,
+            "per_item_sec": per_item,
+            "batched_sec": batched,
+            "speedup": {
+                name: round(per_item[name] / batched[name], 1) if batched[name] else None
+                for name in per_item
+            },
+        }, ensure_ascii=False, indent=2))
+    finally:
+        client.close()
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
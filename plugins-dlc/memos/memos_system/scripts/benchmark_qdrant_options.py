@@ -0,0 +1,184 @@
+# benchmark_qdrant_options.py - 量化 / on_disk / HNSW 选项的召回率、延迟与内存对比
+"""
+在 Qdrant 服务端为每组存储选项建一个临时集合，写入同一批向量，然后对比：
+    recall@k     与精确检索（exact=True）结果的重合率
+    p50/p95_ms   单次检索延迟
+    ram_mb_est   按配置估算的常驻内存（原始向量 + 量化向量 + HNSW 图）
+
+向量默认是带簇结构的随机数据；--from-collection 可以直接用现有记忆集合的向量，
+结果更接近真实分布。测完删除临时集合。
+
+用法：
+    python scripts/benchmark_qdrant_options.py --url http://localhost:6333
+    python scripts/benchmark_qdrant_options.py --url http://localhost:6333 --points 50000 --dim 1024
+    python scripts/benchmark_qdrant_options.py --url http://localhost:6333 --from-collection memories
+    python scripts/benchmark_qdrant_options.py --url http://localhost:6333 --ef 64 128 256
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from qdrant_client.models import PointStruct, SearchParams  # noqa: E402
+
+from storage.qdrant_client import MemosQdrantClient  # noqa: E402
+
+# 参与对比的选项组合（未列出的项用 DEFAULT_COLLECTION_OPTIONS）
+VARIANTS = {
+    "float32": {},
+    "float32_on_disk": {"on_disk_vectors": True, "on_disk_payload": True},
+    "int8_rescore": {"quantization": "scalar", "on_disk_vectors": True, "on_disk_payload": True},
+    "int8_no_rescore": {"quantization": "scalar", "rescore": False, "on_disk_vectors": True},
+    "binary_rescore": {"quantization": "binary", "oversampling": 3.0, "on_disk_vectors": True,
+                       "on_disk_payload": True},
+}
+
+
+def make_vectors(args, rng):
+    if args.from_collection:
+        source = MemosQdrantClient(collection_name=args.from_collection, url=args.url, api_key=args.api_key)
+        vectors = []
+        offset = None
+        while len(vectors) < args.points:
+            points, offset = source.client.scroll(
+                collection_name=source.physical_collection(), limit=1000, offset=offset,
+                with_payload=False, with_vectors=True
+            )
+            vectors.extend(p.vector for p in points)
+            if offset is None:
+                break
+        source.close()
+        data = np.asarray(vectors[:args.points], dtype=np.float32)
+    else:
+        centers = rng.normal(size=(max(args.points // 200, 1), args.dim))
+        data = centers[rng.integers(0, len(centers), args.points)] + 0.35 * rng.normal(size=(args.points, args.dim))
+        data = data.astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True) + 1e-12
+    return data
+
+
+def estimate_ram_mb(options, points, dim):
+    """常驻内存估算：always_ram 的量化向量常驻，on_disk 的原始向量 / HNSW 图按需从磁盘读"""
+    total = 0.0
+    if not options.get("on_disk_vectors"):
+        total += points * dim * 4
+    quantization = options.get("quantization", "none")
+    if quantization in ("scalar", "int8"):
+        total += points * dim
+    elif quantization == "binary":
+        total += points * dim / 8
+    if not options.get("hnsw_on_disk"):
+        total += points * options.get("hnsw_m", 16) * 2 * 4
+    return round(total / 1024 / 1024, 1)
+
+
+def wait_indexed(client, collection, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = client.client.get_collection(collection)
+        if str(getattr(info.status, "value", info.status)) == "green" and \
+                (info.indexed_vectors_count or 0) >= (info.points_count or 0):
+            return True
+        time.sleep(1)
+    return False
+
+
+def run_variant(name, options, args, data, queries):
+    collection = f"bench_{name}_{uuid.uuid4().hex[:6]}"
+    client = MemosQdrantClient(
+        collection_name=collection, vector_size=data.shape[1],
+        url=args.url, api_key=args.api_key, options=options
+    )
+    try:
+        start = time.perf_counter()
+        for begin in range(0, len(data), 1000):
+            chunk = data[begin:begin + 1000]
+            client.client.upsert(collection_name=collection, points=[
+                PointStruct(id=begin + i, vector=v.tolist(), payload={"n": begin + i})
+                for i, v in enumerate(chunk)
+            ])
+        indexed = wait_indexed(client, collection, args.index_timeout)
+        build_sec = round(time.perf_counter() - start, 2)
+
+        truth = []
+        for q in queries:
+            hits = client.client.query_points(
+                collection_name=collection, query=q.tolist(), limit=args.k,
+                search_params=SearchParams(exact=True)
+            ).points
+            truth.append({h.id for h in hits})
+
+        results = []
+        for ef in args.ef or [options.get("search_ef")]:
+            client.options["search_ef"] = ef
+            latencies = []
+            recall = []
+            for q, expected in zip(queries, truth):
+                t0 = time.perf_counter()
+                hits = client.client.query_points(
+                    collection_name=collection, query=q.tolist(), limit=args.k,
+                    search_params=client._search_params()
+                ).points
+                latencies.append((time.perf_counter() - t0) * 1000)
+                recall.append(len(expected & {h.id for h in hits}) / max(len(expected), 1))
+            results.append({
+                "variant": name,
+                "ef": ef,
+                f"recall@{args.k}": round(float(np.mean(recall)), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+                "ram_mb_est": estimate_ram_mb(client.options, len(data), data.shape[1]),
+                "build_sec": build_sec,
+                "indexed": indexed,
+            })
+        return results
+    finally:
+        client.client.delete_collection(collection)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant 存储选项的召回率 / 延迟 / 内存对比")
+    parser.add_argument("--url", default=os.getenv("MEMOS_QDRANT_URL") or "http://localhost:6333",
+                        help="Qdrant 服务地址（默认 MEMOS_QDRANT_URL）")
+    parser.add_argument("--api-key", default=os.getenv("MEMOS_QDRANT_API_KEY"))
+    parser.add_argument("--points", type=int, default=20000, help="向量数")
+    parser.add_argument("--dim", type=int, default=1024, help="向量维度（--from-collection 时以集合为准）")
+    parser.add_argument("--queries", type=int, default=200, help="检索次数")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="*", default=None, help="依次测试的 hnsw_ef")
+    parser.add_argument("--variants", nargs="*", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--from-collection", default=None, help="使用现有集合的向量")
+    parser.add_argument("--index-timeout", type=float, default=300, help="等待索引完成的最长秒数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    data = make_vectors(args, rng)
+    picks = rng.choice(len(data), size=min(args.queries, len(data)), replace=False)
+    queries = data[picks] + 0.05 * rng.normal(size=(len(picks), data.shape[1])).astype(np.float32)
+
+    rows = []
+    for name in args.variants:
+        print(f"[测试] {name} ...", file=sys.stderr)
+        rows.extend(run_variant(name, VARIANTS[name], args, data, queries))
+    print(json.dumps({
+        "points": len(data),
+        "dim": int(data.shape[1]),
+        "queries": len(queries),
+        "results": rows,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
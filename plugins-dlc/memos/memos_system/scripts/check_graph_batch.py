@@ -0,0 +1,192 @@
+# check_graph_batch.py - 图谱批量写入自检
+"""
+用进程内的假 Neo4j 驱动检查 MemosNeo4jClient 的批量接口：
+    resolve_entity_names / upsert_entities / upsert_relations / link_memories
+
+假驱动只认识这几条批量语句，把写入落到内存字典里，同时统计
+session、事务和语句数，用来确认每个批次只有一次往返、一个事务。
+同样的流程也会在临时目录下的 NetworkXGraphClient 上跑一遍。
+
+用法：
+    python scripts/check_graph_batch.py
+退出码非 0 表示检查未通过。
+"""
+
+import json
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from storage.neo4j_client import MemosNeo4jClient  # noqa: E402
+
+
+class FakeRecord(dict):
+    pass
+
+
+class FakeGraph:
+    """假驱动背后的内存图"""
+
+    def __init__(self):
+        self.entities = {}
+        self.relations = set()
+        self.contains = set()
+        self.stats = {"sessions": 0, "transactions": 0, "statements": 0}
+
+    def execute(self, query, params):
+        self.stats["statements"] += 1
+        rows = params.get("rows", [])
+
+        if "MATCH (e:Entity {name: row.name" in query:
+            records = []
+            for row in rows:
+                matches = [
+                    e for e in self.entities.values()
+                    if e["name"] == row["name"] and e.get("user_id") == params["user_id"]
+                    and (row["type"] is None or e["type"] == row["type"])
+                ]
+                records.append(FakeRecord(name=row["name"], type=row["type"], e=matches[0] if matches else None))
+            return records
+
+        if "MERGE (e:Entity {id: row.id})" in query:
+            for row in rows:
+                entity = self.entities.setdefault(row["id"], {"id": row["id"], "created_at": params["now"]})
+                entity.update(name=row["name"], type=row["type"], user_id=row["user_id"], **row["properties"])
+            return []
+
+        if "MERGE (m)-[:CONTAINS]->(e)" in query:
+            for row in rows:
+                entity = self.entities.get(row["entity_id"])
+                if entity is None:
+                    continue
+                self.contains.add((row["memory_id"], row["entity_id"]))
+                ids = entity.setdefault("source_memory_ids", [])
+                if row["memory_id"] not in ids:
+                    ids.append(row["memory_id"])
+            return []
+
+        match = re.search(r"MERGE \(a\)-\[r:(`?[^\]]+?`?)\]->\(b\)", query)
+        if match:
+            relation_type = match.group(1).strip("`")
+            for row in rows:
+                if row["source_id"] in self.entities and row["target_id"] in self.entities:
+                    self.relations.add((row["source_id"], relation_type, row["target_id"]))
+            return []
+
+        raise AssertionError(f"假驱动不认识的语句: {query.strip()[:80]}")
+
+
+class FakeTransaction:
+    def __init__(self, graph):
+        self.graph = graph
+        self.pending = []
+
+    def run(self, query, **params):
+        self.pending.append((query, params))
+
+    def commit(self):
+        self.graph.stats["transactions"] += 1
+        for query, params in self.pending:
+            self.graph.execute(query, params)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        self.graph.stats["sessions"] += 1
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        return self.graph.execute(query, params)
+
+    def begin_transaction(self):
+        return FakeTransaction(self.graph)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.graph = FakeGraph()
+
+    def session(self, database=None):
+        return FakeSession(self.graph)
+
+    def close(self):
+        pass
+
+
+ENTITIES = [
+    {"id": "ent_a", "name": "肥牛", "type": "person", "user_id": "u", "properties": {"confidence": 0.9}},
+    {"id": "ent_b", "name": "火锅", "type": "object", "user_id": "u", "properties": {}},
+    {"id": "ent_c", "name": "成都", "type": "place", "user_id": "u", "properties": {}},
+]
+RELATIONS = [
+    {"source_id": "ent_a", "target_id": "ent_b", "relation_type": "likes"},
+    {"source_id": "ent_a", "target_id": "ent_c", "relation_type": "lives_in"},
+    {"source_id": "ent_b", "target_id": "ent_c", "relation_type": "likes"},
+    {"source_id": "ent_a", "target_id": "ent_c", "relation_type": "喜欢"},
+]
+LINKS = [("mem_1", "ent_a"), ("mem_1", "ent_b"), ("mem_1", "ent_a")]
+
+
+def check(client):
+    """同一流程在任意图客户端上执行，返回 (结果, 失败项)"""
+    failures = []
+    if client.upsert_entities(ENTITIES) != 3:
+        failures.append("upsert_entities")
+    resolved = client.resolve_entity_names([("肥牛", "person"), ("火锅", None), ("不存在", None)], "u")
+    if set(resolved) != {("肥牛", "person"), ("火锅", None)}:
+        failures.append(f"resolve_entity_names: {sorted(resolved)}")
+    if client.upsert_relations(RELATIONS) != 4:
+        failures.append("upsert_relations")
+    if client.link_memories(LINKS) != 2:
+        failures.append("link_memories")
+    return {"resolved": len(resolved)}, failures
+
+
+def main():
+    report = {}
+    failures = []
+
+    driver = FakeDriver()
+    result, errors = check(MemosNeo4jClient(driver=driver))
+    stats = driver.graph.stats
+    # 每个写批次一个事务；关系按 3 种类型分成 3 条语句
+    if stats["transactions"] != 3:
+        errors.append(f"事务数 {stats['transactions']} != 3")
+    if len(driver.graph.relations) != 4 or len(driver.graph.contains) != 2:
+        errors.append("假驱动中的关系/关联数量不符")
+    report["neo4j_fake"] = {**result, **stats, "errors": errors}
+    failures += errors
+
+    try:
+        from storage.networkx_graph import NetworkXGraphClient
+        with tempfile.TemporaryDirectory() as tmp:
+            result, errors = check(NetworkXGraphClient(data_path=str(Path(tmp) / "graph.json")))
+        report["networkx"] = {**result, "errors": errors}
+        failures += errors
+    except ImportError as e:
+        report["networkx"] = {"skipped": str(e)}
+
+    print(json.dumps({"status": "success" if not failures else "failed", **report}, ensure_ascii=False, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
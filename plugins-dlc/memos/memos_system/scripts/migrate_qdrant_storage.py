@@ -0,0 +1,136 @@
+# migrate_qdrant_storage.py - 把现有集合迁移到新的存储选项（量化 / on_disk / HNSW）
+"""
+storage.vector.options 只在 Qdrant 服务端模式生效，已有集合有两种迁移方式：
+
+1. 已在服务端：原地更新集合配置（服务端在后台重建索引和量化，期间可正常检索）
+       python scripts/migrate_qdrant_storage.py --apply
+       python scripts/migrate_qdrant_storage.py --apply --dry-run     # 只显示差异
+
+2. 从本地模式（storage.vector.path）搬到服务端（storage.vector.url）：
+   按配置的选项在服务端建集合，原样复制向量和 payload（不重新编码）
+       python scripts/migrate_qdrant_storage.py --from-local
+       python scripts/migrate_qdrant_storage.py --from-local --batch-size 1000
+
+迁移完成后保持 url 配置即可，本地目录不会被修改。
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from qdrant_client import QdrantClient  # noqa: E402
+from qdrant_client.models import PointStruct  # noqa: E402
+
+from storage.qdrant_client import MemosQdrantClient, resolve_server  # noqa: E402
+
+
+def load_config():
+    config_path = ROOT / "config" / "memos_config.json"
+    with config_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_path(path_value: str) -> str:
+    path = Path(path_value)
+    if not path.is_absolute():
+        path = ROOT / path
+    return str(path.resolve())
+
+
+def open_server(vector_cfg, vector_size):
+    url, api_key = resolve_server(vector_cfg)
+    if not url:
+        raise SystemExit("storage.vector.url（或 MEMOS_QDRANT_URL）未配置：量化 / on_disk / HNSW 选项只在服务端模式生效")
+    client = MemosQdrantClient(
+        collection_name=vector_cfg.get("collection_name", "memories"),
+        vector_size=vector_size,
+        url=url,
+        api_key=api_key,
+        options=vector_cfg.get("options"),
+    )
+    if not client.is_available():
+        raise SystemExit(f"无法连接 Qdrant 服务: {url}")
+    return client
+
+
+def apply_in_place(server, dry_run):
+    collection = server.physical_collection()
+    diff = server.collection_options_diff(collection)
+    if not diff:
+        print(f"集合 {collection} 已与配置一致")
+        return
+    for name, (current, wanted) in diff.items():
+        print(f"  {name}: {current} -> {wanted}")
+    if dry_run:
+        return
+    server.apply_collection_options(collection)
+    print(f"已提交更新，服务端正在后台优化集合 {collection}")
+
+
+def copy_from_local(server, vector_cfg, batch_size):
+    local = QdrantClient(path=resolve_path(vector_cfg.get("path", "./data/qdrant")))
+    base_name = vector_cfg.get("collection_name", "memories")
+    source = base_name
+    for alias in local.get_aliases().aliases:
+        if alias.alias_name == server.live_alias:
+            source = alias.collection_name
+    total = local.count(collection_name=source, exact=True).count
+    target = server.physical_collection()
+    print(f"本地 {source} ({total} 条) -> 服务端 {target}")
+
+    copied = 0
+    offset = None
+    started = time.perf_counter()
+    while True:
+        points, offset = local.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        if points:
+            server.client.upsert(
+                collection_name=target,
+                points=[PointStruct(id=p.id, vector=p.vector, payload=p.payload or {}) for p in points]
+            )
+            copied += len(points)
+            rate = copied / max(time.perf_counter() - started, 1e-6)
+            print(f"  {copied}/{total} ({rate:.0f} 条/秒)", end="\r", flush=True)
+        if offset is None:
+            break
+    local.close()
+    print(f"\n复制完成: {copied} 条，用时 {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把现有 Qdrant 集合迁移到新的存储选项")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--apply", action="store_true", help="原地更新服务端集合配置")
+    mode.add_argument("--from-local", action="store_true", help="把本地模式集合复制到服务端")
+    parser.add_argument("--dry-run", action="store_true", help="只显示配置差异")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    config = load_config()
+    vector_cfg = config.get("storage", {}).get("vector", {})
+    vector_size = config.get("embedding", {}).get("vector_size", vector_cfg.get("vector_size", 768))
+
+    server = open_server(vector_cfg, vector_size)
+    try:
+        if args.apply:
+            apply_in_place(server, args.dry_run)
+        else:
+            copy_from_local(server, vector_cfg, args.batch_size)
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
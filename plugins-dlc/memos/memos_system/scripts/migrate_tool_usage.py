@@ -0,0 +1,77 @@
+# migrate_tool_usage.py - 迁出工具使用记录
+"""
+把旧版以零向量写入 memories 集合的 tool_usage 点迁移到
+独立的工具使用统计库（默认 data/tool_usage.db），并从 Qdrant 删除。
+
+服务启动时 ToolMemory.load() 也会自动执行同样的迁移；
+本脚本用于服务未运行时手动迁移（本地 Qdrant 不能被两个进程同时打开）。
+
+用法：
+    python scripts/migrate_tool_usage.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from storage.qdrant_client import MemosQdrantClient, resolve_server  # noqa: E402
+from memories.tool_memory import ToolMemory  # noqa: E402
+
+
+def load_config():
+    config_path = ROOT / "config" / "memos_config.json"
+    with config_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_path(path_value: str) -> str:
+    path = Path(path_value)
+    if not path.is_absolute():
+        path = ROOT / path
+    return str(path.resolve())
+
+
+def main():
+    config = load_config()
+    vector_cfg = config.get("storage", {}).get("vector", {})
+    embedding_cfg = config.get("embedding", {})
+    url, api_key = resolve_server(vector_cfg)
+
+    client = MemosQdrantClient(
+        path=resolve_path(vector_cfg.get("path", "./data/qdrant")),
+        collection_name=vector_cfg.get("collection_name", "memories"),
+        vector_size=embedding_cfg.get("vector_size", vector_cfg.get("vector_size", 768)),
+        url=url,
+        api_key=api_key,
+        options=vector_cfg.get("options"),
+    )
+    if not client.is_available():
+        raise RuntimeError("Qdrant 不可用")
+
+    store_path = resolve_path(config.get("tools", {}).get("store_path", "./data/tool_usage.db"))
+    Path(store_path).parent.mkdir(parents=True, exist_ok=True)
+
+    tool_memory = ToolMemory(
+        user_id=config.get("users", {}).get("default_user", "feiniu_default"),
+        vector_storage=client,
+        store_path=store_path,
+    )
+    moved = tool_memory.migrate_from_vector_storage()
+    total = tool_memory.store.count_events()
+    tool_memory.close()
+    client.close()
+
+    print(json.dumps({
+        "status": "success",
+        "moved_points": moved,
+        "events_in_store": total,
+        "store_path": store_path,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
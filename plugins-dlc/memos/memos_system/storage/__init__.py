@@ -3,8 +3,9 @@
 
 from .qdrant_client import MemosQdrantClient
 from .networkx_graph import NetworkXGraphClient
+from .matrix_store import MatrixMemoryStore
 
 # 兼容别名
 MemosNeo4jClient = NetworkXGraphClient
 
-__all__ = ['MemosQdrantClient', 'NetworkXGraphClient', 'MemosNeo4jClient']
+__all__ = ['MemosQdrantClient', 'NetworkXGraphClient', 'MemosNeo4jClient', 'MatrixMemoryStore']
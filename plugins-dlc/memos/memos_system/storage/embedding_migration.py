@@ -0,0 +1,392 @@
+# embedding_migration.py - Embedding 模型指纹与后台重嵌入迁移
+"""
+更换 Embedding 模型（model_path / vector_size / 模型文件）后，Qdrant 里的旧向量
+与新模型的查询向量不在同一空间，检索结果会悄悄变差。
+
+- embedding_fingerprint(): 根据配置和模型目录内容算出模型指纹
+- FingerprintRegistry: data/embedding_fingerprints.json，记录每个物理集合由哪个模型写入，
+  以及进行中的迁移进度（重启后从断点继续）
+- ReembedMigration: 把源集合的每条记忆按 content 用新模型批量重新编码，写入影子集合；
+  复制完成后按 payload 做差量同步，再由调用方原子切换 live 别名
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from qdrant_client.models import PointStruct
+except ImportError:
+    PointStruct = None
+
+logger = logging.getLogger(__name__)
+
+# 参与模型内容哈希的文件：配置文件取内容，权重文件只取文件名和大小
+MODEL_IDENTITY_FILES = (
+    'config.json', 'modules.json', 'sentence_bert_config.json',
+    'config_sentence_transformers.json', '1_Pooling/config.json'
+)
+MODEL_WEIGHT_SUFFIXES = ('.safetensors', '.bin', '.onnx', '.pt')
+
+# 每批重新编码的记忆数
+REEMBED_BATCH_SIZE = 64
+# 进度日志的最小间隔（秒）
+REPORT_INTERVAL_SEC = 10.0
+# 差量同步最多轮数（每轮处理复制期间的新增/修改）
+SYNC_MAX_ROUNDS = 3
+
+
+def _or_dash(value):
+    return '-' if value is None else value
+
+
+def _version(payload: Dict[str, Any]) -> str:
+    """记忆的版本：更新操作都会刷新 updated_at，从未更新过的用 created_at"""
+    return str(payload.get('updated_at') or payload.get('created_at') or '')
+
+
+def _model_content_hash(model_path: Optional[str]) -> Optional[str]:
+    """模型目录的内容摘要；目录不存在返回 None"""
+    if not model_path or not os.path.isdir(model_path):
+        return None
+    digest = hashlib.sha1()
+    base = Path(model_path)
+    for name in MODEL_IDENTITY_FILES:
+        path = base / name
+        if path.is_file():
+            digest.update(name.encode('utf-8'))
+            digest.update(path.read_bytes())
+    for path in sorted(base.rglob('*')):
+        if path.is_file() and path.suffix in MODEL_WEIGHT_SUFFIXES:
+            digest.update(f"{path.relative_to(base).as_posix()}:{path.stat().st_size}".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def embedding_fingerprint(embedding_config: Dict[str, Any], model_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    计算当前 Embedding 配置的指纹
+
+    Args:
+        embedding_config: memos_config.json 中的 embedding 配置
+        model_path: 解析后的模型目录（用于读取模型文件内容）
+
+    Returns:
+        记录字典：fingerprint 以及重新加载该模型所需的配置
+    """
+    identity = {
+        'model_path': embedding_config.get('model_path', '../full-hub/rag-hub'),
+        'vector_size': int(embedding_config.get('vector_size', 768)),
+        'model_hash': _model_content_hash(model_path),
+    }
+    fingerprint = hashlib.sha1(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return {
+        'fingerprint': fingerprint,
+        **identity,
+        'backend': embedding_config.get('backend', 'torch'),
+        'device': embedding_config.get('device', 'auto'),
+        'recorded_at': datetime.now().isoformat(),
+    }
+
+
+class FingerprintRegistry:
+    """集合 -> 模型指纹 的登记表，以及进行中的迁移状态"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.data = {'collections': {}, 'migration': None}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+            if isinstance(loaded, dict):
+                self.data['collections'].update(loaded.get('collections') or {})
+                self.data['migration'] = loaded.get('migration')
+        except (OSError, ValueError):
+            pass
+
+    def get(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        return self.data['collections'].get(collection_name)
+
+    def set(self, collection_name: str, record: Dict[str, Any]):
+        with self.lock:
+            self.data['collections'][collection_name] = dict(record)
+        self.save()
+
+    def find_collection(self, fingerprint: str, exists: Callable[[str], bool]) -> Optional[str]:
+        """已登记为该指纹且仍存在的集合（模型改回旧版本时直接复用）"""
+        for name, record in self.data['collections'].items():
+            if record.get('fingerprint') == fingerprint and exists(name):
+                return name
+        return None
+
+    @property
+    def migration(self) -> Optional[Dict[str, Any]]:
+        return self.data.get('migration')
+
+    def set_migration(self, state: Optional[Dict[str, Any]]):
+        with self.lock:
+            self.data['migration'] = dict(state) if state else None
+        self.save()
+
+    def save(self):
+        with self.lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_name(self.path.name + '.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"保存 Embedding 指纹登记表失败: {e}")
+
+
+class ReembedMigration:
+    """
+    源集合 -> 影子集合 的后台重嵌入
+
+    在线程中执行（run / sync 都是阻塞调用）。进度每批写回登记表，
+    中断后用相同参数重新构造即可从上次的 scroll offset 继续。
+
+    switched=True 表示 live 别名已经指向影子集合，影子集合同时在接收新写入：
+    此后同步只用 updated_at 更新的源记录覆盖，只删除切换前最后一轮同步时
+    已在影子集合里、之后又从源集合删除的记忆。
+    """
+
+    def __init__(
+        self,
+        qdrant,
+        registry: FingerprintRegistry,
+        source: str,
+        target: str,
+        fingerprint: Dict[str, Any],
+        encode: Callable[[List[str]], Any],
+        batch_size: int = REEMBED_BATCH_SIZE
+    ):
+        self.qdrant = qdrant
+        self.client = qdrant.client
+        self.registry = registry
+        self.source = source
+        self.target = target
+        self.fingerprint = fingerprint
+        self.encode = encode
+        self.batch_size = max(int(batch_size), 1)
+        self._stop = threading.Event()
+        self._session_started = None
+        self._session_copied = 0
+        self._last_report = 0.0
+        # 切换前最后一轮同步后影子集合里的记忆 ID（只在内存里，重启后不再传播硬删除）
+        self._cutover_ids = set()
+
+        previous = registry.migration or {}
+        if (previous.get('source') == source and previous.get('target') == target
+                and previous.get('fingerprint') == fingerprint['fingerprint']):
+            self.state = dict(previous)
+        else:
+            self.state = {
+                'source': source,
+                'target': target,
+                'fingerprint': fingerprint['fingerprint'],
+                'phase': 'pending',
+                'offset': None,
+                'copied': 0,
+                'total': None,
+                'switched': False,
+                'started_at': datetime.now().isoformat(),
+                'error': None,
+            }
+
+    # ---------- 状态 ----------
+
+    @property
+    def switched(self) -> bool:
+        return bool(self.state.get('switched'))
+
+    def mark_switched(self):
+        self.state['switched'] = True
+        self._save_state()
+
+    def stop(self):
+        self._stop.set()
+
+    def _save_state(self):
+        self.registry.set_migration(self.state)
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._session_started if self._session_started else 0
+        rate = self._session_copied / elapsed if elapsed > 0 else None
+        total = self.state.get('total')
+        remaining = max(total - self.state['copied'], 0) if total is not None else None
+        return {
+            **self.state,
+            'model_path': self.fingerprint.get('model_path'),
+            'vector_size': self.fingerprint.get('vector_size'),
+            'points_per_sec': round(rate, 1) if rate else None,
+            'eta_seconds': round(remaining / rate) if rate and remaining is not None else None,
+        }
+
+    def _report(self, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self._last_report < REPORT_INTERVAL_SEC:
+            return
+        self._last_report = now
+        status = self.status()
+        logger.info(
+            f"重嵌入迁移 {self.source} -> {self.target}: {status['copied']}/{status['total']} "
+            f"({status['points_per_sec'] or '-'} 条/秒, 预计剩余 {_or_dash(status['eta_seconds'])} 秒)"
+        )
+
+    # ---------- 复制 ----------
+
+    def _vectors(self, payloads: List[Dict[str, Any]]) -> List[List[float]]:
+        vectors = self.encode([str((payload or {}).get('content') or '') for payload in payloads])
+        return [v.tolist() if hasattr(v, 'tolist') else list(v) for v in vectors]
+
+    def _upsert(self, points: List[Any]):
+        """重新编码一批源记录并写入影子集合（id 和 payload 原样保留）"""
+        if not points:
+            return
+        vectors = self._vectors([p.payload for p in points])
+        self.client.upsert(
+            collection_name=self.target,
+            points=[
+                PointStruct(id=p.id, vector=vector, payload=p.payload or {})
+                for p, vector in zip(points, vectors)
+            ]
+        )
+
+    def run(self):
+        """全量复制（可续传），然后差量同步到稳定"""
+        self._session_started = time.perf_counter()
+        self._session_copied = 0
+        if not self.qdrant.create_collection(self.target, int(self.fingerprint['vector_size'])):
+            raise RuntimeError(f"无法创建影子集合: {self.target}")
+
+        self.state['total'] = self.client.count(collection_name=self.source, exact=True).count
+        if self.state['phase'] in ('pending', 'copying'):
+            self.state['phase'] = 'copying'
+            self._save_state()
+            self._copy_all()
+        if self._stop.is_set():
+            return
+        self.state['phase'] = 'syncing'
+        self._save_state()
+        for _ in range(SYNC_MAX_ROUNDS):
+            if self._stop.is_set() or self.sync() == 0:
+                break
+        self._report(force=True)
+
+    def _copy_all(self):
+        offset = self.state.get('offset')
+        while not self._stop.is_set():
+            points, next_offset = self.client.scroll(
+                collection_name=self.source,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            if self.switched and points:
+                # 已切换：影子集合里已有的记忆是新写入的，不能被旧数据覆盖
+                existing = {
+                    str(p.id) for p in self.client.retrieve(
+                        collection_name=self.target, ids=[p.id for p in points],
+                        with_payload=False, with_vectors=False
+                    )
+                }
+                points = [p for p in points if str(p.id) not in existing]
+            self._upsert(points)
+            self._session_copied += len(points)
+            self.state['copied'] += len(points)
+            self.state['offset'] = next_offset
+            self._save_state()
+            self._report()
+            if next_offset is None:
+                break
+            offset = next_offset
+
+    # ---------- 差量同步 ----------
+
+    def _payload_map(self, collection_name: str) -> Dict[str, Any]:
+        payloads = {}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            for point in points:
+                payloads[str(point.id)] = point.payload or {}
+            if offset is None:
+                return payloads
+
+    def sync(self) -> int:
+        """
+        把复制期间源集合的变化补到影子集合，返回处理的记忆数
+
+        - 影子集合缺失的记忆：重新编码写入
+        - content 变化：重新编码；其余 payload 变化：沿用已有向量更新 payload
+        - 源集合已删除的记忆：从影子集合删除
+
+        已切换后只覆盖源集合版本更新的记忆（切换前后写入旧集合的修改），
+        只删除 _cutover_ids 里的记忆，切换后直接写入影子集合的不受影响。
+        """
+        switched = self.switched
+        source = self._payload_map(self.source)
+        target = self._payload_map(self.target)
+
+        reembed, repayload = [], []
+        for memory_id, payload in source.items():
+            current = target.get(memory_id)
+            if current is None:
+                reembed.append(memory_id)
+            elif current == payload or (switched and _version(payload) <= _version(current)):
+                continue
+            elif current.get('content') != payload.get('content'):
+                reembed.append(memory_id)
+            else:
+                repayload.append(memory_id)
+        extra = [
+            memory_id for memory_id in target
+            if memory_id not in source and (not switched or memory_id in self._cutover_ids)
+        ]
+
+        for start in range(0, len(reembed), self.batch_size):
+            ids = reembed[start:start + self.batch_size]
+            self._upsert(self.client.retrieve(
+                collection_name=self.source, ids=ids, with_payload=True, with_vectors=False
+            ))
+        for start in range(0, len(repayload), self.batch_size):
+            ids = repayload[start:start + self.batch_size]
+            points = self.client.retrieve(
+                collection_name=self.target, ids=ids, with_payload=False, with_vectors=True
+            )
+            self.client.upsert(
+                collection_name=self.target,
+                points=[PointStruct(id=p.id, vector=p.vector, payload=source[str(p.id)]) for p in points]
+            )
+        if extra:
+            self.client.delete(collection_name=self.target, points_selector=extra)
+        if not switched:
+            self._cutover_ids = (set(target) - set(extra)) | set(reembed)
+
+        changed = len(reembed) + len(repayload) + len(extra)
+        if changed:
+            logger.info(
+                f"重嵌入差量同步: 重新编码 {len(reembed)}, 更新 payload {len(repayload)}, 删除 {len(extra)}"
+            )
+        return changed
+
+    def finish(self):
+        """迁移完成：登记影子集合的指纹并清除迁移状态"""
+        self.state['phase'] = 'done'
+        self.registry.set(self.target, self.fingerprint)
+        self.registry.set_migration(None)
@@ -0,0 +1,332 @@
+# matrix_store.py - 连续矩阵 + 追加日志的轻量记忆存储（v1 简化版服务使用）
+"""
+记忆向量存放在一块连续的、已归一化的 float32 矩阵里，id -> 行号用字典维护；
+删除时把最后一行换到被删位置（swap-remove），检索是一次矩阵-向量乘法加 argpartition。
+
+持久化：
+- memory_store.json        快照（与旧版格式相同：记忆列表，每条带 embedding），只在压实时重写
+- memory_store.log.jsonl   追加日志，每行一个 put / del 操作（不含向量）
+- memory_store.log.f32     追加的原始 float32 向量段，put 记录里的 vec 为其行号
+
+启动时加载快照再重放日志；日志条数超过阈值时压实（重写快照并清空日志）。
+日志最后一行没写完、或向量段短于记录时，对应操作被忽略。
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOG_SUFFIX = '.log.jsonl'
+VEC_SUFFIX = '.log.f32'
+
+
+def _normalize(vector) -> np.ndarray:
+    vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else vec
+
+
+class MatrixMemoryStore:
+    """按行存放归一化向量的记忆存储"""
+
+    def __init__(self, snapshot_path: str, compact_min_ops: int = 256, compact_ratio: float = 0.5):
+        """
+        Args:
+            snapshot_path: 快照路径（memory_store.json），日志与向量段放在同目录
+            compact_min_ops: 触发压实的最少日志条数
+            compact_ratio: 日志条数超过 记忆数 * compact_ratio 时压实
+        """
+        base = snapshot_path[:-5] if snapshot_path.endswith('.json') else snapshot_path
+        self.snapshot_path = snapshot_path
+        self.log_path = base + LOG_SUFFIX
+        self.vec_path = base + VEC_SUFFIX
+        self.compact_min_ops = compact_min_ops
+        self.compact_ratio = compact_ratio
+
+        self.dim: Optional[int] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._importance = np.zeros(0, dtype=np.float32)
+        self._size = 0
+        self._items: List[Dict[str, Any]] = []  # 行号 -> 记忆（不含 embedding）
+        self._index: Dict[str, int] = {}         # id -> 行号，按插入顺序
+        self._log_ops = 0
+
+    # ==================== 基本访问 ====================
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """按添加顺序遍历记忆（返回的是内部字典，修改请走 update）"""
+        items = self._items
+        return iter([items[row] for row in self._index.values()])
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._index
+
+    def get(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        row = self._index.get(memory_id)
+        return self._items[row] if row is not None else None
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """最新的 limit 条，最新在前"""
+        result = []
+        for memory_id in reversed(self._index):
+            if len(result) >= limit:
+                break
+            result.append(self._items[self._index[memory_id]])
+        return result
+
+    def vector(self, memory_id: str) -> Optional[np.ndarray]:
+        row = self._index.get(memory_id)
+        return self._matrix[row] if row is not None else None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """当前全部向量（只读视图，行号与内部存储一致）"""
+        return self._matrix[:self._size]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """导出为旧版列表格式（每条带 embedding）"""
+        return [dict(self._items[row], embedding=self._matrix[row].tolist()) for row in self._index.values()]
+
+    # ==================== 内部行操作 ====================
+
+    def _reserve(self, dim: int):
+        if self.dim is None:
+            self.dim = dim
+            self._matrix = np.zeros((16, dim), dtype=np.float32)
+            self._importance = np.zeros(16, dtype=np.float32)
+        elif dim != self.dim:
+            raise ValueError(f"向量维度不一致: {dim} != {self.dim}")
+        if self._size == self._matrix.shape[0]:
+            capacity = max(16, self._size * 2)
+            matrix = np.zeros((capacity, dim), dtype=np.float32)
+            matrix[:self._size] = self._matrix[:self._size]
+            importance = np.zeros(capacity, dtype=np.float32)
+            importance[:self._size] = self._importance[:self._size]
+            self._matrix, self._importance = matrix, importance
+
+    def _put(self, memory: Dict[str, Any], vector: Optional[np.ndarray]):
+        """插入或覆盖一条记忆；vector 为空时保留原向量"""
+        memory_id = memory['id']
+        row = self._index.get(memory_id)
+        if row is None:
+            if vector is None:
+                return False
+            self._reserve(vector.shape[0])
+            row = self._size
+            self._size += 1
+            self._items.append(memory)
+            self._index[memory_id] = row
+        else:
+            self._items[row] = memory
+        if vector is not None:
+            if vector.shape[0] != self.dim:
+                raise ValueError(f"向量维度不一致: {vector.shape[0]} != {self.dim}")
+            self._matrix[row] = vector
+        self._importance[row] = float(memory.get('importance', 0.5) or 0.0)
+        return True
+
+    def _remove(self, memory_id: str) -> bool:
+        row = self._index.pop(memory_id, None)
+        if row is None:
+            return False
+        last = self._size - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._importance[row] = self._importance[last]
+            moved = self._items[last]
+            self._items[row] = moved
+            self._index[moved['id']] = row  # 已有键赋值不改变插入顺序
+        self._items.pop()
+        self._size = last
+        return True
+
+    # ==================== 修改（写日志） ====================
+
+    def add(self, memory: Dict[str, Any], embedding=None):
+        """添加记忆；embedding 为空时取 memory['embedding']"""
+        memory = dict(memory)
+        vector = _normalize(memory.pop('embedding') if embedding is None else embedding)
+        memory.pop('embedding', None)
+        self._put(memory, vector)
+        self._log({'op': 'put', 'memory': memory}, vector)
+
+    def update(self, memory_id: str, fields: Optional[Dict[str, Any]] = None, embedding=None) -> bool:
+        """修改字段和/或向量"""
+        memory = self.get(memory_id)
+        if memory is None:
+            return False
+        memory = dict(memory, **(fields or {}))
+        memory.pop('embedding', None)
+        vector = _normalize(embedding) if embedding is not None else None
+        self._put(memory, vector)
+        self._log({'op': 'put', 'memory': memory}, vector)
+        return True
+
+    def delete(self, memory_ids: Iterable[str]) -> int:
+        removed = [memory_id for memory_id in memory_ids if self._remove(memory_id)]
+        if removed:
+            self._log({'op': 'del', 'ids': removed})
+        return len(removed)
+
+    # ==================== 检索 ====================
+
+    def similarities(self, query) -> np.ndarray:
+        """查询向量与每一行的余弦相似度"""
+        if self._size == 0:
+            return np.zeros(0, dtype=np.float32)
+        return self.matrix @ _normalize(query)
+
+    def top_k(self, query, k: Optional[int] = None, threshold: float = 0.0,
+              importance_weight: float = 0.0) -> Tuple[List[Tuple[Dict[str, Any], float, float]], int]:
+        """按 相似度 * (1 + 重要度 * importance_weight) 排序，只保留相似度 >= threshold 的
+
+        Returns:
+            ([(记忆, 相似度, 综合得分)], 高于阈值的条数)
+        """
+        sims = self.similarities(query)
+        if sims.size == 0:
+            return [], 0
+        scores = sims * (1.0 + self._importance[:self._size] * importance_weight)
+        candidates = np.flatnonzero(sims >= threshold)
+        above = int(candidates.size)
+        if k is not None and k < candidates.size:
+            if k <= 0:
+                return [], above
+            part = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[part]
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(self._items[row], float(sims[row]), float(scores[row])) for row in order], above
+
+    def most_similar(self, query) -> Optional[Tuple[int, Dict[str, Any], float]]:
+        """最相似的一条：(行号, 记忆, 相似度)"""
+        sims = self.similarities(query)
+        if sims.size == 0:
+            return None
+        row = int(np.argmax(sims))
+        return row, self._items[row], float(sims[row])
+
+    def similarity(self, id1: str, id2: str) -> Optional[float]:
+        v1, v2 = self.vector(id1), self.vector(id2)
+        if v1 is None or v2 is None:
+            return None
+        return float(v1 @ v2)
+
+    # ==================== 持久化 ====================
+
+    def load(self, memories: List[Dict[str, Any]]):
+        """从快照列表重建，再重放追加日志"""
+        self.dim = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._importance = np.zeros(0, dtype=np.float32)
+        self._size = 0
+        self._items = []
+        self._index = {}
+
+        skipped = 0
+        for memory in memories or []:
+            embedding = memory.get('embedding') if isinstance(memory, dict) else None
+            if not embedding or 'id' not in memory:
+                skipped += 1
+                continue
+            memory = dict(memory)
+            memory.pop('embedding', None)
+            try:
+                self._put(memory, _normalize(embedding))
+            except ValueError:
+                skipped += 1
+        if skipped:
+            logger.warning(f"快照中有 {skipped} 条记忆缺少或维度不符的向量，已跳过")
+
+        self._log_ops = self._replay_log()
+
+    def _replay_log(self) -> int:
+        if not os.path.exists(self.log_path):
+            return 0
+        vectors = np.fromfile(self.vec_path, dtype=np.float32) if os.path.exists(self.vec_path) else None
+
+        ops = 0
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 写到一半的最后一行
+                ops += 1
+                if record.get('op') == 'del':
+                    for memory_id in record.get('ids', []):
+                        self._remove(memory_id)
+                    continue
+                memory = record.get('memory') or {}
+                if 'id' not in memory:
+                    continue
+                vector = None
+                vec_row, dim = record.get('vec'), record.get('dim')
+                if vec_row is not None and dim and vectors is not None:
+                    start = vec_row * dim
+                    if start + dim > vectors.size:
+                        continue  # 向量段没写完
+                    vector = vectors[start:start + dim].copy()
+                try:
+                    self._put(memory, vector)
+                except ValueError:
+                    continue
+        return ops
+
+    def _log(self, record: Dict[str, Any], vector: Optional[np.ndarray] = None):
+        """追加一条操作；先写向量段，再写日志行"""
+        try:
+            if vector is not None:
+                with open(self.vec_path, 'ab') as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    row_bytes = vector.shape[0] * 4
+                    if offset % row_bytes:
+                        # 上次写入被打断：补齐到整行，残缺的向量不会被日志引用
+                        f.write(b'\0' * (row_bytes - offset % row_bytes))
+                        offset += row_bytes - offset % row_bytes
+                    f.write(vector.astype(np.float32).tobytes())
+                record = dict(record, vec=offset // row_bytes, dim=vector.shape[0])
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._log_ops += 1
+        except Exception as e:
+            logger.error(f"写入记忆日志失败: {e}")
+            return
+        if self._log_ops >= max(self.compact_min_ops, self._size * self.compact_ratio):
+            self.compact()
+
+    @property
+    def log_ops(self) -> int:
+        return self._log_ops
+
+    def compact(self) -> bool:
+        """重写快照并清空追加日志"""
+        temp_file = self.snapshot_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.to_list(), f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.snapshot_path)
+            # 先删日志再删向量段：中途中断时，残留的日志只会引用仍存在的向量
+            for path in (self.log_path, self.vec_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._log_ops = 0
+            logger.info(f"记忆快照已压实: {self._size} 条")
+            return True
+        except Exception as e:
+            logger.error(f"压实记忆快照失败: {e}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False
+
+    def files(self) -> List[str]:
+        """快照、日志、向量段三个文件路径"""
+        return [self.snapshot_path, self.log_path, self.vec_path]
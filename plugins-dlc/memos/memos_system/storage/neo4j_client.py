@@ -5,6 +5,7 @@ Neo4j 图数据库客户端封装
 """
 
 import os
+import re
 import uuid
 import logging
 from typing import List, Dict, Any, Optional, Tuple
@@ -20,6 +21,15 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+_RELATION_TYPE_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _quote_relation_type(relation_type: str) -> str:
+    """关系类型拼进 Cypher 前做转义（非标识符字符时用反引号包裹）"""
+    if _RELATION_TYPE_RE.match(relation_type):
+        return relation_type
+    return "`" + relation_type.replace("`", "``") + "`"
+
 
 class MemosNeo4jClient:
     """MemOS 的 Neo4j 知识图谱客户端"""
@@ -29,7 +39,9 @@ class MemosNeo4jClient:
         uri: str = "bolt://localhost:7687",
         user: str = "neo4j",
         password: str = "password",
-        database: str = "neo4j"
+        database: str = "neo4j",
+        max_connection_pool_size: int = 50,
+        driver=None
     ):
         """
         初始化 Neo4j 客户端
@@ -39,14 +51,22 @@ class MemosNeo4jClient:
             user: 用户名
             password: 密码
             database: 数据库名称
+            max_connection_pool_size: 驱动连接池大小（所有 session 共用）
+            driver: 已创建的驱动（测试时可传入进程内的假驱动）
         """
         self.uri = uri
         self.user = user
         self.password = password
         self.database = database
+        self.max_connection_pool_size = max_connection_pool_size
         self.driver = None
         self._initialized = False
         
+        if driver is not None:
+            self.driver = driver
+            self._initialized = True
+            return
+        
         if not NEO4J_AVAILABLE:
             logger.warning("Neo4j 不可用，请安装 neo4j: pip install neo4j")
             return
@@ -58,7 +78,8 @@ class MemosNeo4jClient:
         try:
             self.driver = GraphDatabase.driver(
                 self.uri,
-                auth=(self.user, self.password)
+                auth=(self.user, self.password),
+                max_connection_pool_size=self.max_connection_pool_size
             )
             # 测试连接
             with self.driver.session(database=self.database) as session:
@@ -125,7 +146,7 @@ class MemosNeo4jClient:
     
     def is_available(self) -> bool:
         """检查 Neo4j 是否可用"""
-        return NEO4J_AVAILABLE and self._initialized and self.driver is not None
+        return self._initialized and self.driver is not None
     
     def close(self):
         """关闭连接"""
@@ -816,6 +837,182 @@ class MemosNeo4jClient:
             logger.error(f"获取实体记忆失败: {e}")
             return []
     
+    # ==================== 批量写入 ====================
+    
+    def _write_batch(self, statements: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        """在一个显式事务里依次执行多条语句（一次往返提交）"""
+        if not statements:
+            return True
+        with self.driver.session(database=self.database) as session:
+            tx = session.begin_transaction()
+            try:
+                for query, params in statements:
+                    tx.run(query, **params)
+                tx.commit()
+            except Exception:
+                tx.rollback()
+                raise
+            finally:
+                tx.close()
+        return True
+    
+    def resolve_entity_names(
+        self,
+        keys: List[Tuple[str, Optional[str]]],
+        user_id: str
+    ) -> Dict[Tuple[str, Optional[str]], Dict[str, Any]]:
+        """
+        批量按名称查找实体（一次查询）
+        
+        Args:
+            keys: [(名称, 类型)]，类型为 None 时只按名称匹配
+            user_id: 用户 ID
+        
+        Returns:
+            {(名称, 类型): 实体数据}，未找到的键不出现
+        """
+        if not self.is_available() or not keys:
+            return {}
+        
+        rows = [{'name': name, 'type': entity_type} for name, entity_type in dict.fromkeys(keys)]
+        try:
+            with self.driver.session(database=self.database) as session:
+                result = session.run("""
+                    UNWIND $rows AS row
+                    MATCH (e:Entity {name: row.name, user_id: $user_id})
+                    WHERE row.type IS NULL OR e.type = row.type
+                    WITH row, e ORDER BY e.created_at
+                    WITH row, collect(e)[0] AS e
+                    RETURN row.name AS name, row.type AS type, e
+                """, rows=rows, user_id=user_id)
+                
+                return {
+                    (record['name'], record['type']): dict(record['e'])
+                    for record in result if record['e'] is not None
+                }
+                
+        except Exception as e:
+            logger.error(f"批量查找实体失败: {e}")
+            return {}
+    
+    def upsert_entities(self, entities: List[Dict[str, Any]]) -> int:
+        """
+        批量创建/更新实体（单条 UNWIND + MERGE，一个事务）
+        
+        Args:
+            entities: [{'id', 'name', 'type', 'user_id', 'properties'}]
+        
+        Returns:
+            写入的实体数，失败返回 0
+        """
+        if not self.is_available() or not entities:
+            return 0
+        
+        now = datetime.now().isoformat()
+        rows = [{
+            'id': entity['id'],
+            'name': entity['name'],
+            'type': entity.get('type') or 'unknown',
+            'user_id': entity.get('user_id'),
+            'properties': entity.get('properties') or {}
+        } for entity in entities]
+        
+        try:
+            self._write_batch([("""
+                UNWIND $rows AS row
+                MERGE (e:Entity {id: row.id})
+                ON CREATE SET e.created_at = $now
+                SET e.name = row.name,
+                    e.type = row.type,
+                    e.user_id = row.user_id,
+                    e.updated_at = $now,
+                    e += row.properties
+            """, {'rows': rows, 'now': now})])
+            logger.debug(f"批量写入实体: {len(rows)}")
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"批量写入实体失败: {e}")
+            return 0
+    
+    def upsert_relations(self, relations: List[Dict[str, Any]]) -> int:
+        """
+        批量创建/更新关系
+        
+        关系类型不能参数化，按类型分组，每组一条 UNWIND + MERGE，
+        所有分组在同一个事务里提交。
+        
+        Args:
+            relations: [{'source_id', 'target_id', 'relation_type', 'properties'}]
+        
+        Returns:
+            写入的关系数，失败返回 0
+        """
+        if not self.is_available() or not relations:
+            return 0
+        
+        now = datetime.now().isoformat()
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for relation in relations:
+            grouped.setdefault(relation.get('relation_type') or 'RELATED_TO', []).append({
+                'source_id': relation['source_id'],
+                'target_id': relation['target_id'],
+                'properties': {'created_at': now, **(relation.get('properties') or {})}
+            })
+        
+        statements = []
+        for relation_type, rows in grouped.items():
+            statements.append((f"""
+                UNWIND $rows AS row
+                MATCH (a:Entity {{id: row.source_id}})
+                MATCH (b:Entity {{id: row.target_id}})
+                MERGE (a)-[r:{_quote_relation_type(relation_type)}]->(b)
+                SET r += row.properties
+            """, {'rows': rows}))
+        
+        try:
+            self._write_batch(statements)
+            logger.debug(f"批量写入关系: {len(relations)}（{len(grouped)} 种类型）")
+            return len(relations)
+            
+        except Exception as e:
+            logger.error(f"批量写入关系失败: {e}")
+            return 0
+    
+    def link_memories(self, links: List[Tuple[str, str]]) -> int:
+        """
+        批量关联记忆和实体（Memory-[:CONTAINS]->Entity，并记入 source_memory_ids）
+        
+        Args:
+            links: [(记忆 ID, 实体 ID)]
+        
+        Returns:
+            写入的关联数，失败返回 0
+        """
+        if not self.is_available() or not links:
+            return 0
+        
+        rows = [
+            {'memory_id': memory_id, 'entity_id': entity_id}
+            for memory_id, entity_id in dict.fromkeys(links)
+        ]
+        try:
+            self._write_batch([("""
+                UNWIND $rows AS row
+                MATCH (e:Entity {id: row.entity_id})
+                MERGE (m:Memory {id: row.memory_id})
+                MERGE (m)-[:CONTAINS]->(e)
+                SET e.source_memory_ids = CASE
+                    WHEN row.memory_id IN coalesce(e.source_memory_ids, []) THEN e.source_memory_ids
+                    ELSE coalesce(e.source_memory_ids, []) + row.memory_id
+                END
+            """, {'rows': rows})])
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"批量关联记忆和实体失败: {e}")
+            return 0
+    
     # ==================== 统计 ====================
     
     def get_stats(self, user_id: Optional[str] = None) -> Dict[str, Any]:
@@ -7,7 +7,7 @@
 import os
 import json
 import logging
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 
 try:
@@ -853,6 +853,85 @@ class NetworkXGraphClient:
             properties=properties
         )
 
+    # ==================== 批量写入（与 Neo4j 接口一致） ====================
+
+    def resolve_entity_names(
+        self,
+        keys: List[Tuple[str, Optional[str]]],
+        user_id: Optional[str] = None
+    ) -> Dict[Tuple[str, Optional[str]], Dict[str, Any]]:
+        """批量按名称查找实体，返回 {(名称, 类型): 实体}"""
+        resolved = {}
+        for name, entity_type in dict.fromkeys(keys):
+            found = self.find_entity_by_name(name, user_id, entity_type=entity_type)
+            if found:
+                resolved[(name, entity_type)] = found
+        return resolved
+
+    def upsert_entities(self, entities: List[Dict[str, Any]]) -> int:
+        """批量创建/更新实体，只落盘一次"""
+        if not self.is_available() or not entities:
+            return 0
+
+        now = datetime.now().isoformat()
+        for entity in entities:
+            entity_id = entity['id']
+            attrs = dict(self.graph.nodes[entity_id]) if entity_id in self.graph.nodes else {'created_at': now}
+            attrs.update({
+                'entity_type': entity.get('type') or 'unknown',
+                'name': entity['name'],
+                'properties': {**(attrs.get('properties') or {}), **(entity.get('properties') or {})},
+                'user_id': entity.get('user_id'),
+                'updated_at': now
+            })
+            self._normalize_entity_attrs(attrs)
+            self.graph.add_node(entity_id, **attrs)
+        self._save_graph()
+        return len(entities)
+
+    def upsert_relations(self, relations: List[Dict[str, Any]]) -> int:
+        """批量创建/更新关系（两端实体必须已存在），只落盘一次"""
+        if not self.is_available() or not relations:
+            return 0
+
+        now = datetime.now().isoformat()
+        written = 0
+        for relation in relations:
+            source_id, target_id = relation['source_id'], relation['target_id']
+            if source_id not in self.graph.nodes or target_id not in self.graph.nodes:
+                continue
+            edge_attrs = {
+                'relation_type': relation.get('relation_type') or 'related_to',
+                'properties': relation.get('properties') or {},
+                'created_at': now
+            }
+            self._normalize_relation_attrs(edge_attrs)
+            self.graph.add_edge(source_id, target_id, **edge_attrs)
+            written += 1
+        if written:
+            self._save_graph()
+        return written
+
+    def link_memories(self, links: List[Tuple[str, str]]) -> int:
+        """批量把实体关联到记忆（记入 source_memory_ids），只落盘一次"""
+        if not self.is_available() or not links:
+            return 0
+
+        written = 0
+        changed = False
+        for memory_id, entity_id in dict.fromkeys(links):
+            if entity_id not in self.graph.nodes:
+                continue
+            attrs = self.graph.nodes[entity_id]
+            self._normalize_entity_attrs(attrs)
+            if memory_id not in attrs['source_memory_ids']:
+                attrs['source_memory_ids'].append(memory_id)
+                changed = True
+            written += 1
+        if changed:
+            self._save_graph()
+        return written
+
     # ==================== Memory-node style compatibility ====================
 
     def add_node(self, node_id: str, metadata: Optional[Dict[str, Any]] = None, **kwargs) -> bool:
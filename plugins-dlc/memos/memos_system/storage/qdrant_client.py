@@ -5,9 +5,10 @@ Qdrant 向量数据库客户端封装
 """
 
 import os
+import json
 import uuid
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
 try:
@@ -15,7 +16,15 @@ try:
     from qdrant_client.models import (
         VectorParams, Distance, PointStruct,
         Filter, FieldCondition, MatchValue, Range,
-        UpdateStatus, PayloadSchemaType
+        IsEmptyCondition, PayloadField, OrderBy, Direction,
+        UpdateStatus, PayloadSchemaType,
+        PointVectors, SetPayload, SetPayloadOperation,
+        UpdateVectors, UpdateVectorsOperation,
+        CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+        ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+        BinaryQuantization, BinaryQuantizationConfig, Disabled,
+        HnswConfigDiff, SearchParams, QuantizationSearchParams,
+        VectorParamsDiff, CollectionParamsDiff
     )
     QDRANT_AVAILABLE = True
 except ImportError:
@@ -24,6 +33,41 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 批量操作每次请求携带的最多点数
+BATCH_CHUNK_SIZE = 512
+
+# 存在 "<集合名>__live" 别名时，所有操作都走别名（更换 Embedding 模型后由迁移切换指向）
+LIVE_ALIAS_SUFFIX = '__live'
+
+# 集合存储选项（memos_config.json 的 storage.vector.options）。
+# 量化 / HNSW / on_disk 只在 Qdrant 服务端模式（storage.vector.url）生效，
+# 本地模式是内存中的暴力检索，这些选项会被忽略。
+DEFAULT_COLLECTION_OPTIONS = {
+    'quantization': 'none',          # none / scalar（int8）/ binary
+    'quantization_always_ram': True,  # 量化向量常驻内存，原始向量可放磁盘
+    'rescore': True,                 # 量化检索后用原始向量重打分
+    'oversampling': 2.0,             # 量化检索的候选放大倍数
+    'on_disk_vectors': False,        # 原始向量存磁盘（mmap）
+    'on_disk_payload': False,
+    'hnsw_m': 16,
+    'hnsw_ef_construct': 100,
+    'hnsw_on_disk': False,
+    'search_ef': None,               # 检索时的 hnsw_ef，None 使用服务端默认
+}
+
+
+def resolve_server(vector_cfg: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """服务端地址和 API Key：环境变量 MEMOS_QDRANT_URL / MEMOS_QDRANT_API_KEY 优先于配置；
+    url 为 None 表示使用本地模式"""
+    url = os.getenv('MEMOS_QDRANT_URL') or vector_cfg.get('url') or None
+    api_key = os.getenv('MEMOS_QDRANT_API_KEY') or vector_cfg.get('api_key') or None
+    return url, api_key
+
+
+def _chunks(items: List[Any], size: int = BATCH_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 
 class MemosQdrantClient:
     """MemOS 的 Qdrant 向量数据库客户端"""
@@ -33,7 +77,10 @@ class MemosQdrantClient:
         path: str = "./memos_data/qdrant",
         collection_name: str = "memories",
         vector_size: int = 768,
-        use_memory: bool = False
+        use_memory: bool = False,
+        url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None
     ):
         """
         初始化 Qdrant 客户端
@@ -43,8 +90,16 @@ class MemosQdrantClient:
             collection_name: 集合名称
             vector_size: 向量维度
             use_memory: 是否使用内存模式（不持久化）
+            url: Qdrant 服务地址（设置后使用服务端模式，忽略 path）
+            api_key: Qdrant 服务端 API Key
+            options: 集合存储选项，见 DEFAULT_COLLECTION_OPTIONS
         """
         self.path = path
+        self.url = url or None
+        self.api_key = api_key or None
+        self.options = {**DEFAULT_COLLECTION_OPTIONS, **(options or {})}
+        self.base_collection_name = collection_name
+        self.live_alias = collection_name + LIVE_ALIAS_SUFFIX
         self.collection_name = collection_name
         self.vector_size = vector_size
         self.use_memory = use_memory
@@ -60,7 +115,11 @@ class MemosQdrantClient:
     def _init_client(self):
         """初始化 Qdrant 客户端"""
         try:
-            if self.use_memory:
+            if self.url:
+                # 服务端模式
+                self.client = QdrantClient(url=self.url, api_key=self.api_key)
+                logger.info(f"Qdrant 服务端模式: {self.url}")
+            elif self.use_memory:
                 # 内存模式
                 self.client = QdrantClient(":memory:")
                 logger.info("Qdrant 内存模式已启动")
@@ -70,6 +129,14 @@ class MemosQdrantClient:
                 self.client = QdrantClient(path=self.path)
                 logger.info(f"Qdrant 本地模式已启动: {self.path}")
 
+                if any(self.options[k] != v for k, v in DEFAULT_COLLECTION_OPTIONS.items()):
+                    logger.info("量化 / HNSW / on_disk 选项仅在服务端模式（url）生效，本地模式忽略")
+
+            # 已切换过集合时使用别名，否则直接用配置的集合名
+            if self.alias_target(self.live_alias):
+                self.collection_name = self.live_alias
+                logger.info(f"使用集合别名: {self.live_alias} -> {self.alias_target(self.live_alias)}")
+
             # 检查并创建集合
             self._ensure_collection()
             self._initialized = True
@@ -84,13 +151,10 @@ class MemosQdrantClient:
             collections = self.client.get_collections().collections
             collection_names = [c.name for c in collections]
 
-            if self.collection_name not in collection_names:
+            if self.collection_name not in collection_names and not self.alias_target(self.collection_name):
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=self.vector_size,
-                        distance=Distance.COSINE
-                    )
+                    **self._collection_config(self.vector_size)
                 )
                 logger.info(f"创建集合: {self.collection_name}")
 
@@ -100,30 +164,37 @@ class MemosQdrantClient:
                 logger.info(f"集合已存在: {self.collection_name}")
                 # 旧集合启动时也补建新增 payload 索引（已存在会被安全忽略）
                 self._create_payload_indexes()
+                # 存储选项有变化时原地更新（服务端在后台重建索引/量化）
+                if self.url:
+                    self.apply_collection_options()
 
         except Exception as e:
             logger.error(f"创建集合失败: {e}")
             raise
 
-    def _create_payload_indexes(self):
+    def _create_payload_indexes(self, collection_name: Optional[str] = None):
         """创建 Payload 索引以加速过滤查询。
 
         Qdrant 对已存在索引会抛错；这里逐个创建并降级为 debug，
         方便老集合在启动时补上 layer/status 索引。
         """
+        collection_name = collection_name or self.collection_name
         index_fields = [
             ("user_id", PayloadSchemaType.KEYWORD),
             ("memory_type", PayloadSchemaType.KEYWORD),
             ("tags", PayloadSchemaType.KEYWORD),
             ("layer", PayloadSchemaType.KEYWORD),
             ("status", PayloadSchemaType.KEYWORD),
+            # list_memories_page 按时间排序（scroll order_by）需要这两个索引
+            ("created_at", PayloadSchemaType.DATETIME),
+            ("updated_at", PayloadSchemaType.DATETIME),
         ]
 
         created = 0
         for field_name, schema in index_fields:
             try:
                 self.client.create_payload_index(
-                    collection_name=self.collection_name,
+                    collection_name=collection_name,
                     field_name=field_name,
                     field_schema=schema
                 )
@@ -137,6 +208,195 @@ class MemosQdrantClient:
         """检查 Qdrant 是否可用"""
         return QDRANT_AVAILABLE and self._initialized and self.client is not None
 
+    # ==================== 存储选项 ====================
+
+    def _quantization_config(self):
+        mode = str(self.options.get('quantization') or 'none').lower()
+        always_ram = bool(self.options.get('quantization_always_ram', True))
+        if mode in ('scalar', 'int8'):
+            return ScalarQuantization(scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8, quantile=0.99, always_ram=always_ram
+            ))
+        if mode == 'binary':
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+        return None
+
+    def _hnsw_config(self) -> "HnswConfigDiff":
+        return HnswConfigDiff(
+            m=int(self.options.get('hnsw_m', 16)),
+            ef_construct=int(self.options.get('hnsw_ef_construct', 100)),
+            on_disk=bool(self.options.get('hnsw_on_disk', False))
+        )
+
+    def _collection_config(self, vector_size: int) -> Dict[str, Any]:
+        """create_collection 的参数（向量、HNSW、量化、payload 存储）"""
+        return {
+            'vectors_config': VectorParams(
+                size=vector_size,
+                distance=Distance.COSINE,
+                on_disk=bool(self.options.get('on_disk_vectors', False))
+            ),
+            'hnsw_config': self._hnsw_config(),
+            'quantization_config': self._quantization_config(),
+            'on_disk_payload': bool(self.options.get('on_disk_payload', False)),
+        }
+
+    def _search_params(self) -> Optional["SearchParams"]:
+        """检索参数；本地模式没有 HNSW/量化，返回 None"""
+        if not self.url:
+            return None
+        quantization = None
+        if self._quantization_config() is not None:
+            quantization = QuantizationSearchParams(
+                rescore=bool(self.options.get('rescore', True)),
+                oversampling=float(self.options.get('oversampling', 2.0))
+            )
+        ef = self.options.get('search_ef')
+        if quantization is None and not ef:
+            return None
+        return SearchParams(hnsw_ef=int(ef) if ef else None, quantization=quantization)
+
+    def collection_options_diff(self, collection_name: Optional[str] = None) -> Dict[str, Any]:
+        """集合现有配置与 options 不一致的项：{选项名: (当前值, 期望值)}"""
+        info = self.client.get_collection(collection_name or self.collection_name)
+        params = info.config.params
+        hnsw = info.config.hnsw_config
+        current_quantization = info.config.quantization_config
+        if current_quantization is None:
+            current_mode = 'none'
+        elif getattr(current_quantization, 'binary', None) is not None:
+            current_mode = 'binary'
+        elif getattr(current_quantization, 'scalar', None) is not None:
+            current_mode = 'scalar'
+        else:
+            current_mode = type(current_quantization).__name__
+        wanted_mode = str(self.options.get('quantization') or 'none').lower()
+        wanted_mode = 'scalar' if wanted_mode == 'int8' else wanted_mode
+
+        pairs = {
+            'quantization': (current_mode, wanted_mode),
+            'on_disk_vectors': (bool(getattr(params.vectors, 'on_disk', False)),
+                                bool(self.options.get('on_disk_vectors', False))),
+            'on_disk_payload': (bool(params.on_disk_payload), bool(self.options.get('on_disk_payload', False))),
+            'hnsw_m': (hnsw.m, int(self.options.get('hnsw_m', 16))),
+            'hnsw_ef_construct': (hnsw.ef_construct, int(self.options.get('hnsw_ef_construct', 100))),
+            'hnsw_on_disk': (bool(hnsw.on_disk), bool(self.options.get('hnsw_on_disk', False))),
+        }
+        return {name: pair for name, pair in pairs.items() if pair[0] != pair[1]}
+
+    def apply_collection_options(self, collection_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        把 options 应用到已有集合（仅服务端模式）
+
+        Qdrant 服务端支持原地修改向量 on_disk、HNSW 参数、量化和 payload 存储方式，
+        修改后由优化器在后台重建，期间检索照常可用。返回实际修改的项。
+        """
+        if not self.url:
+            return {}
+        collection_name = self.physical_collection() if collection_name is None else collection_name
+        try:
+            diff = self.collection_options_diff(collection_name)
+        except Exception as e:
+            logger.warning(f"读取集合配置失败: {e}")
+            return {}
+        if not diff:
+            return {}
+
+        kwargs = {}
+        if 'on_disk_vectors' in diff:
+            kwargs['vectors_config'] = {'': VectorParamsDiff(on_disk=diff['on_disk_vectors'][1])}
+        if 'on_disk_payload' in diff:
+            kwargs['collection_params'] = CollectionParamsDiff(on_disk_payload=diff['on_disk_payload'][1])
+        if {'hnsw_m', 'hnsw_ef_construct', 'hnsw_on_disk'} & set(diff):
+            kwargs['hnsw_config'] = self._hnsw_config()
+        if 'quantization' in diff:
+            kwargs['quantization_config'] = self._quantization_config() or Disabled.DISABLED
+        try:
+            self.client.update_collection(collection_name=collection_name, **kwargs)
+            logger.info(f"集合 {collection_name} 存储选项已更新: {diff}")
+            return diff
+        except Exception as e:
+            logger.error(f"更新集合存储选项失败: {e}")
+            return {}
+
+    # ==================== 集合与别名 ====================
+
+    def alias_target(self, alias_name: str) -> Optional[str]:
+        """别名指向的实际集合；不是别名返回 None"""
+        try:
+            for alias in self.client.get_aliases().aliases:
+                if alias.alias_name == alias_name:
+                    return alias.collection_name
+        except Exception as e:
+            logger.debug(f"读取集合别名失败: {e}")
+        return None
+
+    def physical_collection(self) -> str:
+        """当前实际读写的集合名（解析别名）"""
+        return self.alias_target(self.collection_name) or self.collection_name
+
+    def collection_exists(self, collection_name: str) -> bool:
+        try:
+            return collection_name in [c.name for c in self.client.get_collections().collections]
+        except Exception:
+            return False
+
+    def collection_vector_size(self, collection_name: Optional[str] = None) -> Optional[int]:
+        """集合实际的向量维度"""
+        try:
+            info = self.client.get_collection(collection_name or self.collection_name)
+            vectors = info.config.params.vectors
+            return getattr(vectors, 'size', None)
+        except Exception as e:
+            logger.debug(f"读取集合维度失败: {e}")
+            return None
+
+    def create_collection(self, collection_name: str, vector_size: int) -> bool:
+        """新建集合（已存在则不动）并建 payload 索引"""
+        if self.collection_exists(collection_name):
+            return True
+        try:
+            self.client.create_collection(
+                collection_name=collection_name,
+                **self._collection_config(vector_size)
+            )
+            self._create_payload_indexes(collection_name)
+            logger.info(f"创建集合: {collection_name}")
+            return True
+        except Exception as e:
+            logger.error(f"创建集合失败: {e}")
+            return False
+
+    def switch_live_collection(self, target_collection: str, vector_size: Optional[int] = None) -> bool:
+        """把 live 别名原子地指向 target_collection，之后的读写都走新集合"""
+        operations = []
+        if self.alias_target(self.live_alias):
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=self.live_alias)))
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(
+            collection_name=target_collection, alias_name=self.live_alias
+        )))
+        try:
+            self.client.update_collection_aliases(change_aliases_operations=operations)
+        except Exception as e:
+            logger.error(f"切换集合别名失败: {e}")
+            return False
+        self.collection_name = self.live_alias
+        if vector_size:
+            self.vector_size = vector_size
+        logger.info(f"集合别名已切换: {self.live_alias} -> {target_collection}")
+        return True
+
+    def delete_collection(self, collection_name: str) -> bool:
+        """删除集合（不允许删除当前使用中的集合）"""
+        if collection_name in (self.collection_name, self.physical_collection()):
+            return False
+        try:
+            self.client.delete_collection(collection_name)
+            return True
+        except Exception as e:
+            logger.error(f"删除集合失败: {e}")
+            return False
+
     @staticmethod
     def _infer_default_layer(payload: Dict[str, Any]) -> str:
         """根据来源/类型推断新写入记忆的生命周期层。"""
@@ -356,7 +616,8 @@ class MemosQdrantClient:
                 query=query_vector,
                 limit=top_k,
                 score_threshold=score_threshold,
-                query_filter=query_filter
+                query_filter=query_filter,
+                search_params=self._search_params()
             )
 
             # 格式化返回结果
@@ -433,6 +694,269 @@ class MemosQdrantClient:
             logger.error(f"获取记忆失败: {e}")
             return None
 
+    def get_memories(
+        self,
+        memory_ids: List[str],
+        with_vectors: bool = False,
+        include_deleted: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取记忆（每 BATCH_CHUNK_SIZE 个 ID 一次 retrieve）
+
+        Args:
+            memory_ids: 记忆 ID 列表
+            with_vectors: 是否带回向量
+            include_deleted: 是否包含软删除的记忆
+
+        Returns:
+            {记忆 ID: 与 get_memory 相同结构的记录}，不存在的 ID 不出现
+        """
+        if not self.is_available() or not memory_ids:
+            return {}
+
+        memories = {}
+        try:
+            for chunk in _chunks(list(dict.fromkeys(memory_ids))):
+                results = self.client.retrieve(
+                    collection_name=self.collection_name,
+                    ids=chunk,
+                    with_payload=True,
+                    with_vectors=with_vectors
+                )
+                for point in results:
+                    payload = point.payload or {}
+                    if not include_deleted and payload.get('status') == 'deleted':
+                        continue
+                    memories[str(point.id)] = {
+                        'id': point.id,
+                        'content': payload.get('content', ''),
+                        'vector': point.vector if with_vectors else None,
+                        'payload': payload
+                    }
+            return memories
+
+        except Exception as e:
+            logger.error(f"批量获取记忆失败: {e}")
+            return memories
+
+    @staticmethod
+    def _memory_record(point) -> Dict[str, Any]:
+        """列表接口返回的记忆结构"""
+        payload = point.payload or {}
+        return {
+            'id': point.id,
+            'content': payload.get('content', ''),
+            'importance': payload.get('importance', 0.5),
+            'created_at': payload.get('created_at'),
+            'updated_at': payload.get('updated_at'),
+            'memory_type': payload.get('memory_type', 'general'),
+            'layer': payload.get('layer', 'LongTermMemory'),
+            'status': payload.get('status', 'active'),
+            'access_count': payload.get('access_count', 0),
+            'last_accessed_at': payload.get('last_accessed_at'),
+            'tags': payload.get('tags', []),
+            'merge_count': payload.get('merge_count', 0),
+            'payload': payload
+        }
+
+    @staticmethod
+    def _list_filter(
+        user_id: Optional[str] = None,
+        include_deleted: bool = False,
+        include_archived: bool = False,
+        status: Optional[str] = None,
+        memory_type: Optional[str] = None,
+        layer: Optional[str] = None
+    ) -> "Filter":
+        """列表 / 计数共用的过滤条件"""
+        must_conditions = []
+        must_not_conditions = []
+        if status:
+            must_conditions.append(FieldCondition(key="status", match=MatchValue(value=status)))
+        else:
+            if not include_deleted:
+                must_not_conditions.append(FieldCondition(key="status", match=MatchValue(value="deleted")))
+            if not include_archived:
+                must_not_conditions.append(FieldCondition(key="status", match=MatchValue(value="archived")))
+        if user_id:
+            must_conditions.append(FieldCondition(key="user_id", match=MatchValue(value=user_id)))
+        if memory_type:
+            must_conditions.append(FieldCondition(key="memory_type", match=MatchValue(value=memory_type)))
+        if layer:
+            must_conditions.append(FieldCondition(key="layer", match=MatchValue(value=layer)))
+        return Filter(must=must_conditions, must_not=must_not_conditions)
+
+    def _scroll_keys(
+        self,
+        query_filter: "Filter",
+        limit: int,
+        order_field: Optional[str] = None,
+        key_fields: Tuple[str, ...] = ()
+    ) -> List[Tuple[str, Any]]:
+        """只取 ID 和排序字段：[(排序键, ID)]；order_field 为空时按存储顺序分批 scroll"""
+        selector = list(key_fields) if key_fields else False
+        if order_field:
+            results, _ = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=query_filter,
+                limit=limit,
+                order_by=OrderBy(key=order_field, direction=Direction.DESC),
+                with_payload=selector,
+                with_vectors=False
+            )
+        else:
+            results = []
+            next_offset = None
+            while len(results) < limit:
+                batch, next_offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=query_filter,
+                    limit=min(1000, limit - len(results)),
+                    offset=next_offset,
+                    with_payload=selector,
+                    with_vectors=False
+                )
+                results.extend(batch)
+                if not batch or next_offset is None:
+                    break
+        keys = []
+        for point in results:
+            payload = point.payload or {}
+            key = next((payload[f] for f in key_fields if payload.get(f)), '')
+            keys.append((key, point.id))
+        return keys
+
+    def _keyword_keys(
+        self,
+        query_filter: "Filter",
+        keyword: str,
+        key_fields: Tuple[str, ...] = ()
+    ) -> List[Tuple[str, Any]]:
+        """按内容子串（不区分大小写）筛选：只读取 content 和排序字段，返回 [(排序键, ID)]
+
+        Qdrant 的 MatchText 按分词整词匹配，中文整句会被当成一个词，
+        所以关键词在客户端匹配，其余条件仍由 Qdrant 过滤。
+        """
+        needle = keyword.lower()
+        keys = []
+        next_offset = None
+        while True:
+            batch, next_offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=query_filter,
+                limit=1000,
+                offset=next_offset,
+                with_payload=['content', *key_fields],
+                with_vectors=False
+            )
+            for point in batch:
+                payload = point.payload or {}
+                if needle in (payload.get('content') or '').lower():
+                    keys.append((next((payload[f] for f in key_fields if payload.get(f)), ''), point.id))
+            if not batch or next_offset is None:
+                break
+        return keys
+
+    @staticmethod
+    def _with_empty(query_filter: "Filter", *fields: str) -> "Filter":
+        return Filter(
+            must=list(query_filter.must or []) + [IsEmptyCondition(is_empty=PayloadField(key=f)) for f in fields],
+            must_not=query_filter.must_not
+        )
+
+    def list_memories_page(
+        self,
+        user_id: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 50,
+        include_deleted: bool = False,
+        include_archived: bool = False,
+        status: Optional[str] = None,
+        memory_type: Optional[str] = None,
+        layer: Optional[str] = None,
+        keyword: Optional[str] = None,
+        sort: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        分页列出记忆：过滤和排序交给 Qdrant，只读取当前页的完整 payload
+
+        Args:
+            offset / limit: 分页（limit <= 0 表示 offset 之后全部）
+            keyword: 内容子串（不区分大小写），需扫描过滤后记忆的 content 字段
+            sort: created_desc / updated_desc，其他值保持存储顺序
+
+        Returns:
+            (当前页记忆, 过滤后的总数)
+        """
+        if not self.is_available():
+            return [], 0
+
+        query_filter = self._list_filter(
+            user_id=user_id, include_deleted=include_deleted, include_archived=include_archived,
+            status=status, memory_type=memory_type, layer=layer
+        )
+        try:
+            if keyword:
+                key_fields = {'created_desc': ('created_at',),
+                              'updated_desc': ('updated_at', 'created_at')}.get(sort, ())
+                keys = self._keyword_keys(query_filter, keyword, key_fields)
+                if key_fields:
+                    keys.sort(key=lambda item: item[0], reverse=True)
+                total = len(keys)
+            else:
+                total = self.client.count(
+                    collection_name=self.collection_name, count_filter=query_filter, exact=True
+                ).count
+            window = min(offset + limit, total) if limit > 0 else total
+            if offset >= window:
+                return [], total
+
+            if not keyword:
+                if sort == 'created_desc':
+                    # order_by 不返回缺少排序字段的点，它们排在最后（与旧的空字符串排序一致）
+                    keys = self._scroll_keys(query_filter, window, 'created_at', ('created_at',))
+                    if len(keys) < window:
+                        keys += self._scroll_keys(self._with_empty(query_filter, 'created_at'), window - len(keys))
+                elif sort == 'updated_desc':
+                    # 从未更新过的记忆按 created_at 参与排序
+                    keys = self._scroll_keys(query_filter, window, 'updated_at', ('updated_at',))
+                    keys += self._scroll_keys(
+                        self._with_empty(query_filter, 'updated_at'), window, 'created_at', ('created_at',)
+                    )
+                    keys.sort(key=lambda item: item[0], reverse=True)
+                    keys = keys[:window]
+                    if len(keys) < window:
+                        keys += self._scroll_keys(self._with_empty(query_filter, 'updated_at', 'created_at'),
+                                                  window - len(keys))
+                else:
+                    keys = self._scroll_keys(query_filter, window)
+
+            page_ids = [point_id for _, point_id in keys[offset:window]]
+            points = {
+                str(point.id): point
+                for chunk in _chunks(page_ids)
+                for point in self.client.retrieve(
+                    collection_name=self.collection_name, ids=chunk, with_payload=True, with_vectors=False
+                )
+            }
+            return [self._memory_record(points[str(i)]) for i in page_ids if str(i) in points], total
+
+        except Exception as e:
+            # 旧版服务端不支持 order_by / datetime 索引时退回整表读取
+            logger.warning(f"分页查询失败，改为读取全部后分页: {e}")
+            memories = self.get_all_memories(
+                user_id=user_id, limit=0, include_deleted=include_deleted, include_archived=include_archived,
+                status=status, memory_type=memory_type, layer=layer
+            )
+            if keyword:
+                needle = keyword.lower()
+                memories = [m for m in memories if needle in (m.get('content') or '').lower()]
+            if sort == 'updated_desc':
+                memories.sort(key=lambda m: m.get('updated_at') or m.get('created_at') or '', reverse=True)
+            elif sort == 'created_desc':
+                memories.sort(key=lambda m: m.get('created_at') or '', reverse=True)
+            return (memories[offset:offset + limit] if limit > 0 else memories[offset:]), len(memories)
+
     def get_all_memories(
         self,
         user_id: Optional[str] = None,
@@ -555,21 +1079,7 @@ class MemosQdrantClient:
                     payload_layer = payload.get('layer', 'LongTermMemory')
                     if layers and payload_layer not in layers:
                         continue
-                    memories.append({
-                        'id': point.id,
-                        'content': payload.get('content', ''),
-                        'importance': payload.get('importance', 0.5),
-                        'created_at': payload.get('created_at'),
-                        'updated_at': payload.get('updated_at'),
-                        'memory_type': payload.get('memory_type', 'general'),
-                        'layer': payload_layer,
-                        'status': payload_status,
-                        'access_count': payload.get('access_count', 0),
-                        'last_accessed_at': payload.get('last_accessed_at'),
-                        'tags': payload.get('tags', []),
-                        'merge_count': payload.get('merge_count', 0),
-                        'payload': payload
-                    })
+                    memories.append(self._memory_record(point))
 
                 if not results or next_offset is None:
                     break
@@ -604,30 +1114,19 @@ class MemosQdrantClient:
             # 添加更新时间
             payload_updates['updated_at'] = datetime.now().isoformat()
 
-            # 更新 payload
-            self.client.set_payload(
+            # payload 和向量（如有）在同一次批量请求里更新
+            operations = [
+                SetPayloadOperation(set_payload=SetPayload(payload=payload_updates, points=[memory_id]))
+            ]
+            if new_vector is not None and len(new_vector):
+                operations.append(UpdateVectorsOperation(update_vectors=UpdateVectors(
+                    points=[PointVectors(id=memory_id, vector=list(new_vector))]
+                )))
+            self.client.batch_update_points(
                 collection_name=self.collection_name,
-                points=[memory_id],
-                payload=payload_updates
+                update_operations=operations
             )
 
-            # 如果有新向量，更新向量
-            if new_vector:
-                # 获取现有 payload
-                existing = self.get_memory(memory_id)
-                if existing:
-                    merged_payload = {**existing['payload'], **payload_updates}
-                    self.client.upsert(
-                        collection_name=self.collection_name,
-                        points=[
-                            PointStruct(
-                                id=memory_id,
-                                vector=new_vector,
-                                payload=merged_payload
-                            )
-                        ]
-                    )
-
             logger.debug(f"更新记忆成功: {memory_id}")
             return True
 
@@ -635,6 +1134,84 @@ class MemosQdrantClient:
             logger.error(f"更新记忆失败: {e}")
             return False
 
+    def update_memories_batch(self, updates: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        批量更新 payload（每条可以不同），通过 batch_update_points 分块提交
+
+        Args:
+            updates: [(记忆 ID, 要更新的字段)]
+
+        Returns:
+            成功更新的数量（整块失败时逐条重试）
+        """
+        if not self.is_available() or not updates:
+            return 0
+
+        now = datetime.now().isoformat()
+        updated = 0
+        for chunk in _chunks(updates):
+            try:
+                # 内容相同的补丁合并成一个 SetPayload（如回填默认字段、相同的访问计数）
+                groups: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+                for memory_id, patch in chunk:
+                    try:
+                        key = json.dumps(patch, sort_keys=True, ensure_ascii=False)
+                    except (TypeError, ValueError):
+                        key = f'id:{memory_id}'
+                    groups.setdefault(key, (patch, []))[1].append(memory_id)
+                operations = [
+                    SetPayloadOperation(set_payload=SetPayload(
+                        payload={**patch, 'updated_at': now},
+                        points=point_ids
+                    ))
+                    for patch, point_ids in groups.values()
+                ]
+                self.client.batch_update_points(
+                    collection_name=self.collection_name,
+                    update_operations=operations
+                )
+                updated += len(chunk)
+            except Exception as e:
+                # 整块失败（如含已不存在的 ID）时逐条重试，避免一条拖累整块
+                logger.warning(f"批量更新记忆失败，逐条重试: {e}")
+                for memory_id, patch in chunk:
+                    try:
+                        self.client.set_payload(
+                            collection_name=self.collection_name,
+                            points=[memory_id],
+                            payload={**patch, 'updated_at': now}
+                        )
+                        updated += 1
+                    except Exception as item_error:
+                        logger.error(f"更新记忆失败 {memory_id}: {item_error}")
+        logger.debug(f"批量更新 {updated}/{len(updates)} 条记忆")
+        return updated
+
+    def update_vectors_batch(self, vectors: List[Tuple[str, List[float]]]) -> int:
+        """
+        批量替换向量（payload 不变）
+
+        Args:
+            vectors: [(记忆 ID, 新向量)]
+
+        Returns:
+            成功更新的数量
+        """
+        if not self.is_available() or not vectors:
+            return 0
+
+        updated = 0
+        for chunk in _chunks(vectors):
+            try:
+                self.client.update_vectors(
+                    collection_name=self.collection_name,
+                    points=[PointVectors(id=memory_id, vector=list(vector)) for memory_id, vector in chunk]
+                )
+                updated += len(chunk)
+            except Exception as e:
+                logger.error(f"批量更新向量失败: {e}")
+        return updated
+
     def delete_memory(self, memory_id: str) -> bool:
         """
         删除记忆
@@ -667,15 +1244,7 @@ class MemosQdrantClient:
         reason: Optional[str] = None
     ) -> bool:
         """软删除记忆，保留 payload 以便恢复。"""
-        return self.update_memory(
-            memory_id,
-            {
-                'status': 'deleted',
-                'deleted_at': datetime.now().isoformat(),
-                'delete_record_id': delete_record_id or str(uuid.uuid4()),
-                'feedback_reason': reason
-            }
-        )
+        return self.update_memory(memory_id, self._soft_delete_patch(reason, delete_record_id))
 
     def archive_memory(
         self,
@@ -684,15 +1253,49 @@ class MemosQdrantClient:
         reason: Optional[str] = None
     ) -> bool:
         """归档记忆，保留 payload 且默认从搜索/BM25 中排除。"""
-        return self.update_memory(
-            memory_id,
-            {
-                'status': 'archived',
-                'archived_at': datetime.now().isoformat(),
-                'archive_record_id': archive_record_id or str(uuid.uuid4()),
-                'feedback_reason': reason
-            }
-        )
+        return self.update_memory(memory_id, self._archive_patch(reason, archive_record_id))
+
+    @staticmethod
+    def _soft_delete_patch(reason: Optional[str] = None, record_id: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            'status': 'deleted',
+            'deleted_at': datetime.now().isoformat(),
+            'delete_record_id': record_id or str(uuid.uuid4()),
+            'feedback_reason': reason
+        }
+
+    @staticmethod
+    def _archive_patch(reason: Optional[str] = None, record_id: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            'status': 'archived',
+            'archived_at': datetime.now().isoformat(),
+            'archive_record_id': record_id or str(uuid.uuid4()),
+            'feedback_reason': reason
+        }
+
+    def soft_delete_memories_batch(
+        self,
+        memory_ids: List[str],
+        reason: Optional[str] = None,
+        extra_payload: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """批量软删除（每条各自生成 delete_record_id），extra_payload 一并写入。"""
+        return self.update_memories_batch([
+            (memory_id, {**(extra_payload or {}), **self._soft_delete_patch(reason)})
+            for memory_id in memory_ids
+        ])
+
+    def archive_memories_batch(
+        self,
+        memory_ids: List[str],
+        reason: Optional[str] = None,
+        extra_payload: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """批量归档（每条各自生成 archive_record_id），extra_payload 一并写入。"""
+        return self.update_memories_batch([
+            (memory_id, {**(extra_payload or {}), **self._archive_patch(reason)})
+            for memory_id in memory_ids
+        ])
 
     def recover_memory(self, memory_id: str) -> bool:
         """恢复软删除或归档的记忆。"""
@@ -708,21 +1311,23 @@ class MemosQdrantClient:
 
     def update_usage(self, memory_id: str, increment: int = 1) -> bool:
         """递增访问计数并刷新最近访问时间。"""
-        memory = self.get_memory(memory_id)
-        if not memory:
-            return False
-        payload = memory.get('payload', {}) or {}
-        try:
-            access_count = int(payload.get('access_count', 0) or 0) + increment
-        except Exception:
-            access_count = increment
-        return self.update_memory(
-            memory_id,
-            {
-                'access_count': max(access_count, 0),
-                'last_accessed_at': datetime.now().isoformat()
-            }
-        )
+        return self.update_usage_batch([memory_id], increment) == 1
+
+    def update_usage_batch(self, memory_ids: List[str], increment: int = 1) -> int:
+        """批量递增访问计数：一次 retrieve 读计数，一次批量写回。"""
+        memories = self.get_memories(memory_ids)
+        if not memories:
+            return 0
+        now = datetime.now().isoformat()
+        updates = []
+        for memory_id, memory in memories.items():
+            payload = memory.get('payload', {}) or {}
+            try:
+                access_count = int(payload.get('access_count', 0) or 0) + increment
+            except Exception:
+                access_count = increment
+            updates.append((memory['id'], {'access_count': max(access_count, 0), 'last_accessed_at': now}))
+        return self.update_memories_batch(updates)
 
     def delete_memories_batch(self, memory_ids: List[str]) -> int:
         """
@@ -827,54 +1432,16 @@ class MemosQdrantClient:
                         layers=layers
                     ))
 
-            must_conditions = []
-            must_not_conditions = []
-            if status:
-                must_conditions.append(
-                    FieldCondition(
-                        key="status",
-                        match=MatchValue(value=status)
-                    )
-                )
-            else:
-                if not include_deleted:
-                    must_not_conditions.append(
-                        FieldCondition(
-                            key="status",
-                            match=MatchValue(value="deleted")
-                        )
-                    )
-                if not include_archived:
-                    must_not_conditions.append(
-                        FieldCondition(
-                            key="status",
-                            match=MatchValue(value="archived")
-                        )
-                    )
-            if user_id:
-                must_conditions.append(
-                    FieldCondition(
-                        key="user_id",
-                        match=MatchValue(value=user_id)
-                    )
-                )
-            if memory_type:
-                must_conditions.append(
-                    FieldCondition(
-                        key="memory_type",
-                        match=MatchValue(value=memory_type)
-                    )
-                )
-            if layer:
-                must_conditions.append(
-                    FieldCondition(
-                        key="layer",
-                        match=MatchValue(value=layer)
-                    )
-                )
             result = self.client.count(
                 collection_name=self.collection_name,
-                count_filter=Filter(must=must_conditions, must_not=must_not_conditions)
+                count_filter=self._list_filter(
+                    user_id=user_id,
+                    include_deleted=include_deleted,
+                    include_archived=include_archived,
+                    status=status,
+                    memory_type=memory_type,
+                    layer=layer
+                )
             )
             return result.count
 
@@ -3,9 +3,12 @@
 提供 BM25、Reranker、混合搜索等功能
 """
 
+import time
+import hashlib
 import logging
+import threading
 from typing import List, Dict, Any, Optional, Tuple
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 logger = logging.getLogger(__name__)
 
@@ -423,17 +426,36 @@ class HybridSearcher:
 
 
 class Reranker:
-    """重排序器（可选使用 Cross-Encoder）"""
+    """重排序器（可选使用 Cross-Encoder）
+
+    分数按 (查询哈希, 记忆内容哈希) 缓存在 LRU 里，
+    同一条记忆被同一个查询重复命中时不再调用模型；记忆内容被修改后
+    哈希变化，旧分数自然失效。不用 updated_at 做版本，因为访问计数
+    等元数据更新也会刷新它。
+    """
     
-    def __init__(self, model_name_or_path: Optional[str] = None):
+    def __init__(
+        self,
+        model_name_or_path: Optional[str] = None,
+        cache_size: int = 4096,
+        batch_size: int = 32
+    ):
         """
         初始化重排序器
         
         Args:
             model_name_or_path: 模型名称或路径
+            cache_size: 分数缓存条数，0 表示不缓存
+            batch_size: predict 的批大小
         """
         self.model = None
         self.model_path = model_name_or_path
+        self.cache_size = max(int(cache_size), 0)
+        self.batch_size = max(int(batch_size), 1)
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._predict_lock = threading.Lock()
+        self.stats = {'calls': 0, 'skipped': 0, 'pairs': 0, 'cache_hits': 0, 'predict_ms': 0.0}
         
         if model_name_or_path:
             self._load_model()
@@ -448,6 +470,67 @@ class Reranker:
             logger.warning("sentence-transformers 未安装，Reranker 不可用")
         except Exception as e:
             logger.error(f"加载重排序模型失败: {e}")
+
+    @staticmethod
+    def _cache_key(query_hash: str, content: str) -> Tuple[str, str]:
+        # Cross-Encoder 分数只取决于 (query, content)，按内容哈希缓存
+        return query_hash, hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def is_decisive(
+        documents: List[Dict[str, Any]],
+        top_k: int,
+        min_gap: float,
+        score_field: str = 'final_score'
+    ) -> bool:
+        """
+        粗排第 top_k 名与第 top_k+1 名的分差是否已足够大
+
+        分差超过 min_gap 时精排几乎不可能改变入选集合，可直接跳过重排序。
+        候选不足 top_k+1 条时没有“落选者”，返回 False（仍重排以调整顺序）。
+        """
+        if min_gap <= 0 or top_k <= 0 or len(documents) <= top_k:
+            return False
+        gap = documents[top_k - 1].get(score_field, 0) - documents[top_k].get(score_field, 0)
+        return gap >= min_gap
+
+    def score(self, query: str, documents: List[Dict[str, Any]], content_field: str = 'content') -> Tuple[List[float], int]:
+        """
+        计算 (query, doc) 分数，只对未缓存的文档调用模型（一次批量 predict）
+
+        Returns:
+            (分数列表, 缓存命中数)
+        """
+        query_hash = hashlib.sha1(query.encode('utf-8')).hexdigest()
+        scores: List[Optional[float]] = [None] * len(documents)
+        keys = []
+        missing = []
+        with self._cache_lock:
+            for i, doc in enumerate(documents):
+                content = doc.get(content_field) or ''
+                key = self._cache_key(query_hash, content)
+                keys.append(key)
+                cached = self._cache.get(key) if self.cache_size else None
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    scores[i] = cached
+                else:
+                    missing.append(i)
+
+        if missing:
+            pairs = [[query, documents[i].get(content_field) or ''] for i in missing]
+            with self._predict_lock:
+                predicted = self.model.predict(pairs, batch_size=self.batch_size)
+            with self._cache_lock:
+                for i, value in zip(missing, predicted):
+                    scores[i] = float(value)
+                    if self.cache_size:
+                        self._cache[keys[i]] = scores[i]
+                        self._cache.move_to_end(keys[i])
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return scores, len(documents) - len(missing)
     
     def rerank(
         self,
@@ -468,27 +551,67 @@ class Reranker:
         Returns:
             重排序后的文档列表
         """
+        return self.rerank_with_info(query, documents, content_field, top_k)[0]
+
+    def rerank_with_info(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        content_field: str = 'content',
+        top_k: Optional[int] = None,
+        skip_gap: float = 0.0
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        重排序并返回本次统计
+
+        Args:
+            skip_gap: 粗排分差阈值（见 is_decisive），0 表示总是重排
+
+        Returns:
+            (文档列表, {'skipped', 'pairs', 'cache_hits', 'latency_ms'})
+        """
+        info = {'skipped': False, 'pairs': 0, 'cache_hits': 0, 'latency_ms': 0.0}
         if not self.model or not documents:
-            return documents
-        
-        # 构建 query-doc 对
-        pairs = [
-            [query, doc.get(content_field, '')]
-            for doc in documents
-        ]
-        
-        # 获取分数
-        scores = self.model.predict(pairs)
-        
+            return (documents[:top_k] if top_k else documents), info
+
+        self.stats['calls'] += 1
+        if top_k and self.is_decisive(documents, top_k, skip_gap):
+            self.stats['skipped'] += 1
+            info['skipped'] = True
+            return documents[:top_k], info
+
+        start = time.perf_counter()
+        scores, hits = self.score(query, documents, content_field)
+        latency_ms = (time.perf_counter() - start) * 1000
+
         # 添加分数并排序
         for doc, score in zip(documents, scores):
-            doc['rerank_score'] = float(score)
-        
+            doc['rerank_score'] = score
         documents.sort(key=lambda x: x.get('rerank_score', 0), reverse=True)
-        
+
+        info.update(pairs=len(documents), cache_hits=hits, latency_ms=round(latency_ms, 2))
+        self.stats['pairs'] += len(documents)
+        self.stats['cache_hits'] += hits
+        self.stats['predict_ms'] += latency_ms
+
         if top_k:
-            return documents[:top_k]
-        return documents
+            return documents[:top_k], info
+        return documents, info
+
+    def get_stats(self) -> Dict[str, Any]:
+        """累计统计：调用次数、跳过次数、缓存命中率、平均耗时"""
+        calls = self.stats['calls'] - self.stats['skipped']
+        return {
+            **self.stats,
+            'predict_ms': round(self.stats['predict_ms'], 2),
+            'avg_latency_ms': round(self.stats['predict_ms'] / calls, 2) if calls else 0.0,
+            'cache_hit_rate': round(self.stats['cache_hits'] / self.stats['pairs'], 4) if self.stats['pairs'] else 0.0,
+            'cache_entries': len(self._cache),
+        }
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
     
     def is_available(self) -> bool:
         """检查 Reranker 是否可用"""
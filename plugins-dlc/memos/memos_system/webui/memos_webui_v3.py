@@ -6,8 +6,12 @@ import requests
 import json
 import base64
 import os
+import time
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 # 尝试导入 pyvis
 try:
@@ -239,40 +243,136 @@ MEMORY_TYPE_EMOJI = {
 #                        API 函数
 # ═══════════════════════════════════════════════════════════════
 
-def check_service_status():
-    try:
-        r = requests.get(f"{MEMOS_API_URL}/health", timeout=2)
-        return r.status_code == 200, r.json() if r.status_code == 200 else {}
-    except:
-        return False, {}
+CACHE_TTL = 30          # 列表/统计类 GET 的缓存秒数（写操作后立即失效）
+HEALTH_TTL = 5
+THUMBNAIL_TTL = 600     # 缩略图按图片 id 缓存
+FETCH_WORKERS = 8       # 并发拉取缩略图/统计的线程数
+
+
+class ResponseCache:
+    """GET 响应的 TTL 缓存，跨 rerun 共享；任何写操作成功后整体失效"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item and item[0] > time.monotonic():
+                return item[1]
+            self._data.pop(key, None)
+            return None
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+
+
+@st.cache_resource
+def get_http_session():
+    """共享 keep-alive 连接池，避免每个组件刷新都新建 TCP 连接"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=FETCH_WORKERS * 2)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+
+@st.cache_resource
+def get_fetch_pool():
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="memos-webui")
 
-def api_get(endpoint, params=None, timeout=5):
+
+def _cached_get(session, cache, endpoint, params, timeout, ttl):
+    """不依赖 Streamlit 上下文，可以在线程池里调用"""
+    key = (endpoint, json.dumps(params, sort_keys=True, ensure_ascii=False) if params else "")
+    if ttl:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
     try:
-        r = requests.get(f"{MEMOS_API_URL}{endpoint}", params=params, timeout=timeout)
-        return r.json() if r.status_code == 200 else None
-    except:
+        r = session.get(f"{MEMOS_API_URL}{endpoint}", params=params, timeout=timeout)
+        data = r.json() if r.status_code == 200 else None
+    except (requests.RequestException, ValueError):
         return None
+    if ttl and data is not None:
+        cache.set(key, data, ttl)
+    return data
+
+def check_service_status():
+    health = api_get("/health", timeout=2, ttl=HEALTH_TTL)
+    return health is not None, health or {}
+
+def api_get(endpoint, params=None, timeout=5, ttl=CACHE_TTL):
+    return _cached_get(get_http_session(), get_response_cache(), endpoint, params, timeout, ttl)
+
+def api_get_many(calls):
+    """
+    并发执行多个 GET
+
+    Args:
+        calls: [(endpoint, params, timeout, ttl)]
+
+    Returns:
+        与 calls 顺序一致的结果列表
+    """
+    session, cache = get_http_session(), get_response_cache()
+    futures = [get_fetch_pool().submit(_cached_get, session, cache, *call) for call in calls]
+    return [f.result() for f in futures]
 
-def api_post(endpoint, data=None, timeout=10):
+def _send(method, endpoint, data=None, params=None, timeout=10, invalidate=True):
     try:
-        r = requests.post(f"{MEMOS_API_URL}{endpoint}", json=data, timeout=timeout)
-        return r.status_code, r.json() if r.status_code == 200 else r.text
+        r = get_http_session().request(method, f"{MEMOS_API_URL}{endpoint}", json=data, params=params, timeout=timeout)
     except Exception as e:
         return 500, str(e)
-
-def api_put(endpoint, data=None, timeout=10):
+    if invalidate and r.status_code == 200:
+        get_response_cache().invalidate()
     try:
-        r = requests.put(f"{MEMOS_API_URL}{endpoint}", json=data, timeout=timeout)
         return r.status_code, r.json() if r.status_code == 200 else r.text
-    except Exception as e:
-        return 500, str(e)
+    except ValueError:
+        return r.status_code, r.text
+
+def api_post(endpoint, data=None, timeout=10, params=None, invalidate=True):
+    """POST；invalidate=False 用于 /search 这类只读请求"""
+    return _send("POST", endpoint, data=data, params=params, timeout=timeout, invalidate=invalidate)
+
+def api_put(endpoint, data=None, timeout=10):
+    return _send("PUT", endpoint, data=data, timeout=timeout)
 
 def api_delete(endpoint, timeout=5):
-    try:
-        r = requests.delete(f"{MEMOS_API_URL}{endpoint}", timeout=timeout)
-        return r.status_code == 200
-    except:
-        return False
+    status, _ = _send("DELETE", endpoint, timeout=timeout)
+    return status == 200
+
+def render_pager(prefix, total_pages):
+    """首页/上页/下页/末页按钮，页码保存在 st.session_state[f"{prefix}_page"]"""
+    key = f"{prefix}_page"
+    pc1, pc2, pc3, pc4 = st.columns(4)
+    with pc1:
+        if st.button("首页", key=f"{prefix}_first", disabled=st.session_state[key] <= 1):
+            st.session_state[key] = 1
+            st.rerun()
+    with pc2:
+        if st.button("上页", key=f"{prefix}_prev", disabled=st.session_state[key] <= 1):
+            st.session_state[key] -= 1
+            st.rerun()
+    with pc3:
+        if st.button("下页", key=f"{prefix}_next", disabled=st.session_state[key] >= total_pages):
+            st.session_state[key] += 1
+            st.rerun()
+    with pc4:
+        if st.button("末页", key=f"{prefix}_last", disabled=st.session_state[key] >= total_pages):
+            st.session_state[key] = total_pages
+            st.rerun()
 
 def get_type_label(t):
     return MEMORY_TYPE_LABELS.get(t, t)
@@ -383,8 +483,10 @@ with tab2:
     st.header("📊 数据总览")
     st.divider()
     
-    stats = api_get("/stats")
-    graph_stats = api_get("/graph/stats")
+    stats, graph_stats = api_get_many([
+        ("/stats", None, 5, CACHE_TTL),
+        ("/graph/stats", None, 5, CACHE_TTL),
+    ])
     
     if stats:
         c1, c2, c3, c4 = st.columns(4)
@@ -436,53 +538,44 @@ with tab3:
     with fc3:
         per_page = st.selectbox("每页", [10, 20, 50], key="t3_pp")
     
-    # 分页状态
+    # 分页状态（筛选条件变化时回到第一页）
     if 't3_page' not in st.session_state:
         st.session_state.t3_page = 1
+    sel_type = type_map.get(type_filter)
+    t3_filter = (sel_type, search_kw, per_page)
+    if st.session_state.get('t3_filter') != t3_filter:
+        st.session_state.t3_filter = t3_filter
+        st.session_state.t3_page = 1
     
-    # 获取数据
-    data = api_get("/list", {"limit": 0}, timeout=300)
+    # 服务端过滤、排序、分页，只取当前页
+    params = {
+        "limit": per_page,
+        "offset": (st.session_state.t3_page - 1) * per_page,
+        "sort": "created_desc",
+    }
+    if sel_type:
+        params["memory_type"] = sel_type
+    if search_kw:
+        params["keyword"] = search_kw
+    data = api_get("/list", params, timeout=60)
     if data:
         memories = data.get('memories', [])
-        memories.sort(key=lambda x: x.get('created_at') or '', reverse=True)
-        
-        # 筛选
-        sel_type = type_map.get(type_filter)
-        if sel_type:
-            memories = [m for m in memories if m.get('memory_type') == sel_type]
-        if search_kw:
-            memories = [m for m in memories if search_kw.lower() in m.get('content', '').lower()]
-        
-        total = len(memories)
+        total = data.get('total_count', len(memories))
         total_pages = max(1, (total + per_page - 1) // per_page)
-        st.session_state.t3_page = min(st.session_state.t3_page, total_pages)
+        if st.session_state.t3_page > total_pages:
+            st.session_state.t3_page = total_pages
+            st.rerun()
         
         st.info(f"共 {total} 条 | 第 {st.session_state.t3_page}/{total_pages} 页")
         
         # 分页按钮
-        pc1, pc2, pc3, pc4 = st.columns(4)
-        with pc1:
-            if st.button("首页", key="t3_first", disabled=st.session_state.t3_page <= 1):
-                st.session_state.t3_page = 1
-                st.rerun()
-        with pc2:
-            if st.button("上页", key="t3_prev", disabled=st.session_state.t3_page <= 1):
-                st.session_state.t3_page -= 1
-                st.rerun()
-        with pc3:
-            if st.button("下页", key="t3_next", disabled=st.session_state.t3_page >= total_pages):
-                st.session_state.t3_page += 1
-                st.rerun()
-        with pc4:
-            if st.button("末页", key="t3_last", disabled=st.session_state.t3_page >= total_pages):
-                st.session_state.t3_page = total_pages
-                st.rerun()
+        render_pager("t3", total_pages)
         
         st.divider()
         
         # 显示记忆
         start = (st.session_state.t3_page - 1) * per_page
-        for i, mem in enumerate(memories[start:start+per_page]):
+        for i, mem in enumerate(memories):
             idx = start + i + 1
             mem_id = mem.get('id', '')
             content = mem.get('content', '')
@@ -568,11 +661,25 @@ with tab_archive:
     st.caption("归档记忆默认不参与检索，但数据仍保留，可一键恢复。")
     st.divider()
 
-    archived = api_get("/list", {"limit": 0, "status": "archived"}, timeout=300)
+    if 'archive_page' not in st.session_state:
+        st.session_state.archive_page = 1
+    archive_per_page = 20
+    archived = api_get("/list", {
+        "limit": archive_per_page,
+        "offset": (st.session_state.archive_page - 1) * archive_per_page,
+        "status": "archived",
+        "sort": "updated_desc",
+    }, timeout=60)
     if archived:
         archived_mems = archived.get('memories', [])
-        archived_mems.sort(key=lambda x: x.get('updated_at') or x.get('created_at') or '', reverse=True)
-        st.info(f"共 {len(archived_mems)} 条归档记忆")
+        archived_total = archived.get('total_count', len(archived_mems))
+        archive_pages = max(1, (archived_total + archive_per_page - 1) // archive_per_page)
+        if st.session_state.archive_page > archive_pages:
+            st.session_state.archive_page = archive_pages
+            st.rerun()
+        st.info(f"共 {archived_total} 条归档记忆 | 第 {st.session_state.archive_page}/{archive_pages} 页")
+        if archive_pages > 1:
+            render_pager("archive", archive_pages)
 
         for mem in archived_mems:
             mem_id = mem.get('id', '')
@@ -637,7 +744,7 @@ with tab4:
                         "use_graph": use_graph,
                         "similarity_threshold": threshold,
                         "layers": [layer_labels[label] for label in selected_layer_labels]
-                    })
+                    }, invalidate=False)
                     if status == 200:
                         mems = result.get('memories', [])
                         if mems:
@@ -722,27 +829,22 @@ with tab4:
         
         if st.button("开始去重", type="primary", key="t4_dedup_btn"):
             with st.spinner("处理中..."):
-                try:
-                    r = requests.post(f"{MEMOS_API_URL}/deduplicate", params={"threshold": threshold, "by_type": by_type}, timeout=300)
-                    if r.status_code == 200:
-                        d = r.json()
-                        st.success(f"合并 {d.get('merged_count', 0)} 条，剩余 {d.get('remaining_count', 0)} 条")
-                    else:
-                        st.error(r.text)
-                except Exception as e:
-                    st.error(str(e))
+                status, d = api_post("/deduplicate", params={"threshold": threshold, "by_type": by_type}, timeout=300)
+                if status == 200:
+                    st.success(f"合并 {d.get('merged_count', 0)} 条，剩余 {d.get('remaining_count', 0)} 条")
+                else:
+                    st.error(d)
     
     with op_tab4:
         st.subheader("批量操作")
         if st.button("重新分类所有记忆", key="t4_reclassify"):
             with st.spinner("处理中..."):
-                try:
-                    r = requests.post(f"{MEMOS_API_URL}/reclassify", timeout=3600)
-                    if r.status_code == 200:
-                        st.success("完成")
-                        st.json(r.json())
-                except Exception as e:
-                    st.error(str(e))
+                status, result = api_post("/reclassify", timeout=3600)
+                if status == 200:
+                    st.success("完成")
+                    st.json(result)
+                else:
+                    st.error(result)
 
 # ═══════════════════════════════════════════════════════════════
 #                        Tab 5: 图片记忆
@@ -768,20 +870,12 @@ with tab5:
         
         if st.button("🤖 生成图片描述", type="primary", key="regen_desc_btn"):
             with st.spinner("正在生成描述，这可能需要一些时间..."):
-                try:
-                    r = requests.post(
-                        f"{MEMOS_API_URL}/images/regenerate-descriptions",
-                        params={"force": force_regen},
-                        timeout=300
-                    )
-                    if r.status_code == 200:
-                        result = r.json()
-                        st.success(f"✅ {result.get('message', '完成')}")
-                        st.rerun()
-                    else:
-                        st.error(f"失败: {r.text}")
-                except Exception as e:
-                    st.error(f"请求失败: {e}")
+                status, result = api_post("/images/regenerate-descriptions", params={"force": force_regen}, timeout=300)
+                if status == 200:
+                    st.success(f"✅ {result.get('message', '完成')}")
+                    st.rerun()
+                else:
+                    st.error(f"失败: {result}")
     
     img_tab1, img_tab2 = st.tabs(["图片库", "上传图片"])
     
@@ -802,23 +896,7 @@ with tab5:
                 st.info(f"共 {total_imgs} 张图片 | 第 {st.session_state.img_page}/{total_pages} 页")
                 
                 # 分页按钮
-                pc1, pc2, pc3, pc4 = st.columns(4)
-                with pc1:
-                    if st.button("首页", key="img_first", disabled=st.session_state.img_page <= 1):
-                        st.session_state.img_page = 1
-                        st.rerun()
-                with pc2:
-                    if st.button("上页", key="img_prev", disabled=st.session_state.img_page <= 1):
-                        st.session_state.img_page -= 1
-                        st.rerun()
-                with pc3:
-                    if st.button("下页", key="img_next", disabled=st.session_state.img_page >= total_pages):
-                        st.session_state.img_page += 1
-                        st.rerun()
-                with pc4:
-                    if st.button("末页", key="img_last", disabled=st.session_state.img_page >= total_pages):
-                        st.session_state.img_page = total_pages
-                        st.rerun()
+                render_pager("img", total_pages)
                 
                 st.divider()
                 
@@ -826,8 +904,14 @@ with tab5:
                 start_idx = (st.session_state.img_page - 1) * img_per_page
                 page_imgs = imgs[start_idx:start_idx + img_per_page]
                 
+                # 当前页缩略图并发拉取，按图片 id 缓存
+                thumbnails = api_get_many([
+                    (f"/images/{img.get('id', '')}/data", {"thumbnail": "true"}, 10, THUMBNAIL_TTL)
+                    for img in page_imgs
+                ])
+                
                 cols = st.columns(3)
-                for i, img in enumerate(page_imgs):
+                for i, (img, img_data_resp) in enumerate(zip(page_imgs, thumbnails)):
                     with cols[i % 3]:
                         with st.container(border=True):
                             img_id = img.get('id', '')
@@ -837,7 +921,6 @@ with tab5:
                             
                             # 显示图片（获取缩略图）
                             try:
-                                img_data_resp = api_get(f"/images/{img_id}/data?thumbnail=true", timeout=10)
                                 if img_data_resp and img_data_resp.get('data'):
                                     img_b64 = img_data_resp.get('data')
                                     st.image(f"data:image/jpeg;base64,{img_b64}", use_container_width=True)
@@ -895,7 +978,7 @@ with tab5:
                             # 显示原图对话框
                             if st.session_state.get(f"show_full_{img_id}", False):
                                 try:
-                                    full_img_resp = api_get(f"/images/{img_id}/data?thumbnail=false", timeout=15)
+                                    full_img_resp = api_get(f"/images/{img_id}/data", {"thumbnail": "false"}, timeout=15, ttl=0)
                                     if full_img_resp and full_img_resp.get('data'):
                                         st.image(f"data:image/jpeg;base64,{full_img_resp.get('data')}", caption="原图")
                                     if st.button("关闭", key=f"close_img_{img_id}"):
@@ -966,8 +1049,10 @@ with tab6:
     kg_tab1, kg_tab2, kg_tab3 = st.tabs(["图谱可视化", "实体列表", "添加实体"])
     
     with kg_tab1:
-        entities = api_get("/graph/entities", {"limit": 500})
-        relations = api_get("/graph/relations", {"limit": 1000})
+        entities, relations = api_get_many([
+            ("/graph/entities", {"limit": 500}, 5, CACHE_TTL),
+            ("/graph/relations", {"limit": 1000}, 5, CACHE_TTL),
+        ])
         
         if entities and PYVIS_AVAILABLE:
             elist = entities.get('entities', [])
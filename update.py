@@ -9,6 +9,13 @@ from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent
 
+# 分段并行下载引擎与 full-hub/Batch_Download.py 共用
+sys.path.insert(0, str(PROJECT_ROOT / "full-hub"))
+try:
+    from download_engine import DownloadError, download, extract_zip_streaming
+except ImportError:
+    download = None
+
 
 def now_version():
     with open(PROJECT_ROOT / "live-2d" / "config.json", 'r', encoding="utf-8") as f:
@@ -161,6 +168,21 @@ def extract_zip(zip_file, target_folder):
         os.makedirs(target_folder)
         print(f"已创建目标文件夹: {target_folder}")
 
+    if download is not None:
+        # 按块流式写盘，不把整个成员读进内存
+        try:
+            extract_zip_streaming(zip_file, target_folder, progress=lambda done, total: display_progress_bar(
+                int(done * 100 / total), "解压进度", current=done, total=total))
+            print("\n解压完成!")
+            print(f"所有文件已解压到 '{target_folder}' 文件夹")
+            return True
+        except zipfile.BadZipFile as e:
+            print(f"错误: 下载的文件不是有效的ZIP格式 ({e})")
+            return False
+        except Exception as e:
+            print(f"解压过程中出错: {e}")
+            return False
+
     try:
         with zipfile.ZipFile(zip_file, 'r') as zip_ref:
             # 获取zip文件中的所有文件列表
@@ -234,6 +256,10 @@ def download_live2d_model_to_temp(target_folder):
         # 提取GitHub原始下载URL和文件名
         github_url = data['assets'][0]['browser_download_url']
         filename = data['assets'][0]['name']
+        # Release 资产的 digest 形如 "sha256:<hex>"，旧版本的 Release 没有这个字段
+        digest = data['assets'][0].get('digest') or ''
+        expected_sha256 = digest.split(':', 1)[1] if digest.startswith('sha256:') else None
+        expected_size = data['assets'][0].get('size')
         download_path = PROJECT_ROOT / filename
 
     except Exception as e:
@@ -249,8 +275,24 @@ def download_live2d_model_to_temp(target_folder):
 
     downloaded_file = None
 
+    if download is not None:
+        # 分段并行下载，某个源中途失败时自动切到下一个源，已下载的分段保留
+        print(f"\n正在下载: {filename}...")
+        try:
+            downloaded_file = download(
+                download_sources, download_path, sha256=expected_sha256, size=expected_size, segments=8,
+                progress=lambda done, total: display_progress_bar(
+                    int(done * 100 / total) if total else 0, "下载进度",
+                    mb_downloaded=done / (1024 * 1024), mb_total=total / (1024 * 1024))
+            )
+            print("\n下载完成!")
+        except (DownloadError, OSError) as e:
+            print(f"\n✗ 下载失败: {e}")
+            print("重新运行更新即可从断点继续下载")
+            return False
+
     # 依次尝试每个下载源
-    for source_name, url in download_sources:
+    for source_name, url in ([] if download is not None else download_sources):
         try:
             print(f"\n尝试使用 {source_name} 下载...")
             downloaded_file = download_file(url, download_path)